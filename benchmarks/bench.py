@@ -0,0 +1,334 @@
+"""
+Metric benchmark suite: every weekly KPI stage, pandas vs DuckDB, at fixed data scales.
+
+Datasets are seeded synthetic logs (`synthetic.py`, 52 ISO weeks, seed 42) sized by
+session events: 10k, 1m, 10m and 100m. Each is generated once into data/bench/<scale>/
+(a `datasets.Profile`: raw CSVs, the Parquet store, the DuckDB file and the metadata
+sidecar) and reused while its parameters are unchanged.
+
+Every (scale, engine) runs in a fresh process, so one engine's memory never shows up in
+the other's numbers. `load` comes first: the typed frames for pandas, the warehouse file
+for DuckDB. Then each stage computes its metric frame from the loaded data, best of
+`repeat` runs. Stages are listed in `STAGES`: wau, mau, aov, opac, opac_channel, churn,
+retention, rev_per_wau and refund_rate. Each result records:
+
+- wall_s / cpu_s: the fastest repeat
+- rows, rows_per_s: rows of the tables the stage reads (sessions, orders, users)
+- peak_rss_mb: the process's peak RSS during the stage (loaded frames included);
+  peak_delta_mb: the same minus the RSS the stage started with, i.e. its working memory
+
+A run is appended to benchmarks/results/history.jsonl. `compare()` matches a run's
+results with a baseline (benchmarks/results/baseline.json, stored from a run of
+history) on (scale, engine, stage) and flags wall time or working memory more than
+`THRESHOLD` (20%) above it. Tiny changes are not flagged: under 0.05 s, or under 16 MiB.
+"""
+
+import gc
+import json
+import os
+import platform
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+from beamcart_metrics import churn, datasets, metrics, retention, store, warehouse
+from beamcart_metrics.context import FrameContext
+from beamcart_metrics.paths import ROOT
+from beamcart_metrics.profiling import Probe, git_commit
+from beamcart_metrics.streaming import rss_mb
+from beamcart_metrics.synthetic import Params, generate
+
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000, "100m": 100_000_000}
+WEEKS = 52
+EVENTS_PER_USER = 32  # session events per user over 52 weeks with the default Params
+ENGINES = ("pandas", "duckdb")
+BENCH_DATA = ROOT / "data" / "bench"
+RESULTS = ROOT / "benchmarks" / "results"
+HISTORY = RESULTS / "history.jsonl"
+BASELINE = RESULTS / "baseline.json"
+THRESHOLD = 0.2  # flagged when wall time or working memory grows by more than this
+MIN_SECONDS = 0.05  # ... and by at least this much
+MIN_MB = 16.0
+
+
+def params(events: int) -> Params:
+    """Generator parameters for about `events` session events."""
+    return Params(users=max(1, round(events / EVENTS_PER_USER)), weeks=WEEKS)
+
+
+def dataset(
+    scale: str, events: int | None = None, root: Path = BENCH_DATA, workers: int | None = None
+) -> datasets.Profile:
+    """The `scale` dataset profile, generated and ingested unless data/bench/<scale>
+    already holds one made with the same parameters (`events` defaults to
+    `SCALES[scale]`). Its metadata sidecar (`datasets.describe`) has the row counts."""
+    p = params(SCALES[scale] if events is None else events)
+    wanted = json.loads(json.dumps(asdict(p)))
+    d = Path(root) / scale
+    profile = datasets.Profile(scale, d / "raw", d)
+    meta = d / "_params.json"
+    if meta.exists() and json.loads(meta.read_text())["params"] == wanted:
+        return profile
+    meta.unlink(missing_ok=True)
+    generate(p, profile.raw_dir, "csv", workers)
+    store.ingest(profile.raw_dir, profile.store_dir)
+    profile.db_path.unlink(missing_ok=True)
+    datasets.describe(profile, refresh=True)
+    meta.write_text(json.dumps({"params": wanted}, indent=2))
+    return profile
+
+
+# --- stages ----------------------------------------------------------------------------
+
+
+def _load_pandas(ctx: FrameContext) -> None:
+    for name in ("users", "sessions", "orders"):
+        getattr(ctx, name)  # read once and cached in the context
+
+
+def _load_duckdb(ctx: FrameContext) -> None:
+    warehouse.build(ctx.db_path, ctx.raw_dir, ctx.store_dir)
+    ctx.db  # opens the file read-only
+
+
+def _pandas_opac(ctx):
+    wau, net = metrics.wau_by_week(ctx.sessions), metrics.net_orders_by_week(ctx.orders)
+    return metrics.opac_by_week(wau, net)
+
+
+def _pandas_rev_per_wau(ctx):
+    wau, net = metrics.wau_by_week(ctx.sessions), metrics.net_orders_by_week(ctx.orders)
+    return metrics.rev_per_wau(wau, net)
+
+
+def _duckdb_opac(con):
+    return metrics.opac_by_week(warehouse.wau_by_week(con), warehouse.net_orders_by_week(con))
+
+
+def _duckdb_rev_per_wau(con):
+    return metrics.rev_per_wau(warehouse.wau_by_week(con), warehouse.net_orders_by_week(con))
+
+
+# stage -> (tables it reads, pandas: f(ctx), DuckDB: f(connection)); the same calls the
+# pipeline stages make, without writing their CSVs
+STAGES = {
+    "wau": (
+        ("sessions",),
+        lambda ctx: metrics.wau_by_week(ctx.sessions),
+        warehouse.wau_by_week,
+    ),
+    "mau": (
+        ("sessions",),
+        lambda ctx: metrics.mau_by_month(ctx.sessions),
+        warehouse.mau_by_month,
+    ),
+    "aov": (
+        ("orders",),
+        lambda ctx: metrics.aov_by_week(metrics.net_orders_by_week(ctx.orders)),
+        lambda con: metrics.aov_by_week(warehouse.net_orders_by_week(con)),
+    ),
+    "opac": (("sessions", "orders"), _pandas_opac, _duckdb_opac),
+    "opac_channel": (
+        ("users", "sessions", "orders"),
+        lambda ctx: metrics.opac_by_channel_week(ctx.users, ctx.sessions, ctx.orders),
+        warehouse.opac_by_channel_week,
+    ),
+    "churn": (
+        ("sessions",),
+        lambda ctx: churn.lifecycle(churn.activity(ctx.sessions, "week"), gaps=(2, 4)),
+        lambda con: churn.lifecycle(warehouse.activity(con, "week"), gaps=(2, 4)),
+    ),
+    "retention": (
+        ("users", "sessions"),
+        lambda ctx: retention.retention_counts(ctx.users, ctx.sessions, retention.DAYS),
+        lambda con: warehouse.retention_counts(con, retention.DAYS),
+    ),
+    "rev_per_wau": (("sessions", "orders"), _pandas_rev_per_wau, _duckdb_rev_per_wau),
+    "refund_rate": (
+        ("orders",),
+        lambda ctx: metrics.refund_rate_by_week(metrics.refunds_by_week(ctx.orders)),
+        lambda con: metrics.refund_rate_by_week(warehouse.refunds_by_week(con)),
+    ),
+}
+LOAD = {"pandas": _load_pandas, "duckdb": _load_duckdb}
+
+
+def _table_rows(data: datasets.Profile, ctx: FrameContext, engine: str) -> dict[str, int]:
+    rows = {name: t["rows"] for name, t in datasets.describe(data)["tables"].items()}
+    if engine == "pandas":
+        rows["sessions"] = len(ctx.sessions)
+    else:
+        q = "SELECT COUNT(*) FROM events WHERE event_type = 'session_start'"
+        rows["sessions"] = ctx.db.execute(q).fetchone()[0]
+    return rows
+
+
+def measure(fn, arg, repeat: int) -> dict:
+    """Best wall / CPU time of `repeat` calls, with the peak memory of the first."""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        before = rss_mb()
+        with Probe() as probe:
+            fn(arg)
+        stats = probe.stats
+        if best is None:
+            best = {
+                "peak_rss_mb": stats["peak_rss_mb"],
+                "peak_delta_mb": round(max(stats["peak_rss_mb"] - before, 0.0), 1),
+            }
+        if "wall_s" not in best or stats["wall_s"] < best["wall_s"]:
+            best.update(wall_s=stats["wall_s"], cpu_s=stats["cpu_s"])
+    return best
+
+
+def run_engine(
+    data: datasets.Profile, engine: str, stages=tuple(STAGES), repeat: int = 3
+) -> list[dict]:
+    """Results of `load` then each of `stages` on one engine, in this process."""
+    ctx = FrameContext(data.raw_dir, data.store_dir, engine=engine, db_path=data.db_path)
+    results = []
+
+    def record(stage: str, tables, stats: dict, rows: dict) -> None:
+        n = sum(rows[t] for t in tables)
+        wall = stats["wall_s"]
+        results.append(
+            {
+                "scale": data.name,
+                "engine": engine,
+                "stage": stage,
+                "rows": n,
+                **stats,
+                "rows_per_s": round(n / wall) if wall > 0 else None,
+            }
+        )
+
+    load = measure(LOAD[engine], ctx, 1)  # a second load would hit the caches
+    rows = _table_rows(data, ctx, engine)
+    record("load", ("users", "events", "orders"), load, rows)
+    for stage in stages:
+        tables, pandas_fn, duckdb_fn = STAGES[stage]
+        fn, arg = (pandas_fn, ctx) if engine == "pandas" else (duckdb_fn, ctx.db)
+        record(stage, tables, measure(fn, arg, repeat), rows)
+    ctx.reset()
+    return results
+
+
+def run(
+    scales=("10k", "1m"),
+    engines=ENGINES,
+    stages=tuple(STAGES),
+    repeat: int = 3,
+    root: Path = BENCH_DATA,
+    workers: int | None = None,
+    events: dict[str, int] | None = None,
+) -> dict:
+    """Benchmark every scale x engine (each engine in a fresh process); the run record."""
+    started = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    results = []
+    for scale in scales:
+        data = dataset(scale, (events or {}).get(scale), root, workers)
+        for engine in engines:
+            with ProcessPoolExecutor(1) as pool:
+                results += pool.submit(run_engine, data, engine, tuple(stages), repeat).result()
+    return {
+        "run": {
+            "started": started,
+            "commit": git_commit(),
+            "repeat": repeat,
+            "host": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+            },
+        },
+        "results": results,
+    }
+
+
+# --- history and baseline --------------------------------------------------------------
+
+
+def save(record: dict, history: Path = HISTORY) -> None:
+    Path(history).parent.mkdir(parents=True, exist_ok=True)
+    with open(history, "a") as f:
+        f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def load_history(history: Path = HISTORY) -> list[dict]:
+    if not Path(history).exists():
+        return []
+    return [json.loads(line) for line in Path(history).read_text().splitlines() if line.strip()]
+
+
+def save_baseline(record: dict, path: Path = BASELINE) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(record, indent=2) + "\n")
+
+
+def load_baseline(path: Path = BASELINE) -> dict:
+    return json.loads(Path(path).read_text())
+
+
+def compare(record: dict, base: dict, threshold: float = THRESHOLD) -> list[dict]:
+    """One row per (scale, engine, stage) in both runs over the same number of rows:
+    both wall times and working memories, their ratio, and `regression` (a list of
+    "wall" / "memory", empty when neither grew beyond `threshold`)."""
+    key = ("scale", "engine", "stage")
+    past = {tuple(r[k] for k in key): r for r in base["results"]}
+    out = []
+    for r in record["results"]:
+        b = past.get(tuple(r[k] for k in key))
+        if b is None or b["rows"] != r["rows"]:
+            continue
+        flags = []
+        if r["wall_s"] > b["wall_s"] * (1 + threshold) and r["wall_s"] - b["wall_s"] >= MIN_SECONDS:
+            flags.append("wall")
+        grew = r["peak_delta_mb"] - b["peak_delta_mb"]
+        if r["peak_delta_mb"] > b["peak_delta_mb"] * (1 + threshold) and grew >= MIN_MB:
+            flags.append("memory")
+        out.append(
+            {
+                **{k: r[k] for k in key},
+                "wall_s": r["wall_s"],
+                "base_wall_s": b["wall_s"],
+                "wall_ratio": r["wall_s"] / b["wall_s"] if b["wall_s"] > 0 else None,
+                "peak_delta_mb": r["peak_delta_mb"],
+                "base_peak_delta_mb": b["peak_delta_mb"],
+                "regression": flags,
+            }
+        )
+    return out
+
+
+def table(record: dict) -> str:
+    """The results of a run, one line per scale / engine / stage."""
+    lines = [
+        f"{'scale':<6} {'engine':<7} {'stage':<13} {'rows':>12} {'wall s':>8} {'cpu s':>8} "
+        f"{'rows/s':>13} {'peak MiB':>9} {'Δ MiB':>8}"
+    ]
+    for r in record["results"]:
+        rate = "-" if r["rows_per_s"] is None else f"{r['rows_per_s']:,}"
+        lines.append(
+            f"{r['scale']:<6} {r['engine']:<7} {r['stage']:<13} {r['rows']:>12,} "
+            f"{r['wall_s']:8.3f} {r['cpu_s']:8.3f} {rate:>13} {r['peak_rss_mb']:9.0f} "
+            f"{r['peak_delta_mb']:8.0f}"
+        )
+    return "\n".join(lines)
+
+
+def comparison_table(rows: list[dict], threshold: float = THRESHOLD) -> str:
+    lines = [
+        f"{'scale':<6} {'engine':<7} {'stage':<13} {'wall s':>8} {'base s':>8} {'ratio':>6} "
+        f"{'Δ MiB':>7} {'base':>7}  flagged (> {threshold:.0%})"
+    ]
+    for c in rows:
+        ratio = "-" if c["wall_ratio"] is None else f"{c['wall_ratio']:.2f}"
+        flag = f"⚠️ {', '.join(c['regression'])}" if c["regression"] else ""
+        lines.append(
+            f"{c['scale']:<6} {c['engine']:<7} {c['stage']:<13} {c['wall_s']:8.3f} "
+            f"{c['base_wall_s']:8.3f} {ratio:>6} {c['peak_delta_mb']:7.0f} "
+            f"{c['base_peak_delta_mb']:7.0f}  {flag}".rstrip()
+        )
+    return "\n".join(lines)
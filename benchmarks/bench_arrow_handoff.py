@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: DuckDB <-> pandas hand-off, copying (`.df()`, a CSV round trip) vs
+Arrow (`beamcart_metrics.arrowio`), on a dataset profile's DuckDB file.
+
+Cases:
+- user_week: the distinct (week, user_id) activity pairs, DuckDB -> pandas
+- events:    the whole events table, DuckDB -> pandas (`arrow_dtypes=True`, so the
+             strings stay Arrow instead of becoming Python objects)
+- scan:      the loaded pandas sessions -> DuckDB, which derives the user_week pairs:
+             written to CSV and read back vs scanned in place by name
+
+Each (case, variant) runs in a fresh process: best wall time of `--repeat` runs and
+the peak RSS above the starting RSS (working memory), as in bench_metrics.py. Both
+variants of a case must return the same number of rows.
+
+Usage:
+  python benchmarks/bench_arrow_handoff.py [--dataset big] [--cases user_week events scan]
+                                           [--repeat 3]
+"""
+
+import argparse
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from beamcart_metrics import FrameContext, arrowio, datasets, warehouse  # noqa: E402
+from bench import measure  # noqa: E402
+
+USER_WEEK = "SELECT week, user_id FROM user_week"
+EVENTS = "SELECT user_id, event_ts, event_type, week FROM events"
+DERIVE = """
+    SELECT DISTINCT CAST(DATE_TRUNC('week', event_ts) AS DATE) AS week, user_id
+    FROM {src}
+"""
+
+
+def _csv_round_trip(arg) -> int:
+    con, sessions = arg
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "sessions.csv"
+        sessions[["user_id", "event_ts"]].to_csv(path, index=False)
+        q = DERIVE.format(src=f"read_csv_auto('{path}', header=True)")
+        return len(con.execute(q).fetch_arrow_table())
+
+
+def _scan(arg) -> int:
+    con, sessions = arg
+    with arrowio.scan(con, sessions=sessions[["user_id", "event_ts"]]):
+        return len(con.execute(DERIVE.format(src="sessions")).fetch_arrow_table())
+
+
+CASES = {
+    "user_week": {
+        "copy (.df())": lambda con: len(con.execute(USER_WEEK).df()),
+        "arrow (frame)": lambda con: len(arrowio.frame(con, USER_WEEK)),
+    },
+    "events": {
+        "copy (.df())": lambda con: len(con.execute(EVENTS).df()),
+        "arrow (ArrowDtype)": lambda con: len(arrowio.frame(con, EVENTS, arrow_dtypes=True)),
+    },
+    "scan": {"copy (CSV round trip)": _csv_round_trip, "arrow (scan by name)": _scan},
+}
+
+
+def run_variant(dataset: str, case: str, variant: str, repeat: int) -> dict:
+    """One (case, variant) in this process: set up, then measure."""
+    p = datasets.get(dataset)
+    con = warehouse.connect(p.db_path, p.raw_dir, p.store_dir)
+    arg = con
+    if case == "scan":
+        arg = (con, FrameContext(dataset=dataset).sessions)
+    fn = CASES[case][variant]
+    stats = measure(fn, arg, repeat)  # the peak comes from the first, cold, run
+    return {"rows": fn(arg), **stats}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--dataset", default="big", help="dataset profile (default: big)")
+    ap.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+    profile = datasets.get(args.dataset)
+    if profile.missing():
+        sys.exit(f"❌ no {args.dataset} raw data; generate it with `{profile.seed}`")
+    warehouse.connect(profile.db_path, profile.raw_dir, profile.store_dir).close()
+
+    print(f"dataset: {profile.name} ({profile.raw_dir})")
+    print(f"{'case':<10} {'variant':<22} {'rows':>12} {'wall s':>8} {'peak MB':>8} {'vs copy':>14}")
+    for case in args.cases:
+        base = None
+        for variant in CASES[case]:
+            with ProcessPoolExecutor(1) as pool:
+                r = pool.submit(run_variant, args.dataset, case, variant, args.repeat).result()
+            vs = ""
+            if base is None:
+                base = r
+            else:
+                assert r["rows"] == base["rows"], (case, variant, r["rows"], base["rows"])
+                speed = base["wall_s"] / max(r["wall_s"], 1e-9)
+                memory = base["peak_delta_mb"] / max(r["peak_delta_mb"], 0.1)
+                vs = f"{speed:.1f}x, {memory:.1f}x mem"
+            print(
+                f"{case:<10} {variant:<22} {r['rows']:>12,} {r['wall_s']:>8.3f} "
+                f"{r['peak_delta_mb']:>8.1f} {vs:>14}"
+            )
+
+
+if __name__ == "__main__":
+    main()
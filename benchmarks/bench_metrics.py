@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Metric benchmark suite: each KPI stage (WAU, MAU, AOV, OPAC, channel OPAC, churn,
+retention, Rev/WAU, refund rate) under pandas and DuckDB at seeded data scales.
+
+Datasets (10k, 1m, 10m, 100m session events) are generated once into data/bench/. Each
+run prints wall / CPU time, rows/s and peak memory per scale, engine and stage, and is
+appended to benchmarks/results/history.jsonl (see bench.py).
+
+Usage:
+  python benchmarks/bench_metrics.py run [--scales 10k 1m 10m 100m] [--engines pandas duckdb]
+                                         [--stages wau churn ...] [--repeat 3] [--baseline]
+  python benchmarks/bench_metrics.py baseline [--run -1]     # store a run as the baseline
+  python benchmarks/bench_metrics.py compare [--run -1] [--threshold 0.2]
+      # exits 1 if a stage got slower or needs more memory than the baseline
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import bench  # noqa: E402
+
+
+def _history_run(args) -> dict:
+    runs = bench.load_history(args.history)
+    if not runs:
+        sys.exit(f"no benchmark runs in {args.history}: run `bench_metrics.py run` first")
+    try:
+        return runs[args.run]
+    except IndexError:
+        sys.exit(f"{args.history} has {len(runs)} run(s); no run {args.run}")
+
+
+def cmd_run(args) -> None:
+    record = bench.run(args.scales, args.engines, args.stages, args.repeat, args.data, args.workers)
+    bench.save(record, args.history)
+    print(bench.table(record))
+    print(f"✅ appended to {args.history}")
+    if args.baseline:
+        bench.save_baseline(record, args.baseline_file)
+        print(f"✅ saved baseline {args.baseline_file}")
+    elif Path(args.baseline_file).exists():
+        base = bench.load_baseline(args.baseline_file)
+        print("\nvs baseline:\n" + bench.comparison_table(bench.compare(record, base)))
+
+
+def cmd_baseline(args) -> None:
+    bench.save_baseline(_history_run(args), args.baseline_file)
+    print(f"✅ saved baseline {args.baseline_file}")
+
+
+def cmd_compare(args) -> None:
+    if not Path(args.baseline_file).exists():
+        sys.exit(f"no baseline at {args.baseline_file}: run `bench_metrics.py baseline` first")
+    record = _history_run(args)
+    base = bench.load_baseline(args.baseline_file)
+    rows = bench.compare(record, base, args.threshold)
+    print(f"run {record['run']['started']} vs baseline {base['run']['started']}")
+    print(bench.comparison_table(rows, args.threshold))
+    flagged = [r for r in rows if r["regression"]]
+    if not rows:
+        print("nothing to compare (no stage ran at the same scale in both)")
+    elif flagged:
+        print(f"⚠️ {len(flagged)} regression(s) beyond {args.threshold:.0%}")
+        sys.exit(1)
+    else:
+        print(f"✅ no regression beyond {args.threshold:.0%}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--history", type=Path, default=bench.HISTORY)
+    ap.add_argument("--baseline-file", type=Path, default=bench.BASELINE)
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    r = sub.add_parser("run", help="benchmark and append the results to the history")
+    r.add_argument("--scales", nargs="+", choices=bench.SCALES, default=["10k", "1m"])
+    r.add_argument("--engines", nargs="+", choices=bench.ENGINES, default=list(bench.ENGINES))
+    r.add_argument("--stages", nargs="+", choices=bench.STAGES, default=list(bench.STAGES))
+    r.add_argument("--repeat", type=int, default=3, help="runs per stage (the best is kept)")
+    r.add_argument("--data", type=Path, default=bench.BENCH_DATA, help="dataset directory")
+    r.add_argument("--workers", type=int, default=None, help="data generator processes")
+    r.add_argument("--baseline", action="store_true", help="also store this run as the baseline")
+    r.set_defaults(fn=cmd_run)
+
+    for name, fn, text in (
+        ("baseline", cmd_baseline, "store a run of the history as the baseline"),
+        ("compare", cmd_compare, "flag regressions of a run against the baseline"),
+    ):
+        c = sub.add_parser(name, help=text)
+        c.add_argument("--run", type=int, default=-1, help="run in the history (default: last)")
+        if name == "compare":
+            c.add_argument("--threshold", type=float, default=bench.THRESHOLD)
+        c.set_defaults(fn=fn)
+
+    args = ap.parse_args(argv)
+    args.fn(args)
+
+
+if __name__ == "__main__":
+    main()
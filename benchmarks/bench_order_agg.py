@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: weekly net orders / revenue / refunds, per-group lambdas vs the
+vectorised `beamcart_metrics.orders` module.
+
+Orders are synthetic (uniform over `--weeks` ISO weeks, ~8% refunds). Both variants
+produce the same table; timings are the best of `--repeat` runs.
+
+Usage:
+  python benchmarks/bench_order_agg.py [--orders 1000000 10000000] [--weeks 52] [--repeat 3]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from beamcart_metrics.orders import order_totals, with_net_columns  # noqa: E402
+
+
+def make_orders(n: int, weeks: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2025-01-06T00:00:00", "s")  # a Monday
+    ts = start + rng.integers(0, weeks * 7 * 86400, n).astype("timedelta64[s]")
+    week_start = ts.astype("datetime64[D]") - ((ts.astype("datetime64[D]").astype(int) + 3) % 7)
+    return pd.DataFrame(
+        {
+            "order_id": pd.RangeIndex(n),
+            "revenue": rng.gamma(2.0, 25.0, n).round(2),
+            "is_refund": (rng.random(n) < 0.08).astype("int8"),
+            "week_start": week_start.astype("datetime64[s]"),
+        }
+    )
+
+
+def lambdas(orders: pd.DataFrame) -> pd.DataFrame:
+    """The pre-vectorisation aggregation (opac_by_week / refund_rate_by_week)."""
+    return orders.groupby("week_start", as_index=False).agg(
+        all_orders=("order_id", "count"),
+        refund_orders=("is_refund", lambda s: (s == 1).sum()),
+        orders_net=("is_refund", lambda s: (s == 0).sum()),
+        revenue_net=("revenue", lambda s: s.where(orders.loc[s.index, "is_refund"] == 0, 0).sum()),
+    )
+
+
+def vectorised(orders: pd.DataFrame) -> pd.DataFrame:
+    return order_totals(with_net_columns(orders), "week_start")
+
+
+def best_of(fn, orders: pd.DataFrame, repeat: int) -> tuple[float, pd.DataFrame]:
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(orders)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--orders", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    ap.add_argument("--weeks", type=int, default=52)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    print(f"{'orders':>12} {'lambdas s':>10} {'vectorised s':>13} {'speedup':>8}")
+    for n in args.orders:
+        orders = make_orders(n, args.weeks)
+        t_old, old = best_of(lambdas, orders, args.repeat)
+        t_new, new = best_of(vectorised, orders, args.repeat)
+        pd.testing.assert_frame_equal(old, new, check_dtype=False, rtol=1e-12)
+        print(f"{n:>12,} {t_old:>10.3f} {t_new:>13.3f} {t_old / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Ad-hoc active-user roll-ups merged from the persisted HLL sketches
+(_sketches/active_users.parquet in the active dataset's interim dir, written by
+build_sketches.py), without
+rescanning the raw data. Every number is an estimate (±~0.8% standard error).
+
+Examples:
+  python scripts/active_users_rollup.py --by country            # WAU per country
+  python scripts/active_users_rollup.py --window 4              # 4-week active users
+  python scripts/active_users_rollup.py --grain month --by acquisition_channel country
+Usage:
+  python scripts/active_users_rollup.py [--grain week|month] [--by DIM ...]
+                                        [--window N] [--out CSV]
+"""
+import argparse
+
+from beamcart_metrics import datasets
+from beamcart_metrics.sketch import DIMENSIONS, GRAINS, SKETCHES, Sketches, active_users, flagged
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Roll up active users from the HLL sketches.")
+    ap.add_argument("--grain", choices=GRAINS, default="week")
+    ap.add_argument("--by", nargs="*", choices=DIMENSIONS, default=[], help="split by these")
+    ap.add_argument("--window", type=int, default=1, help="periods merged per row (default 1)")
+    ap.add_argument("--out", help="also write the table to this CSV")
+    args = ap.parse_args(argv)
+    if args.window < 1:
+        ap.error("--window must be >= 1")
+    path = datasets.get().interim_dir / SKETCHES
+    if not path.exists():
+        ap.error(f"{path} is missing; run scripts/build_sketches.py first")
+
+    out = flagged(active_users(Sketches.load(path), args.grain, args.by, args.window), "users")
+    if args.out:
+        out.to_csv(args.out, index=False)
+        print(f"✅ saved {args.out}")
+    print(out.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+BeamCart metrics core — shared code imported by the scripts in scripts/.
+
+The scripts stay runnable on their own (`python scripts/first_metrics.py`); the
+pieces here let `run_pipeline.py` run every stage in one interpreter and hand the
+same loaded raw tables to each of them.
+"""
+
+from beamcart_metrics.context import ENGINES, FrameContext, read_raw_table
+from beamcart_metrics.loaders import LOADERS, load_events, load_orders, load_sessions, load_users
+from beamcart_metrics.paths import DUCKDB, INTERIM, RAW, ROOT, STORE
+
+__all__ = [
+    "FrameContext",
+    "ENGINES",
+    "read_raw_table",
+    "LOADERS",
+    "load_users",
+    "load_events",
+    "load_sessions",
+    "load_orders",
+    "ROOT",
+    "RAW",
+    "INTERIM",
+    "STORE",
+    "DUCKDB",
+]
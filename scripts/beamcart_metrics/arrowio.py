@@ -0,0 +1,77 @@
+"""
+Arrow hand-off between DuckDB and pandas.
+
+`con.execute(sql).df()` has DuckDB build NumPy arrays itself: every column is copied
+out of its result chunks, strings become one Python object per value. Going through
+Arrow instead, DuckDB hands over its result buffers (`fetch_arrow_table()`), and
+pandas wraps them:
+
+- `fetch(con, sql)`: the result as an Arrow table
+- `batches(con, sql, rows)`: the same streamed as record batches (bounded memory)
+- `frame(con, sql)`: the result as pandas. Numeric columns without nulls are views of
+  the Arrow buffers (one block per column, no consolidation copy); DATEs come back as
+  datetime64[s] like the pandas path's, ENUMs (e.g. a scanned categorical) as
+  categoricals, other types as `.df()` gives them. With
+  `arrow_dtypes=True` every column is a `pd.ArrowDtype` view, strings included.
+- `scan(con, **objects)`: pandas frames, Arrow tables or record batch readers as
+  tables DuckDB queries by name, read in place (no CSV / Parquet round trip)
+
+Arrays from `frame()` may be read-only views of Arrow memory: copy before writing into
+them in place (the pipeline never does).
+"""
+
+import contextlib
+from collections.abc import Iterator
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+
+
+def fetch(con: duckdb.DuckDBPyConnection, sql: str, params=None) -> pa.Table:
+    """Result of `sql` as an Arrow table."""
+    return con.execute(sql, params).fetch_arrow_table()
+
+
+def batches(
+    con: duckdb.DuckDBPyConnection, sql: str, rows: int = 1 << 20, params=None
+) -> pa.RecordBatchReader:
+    """Result of `sql` as a stream of record batches of `rows` rows at most."""
+    return con.execute(sql, params).fetch_record_batch(rows)
+
+
+def to_frame(table: pa.Table, arrow_dtypes: bool = False) -> pd.DataFrame:
+    """Arrow table -> pandas without consolidating columns into shared 2-D blocks, so
+    numeric columns without nulls stay views of the Arrow buffers."""
+    if arrow_dtypes:
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    for i, field in enumerate(table.schema):
+        t = field.type
+        if pa.types.is_date(t):  # the pandas path's datetime64[s]
+            t = pa.timestamp("s")
+        elif pa.types.is_dictionary(t) and pa.types.is_unsigned_integer(t.index_type):
+            t = pa.dictionary(pa.int32(), t.value_type)  # DuckDB ENUMs, e.g. a categorical
+        if t != field.type:
+            table = table.set_column(i, field.name, table.column(i).cast(t))
+    return table.to_pandas(split_blocks=True)
+
+
+def frame(
+    con: duckdb.DuckDBPyConnection, sql: str, params=None, arrow_dtypes: bool = False
+) -> pd.DataFrame:
+    """Result of `sql` as pandas, through Arrow (see `to_frame`)."""
+    return to_frame(fetch(con, sql, params), arrow_dtypes)
+
+
+@contextlib.contextmanager
+def scan(con: duckdb.DuckDBPyConnection, **objects) -> Iterator[duckdb.DuckDBPyConnection]:
+    """Make each of `objects` (pandas frame, Arrow table or record batch reader) a
+    table DuckDB can query by its keyword name for the duration of the block; DuckDB
+    reads the objects' memory directly."""
+    for name, obj in objects.items():
+        con.register(name, obj)
+    try:
+        yield con
+    finally:
+        for name in objects:
+            con.unregister(name)
@@ -0,0 +1,54 @@
+"""
+Calendar bucketing on int64 epoch seconds.
+
+All timestamps are UTC-naive. Instead of `ts - to_timedelta(ts.dt.weekday) ...
+.normalize()` (three datetime passes plus a timedelta array), the bucket is computed
+with integer arithmetic on the seconds since 1970-01-01. That day was a Thursday, so
+ISO week n (Monday start) begins on day 7n - 3.
+"""
+
+import numpy as np
+import pandas as pd
+
+DAY = 86_400
+
+
+def epoch_seconds(ts: pd.Series) -> np.ndarray:
+    """Seconds since the epoch as int64 (NaT becomes the int64 minimum)."""
+    return ts.to_numpy(dtype="datetime64[s]").view(np.int64)
+
+
+def epoch_days(ts: pd.Series) -> np.ndarray:
+    """Calendar day number (days since 1970-01-01) of each timestamp."""
+    return epoch_seconds(ts) // DAY
+
+
+def week_index(ts: pd.Series) -> np.ndarray:
+    """ISO week number since the epoch: week n starts on day 7n - 3 (a Monday)."""
+    return (epoch_days(ts) + 3) // 7
+
+
+def _as_series(seconds: np.ndarray, ts: pd.Series) -> pd.Series:
+    out = pd.Series(seconds.astype("datetime64[s]"), index=ts.index, name=ts.name)
+    if ts.hasnans:
+        out = out.where(ts.notna())
+    return out
+
+
+def day_start(ts: pd.Series) -> pd.Series:
+    """Midnight of each timestamp's calendar day, datetime64[s]."""
+    return _as_series(epoch_days(ts) * DAY, ts)
+
+
+def week_start(ts: pd.Series) -> pd.Series:
+    """Monday 00:00:00 of each timestamp's ISO week, datetime64[s]."""
+    return _as_series((week_index(ts) * 7 - 3) * DAY, ts)
+
+
+def month_label(ts: pd.Series) -> pd.Series:
+    """Calendar month as a `YYYY-MM` categorical (formats each distinct month once)."""
+    months, codes = np.unique(ts.to_numpy(dtype="datetime64[M]"), return_inverse=True)
+    if len(months) and np.isnat(months[-1]):  # NaT sorts last -> missing label
+        months, codes = months[:-1], np.where(codes == len(months) - 1, -1, codes)
+    labels = pd.Categorical.from_codes(codes, months.astype(str))
+    return pd.Series(labels, index=ts.index, name=ts.name)
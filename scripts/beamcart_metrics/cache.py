@@ -0,0 +1,145 @@
+"""
+Content-hash build cache for pipeline stages.
+
+A stage's fingerprint hashes its script source, the beamcart_metrics sources it runs
+on, its run options (`Stage.params`) and the content of every declared input (raw
+CSVs, store tables, sql/ files, interim CSVs). Content hashes are reused while a
+file's size and mtime are unchanged, so a warm check costs one `stat` per input. A
+stage is skipped when its fingerprint matches the last successful run and its outputs
+are still the files that run wrote.
+
+The manifest (`_cache_manifest.json` in the dataset's interim dir, e.g. data/interim/)
+keeps per stage the fingerprint, output stats and whether the latest run was a `hit`
+or a `miss`.
+"""
+
+import hashlib
+import json
+import time
+from pathlib import Path
+
+from beamcart_metrics.paths import INTERIM, ROOT
+
+MANIFEST = "_cache_manifest.json"  # in the dataset's interim dir
+PACKAGE = Path(__file__).resolve().parent
+
+# (resolved path, size, mtime_ns) -> sha256, shared by every caller in this process
+_DIGESTS: dict[tuple[str, int, int], str] = {}
+
+
+def file_digest(path: Path) -> str:
+    """sha256 of a file's content, memoised on (path, size, mtime)."""
+    path = Path(path).resolve()
+    st = path.stat()
+    key = (str(path), st.st_size, st.st_mtime_ns)
+    if key not in _DIGESTS:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _DIGESTS[key] = h.hexdigest()
+    return _DIGESTS[key]
+
+
+def path_digest(path: Path) -> str:
+    """Digest of a file, or of a directory tree (relative names + file digests)."""
+    path = Path(path)
+    if not path.exists():
+        return "missing"
+    if path.is_file():
+        return file_digest(path)
+    h = hashlib.sha256()
+    for f in sorted(p for p in path.rglob("*") if p.is_file()):
+        h.update(f.relative_to(path).as_posix().encode())
+        h.update(file_digest(f).encode())
+    return h.hexdigest()
+
+
+def package_digest() -> str:
+    """Digest of the beamcart_metrics sources (shared code every stage runs on)."""
+    h = hashlib.sha256()
+    for f in sorted(PACKAGE.glob("*.py")):
+        h.update(f.name.encode())
+        h.update(file_digest(f).encode())
+    return h.hexdigest()
+
+
+def _stat(path: Path):
+    """(size, mtime_ns) of a file, or of every file under a directory."""
+    path = Path(path)
+    if path.is_file():
+        st = path.stat()
+        return [st.st_size, st.st_mtime_ns]
+    if path.is_dir():
+        return {
+            f.relative_to(path).as_posix(): _stat(f) for f in sorted(path.rglob("*")) if f.is_file()
+        }
+    return None
+
+
+class BuildCache:
+    """Fingerprints stages, decides hit/miss and persists the manifest."""
+
+    def __init__(self, manifest: Path = INTERIM / MANIFEST, root: Path = ROOT, force: bool = False):
+        self.manifest = Path(manifest)
+        self.root = Path(root)
+        self.force = force  # never report a hit, but still record fresh fingerprints
+        self.data = {"stages": {}, "files": {}}
+        if self.manifest.exists():
+            try:
+                self.data = json.loads(self.manifest.read_text())
+            except ValueError:
+                pass
+        # seed the in-process memo with digests recorded by earlier runs
+        for p, (size, mtime_ns, sha) in self.data.get("files", {}).items():
+            _DIGESTS.setdefault((p, size, mtime_ns), sha)
+        self._package = None
+
+    def package_digest(self) -> str:
+        if self._package is None:
+            self._package = package_digest()
+        return self._package
+
+    def fingerprint(self, stage) -> str:
+        h = hashlib.sha256()
+        h.update(file_digest(self.root / stage.script).encode())
+        h.update(self.package_digest().encode())
+        h.update(stage.params.encode())
+        for a in stage.inputs:
+            h.update(a.encode())
+            h.update(path_digest(self.root / a).encode())
+        return h.hexdigest()
+
+    def is_hit(self, stage, fingerprint: str, rewritten: frozenset = frozenset()) -> bool:
+        """Same fingerprint and outputs untouched since. Outputs in `rewritten` are
+        overwritten by a later stage of the same run, so they only have to exist."""
+        prev = self.data["stages"].get(stage.name)
+        if self.force or not prev or prev.get("fingerprint") != fingerprint:
+            return False
+        for a in stage.outputs:
+            now = _stat(self.root / a)
+            if now is None or (a not in rewritten and now != prev["outputs"].get(a)):
+                return False
+        return True
+
+    def record(self, stage, fingerprint: str, status: str, seconds: float = 0.0) -> None:
+        """Remember a successful run (`miss`) or a skip (`hit`) and save the manifest."""
+        self.data["stages"][stage.name] = {
+            "fingerprint": fingerprint,
+            "outputs": {a: _stat(self.root / a) for a in stage.outputs},
+            "status": status,
+            "seconds": round(seconds, 4),
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        self.save()
+
+    def save(self) -> None:
+        files = {}
+        for (p, size, mtime), sha in _DIGESTS.items():
+            if _stat(Path(p)) == [size, mtime]:  # keep only digests of current content
+                files[p] = [size, mtime, sha]
+        self.data["files"] = files
+        self.manifest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.data, indent=2, sort_keys=True))
+        tmp.replace(self.manifest)
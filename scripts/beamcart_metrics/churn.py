@@ -0,0 +1,140 @@
+"""
+User lifecycle engine: churn, retention, resurrection and new users per period.
+
+`activity()` reduces session_start events to the distinct (user_code, period) pairs,
+sorted by user then period, as two integer arrays. Periods are the observed ISO weeks
+(or calendar months) in order. `lifecycle()` counts on their calendar offsets
+(`calendar_offsets`), so "t-1" is the calendar period before t, as in
+sql/churn_rate.sql, even when a whole period has no activity. For a user's consecutive
+pairs at calendar offsets p < n, the user is:
+
+- new at their first period, retained at p+1 if n == p+1, resurrected at n otherwise
+- churned at p+1 (active in p, not in p+1) when n != p+1
+- inactive for k+ periods at every t with p+k <= t < n (the gap after p)
+
+Every count is a `bincount` or a cumulative sum over those arrays. There are no
+per-period scans and no Python sets. The table has a row per observed period whose
+previous calendar period is observed too (the weeks sql/churn_rate.sql evaluates).
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from beamcart_metrics.buckets import week_index
+from beamcart_metrics.userdict import sorted_unique, user_codes
+
+
+@dataclass(frozen=True)
+class Activity:
+    user: np.ndarray  # user code of each active (user, period) pair, sorted
+    period: np.ndarray  # dense period index, ascending within each user
+    labels: pd.Series  # period label per dense index (week_start or "YYYY-MM")
+
+    @property
+    def n_periods(self) -> int:
+        return len(self.labels)
+
+
+def activity(sessions: pd.DataFrame, by: str = "week", user: np.ndarray | None = None) -> Activity:
+    """Distinct active (user, period) pairs; `by` is "week" (ISO, Monday) or "month".
+    `user`: the rows' user codes, if they must match another frame's (default: the
+    sessions' own `user_codes`). Rows without event_ts are skipped."""
+    if by == "week":
+        raw = week_index(sessions["event_ts"])
+    elif by == "month":
+        raw = sessions["event_ts"].to_numpy(dtype="datetime64[M]").astype(np.int64)
+    else:
+        raise ValueError(f"unknown period {by!r}")
+    ok = sessions["event_ts"].notna().to_numpy()
+    observed, period = np.unique(raw[ok], return_inverse=True)
+
+    n = max(len(observed), 1)
+    if user is None:
+        (user,) = user_codes(sessions)
+    key = sorted_unique(user[ok].astype(np.int64) * n + period)
+    return Activity(key // n, key % n, period_labels(observed, by))
+
+
+def period_labels(observed: np.ndarray, by: str) -> pd.Series:
+    """week_start (from ISO week numbers) or "YYYY-MM" month (from months since 1970)."""
+    if by == "week":
+        labels = (observed * 7 - 3).astype("datetime64[D]").astype("datetime64[s]")
+        return pd.Series(labels, name="week_start")
+    return pd.Series(observed.astype("datetime64[M]").astype(str), name="month")
+
+
+def calendar_offsets(labels: pd.Series) -> np.ndarray:
+    """Calendar periods (weeks or months) from the first label to each label."""
+    if not len(labels):
+        return np.zeros(0, np.int64)
+    if pd.api.types.is_datetime64_any_dtype(labels):
+        return ((labels - labels.iloc[0]).dt.days // 7).to_numpy(np.int64)
+    months = pd.PeriodIndex(labels.astype(str), freq="M").asi8
+    return months - months[0]
+
+
+def lifecycle(act: Activity, gaps: tuple[int, ...] = (2,)) -> pd.DataFrame:
+    """
+    Per observed period whose previous calendar period is observed: the churn columns
+    (active_t_minus_1, churned_users, churn_rate), then active / retained / resurrected /
+    new users and, for each k in `gaps`, users inactive for k or more periods.
+    """
+    offsets = calendar_offsets(act.labels)
+    n = int(offsets[-1]) + 1 if len(offsets) else 0  # calendar periods spanned
+    u, p = act.user, offsets[act.period]
+    first = np.ones(len(u), dtype=bool)
+    first[1:] = u[1:] != u[:-1]
+    last = np.ones(len(u), dtype=bool)
+    last[:-1] = u[:-1] != u[1:]
+    nxt = np.where(last, n, np.roll(p, -1))  # user's next active period (n: none)
+
+    active = np.bincount(p, minlength=n)
+    new = np.bincount(p[first], minlength=n)
+    retained = np.bincount(p[~first & (p - np.roll(p, 1) == 1)], minlength=n)
+    gone = (nxt != p + 1) & (p + 1 < n)
+    churned = np.bincount(p[gone] + 1, minlength=n)
+
+    inactive = {}
+    for k in gaps:
+        # +1 when a gap reaches k periods, -1 when the user comes back
+        start, end = p + k, nxt
+        open_ = start < end
+        delta = np.bincount(start[open_], minlength=n + 1)[: n + 1]
+        delta -= np.bincount(end[open_], minlength=n + 1)[: n + 1]
+        inactive[k] = np.cumsum(delta)[:n]
+    return lifecycle_frame(act.labels, offsets, active, retained, new, churned, inactive)
+
+
+def lifecycle_frame(
+    labels: pd.Series,
+    offsets: np.ndarray,
+    active: np.ndarray,
+    retained: np.ndarray,
+    new: np.ndarray,
+    churned: np.ndarray,
+    inactive: dict[int, np.ndarray],
+) -> pd.DataFrame:
+    """The `lifecycle` table from per-period counts (one entry per calendar period;
+    `labels` are the observed periods, at `offsets` in the counts, and `inactive` maps k
+    to the users inactive for k+ periods)."""
+    offsets = np.asarray(offsets, dtype=np.int64)
+    rows = (offsets > 0) & np.isin(offsets - 1, offsets)  # the previous period is observed
+    t = offsets[rows]
+    prev = active[t - 1]
+    out = pd.DataFrame(
+        {
+            labels.name: labels.to_numpy()[rows],
+            "active_t_minus_1": prev,
+            "churned_users": churned[t],
+            "churn_rate": churned[t] / prev,
+            "active_users": active[t],
+            "retained_users": retained[t],
+            "resurrected_users": active[t] - retained[t] - new[t],
+            "new_users": new[t],
+        }
+    )
+    for k, counts in inactive.items():
+        out[f"inactive_{k}plus"] = counts[t]
+    return out
@@ -0,0 +1,167 @@
+"""
+Shared raw-table context.
+
+`FrameContext` reads users/events/orders at most once and caches the typed frames, so
+every pipeline stage run in the same process reuses them instead of re-parsing the
+raw data. Tables come from the typed loaders in `loaders.py` (Parquet store when fresh,
+else the CSVs, same dtypes either way). Which raw tables, store and database it uses
+comes from the dataset registry (`dataset=`, default: the active profile; see
+datasets.py) unless the directories are given explicitly. Stages write their outputs,
+partials, sketches and activity index to the profile's interim dir (`ctx.interim_dir`),
+and charts to its charts dir (`ctx.charts_dir`). Frames handed out are shared: stages
+must treat them as read-only (filter / `assign` into new frames, never mutate in place).
+
+With `engine="duckdb"` stages compute their metrics in the persistent DuckDB database
+instead (`ctx.db`, see `warehouse.py`); with `engine="streaming"` from bounded batches
+of the raw tables (`ctx.stream`, see `streaming.py`), so the event log never has to
+fit in memory. pandas stays the reference engine. With `approx=True`, WAU, MAU and
+channel WAU are HyperLogLog estimates merged from persisted sketches (`ctx.sketches`,
+see `sketch.py`), whatever the engine. With `index=True`, WAU, MAU, churn and retention
+are bit operations on the persisted user x day activity index (`ctx.user_days`, see
+`userdays.py`).
+"""
+
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+from beamcart_metrics import datasets, sketch, streaming, userdays, warehouse
+from beamcart_metrics.loaders import LOADERS, read_raw_table
+from beamcart_metrics.paths import INTERIM, RAW, ROOT
+
+__all__ = ["FrameContext", "read_raw_table", "ENGINES", "ROOT", "RAW", "INTERIM"]
+
+ENGINES = ("pandas", "duckdb", "streaming")
+
+
+class FrameContext:
+    """Lazily loaded, cached users/events/orders frames shared across stages."""
+
+    def __init__(
+        self,
+        raw_dir: Path | None = None,
+        store_dir: Path | None = None,
+        full_refresh: bool = False,
+        engine: str = "pandas",
+        db_path: Path | None = None,
+        parity_sample=None,
+        memory_mb: float | None = None,
+        approx: bool = False,
+        index: bool = False,
+        dataset: str | None = None,
+        interim_dir: Path | None = None,
+    ):
+        if engine not in ENGINES:
+            raise ValueError(f"unknown engine {engine!r} (expected one of {ENGINES})")
+        # registry profile the directories default to (None: the active one)
+        self.dataset = datasets.get(dataset)
+        self.raw_dir = Path(raw_dir or self.dataset.raw_dir)
+        self.store_dir = Path(store_dir or self.dataset.store_dir)
+        # recompute incremental weekly aggregates from scratch (see weekly.py)
+        self.full_refresh = full_refresh
+        self.engine = engine
+        self.db_path = Path(db_path or self.dataset.db_path)
+        # derived state of this dataset: metric outputs, partials, sketches, index, charts
+        self.interim_dir = Path(interim_dir or self.dataset.interim_dir)
+        self.charts_dir = self.dataset.charts_dir
+        # parity.Sample: verify SQL <-> pandas parity on a slice of the data (None: full)
+        self.parity_sample = parity_sample
+        # peak RSS budget of the streaming engine (sizes its batches; None: default)
+        self.memory_mb = memory_mb
+        # estimate distinct active users from HLL sketches instead of counting them
+        self.approx = approx
+        # answer WAU / MAU / churn / retention from the user x day activity index
+        self.index = index
+        self._frames: dict[str, pd.DataFrame] = {}
+        self._db: duckdb.DuckDBPyConnection | None = None
+        self._stream: streaming.Stream | None = None
+        self._sketches: sketch.Sketches | None = None
+        self._user_days: userdays.UserDays | None = None
+
+    @classmethod
+    def from_frames(cls, **frames: pd.DataFrame) -> "FrameContext":
+        """A context over frames already in memory (e.g. a parity sample); `frames` are
+        any of users / events / sessions / orders."""
+        ctx = cls()
+        ctx._frames.update(frames)
+        return ctx
+
+    @property
+    def profile(self) -> datasets.Profile | None:
+        """The registry profile this context reads, None if its directories were given
+        explicitly and differ from the profile's."""
+        p = self.dataset
+        own = (p.raw_dir, p.store_dir, p.db_path) == (self.raw_dir, self.store_dir, self.db_path)
+        return p if own else None
+
+    def _get(self, name: str) -> pd.DataFrame:
+        if name not in self._frames:
+            self._frames[name] = LOADERS[name](self.raw_dir, self.store_dir)
+        return self._frames[name]
+
+    @property
+    def users(self) -> pd.DataFrame:
+        return self._get("users")
+
+    @property
+    def events(self) -> pd.DataFrame:
+        return self._get("events")
+
+    @property
+    def orders(self) -> pd.DataFrame:
+        return self._get("orders")
+
+    @property
+    def sessions(self) -> pd.DataFrame:
+        """`session_start` events only — the activity definition every metric uses."""
+        if "sessions" not in self._frames and "events" in self._frames:
+            ev = self._frames["events"]
+            self._frames["sessions"] = ev[ev["event_type"] == "session_start"]
+        # otherwise load_sessions pushes the filter into the scan
+        return self._get("sessions")
+
+    @property
+    def db(self) -> duckdb.DuckDBPyConnection:
+        """Read-only connection to the persistent DuckDB database, opened once."""
+        if self._db is None:
+            self._db = warehouse.connect(self.db_path, self.raw_dir, self.store_dir)
+        return self._db
+
+    @property
+    def stream(self) -> streaming.Stream:
+        """Streaming state over the raw tables, each read once in bounded batches."""
+        if self._stream is None:
+            self._stream = streaming.Stream(self.raw_dir, self.store_dir, self.memory_mb)
+        return self._stream
+
+    @property
+    def sketches(self) -> sketch.Sketches:
+        """Active-user HLL sketches from the interim dir's _sketches (built if missing
+        or stale)."""
+        if self._sketches is None:
+            self._sketches = sketch.load_or_build(
+                self.interim_dir / sketch.SKETCHES, self.raw_dir, self.store_dir, self.memory_mb
+            )
+        return self._sketches
+
+    @property
+    def user_days(self) -> userdays.UserDays:
+        """User x day activity index from the interim dir's _activity (built if missing
+        or stale)."""
+        if self._user_days is None:
+            self._user_days = userdays.load_or_build(
+                self.interim_dir / userdays.USER_DAYS, self.raw_dir, self.store_dir
+            )
+        return self._user_days
+
+    def reset(self) -> None:
+        """Drop cached frames, streaming state, sketches, the activity index and the
+        database connection (e.g. after the raw data was regenerated or re-ingested)."""
+        self._frames.clear()
+        self._stream = None
+        self._sketches = None
+        self._user_days = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,238 @@
+"""
+Segment cube: every weekly KPI by acquisition_channel x country, with the rollups.
+
+Each fact the KPIs count (an active (user, week) pair, a user active in the previous
+calendar week, an order) is tagged once with its user's segment, the (channel,
+country) cell from the users table, and summed into a weeks x channels x countries
+grid. A user has one channel and one country, so distinct users add up across cells:
+the channel totals, country totals and week totals (`GROUPING SETS`) are sums of the
+grid along its axes, and one grouped pass gives every cut:
+
+- wau; orders_net, revenue_net, aov; opac = orders_net / wau, rev_per_wau
+- all_orders, refund_orders, refund_rate
+- active_t_minus_1, churned_users, churn_rate (previous calendar week, as churn.py)
+
+`grouping_id` is DuckDB's `GROUPING(acquisition_channel, country)`: 0 for a cell, 1 for
+a channel total, 2 for a country total, 3 for the week total. A grouped-out dimension
+is null, so a null channel or country in a row with that bit unset means the users
+table has no value (or the user is unknown). Ratios are NaN when their denominator is
+0, as NULLIF in SQL. Rows exist for the (week, group) pairs with at least one fact.
+
+The cube is written to segment_cube.parquet in the dataset's interim dir (data/interim/
+for the default one); `level()` slices one cut out of it for the charts and the memo.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from beamcart_metrics.buckets import week_index
+from beamcart_metrics.churn import activity, period_labels
+from beamcart_metrics.paths import INTERIM
+from beamcart_metrics.userdict import lookup, user_codes
+
+CUBE = "segment_cube.parquet"  # in the dataset's interim dir
+DIMENSIONS = ("acquisition_channel", "country")
+COUNTS = ("wau", "active_t_minus_1", "churned_users", "all_orders", "refund_orders", "orders_net")
+COLUMNS = [
+    "week_start",
+    *DIMENSIONS,
+    "grouping_id",
+    "wau",
+    "orders_net",
+    "revenue_net",
+    "aov",
+    "opac",
+    "rev_per_wau",
+    "all_orders",
+    "refund_orders",
+    "refund_rate",
+    "active_t_minus_1",
+    "churned_users",
+    "churn_rate",
+]
+
+
+@dataclass(frozen=True)
+class Segments:
+    """The (channel, country) cell of each user in the users table. Cell c * (countries
+    + 1) + k; the last channel / country slot holds users without one."""
+
+    channels: pd.Index
+    countries: pd.Index
+    user: np.ndarray  # user code of each users row
+    cell: np.ndarray  # its cell
+
+    @classmethod
+    def of(cls, users: pd.DataFrame, user: np.ndarray) -> "Segments":
+        """Cells of `users`, whose rows have the user codes `user`."""
+        channel = pd.Categorical(users["acquisition_channel"])
+        country = pd.Categorical(users["country"])
+        c = np.where(channel.codes < 0, len(channel.categories), channel.codes)
+        k = np.where(country.codes < 0, len(country.categories), country.codes)
+        cell = c.astype(np.int64) * (len(country.categories) + 1) + k
+        return cls(channel.categories, country.categories, np.asarray(user), cell)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return len(self.channels) + 1, len(self.countries) + 1
+
+    @property
+    def size(self) -> int:
+        return self.shape[0] * self.shape[1]
+
+    def lookup(self, codes: np.ndarray) -> np.ndarray:
+        """Cell of each user code (the null / null cell for unknown users and -1)."""
+        return lookup(self.user, self.cell, codes, fill=self.size - 1)
+
+
+def activity_facts(
+    seg: Segments, user: np.ndarray, period: np.ndarray, weeks: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, dict[str, np.ndarray]]:
+    """Week, cell and wau / active_t_minus_1 / churned_users of each fact of the active
+    (user, period) pairs (sorted by user then period; `weeks[p]` is period p's ISO week
+    number). A pair (u, p) in week w is active at w and, if week w + 1 is observed,
+    previously active at w + 1, churned too if u is not active at w + 1."""
+    week = weeks[period]
+    last = np.ones(len(user), dtype=bool)
+    last[:-1] = user[:-1] != user[1:]
+    nxt = np.where(last, -1, np.roll(week, -1))  # the user's next active week (-1: none)
+    has_next = np.isin(week + 1, weeks)
+    cell = seg.lookup(user)
+    ones, zeros = np.ones(len(user), np.int64), np.zeros(len(user), np.int64)
+    values = {
+        "wau": np.concatenate([ones, zeros[has_next]]),
+        "active_t_minus_1": np.concatenate([zeros, ones[has_next]]),
+        "churned_users": np.concatenate([zeros, (nxt != week + 1)[has_next]]),
+    }
+    week = np.concatenate([week, week[has_next] + 1])
+    return week, np.concatenate([cell, cell[has_next]]), values
+
+
+def segment_cube(users: pd.DataFrame, sessions: pd.DataFrame, orders: pd.DataFrame) -> pd.DataFrame:
+    """The cube from the typed frames."""
+    u, s, o = user_codes(users, sessions, orders)
+    seg = Segments.of(users, u)
+
+    timed = sessions["event_ts"].notna().to_numpy()
+    act = activity(sessions.loc[timed, ["event_ts"]], "week", user=s[timed])
+    known = act.user >= 0
+    weeks = week_index(act.labels)
+    week, cell, values = activity_facts(seg, act.user[known], act.period[known], weeks)
+
+    ok = orders["order_ts"].notna().to_numpy()
+    is_net = (orders["is_refund"] == 0).to_numpy()[ok]
+    revenue = orders["revenue"].to_numpy(dtype=float, na_value=0.0)[ok]
+    order_values = {
+        "all_orders": orders["order_id"].notna().to_numpy()[ok],
+        "refund_orders": (orders["is_refund"] == 1).to_numpy()[ok],
+        "orders_net": is_net,
+        "revenue_net": np.where(is_net, revenue, 0.0),
+    }
+    return cube_frame(
+        seg,
+        np.concatenate([week, week_index(orders["order_ts"])[ok]]),
+        np.concatenate([cell, seg.lookup(o[ok])]),
+        stack_facts(values, order_values, len(week), int(ok.sum())),
+    )
+
+
+def stack_facts(a: dict, b: dict, n_a: int, n_b: int) -> dict[str, np.ndarray]:
+    """Measures of two fact sets, one after the other (0 where a set has none)."""
+    return {
+        m: np.concatenate([a.get(m, np.zeros(n_a)), b.get(m, np.zeros(n_b))])
+        for m in (*COUNTS, "revenue_net")
+    }
+
+
+def cube_frame(
+    seg: Segments, week: np.ndarray, cell: np.ndarray, values: dict[str, np.ndarray]
+) -> pd.DataFrame:
+    """Sum the facts (ISO week number, cell, measures) into the grid and emit every
+    observed (week, group) row of the four grouping sets."""
+    if not len(week):
+        return with_ratios(pd.DataFrame(columns=COLUMNS[:4] + [*COUNTS, "revenue_net"]))
+    lo = int(week.min())
+    n_weeks = int(week.max()) - lo + 1
+    idx = (week - lo) * seg.size + cell
+    shape = (n_weeks, *seg.shape)
+    grids = {"rows": np.bincount(idx, minlength=n_weeks * seg.size).reshape(shape)}
+    for m, v in values.items():
+        grids[m] = np.bincount(idx, weights=v, minlength=n_weeks * seg.size).reshape(shape)
+
+    parts = []
+    for gid in range(4):
+        # bit 1: channel grouped out, bit 0: country grouped out
+        axes = tuple(a for a, bit in ((1, 2), (2, 1)) if gid & bit)
+        sums = {m: g.sum(axis=axes, keepdims=True) for m, g in grids.items()}
+        w, c, k = np.nonzero(sums["rows"])
+        part = {m: g[w, c, k] for m, g in sums.items()}
+        part.update(week=w, gid=np.full(len(w), gid), c=c, k=k)
+        if gid & 2:
+            part["c"] = np.full(len(w), -1)
+        if gid & 1:
+            part["k"] = np.full(len(w), -1)
+        parts.append(part)
+    rows = {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+    order = np.lexsort((rows["k"], rows["c"], rows["gid"], rows["week"]))
+    rows = {key: v[order] for key, v in rows.items()}
+
+    n_channels, n_countries = len(seg.channels), len(seg.countries)
+    out = pd.DataFrame(
+        {
+            "week_start": period_labels(rows["week"] + lo, "week").to_numpy(),
+            "acquisition_channel": pd.Categorical.from_codes(
+                np.where(rows["c"] < n_channels, rows["c"], -1), seg.channels
+            ),
+            "country": pd.Categorical.from_codes(
+                np.where(rows["k"] < n_countries, rows["k"], -1), seg.countries
+            ),
+            "grouping_id": rows["gid"],
+        }
+    )
+    for m in COUNTS:
+        out[m] = rows[m].round().astype(np.int64)
+    out["revenue_net"] = rows["revenue_net"]
+    return with_ratios(out)
+
+
+def with_ratios(cube: pd.DataFrame) -> pd.DataFrame:
+    """Add aov, opac, rev_per_wau, refund_rate and churn_rate (NaN if the denominator is
+    0) and put the columns in cube order."""
+
+    def ratio(num: str, den: str) -> pd.Series:
+        return cube[num] / cube[den].where(cube[den] > 0)
+
+    return cube.assign(
+        aov=ratio("revenue_net", "orders_net"),
+        opac=ratio("orders_net", "wau"),
+        rev_per_wau=ratio("revenue_net", "wau"),
+        refund_rate=ratio("refund_orders", "all_orders"),
+        churn_rate=ratio("churned_users", "active_t_minus_1"),
+    )[COLUMNS]
+
+
+def level(cube: pd.DataFrame, *dims: str) -> pd.DataFrame:
+    """The rows grouped by week and exactly `dims` (e.g. `level(cube, "country")`; no
+    dims: the week totals), without the grouped-out columns."""
+    unknown = set(dims) - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f"unknown dimensions {sorted(unknown)} (expected {DIMENSIONS})")
+    gid = sum(bit for d, bit in zip(DIMENSIONS, (2, 1)) if d not in dims)
+    out = cube[cube["grouping_id"] == gid]
+    dropped = [d for d in DIMENSIONS if d not in dims] + ["grouping_id"]
+    return out.drop(columns=dropped).reset_index(drop=True)
+
+
+def write(cube: pd.DataFrame, path: Path = INTERIM / CUBE) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(cube, preserve_index=False), path, compression="zstd")
+
+
+def read(path: Path = INTERIM / CUBE) -> pd.DataFrame:
+    """The cube as written (Parquet keeps week_start in ms: back to datetime64[s])."""
+    return pq.read_table(path).to_pandas().astype({"week_start": "datetime64[s]"})
@@ -0,0 +1,306 @@
+"""
+Dataset registry: named raw-data profiles, and which one is active.
+
+A profile is a directory of raw tables (users / events / orders, each `.csv` or
+`.parquet`) plus a work directory for everything derived from them: its Parquet store,
+its DuckDB file, `_dataset.json` (the metadata sidecar), `interim/` (metric CSVs,
+weekly partials, sketches, the activity index, the build cache manifest and run
+profiles) and `charts/`. Built in:
+
+- small: data/raw (`seed_synthetic_data.py`); work dir data/, i.e. the usual
+  data/store, data/beamcart.duckdb and data/interim, with its charts in docs/charts
+- big:   data/raw/big (`seed_synthetic_data_big.py`, CSV), work dir data/datasets/big
+- xl:    data/raw/xl (1M users x 52 weeks, Parquet), work dir data/datasets/xl
+
+`add(name, path)` registers any other directory (work dir data/datasets/<name>). Custom
+profiles and the active name are kept in data/datasets/registry.json.
+
+`use(name)` only rewrites the active name: nothing is read, linked or copied. Every
+profile has its own store, database, outputs and build cache, so switching back and
+forth rebuilds nothing and two profiles can run side by side (`run_pipeline.py
+--dataset NAME`). `FrameContext` resolves raw_dir / store_dir / db_path / interim_dir /
+charts_dir through `get()`, and `pipeline.for_dataset()` points the stages' declared
+artifacts at the profile's files.
+
+`describe(profile)` returns the sidecar: per table the file, its format, bytes, content
+hash, rows and min / max timestamp, plus the ISO weeks the events and orders cover
+(first, last, count, missing weeks in between). It is recomputed only when a raw file
+changed (size / mtime, then content hash): from the store manifest when the store is
+fresh (ingest records rows and coverage), else by reading the timestamp columns.
+"""
+
+import json
+import os
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import pyarrow.compute as pc
+import pyarrow.csv as pcsv
+import pyarrow.parquet as pq
+
+from beamcart_metrics import store
+from beamcart_metrics.cache import file_digest
+from beamcart_metrics.paths import RAW, ROOT
+
+DATA = ROOT / "data"
+CHARTS = ROOT / "docs" / "charts"  # the default profile's charts (published with the docs)
+DATASETS = DATA / "datasets"
+REGISTRY = DATASETS / "registry.json"
+SIDECAR = "_dataset.json"
+DEFAULT = "small"
+FORMATS = ("csv", "parquet")
+
+
+@dataclass(frozen=True)
+class Profile:
+    name: str
+    raw_dir: Path  # users / events / orders (.csv or .parquet)
+    work_dir: Path  # its store, DuckDB file and metadata sidecar
+    format: str = "csv"
+    seed: str = ""  # command that generates it (built-in profiles)
+
+    @property
+    def store_dir(self) -> Path:
+        return self.work_dir / "store"
+
+    @property
+    def db_path(self) -> Path:
+        return self.work_dir / "beamcart.duckdb"
+
+    @property
+    def interim_dir(self) -> Path:
+        return self.work_dir / "interim"
+
+    @property
+    def charts_dir(self) -> Path:
+        return CHARTS if self.work_dir == DATA else self.work_dir / "charts"
+
+    @property
+    def sidecar(self) -> Path:
+        return self.work_dir / SIDECAR
+
+    def files(self) -> dict[str, Path]:
+        """Raw file per table: the one on disk, else the one its format would have."""
+        out = {}
+        for name in store.SCHEMAS:
+            path = store.source_path(name, self.raw_dir)
+            out[name] = path if path.exists() else path.with_suffix(f".{self.format}")
+        return out
+
+    def missing(self) -> list[str]:
+        return [p.name for p in self.files().values() if not p.exists()]
+
+
+BIG_SEED = "python scripts/seed_synthetic_data_big.py --dataset"
+BUILTIN = {
+    "small": Profile("small", RAW, DATA, "csv", "python scripts/seed_synthetic_data.py"),
+    "big": Profile("big", RAW / "big", DATASETS / "big", "csv", f"{BIG_SEED} big"),
+    "xl": Profile(
+        "xl",
+        RAW / "xl",
+        DATASETS / "xl",
+        "parquet",
+        f"{BIG_SEED} xl --users 1_000_000 --weeks 52 --format parquet",
+    ),
+}
+
+
+def _load(registry: Path = REGISTRY) -> dict:
+    try:
+        reg = json.loads(Path(registry).read_text())
+    except (OSError, ValueError):
+        reg = {}
+    return {"active": reg.get("active", DEFAULT), "profiles": reg.get("profiles", {})}
+
+
+def _save(reg: dict, registry: Path = REGISTRY) -> None:
+    registry = Path(registry)
+    registry.parent.mkdir(parents=True, exist_ok=True)
+    tmp = registry.with_suffix(".tmp")
+    tmp.write_text(json.dumps(reg, indent=2) + "\n")
+    tmp.replace(registry)
+
+
+def profiles(registry: Path = REGISTRY) -> dict[str, Profile]:
+    """Built-in and registered profiles by name."""
+    out = dict(BUILTIN)
+    for name, spec in _load(registry)["profiles"].items():
+        work = Path(registry).parent / name
+        out[name] = Profile(name, Path(spec["path"]), work, spec["format"])
+    return out
+
+
+def active_name(registry: Path = REGISTRY) -> str:
+    return _load(registry)["active"]
+
+
+def get(name: str | None = None, registry: Path = REGISTRY) -> Profile:
+    """The profile called `name` (None: the active one)."""
+    name = name or active_name(registry)
+    known = profiles(registry)
+    if name not in known:
+        raise ValueError(f"unknown dataset {name!r} (known: {', '.join(known)})")
+    return known[name]
+
+
+def use(name: str, registry: Path = REGISTRY) -> Profile:
+    """Make `name` the active profile; its raw files must exist (only stat'ed)."""
+    profile = get(name, registry)
+    missing = profile.missing()
+    if missing:
+        hint = f"; generate it with `{profile.seed}`" if profile.seed else ""
+        raise FileNotFoundError(f"{name}: no {', '.join(missing)} in {profile.raw_dir}{hint}")
+    reg = _load(registry)
+    reg["active"] = name
+    _save(reg, registry)
+    return profile
+
+
+def add(name: str, path: Path, registry: Path = REGISTRY) -> Profile:
+    """Register the raw tables in directory `path` as profile `name` (format from the
+    files found there)."""
+    if name in BUILTIN:
+        raise ValueError(f"{name!r} is a built-in dataset")
+    path = Path(path).resolve()
+    files = {n: store.source_path(n, path) for n in store.SCHEMAS}
+    missing = [p.name for p in files.values() if not p.exists()]
+    if missing:
+        raise FileNotFoundError(f"no {', '.join(missing)} in {path}")
+    fmt = "parquet" if all(p.suffix == ".parquet" for p in files.values()) else "csv"
+    reg = _load(registry)
+    reg["profiles"][name] = {"path": str(path), "format": fmt}
+    _save(reg, registry)
+    return get(name, registry)
+
+
+def remove(name: str, registry: Path = REGISTRY) -> None:
+    """Unregister a custom profile (its files stay); the default becomes active if it
+    was."""
+    reg = _load(registry)
+    if name not in reg["profiles"]:
+        raise ValueError(f"{name!r} is not a registered custom dataset")
+    del reg["profiles"][name]
+    if reg["active"] == name:
+        reg["active"] = DEFAULT
+    _save(reg, registry)
+
+
+# --- metadata sidecar ------------------------------------------------------------------
+
+
+def _file_stats(profile: Profile) -> dict[str, dict]:
+    out = {}
+    for name, path in profile.files().items():
+        st = path.stat()
+        out[name] = {
+            "path": str(path.resolve()),
+            "format": path.suffix.lstrip("."),
+            "bytes": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+        }
+    return out
+
+
+def _same_files(old: dict, new: dict, check_hash: bool) -> bool:
+    for name, cur in new.items():
+        was = old.get(name, {})
+        if (was.get("path"), was.get("bytes")) != (cur["path"], cur["bytes"]):
+            return False
+        if was.get("mtime_ns") != cur["mtime_ns"]:
+            if not check_hash or was.get("sha256") != file_digest(Path(cur["path"])):
+                return False
+    return True
+
+
+def cached(profile: Profile) -> dict | None:
+    """The sidecar if it exists and the raw files are unchanged by size and mtime (no
+    file is read); None otherwise."""
+    try:
+        meta = json.loads(profile.sidecar.read_text())
+        return meta if _same_files(meta["tables"], _file_stats(profile), False) else None
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _scan(name: str, path: Path) -> dict:
+    """rows, min_ts / max_ts and (events, orders) ISO weeks, from the timestamp column."""
+    ts_col = store.TS_COL[name]
+    if path.suffix == ".parquet":
+        table = pq.read_table(path, columns=[ts_col])
+    else:
+        opts = pcsv.ConvertOptions(
+            include_columns=[ts_col], column_types={ts_col: store.SCHEMAS[name].field(ts_col).type}
+        )
+        table = pcsv.read_csv(path, convert_options=opts)
+    ts = table[ts_col].cast(store.TS)
+    out = {"rows": table.num_rows, **store.time_span(ts)}
+    if name in store.PARTITIONED:
+        out["weeks"] = sorted(w for w in pc.unique(store.week_key(ts)).to_pylist() if w)
+    return out
+
+
+def _week_coverage(weeks: set[str]) -> dict:
+    if not weeks:
+        return {"first": None, "last": None, "count": 0, "missing": []}
+    first, last = date.fromisoformat(min(weeks)), date.fromisoformat(max(weeks))
+    every = [first + timedelta(weeks=k) for k in range((last - first).days // 7 + 1)]
+    return {
+        "first": first.isoformat(),
+        "last": last.isoformat(),
+        "count": len(weeks),
+        "missing": [w.isoformat() for w in every if w.isoformat() not in weeks],
+    }
+
+
+def describe(profile: Profile, refresh: bool = False) -> dict:
+    """The profile's metadata sidecar, recomputed (and saved) only when a raw file
+    changed or with `refresh`."""
+    stats = _file_stats(profile)
+    if not refresh:
+        try:
+            meta = json.loads(profile.sidecar.read_text())
+            if _same_files(meta["tables"], stats, check_hash=True):
+                if any(meta["tables"][n]["mtime_ns"] != s["mtime_ns"] for n, s in stats.items()):
+                    for n, s in stats.items():  # same content, new mtime
+                        meta["tables"][n]["mtime_ns"] = s["mtime_ns"]
+                    _write(profile, meta)
+                return meta
+        except (OSError, ValueError, KeyError):
+            pass
+
+    manifest = None
+    if store.is_fresh(profile.raw_dir, profile.store_dir):
+        manifest = json.loads((profile.store_dir / store.MANIFEST).read_text())
+        if "coverage" not in manifest:  # written before ingest recorded it
+            manifest = None
+    tables, covered = {}, set()
+    for name, st in stats.items():
+        if manifest is not None:
+            info = {"rows": manifest["rows"][name], **manifest["coverage"][name]}
+            digest = manifest["source"][name]["sha256"]
+        else:
+            info = _scan(name, Path(st["path"]))
+            digest = file_digest(Path(st["path"]))
+        weeks = info.pop("weeks", None)
+        tables[name] = {**st, "sha256": digest, **info}
+        if weeks is not None:
+            tables[name]["weeks"] = len(weeks)
+            covered.update(weeks)
+    meta = {
+        "name": profile.name,
+        "raw_dir": str(Path(profile.raw_dir).resolve()),
+        "format": profile.format,
+        "described": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "tables": tables,
+        "weeks": _week_coverage(covered),
+    }
+    _write(profile, meta)
+    return meta
+
+
+def _write(profile: Profile, meta: dict) -> None:
+    profile.work_dir.mkdir(parents=True, exist_ok=True)
+    tmp = profile.sidecar.with_name(f"{SIDECAR}.tmp{os.getpid()}")
+    tmp.write_text(json.dumps(meta, indent=2) + "\n")
+    tmp.replace(profile.sidecar)
@@ -0,0 +1,176 @@
+"""
+Typed raw-table loaders.
+
+One loader per table, all reading the Parquet store when it is fresh and the CSV
+otherwise (see `store.py`), with the same dtypes either way:
+
+- users:  user_id, country, acquisition_channel -> category; signup_ts -> datetime64[s]
+- events: user_id, event_type -> category; event_ts -> datetime64[s]
+- orders: user_id -> category; order_id -> string[pyarrow]; order_ts -> datetime64[s];
+  revenue -> float64; items -> int16; is_refund -> int8 (0/1, blanks -> 0)
+
+Categories are sorted, so sorting a categorical column matches sorting the strings.
+Read from the store, every frame also has `user_code` (int32, the user's code in the
+store's user dictionary, -1 for a missing user_id; see userdict.py).
+Extra keyword arguments (`columns=`, `filters=`) are passed to `store.read_table`;
+events, sessions and orders also take `weeks=` (dates, any day of the ISO weeks wanted)
+and / or `since=` (a date: its week and every later one), read from the memory-mapped
+week files (`store.read_weeks`).
+
+`MEMORY_BUDGET` is the resulting bytes per row of each column; `memory_report()`
+compares a loaded frame with what `pd.read_csv` would hold (object strings, int64,
+float64, datetime64[ns]). At the budget an event row is 17 bytes (plus ~3 for the
+user_id categories at ~30 events per user) against about 150, so 12.5M events (a
+quarter of 50M) take about 250 MB. revenue stays float64: float32 would round cents and
+the weekly sums must match the SQL engine exactly.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from beamcart_metrics.paths import RAW, STORE
+from beamcart_metrics.store import SCHEMAS, is_fresh, read_table
+from beamcart_metrics.userdict import USER_CODE
+
+SESSION_FILTER = [("event_type", "=", "session_start")]
+
+
+def read_raw_table(name: str, raw_dir: Path = RAW, store_dir: Path = STORE, **kw) -> pd.DataFrame:
+    """One raw table with the raw columns, plus `user_code` from the store (`week` only
+    if asked for)."""
+    if "columns" not in kw:
+        code = [USER_CODE] if is_fresh(raw_dir, store_dir) else []
+        kw["columns"] = SCHEMAS[name].names + code
+    return read_table(name, raw_dir=raw_dir, store_dir=store_dir, **kw)
+
+
+def load_users(raw_dir: Path = RAW, store_dir: Path = STORE, **kw) -> pd.DataFrame:
+    return read_raw_table("users", raw_dir, store_dir, **kw)
+
+
+def load_events(raw_dir: Path = RAW, store_dir: Path = STORE, **kw) -> pd.DataFrame:
+    return read_raw_table("events", raw_dir, store_dir, **kw)
+
+
+def load_sessions(raw_dir: Path = RAW, store_dir: Path = STORE, **kw) -> pd.DataFrame:
+    """`session_start` events only, the activity definition every metric uses (the
+    filter is pushed into the scan; extra `filters` are ANDed with it)."""
+    kw["filters"] = SESSION_FILTER + list(kw.get("filters") or [])
+    return read_raw_table("events", raw_dir, store_dir, **kw)
+
+
+def load_orders(raw_dir: Path = RAW, store_dir: Path = STORE, **kw) -> pd.DataFrame:
+    return read_raw_table("orders", raw_dir, store_dir, **kw)
+
+
+LOADERS = {
+    "users": load_users,
+    "events": load_events,
+    "sessions": load_sessions,
+    "orders": load_orders,
+}
+
+
+# bytes per row of each loaded column. Categoricals count their codes (pandas picks
+# int8 / int16 / int32 by the number of categories, 4 is the worst case) plus
+# CATEGORY_BYTES per distinct value for the categories themselves (the string, its
+# pointer and hash table slot; 1 KiB at least). order_id is a 4-byte offset plus its characters.
+MEMORY_BUDGET = {
+    "users": {
+        "user_id": 4,
+        "signup_ts": 8,
+        "country": 1,
+        "acquisition_channel": 1,
+        USER_CODE: 4,
+    },
+    "events": {"user_id": 4, "event_ts": 8, "event_type": 1, USER_CODE: 4},
+    "orders": {
+        "order_id": 16,
+        "user_id": 4,
+        "order_ts": 8,
+        "revenue": 8,
+        "items": 2,
+        "is_refund": 1,
+        USER_CODE: 4,
+    },
+}
+MEMORY_BUDGET["sessions"] = MEMORY_BUDGET["events"]
+CATEGORY_BYTES = 100
+
+_STR_BYTES = sys.getsizeof("")  # a CPython ASCII str: this header + 1 byte per char
+_NAN_BYTES = sys.getsizeof(float("nan"))
+
+
+def naive_nbytes(s: pd.Series) -> int:
+    """Bytes `s` would take as `pd.read_csv` types it: one Python object per string
+    (counted like `memory_usage(deep=True)`, ASCII assumed), 8 bytes per number or
+    timestamp. Computed from the compact column, without building the objects."""
+    n = len(s)
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes = s.cat.codes.to_numpy()
+        sizes = np.array([sys.getsizeof(c) for c in s.cat.categories], dtype=np.int64)
+        counts = np.bincount(codes[codes >= 0], minlength=len(sizes))
+        return 8 * n + int(counts @ sizes) + int((codes < 0).sum()) * _NAN_BYTES
+    if isinstance(s.dtype, pd.StringDtype) and s.dtype.storage == "pyarrow":
+        values = pa.array(s)
+        chars = pc.sum(pc.utf8_length(values)).as_py() or 0
+        nulls = values.null_count
+        return 8 * n + chars + (n - nulls) * _STR_BYTES + nulls * _NAN_BYTES
+    if s.dtype == object:
+        return int(s.memory_usage(deep=True, index=False))
+    return 8 * n
+
+
+def memory_report(frames: dict[str, pd.DataFrame], file=None) -> pd.DataFrame:
+    """Bytes per column of `frames` as loaded ("after") against `pd.read_csv`'s types
+    ("before", see `naive_nbytes`) and `MEMORY_BUDGET`; printed to `file` (default
+    stdout) with a total per table, and returned."""
+    rows = []
+    for table, df in frames.items():
+        budget = MEMORY_BUDGET.get(table, {})
+        for col in df.columns:
+            s = df[col]
+            after = int(s.memory_usage(deep=True, index=False))
+            limit = budget[col] * len(df) if col in budget else None
+            if limit is not None and isinstance(s.dtype, pd.CategoricalDtype):
+                limit += max(CATEGORY_BYTES * len(s.cat.categories), 1024)
+            rows.append(
+                {
+                    "table": table,
+                    "column": col,
+                    "dtype": str(s.dtype),
+                    "rows": len(df),
+                    "before_bytes": naive_nbytes(s),
+                    "after_bytes": after,
+                    "budget_bytes": limit,
+                }
+            )
+    report = pd.DataFrame(rows)
+    lines = []
+    for table, g in report.groupby("table", sort=False):
+        before, after = g["before_bytes"].sum(), g["after_bytes"].sum()
+        n = max(int(g["rows"].iloc[0]), 1)
+        lines.append(f"{table} ({n:,} rows)")
+        for r in g.itertuples():
+            over = pd.notna(r.budget_bytes) and r.after_bytes > r.budget_bytes
+            budget = "-" if pd.isna(r.budget_bytes) else _mb(r.budget_bytes)
+            flag = " ⚠️ over budget" if over else ""
+            lines.append(
+                f"  {r.column:<20} {r.dtype[:24]:<24} {_mb(r.before_bytes):>10} -> "
+                f"{_mb(r.after_bytes):>10}  (budget {budget}){flag}"
+            )
+        lines.append(
+            f"  {'total':<20} {'':<24} {_mb(before):>10} -> {_mb(after):>10}  "
+            f"({before / n:.0f} -> {after / n:.0f} B/row, {before / max(after, 1):.1f}x)"
+        )
+    print("\n".join(lines), file=file or sys.stdout)
+    return report
+
+
+def _mb(nbytes: float) -> str:
+    return f"{nbytes / 2**20:.2f} MB"
@@ -0,0 +1,166 @@
+"""
+Metric functions: typed frames in, metric frames out.
+
+Activity is `session_start` events (`FrameContext.sessions` / `load_sessions`); weeks are
+ISO weeks (Monday start, UTC) and every revenue / order figure is net of refunds.
+The per-week aggregates (`wau_by_week`, `net_orders_by_week`, `refunds_by_week`) depend
+only on each week's own rows, so `weekly.weekly()` can maintain them incrementally;
+the ratio functions combine them.
+
+Users are dense codes (`userdict.user_codes`: the store's `user_code`): distinct users
+are `distinct_count` over (period, user) pairs and the user's channel is an array
+lookup, so no metric hashes user_id strings.
+"""
+
+import numpy as np
+import pandas as pd
+
+from beamcart_metrics.buckets import week_index, week_start
+from beamcart_metrics.churn import period_labels
+from beamcart_metrics.orders import order_totals
+from beamcart_metrics.userdict import distinct_count, lookup, user_codes
+
+# --- per-week aggregates --------------------------------------------------------------
+
+
+def _active_users(
+    sessions: pd.DataFrame,
+    by: str = "week",
+    part: np.ndarray | None = None,
+    n_parts: int = 1,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Observed periods (ISO week numbers, or months since 1970 with by="month"), part
+    codes and distinct users per (period, part). Rows whose part is -1 are dropped."""
+    ts = sessions["event_ts"]
+    if by == "week":
+        period = week_index(ts)
+    else:
+        period = ts.to_numpy(dtype="datetime64[M]").astype(np.int64)
+    ok = ts.notna().to_numpy()
+    if part is None:
+        part = np.zeros(len(ts), dtype=np.int64)
+    ok &= part >= 0
+    if not ok.any():
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    lo = period[ok].min()
+    n_groups = int(period[ok].max() - lo + 1) * n_parts
+    group = np.where(ok, (period - lo) * n_parts + part, -1)
+    observed = np.flatnonzero(np.bincount(group[ok], minlength=n_groups))
+    (user,) = user_codes(sessions)
+    counts = distinct_count(group, user, n_groups)[observed]
+    return observed // n_parts + lo, observed % n_parts, counts
+
+
+def wau_by_week(sessions: pd.DataFrame) -> pd.DataFrame:
+    """week_start, wau (distinct active users)."""
+    week, _, wau = _active_users(sessions)
+    return pd.DataFrame({"week_start": period_labels(week, "week"), "wau": wau})
+
+
+def net_orders_by_week(orders: pd.DataFrame) -> pd.DataFrame:
+    """week_start, orders_net, revenue_net; weeks with only refunds are kept (0, 0.0)."""
+    orders = orders.assign(week_start=week_start(orders["order_ts"]))
+    return order_totals(orders, "week_start", ["orders_net", "revenue_net"])
+
+
+def refunds_by_week(orders: pd.DataFrame) -> pd.DataFrame:
+    """week_start, all_orders, refund_orders."""
+    orders = orders.assign(week_start=week_start(orders["order_ts"]))
+    return order_totals(orders, "week_start", ["all_orders", "refund_orders"])
+
+
+# --- ratios ---------------------------------------------------------------------------
+
+
+def aov_by_week(net: pd.DataFrame) -> pd.DataFrame:
+    """`net_orders_by_week` + aov (NaN when a week has no net orders, as in SQL)."""
+    out = net.sort_values("week_start")
+    return out.assign(aov=out["revenue_net"] / out["orders_net"])
+
+
+def opac_by_week(wau: pd.DataFrame, net: pd.DataFrame) -> pd.DataFrame:
+    """week_start, wau, orders_net, revenue_net, opac = orders_net / wau."""
+    out = wau.merge(net, on="week_start", how="left").fillna({"orders_net": 0, "revenue_net": 0.0})
+    out["opac"] = out["orders_net"] / out["wau"]
+    return out.sort_values("week_start")
+
+
+def rev_per_wau(wau: pd.DataFrame, net: pd.DataFrame) -> pd.DataFrame:
+    """week_start, wau, revenue_net, rev_per_wau = revenue_net / wau."""
+    rev = net[["week_start", "revenue_net"]]
+    out = wau.merge(rev, on="week_start", how="left").fillna({"revenue_net": 0.0})
+    out["rev_per_wau"] = out["revenue_net"] / out["wau"]
+    return out.sort_values("week_start")
+
+
+def refund_rate_by_week(refunds: pd.DataFrame) -> pd.DataFrame:
+    """`refunds_by_week` + refund_rate = refund_orders / all_orders."""
+    out = refunds.assign(refund_rate=refunds["refund_orders"] / refunds["all_orders"])
+    return out.sort_values("week_start")
+
+
+# --- other grains ---------------------------------------------------------------------
+
+
+def mau_by_month(sessions: pd.DataFrame) -> pd.DataFrame:
+    """month (`YYYY-MM`, UTC calendar month, categorical), mau."""
+    month, _, mau = _active_users(sessions, by="month")
+    return pd.DataFrame({"month": pd.Categorical(period_labels(month, "month")), "mau": mau})
+
+
+def _channel_codes(users: pd.DataFrame, frame: pd.DataFrame) -> tuple[np.ndarray, pd.Categorical]:
+    """The acquisition channel code of each row of `frame` (-1: user unknown or without
+    a channel), looked up by user code, and the users' channel categorical."""
+    u, f = user_codes(users, frame)
+    channel = pd.Categorical(users["acquisition_channel"])
+    return lookup(u, channel.codes, f), channel
+
+
+def _channel_column(codes: np.ndarray, channel: pd.Categorical, dtype) -> pd.Series:
+    return pd.Series(pd.Categorical.from_codes(codes, dtype=channel.dtype)).astype(dtype)
+
+
+def opac_by_channel_week(
+    users: pd.DataFrame, sessions: pd.DataFrame, orders: pd.DataFrame
+) -> pd.DataFrame:
+    """week_start, acquisition_channel, wau, orders_net, revenue_net, opac (0 if no WAU).
+
+    Only the channel/week pairs that occur are kept; sessions of users without a
+    channel are dropped."""
+    codes, channel = _channel_codes(users, sessions)
+    week, code, n = _active_users(sessions, part=codes, n_parts=len(channel.categories))
+    dtype = users["acquisition_channel"].dtype
+    wau = pd.DataFrame(
+        {
+            "week_start": period_labels(week, "week"),
+            "acquisition_channel": _channel_column(code, channel, dtype),
+            "wau": n,
+        }
+    )
+    return opac_by_channel(wau, net_orders_by_channel_week(users, orders))
+
+
+def net_orders_by_channel_week(users: pd.DataFrame, orders: pd.DataFrame) -> pd.DataFrame:
+    """week_start, acquisition_channel, orders_net, revenue_net."""
+    codes, channel = _channel_codes(users, orders)
+    dtype = users["acquisition_channel"].dtype
+    ordu = orders.assign(
+        week_start=week_start(orders["order_ts"]),
+        acquisition_channel=_channel_column(codes, channel, dtype).array,
+    )
+    keys = ["week_start", "acquisition_channel"]
+    return order_totals(ordu, keys, ["orders_net", "revenue_net"])
+
+
+def opac_by_channel(wau: pd.DataFrame, net: pd.DataFrame) -> pd.DataFrame:
+    """Per (week_start, acquisition_channel) `wau` and `net` orders -> the
+    `opac_by_channel_week` table (channel/week pairs with either side are kept)."""
+    keys = ["week_start", "acquisition_channel"]
+    out = (
+        wau.merge(net, on=keys, how="outer")
+        .fillna({"wau": 0, "orders_net": 0, "revenue_net": 0.0})
+        .sort_values(keys)
+    )
+    out["opac"] = (out["orders_net"] / out["wau"]).where(out["wau"] > 0, 0.0)
+    return out
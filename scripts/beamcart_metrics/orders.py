@@ -0,0 +1,48 @@
+"""
+Vectorised order aggregations shared by the AOV / OPAC / Rev-per-WAU / refund stages.
+
+`with_net_columns` derives once per frame the columns every metric needs:
+
+- is_net: the order is not refunded (is_refund == 0)
+- is_refunded: is_refund == 1
+- net_revenue: revenue of net orders, 0.0 for refunds
+
+After that, each aggregate is a plain groupby `sum` / `count` (cython kernels). There
+are no per-group lambdas that look rows back up in the full frame.
+"""
+
+from collections.abc import Sequence
+
+import pandas as pd
+
+# output column -> (input column, groupby reduction)
+METRICS = {
+    "all_orders": ("order_id", "count"),
+    "refund_orders": ("is_refunded", "sum"),
+    "orders_net": ("is_net", "sum"),
+    "revenue_net": ("net_revenue", "sum"),
+}
+
+
+def with_net_columns(orders: pd.DataFrame) -> pd.DataFrame:
+    """`orders` plus is_net / is_refunded (bool) and net_revenue (float64)."""
+    is_net = orders["is_refund"] == 0
+    return orders.assign(
+        is_net=is_net,
+        is_refunded=orders["is_refund"] == 1,
+        net_revenue=orders["revenue"].where(is_net, 0.0),
+    )
+
+
+def order_totals(
+    orders: pd.DataFrame,
+    by: str | Sequence[str],
+    metrics: Sequence[str] = tuple(METRICS),
+) -> pd.DataFrame:
+    """
+    Per-group order metrics (any of `METRICS`), one row per observed group, sorted by
+    the group keys. Net columns are derived first if `orders` does not have them.
+    """
+    if "net_revenue" not in orders:
+        orders = with_net_columns(orders)
+    return orders.groupby(by, as_index=False, observed=True).agg(**{m: METRICS[m] for m in metrics})
@@ -0,0 +1,482 @@
+"""
+Declarative SQL <-> pandas parity checks.
+
+Each `Check` maps a sql/*.sql query to the pandas result it must reproduce (an interim
+CSV, or a Parquet file such as the segment cube), the key columns rows are matched on,
+the columns that must be equal and the ones compared with a tolerance. `run_checks()`
+runs every query over one DuckDB connection, one cursor per check on a thread pool
+(DuckDB releases the GIL while it executes, so the queries overlap), and compares each
+result as soon as it arrives. Rows present on one side only are mismatches.
+
+Columns the pandas side estimated (its CSV's `approximate` column, written by
+`run_pipeline.py --approx`, see sketch.py) are compared with `sketch.APPROX_RTOL`
+instead of exactly, and the report lists them.
+
+The result is one report: `report_json()` for machines, `report_markdown()` for
+people, with per-check timings and the first mismatching rows.
+
+Full parity re-runs every query over the whole history. For very large data a
+`Sample` verifies a slice instead: the users with `hash(user_id) % K` in a subset of
+shards and/or the last N ISO weeks of events and orders. Both sides are recomputed on
+the slice. The SQL runs over views of the sampled rows (`sample_connection`), and the
+pandas side over the same rows fetched once from DuckDB (`sample_frames`) with each
+check's `compute`. The report records the coverage.
+"""
+
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from beamcart_metrics import arrowio, cube, metrics, rolling, sketch
+from beamcart_metrics.churn import activity, lifecycle
+from beamcart_metrics.context import FrameContext
+from beamcart_metrics.paths import INTERIM, ROOT
+from beamcart_metrics.retention import cohort_sizes, retention_counts, retention_summary
+from beamcart_metrics.store import SCHEMAS, to_pandas
+
+SQL_DIR = ROOT / "sql"
+MAX_DIFF_ROWS = 20  # mismatching rows kept per check in the report
+
+
+@dataclass(frozen=True)
+class Check:
+    name: str
+    sql: str  # sql/<sql>.sql
+    pandas: str  # data/interim/<pandas>.csv, or data/interim/<pandas> if it has a suffix
+    keys: tuple[str, ...]
+    exact: tuple[str, ...] = ()  # counts: equal (missing on both sides counts as equal)
+    close: tuple[str, ...] = ()  # floats: np.isclose, NaN == NaN
+    rtol: float = 1e-9
+    atol: float = 1e-12
+    round: int | None = None  # round the SQL side first (pandas stored rounded rates)
+    save_sql: str | None = None  # also write the SQL result to data/interim/<save_sql>.csv
+    compute: Callable[[FrameContext], pd.DataFrame] | None = None  # pandas side on a sample
+
+    @property
+    def pandas_file(self) -> str:
+        return self.pandas if Path(self.pandas).suffix else f"{self.pandas}.csv"
+
+
+# pandas side of each check, recomputed from the sampled frames in sampled mode
+
+
+def _wau(ctx: FrameContext) -> pd.DataFrame:
+    return metrics.wau_by_week(ctx.sessions)
+
+
+def _aov(ctx: FrameContext) -> pd.DataFrame:
+    return metrics.aov_by_week(metrics.net_orders_by_week(ctx.orders))
+
+
+def _churn(ctx: FrameContext) -> pd.DataFrame:
+    return lifecycle(activity(ctx.sessions, by="week"))
+
+
+def _retention(ctx: FrameContext) -> pd.DataFrame:
+    days = (1, 7, 30)
+    counts = retention_counts(ctx.users, ctx.sessions, days)
+    return retention_summary(cohort_sizes(ctx.users), counts, days)
+
+
+def _opac(ctx: FrameContext) -> pd.DataFrame:
+    wau, net = metrics.wau_by_week(ctx.sessions), metrics.net_orders_by_week(ctx.orders)
+    return metrics.opac_by_week(wau, net)
+
+
+def _opac_by_channel(ctx: FrameContext) -> pd.DataFrame:
+    return metrics.opac_by_channel_week(ctx.users, ctx.sessions, ctx.orders)
+
+
+def _rev_per_wau(ctx: FrameContext) -> pd.DataFrame:
+    wau, net = metrics.wau_by_week(ctx.sessions), metrics.net_orders_by_week(ctx.orders)
+    return metrics.rev_per_wau(wau, net)
+
+
+def _rolling_active(ctx: FrameContext) -> pd.DataFrame:
+    return rolling.daily_actives(rolling.active_days(ctx.sessions))
+
+
+def _l28_histogram(ctx: FrameContext) -> pd.DataFrame:
+    return rolling.active_days_histogram(rolling.active_days(ctx.sessions))
+
+
+def _segment_cube(ctx: FrameContext) -> pd.DataFrame:
+    return cube.segment_cube(ctx.users, ctx.sessions, ctx.orders)
+
+
+CHECKS = [
+    Check(
+        "wau",
+        "weekly_active",
+        "wau_by_week",
+        ("week_start",),
+        ("wau",),
+        save_sql="wau_by_week_sql",
+        compute=_wau,
+    ),
+    Check(
+        "aov",
+        "aov_by_week",
+        "aov_by_week",
+        ("week_start",),
+        ("orders_net",),
+        ("revenue_net", "aov"),
+        rtol=1e-6,
+        atol=1e-9,
+        save_sql="aov_by_week_sql",
+        compute=_aov,
+    ),
+    Check(
+        "churn",
+        "churn_rate",
+        "churn_weekly",
+        ("week_start",),
+        ("active_t_minus_1", "churned_users"),
+        ("churn_rate",),
+        rtol=0.0,
+        atol=1e-9,
+        save_sql="churn_weekly_sql",
+        compute=_churn,
+    ),
+    Check(
+        "retention",
+        "cohort_retention",
+        "retention_summary",
+        ("signup_date",),
+        ("cohort_size",),
+        ("d1_retention", "d7_retention", "d30_retention"),
+        round=4,
+        save_sql="retention_summary_sql",
+        compute=_retention,
+    ),
+    Check(
+        "opac",
+        "opac_by_week",
+        "opac_by_week",
+        ("week_start",),
+        ("wau", "orders_net"),
+        ("revenue_net", "opac"),
+        compute=_opac,
+    ),
+    Check(
+        "opac_by_channel",
+        "opac_by_channel_week",
+        "opac_by_channel_week",
+        ("week_start", "acquisition_channel"),
+        ("wau", "orders_net"),
+        ("revenue_net", "opac"),
+        compute=_opac_by_channel,
+    ),
+    Check(
+        "rev_per_wau",
+        "rev_per_wau",
+        "rev_per_wau",
+        ("week_start",),
+        ("wau",),
+        ("revenue_net", "rev_per_wau"),
+        compute=_rev_per_wau,
+    ),
+    Check(
+        "rolling_active",
+        "rolling_active",
+        "rolling_active_daily",
+        ("day",),
+        ("dau", "l7", "l28"),
+        ("stickiness",),
+        save_sql="rolling_active_daily_sql",
+        compute=_rolling_active,
+    ),
+    Check(
+        "l28_histogram",
+        "l28_histogram",
+        "l28_histogram",
+        ("day", "days_active"),
+        ("users",),
+        compute=_l28_histogram,
+    ),
+    Check(
+        "segment_cube",
+        "segment_cube",
+        "segment_cube.parquet",
+        ("week_start", "grouping_id", *cube.DIMENSIONS),
+        ("wau", "orders_net", "all_orders", "refund_orders", "active_t_minus_1", "churned_users"),
+        ("revenue_net", "aov", "opac", "rev_per_wau", "refund_rate", "churn_rate"),
+        rtol=1e-6,
+        atol=1e-9,
+        compute=_segment_cube,
+    ),
+]
+BY_NAME = {c.name: c for c in CHECKS}
+
+
+@dataclass
+class CheckResult:
+    name: str
+    ok: bool
+    rows: int = 0
+    mismatched_rows: int = 0
+    mismatched_columns: list[str] = field(default_factory=list)
+    max_abs_diff: dict[str, float] = field(default_factory=dict)
+    sql_seconds: float = 0.0
+    compare_seconds: float = 0.0
+    diff: list[dict] = field(default_factory=list)
+    error: str = ""
+    approximate: list[str] = field(default_factory=list)  # compared with APPROX_RTOL
+
+
+def _align_keys(py: pd.DataFrame, sql: pd.DataFrame, keys) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Give the key columns one dtype on both sides (dates come back as datetimes from
+    DuckDB and as strings from the CSV; other keys become strings, null as "")."""
+    py, sql = py.copy(), sql.copy()
+    for k in keys:
+        if pd.api.types.is_datetime64_any_dtype(sql[k]) or k.endswith(("_start", "_date")):
+            py[k], sql[k] = pd.to_datetime(py[k]), pd.to_datetime(sql[k])
+        else:
+            py[k], sql[k] = (s.astype(str).where(s.notna(), "") for s in (py[k], sql[k]))
+    return py, sql
+
+
+def _approximate(py: pd.DataFrame) -> set[str]:
+    """Columns of a pandas result that are HLL estimates (named in its flag column)."""
+    if sketch.FLAG not in py:
+        return set()
+    return set(",".join(py[sketch.FLAG].dropna().astype(str)).split(",")) - {""}
+
+
+def compare(check: Check, py: pd.DataFrame, sql: pd.DataFrame) -> CheckResult:
+    """Outer-join the two results on `check.keys` and test every declared column;
+    estimated columns only have to be within `sketch.APPROX_RTOL`."""
+    approx = _approximate(py)
+    py, sql = _align_keys(py, sql, check.keys)
+    if check.round is not None:
+        sql = sql.round({c: check.round for c in check.close})
+    m = py.merge(sql, on=list(check.keys), how="outer", suffixes=("_py", "_sql"), indicator=True)
+    m = m.sort_values(list(check.keys), ignore_index=True)
+
+    res = CheckResult(check.name, ok=True, rows=len(m))
+    res.approximate = [c for c in check.exact + check.close if c in approx]
+    bad = pd.DataFrame({"missing": m["_merge"] != "both"})
+    for c in check.exact:
+        if c in approx:
+            continue
+        a, b = m[f"{c}_py"].astype(float).fillna(-1), m[f"{c}_sql"].astype(float).fillna(-1)
+        bad[c] = a != b
+    for c in check.close + tuple(c for c in check.exact if c in approx):
+        rtol = max(check.rtol, sketch.APPROX_RTOL) if c in approx else check.rtol
+        a, b = m[f"{c}_py"].to_numpy(dtype=float), m[f"{c}_sql"].to_numpy(dtype=float)
+        bad[c] = ~(np.isclose(a, b, rtol=rtol, atol=check.atol) | (np.isnan(a) & np.isnan(b)))
+        diff = np.abs(a - b)
+        res.max_abs_diff[c] = float(np.nanmax(diff)) if np.isfinite(diff).any() else 0.0
+
+    rows = bad.any(axis=1)
+    res.mismatched_rows = int(rows.sum())
+    res.mismatched_columns = [c for c in bad.columns if bad[c].any()]
+    res.ok = res.mismatched_rows == 0
+    if not res.ok:
+        cols = list(check.keys) + [
+            f"{c}_{side}" for c in check.exact + check.close for side in ("py", "sql")
+        ]
+        shown = m.loc[rows, cols].head(MAX_DIFF_ROWS)
+        shown = shown.assign(side=m.loc[rows, "_merge"].astype(str))
+        res.diff = shown.astype(object).where(shown.notna(), None).astype(str).to_dict("records")
+    return res
+
+
+@dataclass(frozen=True)
+class Sample:
+    """A slice of the data to verify: users in shards `verify` of `hash(user_id) % shards`,
+    and, if `weeks` is set, only events and orders of the last `weeks` ISO weeks."""
+
+    shards: int = 1
+    verify: tuple[int, ...] = (0,)
+    weeks: int | None = None
+
+    @classmethod
+    def parse(cls, shards: str | None = None, weeks: int | None = None) -> "Sample | None":
+        """`shards` as "N/K" (the first N of K user shards); None if nothing is sampled."""
+        if shards is None and weeks is None:
+            return None
+        n, k = 1, 1
+        if shards is not None:
+            try:
+                n, k = (int(x) for x in shards.split("/"))
+            except ValueError:
+                raise ValueError(f"shards must look like N/K, got {shards!r}") from None
+            if not 0 < n <= k:
+                raise ValueError(f"shards N/K needs 0 < N <= K, got {shards!r}")
+        if weeks is not None and weeks < 1:
+            raise ValueError(f"weeks must be >= 1, got {weeks}")
+        return cls(shards=k, verify=tuple(range(n)), weeks=weeks)
+
+    def describe(self) -> dict:
+        return {"shards": self.shards, "verify": list(self.verify), "weeks": self.weeks}
+
+
+def sample_connection(db_path: Path, sample: Sample) -> duckdb.DuckDBPyConnection:
+    """In-memory connection with the warehouse attached read-only and users / events /
+    orders views holding only the sampled rows, so the sql/*.sql files run unchanged."""
+    con = duckdb.connect()
+    con.execute(f"ATTACH '{Path(db_path).as_posix()}' AS wh (READ_ONLY)")
+    users = "TRUE"
+    if sample.shards > 1:
+        shards = ", ".join(str(i) for i in sample.verify)
+        users = f"hash(user_id) % {sample.shards} IN ({shards})"
+    weeks = "TRUE"
+    if sample.weeks is not None:
+        (last,) = con.execute(
+            "SELECT GREATEST((SELECT max(week) FROM wh.events), (SELECT max(week) FROM wh.orders))"
+        ).fetchone()
+        weeks = f"week > DATE '{last}' - INTERVAL {7 * sample.weeks} DAY"
+    con.execute(f"CREATE VIEW users AS SELECT * FROM wh.users WHERE {users}")
+    for name in ("events", "orders"):
+        con.execute(f"CREATE VIEW {name} AS SELECT * FROM wh.{name} WHERE {users} AND {weeks}")
+    return con
+
+
+def coverage(con: duckdb.DuckDBPyConnection) -> dict:
+    """Sampled rows vs all rows per table, and the weeks the sample spans."""
+    out = {}
+    for name in SCHEMAS:
+        rows, total = con.execute(
+            f"SELECT (SELECT count(*) FROM {name}), (SELECT count(*) FROM wh.{name})"
+        ).fetchone()
+        out[name] = {
+            "rows": rows,
+            "of": total,
+            "fraction": round(rows / total, 4) if total else 0.0,
+        }
+    first, last, n = con.execute(
+        "SELECT min(week), max(week), count(DISTINCT week) FROM events"
+    ).fetchone()
+    out["weeks"] = {"first": str(first), "last": str(last), "count": n}
+    return out
+
+
+def sample_frames(con: duckdb.DuckDBPyConnection) -> FrameContext:
+    """The sampled raw tables as a FrameContext with the loaders' dtypes, for the
+    pandas side of each check."""
+    frames = {}
+    for name, schema in SCHEMAS.items():
+        cols = ", ".join(schema.names)
+        table = arrowio.fetch(con, f"SELECT {cols} FROM {name}")
+        frames[name] = to_pandas(table.cast(schema))
+    return FrameContext.from_frames(**frames)
+
+
+def run_check(
+    check: Check,
+    cur: duckdb.DuckDBPyConnection,
+    interim_dir: Path,
+    frames: FrameContext | None = None,
+) -> CheckResult:
+    """Run one check on its own cursor: query, optional save, compare. With `frames`
+    (sampled mode) the pandas side is recomputed from them and nothing is saved."""
+    t0 = time.perf_counter()
+    try:
+        sql = arrowio.frame(cur, (SQL_DIR / f"{check.sql}.sql").read_text())
+    except duckdb.Error as e:
+        return CheckResult(check.name, ok=False, error=f"{type(e).__name__}: {e}")
+    finally:
+        cur.close()
+    t1 = time.perf_counter()
+    if frames is not None:
+        py = check.compute(frames)
+    else:
+        if check.save_sql:
+            sql.to_csv(Path(interim_dir) / f"{check.save_sql}.csv", index=False)
+        path = Path(interim_dir) / check.pandas_file
+        py = pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_csv(path)
+    res = compare(check, py, sql)
+    res.sql_seconds, res.compare_seconds = t1 - t0, time.perf_counter() - t1
+    return res
+
+
+def run_checks(
+    con: duckdb.DuckDBPyConnection,
+    checks: list[Check] = CHECKS,
+    interim_dir: Path = INTERIM,
+    threads: int = 4,
+    frames: FrameContext | None = None,
+) -> list[CheckResult]:
+    """All `checks` over one connection, `threads` queries at a time; results in
+    registry order."""
+    if frames is not None:
+        frames.sessions  # load once before the threads share it
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+        futures = [pool.submit(run_check, c, con.cursor(), interim_dir, frames) for c in checks]
+        return [f.result() for f in futures]
+
+
+def report_json(results: list[CheckResult], seconds: float, **extra) -> dict:
+    return {
+        "ok": all(r.ok for r in results),
+        "seconds": round(seconds, 4),
+        **extra,
+        "checks": [
+            {
+                **r.__dict__,
+                "sql_seconds": round(r.sql_seconds, 4),
+                "compare_seconds": round(r.compare_seconds, 4),
+            }
+            for r in results
+        ],
+    }
+
+
+def report_markdown(report: dict) -> str:
+    status = "✅ all checks passed" if report["ok"] else "❌ parity failed"
+    lines = [
+        f"# SQL ↔ pandas parity: {status} ({report['seconds']:.2f} s)",
+        "",
+    ]
+    if report.get("mode") == "sampled":
+        s, cov = report["sample"], report["coverage"]
+        tables = ", ".join(
+            f"{t} {c['rows']:,} of {c['of']:,} ({c['fraction']:.1%})"
+            for t, c in cov.items()
+            if t != "weeks"
+        )
+        w = cov["weeks"]
+        lines += [
+            f"Sampled: user shards {s['verify']} of {s['shards']}, "
+            f"{'last ' + str(s['weeks']) if s['weeks'] else 'all'} weeks.",
+            f"Coverage: {tables}; weeks {w['first']} .. {w['last']} ({w['count']}).",
+            "",
+        ]
+    lines += [
+        "| check | ok | rows | mismatched rows | sql s | compare s | max abs diff |",
+        "|---|---|---:|---:|---:|---:|---|",
+    ]
+    for c in report["checks"]:
+        diffs = ", ".join(f"{k} {v:.2e}" for k, v in c["max_abs_diff"].items()) or "-"
+        lines.append(
+            f"| {c['name']} | {'✅' if c['ok'] else '❌'} | {c['rows']} | {c['mismatched_rows']}"
+            f" | {c['sql_seconds']:.3f} | {c['compare_seconds']:.3f} | {diffs} |"
+        )
+    approx = [
+        f"{c['name']} ({', '.join(c['approximate'])})" for c in report["checks"] if c["approximate"]
+    ]
+    if approx:
+        lines += [
+            "",
+            f"≈ HLL estimates, compared within rtol {sketch.APPROX_RTOL:.2%}: " + ", ".join(approx),
+        ]
+    for c in report["checks"]:
+        if c["ok"]:
+            continue
+        lines += ["", f"## {c['name']}", ""]
+        if c["error"]:
+            lines.append(f"Error: `{c['error']}`")
+            continue
+        lines.append(f"Mismatched columns: {', '.join(c['mismatched_columns'])}")
+        if c["diff"]:
+            cols = list(c["diff"][0])
+            lines += ["", "| " + " | ".join(cols) + " |", "|" + "---|" * len(cols)]
+            lines += ["| " + " | ".join(row[k] for k in cols) + " |" for row in c["diff"]]
+    return "\n".join(lines) + "\n"
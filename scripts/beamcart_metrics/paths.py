@@ -0,0 +1,9 @@
+"""Repository paths shared by the scripts and the library."""
+
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+RAW = ROOT / "data" / "raw"
+INTERIM = ROOT / "data" / "interim"
+STORE = ROOT / "data" / "store"
+DUCKDB = ROOT / "data" / "beamcart.duckdb"
@@ -0,0 +1,569 @@
+"""
+Pipeline stage registry and dependency-aware scheduler.
+
+Every stage declares the artifacts it reads and writes as repo-relative paths (raw
+CSVs, store tables, sql/ files, data/interim CSVs, charts). Dependencies are derived
+from those declarations in registry order, with the same hazards a serial run obeys:
+a stage waits for the last earlier writer of anything it reads or writes, and a
+writer waits for earlier readers of what it overwrites. Ready stages run concurrently
+on a process pool; each worker keeps its own FrameContext, so raw tables are loaded
+at most once per worker. With a BuildCache, stages whose fingerprint is unchanged are
+skipped and their outputs reused (see cache.py). Every stage run is measured (wall,
+CPU, peak RSS, I/O, artifact rows and bytes; see profiling.py).
+
+`for_engine(STAGES, "duckdb")` is the registry as the DuckDB engine runs it: metric
+stages read the persistent database (built by load_duckdb) instead of the store. The
+streaming engine reads the store too, batch by batch, without weekly partials.
+`with_parity_sample(stages, sample)` makes sql_parity verify a sample (parity.py).
+`with_approx(stages)` adds build_sketches and makes the WAU / MAU / channel WAU stages
+read its HLL sketches (sketch.py). `with_index(stages)` adds build_user_days and makes
+the WAU / MAU / churn / retention stages read its user x day activity index
+(userdays.py). `for_dataset(stages, profile)` points the raw, store and database
+artifacts at another dataset profile's files, and the interim and chart artifacts at its
+work dir (datasets.py); it goes last.
+"""
+
+import contextlib
+import importlib
+import io
+import json
+import multiprocessing
+import time
+import traceback
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+
+from beamcart_metrics import datasets, profiling
+from beamcart_metrics.cache import BuildCache
+from beamcart_metrics.context import FrameContext
+from beamcart_metrics.parity import CHECKS
+
+
+@dataclass(frozen=True)
+class Stage:
+    script: str  # relative to the repo root, e.g. "scripts/first_metrics.py"
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] = ()
+    params: str = ""  # run options the outputs depend on (part of the cache fingerprint)
+
+    @property
+    def name(self) -> str:
+        return Path(self.script).stem
+
+
+@dataclass
+class StageResult:
+    name: str
+    ok: bool
+    output: str = ""
+    error: str = ""
+    started: float = 0.0  # time.time(), comparable across worker processes
+    seconds: float = 0.0
+    cached: bool = False
+    profile: dict = field(default_factory=dict)  # profiling.Probe stats + artifact sizes
+
+
+def raw(*tables):
+    return tuple(f"data/raw/{t}.csv" for t in tables)
+
+
+def store(*tables):
+    return tuple(f"data/store/{t}.parquet" if t == "users" else f"data/store/{t}" for t in tables)
+
+
+def interim(*names):
+    return tuple(f"data/interim/{n}.csv" for n in names)
+
+
+def interim_parquet(*names):
+    return tuple(f"data/interim/{n}.parquet" for n in names)
+
+
+def partials(*keys):
+    """Per-week partial aggregates kept by incremental stages (see weekly.py)."""
+    return tuple(f"data/interim/_partials/{k}.{ext}" for k in keys for ext in ("parquet", "json"))
+
+
+def database():
+    """The persistent DuckDB file (see warehouse.py)."""
+    return ("data/beamcart.duckdb",)
+
+
+def chart(*names):
+    return tuple(f"docs/charts/{n}.png" for n in names)
+
+
+def sql(*names):
+    return tuple(f"sql/{n}.sql" for n in names)
+
+
+STAGES = [
+    Stage("scripts/seed_synthetic_data.py", (), raw("users", "events", "orders")),
+    Stage(
+        "scripts/ingest_raw.py",
+        raw("users", "events", "orders"),
+        store("users", "events", "orders"),
+    ),
+    Stage("scripts/load_duckdb.py", store("users", "events", "orders"), database()),
+    # core metrics
+    Stage(
+        "scripts/first_metrics.py",
+        store("events", "orders"),
+        interim("wau_by_week", "aov_by_week") + partials("first_metrics_wau", "first_metrics_aov"),
+    ),
+    Stage("scripts/compute_mau.py", store("events"), interim("mau_by_month")),
+    Stage(
+        "scripts/recompute_aov_pandas.py",
+        store("orders"),
+        interim("aov_by_week") + partials("recompute_aov_pandas"),
+    ),
+    # retention & churn
+    Stage(
+        "scripts/retention_cohorts.py",
+        store("users", "events"),
+        interim(
+            "retention_d1", "retention_d7", "retention_d30", "retention_summary", "retention_matrix"
+        ),
+    ),
+    Stage("scripts/churn_weekly.py", store("events"), interim("churn_weekly", "churn_monthly")),
+    Stage(
+        "scripts/rolling_active.py",
+        store("events"),
+        interim("rolling_active_daily", "l28_histogram"),
+    ),
+    # north-star + drivers
+    Stage(
+        "scripts/opac_by_week.py",
+        store("events", "orders"),
+        interim("opac_by_week") + partials("opac_by_week_wau", "opac_by_week_orders"),
+    ),
+    Stage(
+        "scripts/rev_per_wau.py",
+        store("events", "orders"),
+        interim("rev_per_wau") + partials("rev_per_wau_wau", "rev_per_wau_revenue"),
+    ),
+    Stage(
+        "scripts/decomposition_check.py",
+        interim("wau_by_week", "opac_by_week", "aov_by_week"),
+        interim("decomposition_check"),
+    ),
+    Stage(
+        "scripts/refund_rate_by_week.py",
+        store("orders"),
+        interim("refund_rate_by_week") + partials("refund_rate_by_week"),
+    ),
+    Stage(
+        "scripts/opac_by_channel_week.py",
+        store("users", "events", "orders"),
+        interim("opac_by_channel_week"),
+    ),
+    Stage(
+        "scripts/segment_cube.py",
+        store("users", "events", "orders"),
+        interim_parquet("segment_cube"),
+    ),
+    # SQL <-> pandas parity (one runner over the DuckDB database, see parity.py)
+    Stage(
+        "scripts/sql_parity.py",
+        database()
+        + sql(*(c.sql for c in CHECKS))
+        + tuple(f"data/interim/{f}" for f in dict.fromkeys(c.pandas_file for c in CHECKS)),
+        interim(*(c.save_sql for c in CHECKS if c.save_sql))
+        + ("data/interim/parity_report.json", "data/interim/parity_report.md"),
+    ),
+    # charts
+    Stage("scripts/make_wau_chart.py", interim("wau_by_week"), chart("wau_trend")),
+    Stage("scripts/make_cohort_heatmap.py", interim("retention_summary"), chart("cohort_heatmap")),
+    Stage("scripts/make_opac_chart.py", interim("opac_by_week"), chart("opac_trend")),
+    Stage("scripts/make_rev_per_wau_chart.py", interim("rev_per_wau"), chart("rev_per_wau_trend")),
+    Stage(
+        "scripts/make_opac_channel_bar_latest.py",
+        interim_parquet("segment_cube"),
+        chart("opac_by_channel_latest"),
+    ),
+    # snapshot
+    Stage(
+        "scripts/weekly_kpis.py",
+        interim("opac_by_week", "aov_by_week", "rev_per_wau", "refund_rate_by_week"),
+        interim("weekly_kpis"),
+    ),
+    Stage(
+        "scripts/summary_day1.py",
+        interim("opac_by_week", "aov_by_week", "mau_by_month"),
+        interim("kpis_day1"),
+    ),
+]
+
+
+def for_engine(stages: list[Stage], engine: str) -> list[Stage]:
+    """The registry as run by `engine`. With "duckdb", stages that read the store (other
+    than load_duckdb) read the database instead; with "duckdb" and "streaming" they
+    keep no weekly partials, and the engine is part of their fingerprint."""
+    if engine == "pandas":
+        return stages
+    out = []
+    for st in stages:
+        reads_store = [a for a in st.inputs if a.startswith("data/store/")]
+        if reads_store and st.name != "load_duckdb":
+            inputs = st.inputs
+            if engine == "duckdb":
+                inputs = tuple(a for a in st.inputs if a not in reads_store) + database()
+            st = replace(
+                st,
+                inputs=inputs,
+                outputs=tuple(a for a in st.outputs if not a.startswith("data/interim/_partials/")),
+                params=",".join(p for p in (st.params, engine) if p),
+            )
+        out.append(st)
+    return out
+
+
+def with_parity_sample(stages: list[Stage], sample) -> list[Stage]:
+    """sql_parity verifying `sample` (a parity.Sample; None: the full data). Sampled runs
+    write only the report, and the sample is part of the stage's fingerprint."""
+    if sample is None:
+        return stages
+    params = json.dumps(sample.describe(), sort_keys=True)
+    return [
+        (
+            replace(
+                st,
+                outputs=tuple(a for a in st.outputs if "/parity_report." in a),
+                params=params,
+            )
+            if st.name == "sql_parity"
+            else st
+        )
+        for st in stages
+    ]
+
+
+APPROX_STAGES = ("first_metrics", "compute_mau", "opac_by_channel_week")
+
+
+def sketches():
+    """Persisted HLL sketches of the active users (see sketch.py)."""
+    return ("data/interim/_sketches/active_users.parquet",)
+
+
+def with_approx(stages: list[Stage], approx: bool = True) -> list[Stage]:
+    """The registry with approximate distinct counts: build_sketches runs after
+    ingest_raw, and the WAU / MAU / channel WAU stages read its sketches (their exact
+    WAU partials are not kept)."""
+    if not approx:
+        return stages
+    out = []
+    for st in stages:
+        if st.name in APPROX_STAGES:
+            st = replace(
+                st,
+                inputs=st.inputs + sketches(),
+                outputs=tuple(a for a in st.outputs if "/first_metrics_wau." not in a),
+                params=",".join(p for p in (st.params, "approx") if p),
+            )
+        out.append(st)
+        if st.name == "ingest_raw":
+            out.append(
+                Stage("scripts/build_sketches.py", store("users", "events"), sketches(), "approx")
+            )
+    return out
+
+
+INDEX_STAGES = (
+    "first_metrics",
+    "compute_mau",
+    "churn_weekly",
+    "retention_cohorts",
+    "rolling_active",
+)
+
+
+def user_days():
+    """Persisted user x day activity index (see userdays.py)."""
+    return ("data/interim/_activity/user_days.parquet",)
+
+
+def with_index(stages: list[Stage], index: bool = True) -> list[Stage]:
+    """The registry with the activity index: build_user_days runs after ingest_raw
+    (re-folding only changed weeks), and the WAU / MAU / churn / retention stages read
+    the index (first_metrics keeps no WAU partials)."""
+    if not index:
+        return stages
+    out = []
+    for st in stages:
+        if st.name in INDEX_STAGES:
+            st = replace(
+                st,
+                inputs=st.inputs + user_days(),
+                outputs=tuple(a for a in st.outputs if "/first_metrics_wau." not in a),
+                params=",".join(p for p in (st.params, "index") if p),
+            )
+        out.append(st)
+        if st.name == "ingest_raw":
+            out.append(Stage("scripts/build_user_days.py", store("events"), user_days(), "index"))
+    return out
+
+
+def for_dataset(stages: list[Stage], profile: datasets.Profile) -> list[Stage]:
+    """The registry on a dataset profile: data/raw, data/store and data/beamcart.duckdb
+    artifacts become the profile's raw files, store and database, and data/interim and
+    docs/charts ones its interim and charts dirs, so profiles neither share outputs nor
+    clobber each other's, and the cache tells them apart. seed_synthetic_data writes
+    the default profile's raw files, so it only runs on that one."""
+    default = datasets.BUILTIN[datasets.DEFAULT]
+    if (profile.raw_dir, profile.work_dir) == (default.raw_dir, default.work_dir):
+        return stages
+    files = profile.files()
+    prefixes = {
+        "data/store/": profiling.relative(profile.store_dir) + "/",
+        "data/beamcart.duckdb": profiling.relative(profile.db_path),
+        "data/interim/": profiling.relative(profile.interim_dir) + "/",
+        "docs/charts/": profiling.relative(profile.charts_dir) + "/",
+    }
+
+    def move(artifact: str) -> str:
+        name = Path(artifact).stem
+        if artifact == f"data/raw/{name}.csv" and name in files:
+            return profiling.relative(files[name])
+        for old, new in prefixes.items():
+            if artifact.startswith(old):
+                return new + artifact[len(old) :]
+        return artifact
+
+    return [
+        replace(st, inputs=tuple(map(move, st.inputs)), outputs=tuple(map(move, st.outputs)))
+        for st in stages
+        if st.name != "seed_synthetic_data"
+    ]
+
+
+def dependencies(stages: list[Stage]) -> dict[str, set[str]]:
+    """Stage name -> names of stages that must finish first (read/write hazards)."""
+    last_writer: dict[str, str] = {}
+    readers: dict[str, list[str]] = defaultdict(list)
+    deps: dict[str, set[str]] = {}
+    for st in stages:
+        d = {last_writer[a] for a in st.inputs + st.outputs if a in last_writer}
+        for a in st.outputs:
+            d.update(readers[a])
+        d.discard(st.name)
+        deps[st.name] = d
+        for a in st.inputs:
+            readers[a].append(st.name)
+        for a in st.outputs:
+            last_writer[a] = st.name
+            readers[a] = []
+    return deps
+
+
+def rewritten_outputs(stages: list[Stage]) -> dict[str, frozenset]:
+    """Stage name -> its outputs that a later stage overwrites (e.g. aov_by_week.csv)."""
+    seen: set[str] = set()
+    out = {}
+    for st in reversed(stages):
+        out[st.name] = frozenset(a for a in st.outputs if a in seen)
+        seen.update(st.outputs)
+    return out
+
+
+def critical_path(
+    stages: list[Stage], deps: dict[str, set[str]], seconds: dict[str, float]
+) -> list[str]:
+    """Longest chain of dependent stages by measured duration (bounds wall time)."""
+    finish: dict[str, float] = {}
+    prev: dict[str, str | None] = {}
+    for st in stages:  # registry order is a topological order
+        best = max(deps[st.name], key=lambda d: finish[d], default=None)
+        prev[st.name] = best
+        finish[st.name] = seconds.get(st.name, 0.0) + (finish[best] if best else 0.0)
+    node = max(finish, key=finish.get, default=None)
+    path = []
+    while node:
+        path.append(node)
+        node = prev[node]
+    return path[::-1]
+
+
+# --- execution ---------------------------------------------------------------------
+
+_CTX: FrameContext | None = None
+_OPTIONS: dict = {}  # FrameContext keyword arguments of this run
+_PROFILE: tuple[str, ...] = ()  # stages run under cProfile
+
+
+def stage_main(script: str):
+    """Import a stage script as a module and return its `main(ctx)` callable."""
+    return importlib.import_module(Path(script).stem).main
+
+
+def run_stage(
+    script: str, ctx: FrameContext, capture: bool = False, cprofile: bool = False
+) -> StageResult:
+    """Run one stage in this process; with `capture`, return its stdout/stderr instead
+    of printing it (parallel runs print each stage's output as one block). The stage is
+    measured by a `profiling.Probe` (and run under cProfile with `cprofile`)."""
+    res = StageResult(Path(script).stem, ok=True, started=time.time())
+    buf = io.StringIO()
+    t0 = time.perf_counter()
+    prof = ctx.interim_dir / profiling.PROFILES / f"{res.name}.prof"
+    probe = profiling.Probe(prof if cprofile else None)
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(probe)
+        if capture:
+            stack.enter_context(contextlib.redirect_stdout(buf))
+            stack.enter_context(contextlib.redirect_stderr(buf))
+        try:
+            stage_main(script)(ctx)
+        except SystemExit as e:  # parity / guardrail failures exit with a message
+            if e.code not in (None, 0):
+                res.ok, res.error = False, str(e.code)
+        except Exception:
+            if not capture:
+                raise
+            res.ok, res.error = False, traceback.format_exc()
+    res.seconds = time.perf_counter() - t0
+    res.output = buf.getvalue()
+    res.profile = probe.stats
+    return res
+
+
+def _worker_init(options: dict, profile: tuple[str, ...] = ()) -> None:
+    global _OPTIONS, _PROFILE
+    _OPTIONS, _PROFILE = options, profile
+
+
+def _worker_run(script: str) -> StageResult:
+    global _CTX
+    if _CTX is None:
+        _CTX = FrameContext(**_OPTIONS)
+    return run_stage(script, _CTX, capture=True, cprofile=Path(script).stem in _PROFILE)
+
+
+def _cached(
+    cache: BuildCache | None, st: Stage, fingerprints: dict, rewritten: dict
+) -> StageResult | None:
+    """Skip `st` if the cache has its current fingerprint; remember it for `_record`."""
+    if cache is None:
+        return None
+    fp = fingerprints[st.name] = cache.fingerprint(st)
+    if not cache.is_hit(st, fp, rewritten[st.name]):
+        return None
+    print(f"→ {st.script} (cached)")
+    cache.record(st, fp, "hit")
+    return StageResult(st.name, ok=True, started=time.time(), cached=True)
+
+
+def _record(
+    cache: BuildCache | None, st: Stage, fingerprints: dict, res: StageResult, store_dir: Path
+) -> None:
+    # before a later stage rewrites them
+    res.profile.update(profiling.artifacts(st, store_dir=store_dir))
+    if cache is not None and res.ok:
+        cache.record(st, fingerprints[st.name], "miss", res.seconds)
+
+
+def run_serial(
+    stages: list[Stage],
+    ctx: FrameContext | None = None,
+    cache: BuildCache | None = None,
+    profile: tuple[str, ...] = (),
+) -> list[StageResult]:
+    """Run `stages` in registry order in this process; `profile` names the stages to run
+    under cProfile."""
+    ctx = ctx or FrameContext()
+    results = []
+    fingerprints: dict[str, str] = {}
+    rewritten = rewritten_outputs(stages)
+    for st in stages:
+        res = _cached(cache, st, fingerprints, rewritten)
+        if res is None:
+            print(f"→ {st.script}")
+            res = run_stage(st.script, ctx, cprofile=st.name in profile)
+            _record(cache, st, fingerprints, res, ctx.store_dir)
+        results.append(res)
+        if not res.ok:
+            raise SystemExit(res.error)
+    return results
+
+
+def run_parallel(
+    stages: list[Stage],
+    jobs: int,
+    cache: BuildCache | None = None,
+    profile: tuple[str, ...] = (),
+    **options,
+) -> list[StageResult]:
+    """Run `stages` on `jobs` worker processes; `options` are the FrameContext keyword
+    arguments every worker's context is created with (full_refresh, engine, ...), and
+    `profile` names the stages to run under cProfile."""
+    deps = dependencies(stages)
+    by_name = {st.name: st for st in stages}
+    pending = [st.name for st in stages]
+    done: set[str] = set()
+    results: list[StageResult] = []
+    fingerprints: dict[str, str] = {}
+    rewritten = rewritten_outputs(stages)
+    failed: StageResult | None = None
+    store_dir = options.get("store_dir") or datasets.get(options.get("dataset")).store_dir
+    # spawn, not fork: the parent may already hold DuckDB/Arrow thread pools
+    ctx = multiprocessing.get_context("spawn")
+    pool = ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=ctx,
+        initializer=_worker_init,
+        initargs=(options, tuple(profile)),
+    )
+    with pool:
+        running = {}
+        while pending or running:
+            ready = [n for n in pending if deps[n] <= done] if not failed else []
+            while ready:
+                for name in ready:
+                    pending.remove(name)
+                    hit = _cached(cache, by_name[name], fingerprints, rewritten)
+                    if hit is not None:
+                        results.append(hit)
+                        done.add(name)
+                    else:
+                        running[pool.submit(_worker_run, by_name[name].script)] = name
+                # cache hits can make their dependents ready right away
+                ready = [n for n in pending if deps[n] <= done]
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name = running.pop(fut)
+                res = fut.result()
+                print(f"→ {by_name[name].script}")
+                print(res.output, end="")
+                results.append(res)
+                _record(cache, by_name[name], fingerprints, res, store_dir)
+                if res.ok:
+                    done.add(name)
+                elif failed is None:
+                    failed = res
+    if failed:
+        raise SystemExit(f"❌ stage {failed.name} failed:\n{failed.error}")
+    return results
+
+
+def critical_path_report(stages: list[Stage], results: list[StageResult]) -> str:
+    deps = dependencies(stages)
+    seconds = {r.name: r.seconds for r in results}
+    path = critical_path(stages, deps, seconds)
+    t0 = min((r.started for r in results), default=0.0)
+    wall = max((r.started + r.seconds for r in results), default=t0) - t0
+    cp = sum(seconds[n] for n in path)
+    hits = sum(r.cached for r in results)
+    lines = [
+        f"Critical path: {cp:.2f} s of {wall:.2f} s wall "
+        f"({sum(seconds.values()):.2f} s total stage time, {len(results)} stages, "
+        f"{hits} cached)",
+    ]
+    for n in path:
+        lines.append(f"  {n:<32} {seconds[n]:7.2f} s")
+    slowest = sorted(results, key=lambda r: r.seconds, reverse=True)[:5]
+    lines.append("Slowest stages: " + ", ".join(f"{r.name} {r.seconds:.2f}s" for r in slowest))
+    return "\n".join(lines)
@@ -0,0 +1,318 @@
+"""
+Per-stage run profile: where a pipeline run spends its time, CPU, memory and I/O.
+
+`Probe` wraps one stage inside the process that runs it (this one, or a pool worker)
+and measures:
+
+- wall_s: elapsed time; cpu_s: user + system CPU of the whole process (DuckDB / Arrow
+  threads included), so cpu_s > wall_s means the stage ran multithreaded
+- peak_rss_mb: the stage's own peak resident set size. On Linux the high-water mark is
+  reset when the stage starts (`/proc/self/clear_refs`), so a worker that ran a big
+  stage earlier does not report that peak again. Elsewhere it falls back to the peak of
+  the process so far (`peak_rss_scope: "process"`).
+- read_bytes / written_bytes: bytes the process read and wrote through system calls
+  (`/proc/self/io` rchar / wchar, page-cache hits included; None where unavailable)
+
+`artifacts()` adds the size of the stage's declared inputs and outputs, taken after it
+ran: rows (Parquet footers; CSV lines; raw CSVs from the store manifest) and bytes on
+disk. A stage named with `run_pipeline.py --profile NAME` also runs under cProfile and
+leaves _profiles/NAME.prof (pstats: `python -m pstats`, snakeviz, gprof2dot) and
+NAME.txt (the top functions by cumulative time) in the dataset's interim dir
+(data/interim/ for the default one).
+
+Each run writes _run_profile.json there and appends the same record to
+_run_profiles.jsonl. `summary()` prints the stages sorted by wall time, each next to its
+wall time in the last comparable run from that history where it ran (same engine,
+options, job count and input row counts; cached and cProfiled runs do not count). That
+makes regressions show up as a column of deltas; ⚠️ marks stages more than 25% (and at
+least 0.1 s) slower.
+"""
+
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pyarrow.parquet as pq
+
+from beamcart_metrics.paths import INTERIM, ROOT, STORE
+from beamcart_metrics.store import SCHEMAS
+
+# in the dataset's interim dir
+PROFILE = "_run_profile.json"
+HISTORY = "_run_profiles.jsonl"
+PROFILES = "_profiles"
+TOP_FUNCTIONS = 40  # rows of each cProfile text summary
+REGRESSION = 0.25  # Δ wall flagged when a stage is this much slower (and >= 0.1 s)
+
+
+def _proc(name: str) -> dict[str, int]:
+    """Integer fields of /proc/self/<name> ("key: value [kB]" lines); {} if unavailable."""
+    try:
+        with open(f"/proc/self/{name}") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return {}
+    out = {}
+    for line in lines:
+        key, _, value = line.partition(":")
+        parts = value.split()
+        if parts and parts[0].isdigit():
+            out[key] = int(parts[0])
+    return out
+
+
+def reset_peak_rss() -> bool:
+    """Reset the process's RSS high-water mark (Linux); False if it cannot be reset."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb(since_reset: bool) -> float:
+    """Peak RSS in MiB: since the last reset (VmHWM) or of the whole process."""
+    if since_reset:
+        hwm = _proc("status").get("VmHWM")
+        if hwm is not None:
+            return hwm / 2**10
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10  # bytes vs KiB
+
+
+class Probe:
+    """Measures the block it wraps (see the module docstring); the numbers are in
+    `stats` after it exits. With `profile_to`, the block also runs under cProfile."""
+
+    def __init__(self, profile_to: Path | None = None):
+        self.profile_to = profile_to
+        self.stats: dict = {}
+
+    def __enter__(self) -> "Probe":
+        self._reset = reset_peak_rss()
+        self._io = _proc("io")
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        self._prof = None
+        if self.profile_to is not None:
+            self._prof = cProfile.Profile()
+            self._prof.enable()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._prof is not None:
+            self._prof.disable()
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        after = _proc("io")
+        self.stats = {
+            "wall_s": round(wall, 4),
+            "cpu_s": round(cpu, 4),
+            "peak_rss_mb": round(peak_rss_mb(self._reset), 1),
+            "peak_rss_scope": "stage" if self._reset else "process",
+            "read_bytes": after["rchar"] - self._io["rchar"] if after else None,
+            "written_bytes": after["wchar"] - self._io["wchar"] if after else None,
+        }
+        if self._prof is not None:
+            self.stats["cprofile"] = dump_profile(self._prof, self.profile_to)
+
+
+def dump_profile(prof: cProfile.Profile, path: Path) -> str:
+    """Write `path` (.prof, pstats format) and a .txt of the top functions next to it;
+    returns the .prof path relative to the repo root when it is inside it."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    prof.dump_stats(path)
+    text = io.StringIO()
+    pstats.Stats(prof, stream=text).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+    path.with_suffix(".txt").write_text(text.getvalue())
+    return relative(path)
+
+
+def relative(path: Path) -> str:
+    path = Path(path).resolve()
+    return path.relative_to(ROOT).as_posix() if path.is_relative_to(ROOT) else str(path)
+
+
+# --- declared artifacts ------------------------------------------------------------
+
+
+def _store_rows(store_dir: Path = STORE) -> dict[str, dict]:
+    """Rows of each raw table as recorded by the last ingest, keyed by the raw file's
+    resolved path (with its size)."""
+    try:
+        manifest = json.loads((Path(store_dir) / "_manifest.json").read_text())
+    except (OSError, ValueError):
+        return {}
+    return {
+        src["path"]: {"size": src["size"], "rows": manifest["rows"][name]}
+        for name, src in manifest.get("source", {}).items()
+        if name in manifest.get("rows", {})
+    }
+
+
+def artifact_size(path: Path, raw_rows: dict | None = None) -> tuple[int | None, int]:
+    """(rows, bytes) of a file or directory artifact; rows is None when it has no rows
+    (charts, the database, sql/ files) or counting them would mean a full read."""
+    path = Path(path)
+    if not path.exists():
+        return None, 0
+    files = [path] if path.is_file() else sorted(p for p in path.rglob("*") if p.is_file())
+    size = sum(f.stat().st_size for f in files)
+    if path.stem in SCHEMAS and path.suffix in (".csv", ".parquet"):
+        # raw logs: only from the ingest manifest
+        known = (raw_rows or {}).get(str(path.resolve()))
+        return (known["rows"] if known and known["size"] == size else None), size
+    parquet = [f for f in files if f.suffix == ".parquet"]
+    if parquet:
+        return sum(pq.ParquetFile(f).metadata.num_rows for f in parquet), size
+    if path.suffix == ".csv":
+        with open(path, "rb") as f:
+            lines = sum(block.count(b"\n") for block in iter(lambda: f.read(1 << 20), b""))
+        return max(lines - 1, 0), size  # minus the header
+    return None, size
+
+
+def artifacts(stage, root: Path = ROOT, store_dir: Path | None = None) -> dict:
+    """rows_in / rows_out / bytes_in / bytes_out of a stage's declared artifacts (rows
+    summed over the artifacts that have a row count, None if none has); raw row counts
+    come from the manifest of `store_dir` (default: <root>/data/store)."""
+    raw_rows = _store_rows(store_dir or Path(root) / "data" / "store")
+    out = {}
+    for side, paths in (("in", stage.inputs), ("out", stage.outputs)):
+        sizes = [artifact_size(Path(root) / p, raw_rows) for p in paths]
+        counted = [r for r, _ in sizes if r is not None]
+        out[f"rows_{side}"] = sum(counted) if counted else None
+        out[f"bytes_{side}"] = sum(b for _, b in sizes)
+    return out
+
+
+# --- run record --------------------------------------------------------------------
+
+
+def git_commit() -> str | None:
+    try:
+        res = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        )
+    except OSError:
+        return None
+    return res.stdout.strip() or None
+
+
+def run_record(
+    results, options: dict, jobs: int, started: float, seconds: float, store_dir: Path = STORE
+) -> dict:
+    """The profile of one run: what ran where, and one entry per stage in run order."""
+    options = {k: v for k, v in options.items() if v not in (None, False)}
+    data = {Path(k).name: v["rows"] for k, v in _store_rows(store_dir).items()}
+    return {
+        "run": {
+            "started": datetime.fromtimestamp(started, timezone.utc).isoformat(timespec="seconds"),
+            "seconds": round(seconds, 4),
+            "jobs": jobs,
+            "options": {
+                k: v if isinstance(v, (int, float, str)) else str(v) for k, v in options.items()
+            },
+            "data_rows": data,
+            "commit": git_commit(),
+            "host": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+            },
+        },
+        "stages": [{"name": r.name, "ok": r.ok, "cached": r.cached, **r.profile} for r in results],
+    }
+
+
+def _comparable(a: dict, b: dict) -> bool:
+    keys = ("options", "jobs", "data_rows")
+    return all(a["run"].get(k) == b["run"].get(k) for k in keys)
+
+
+def baseline(record: dict, history: Path = INTERIM / HISTORY) -> dict[str, dict]:
+    """Stage name -> its entry in the last run in `history` comparable with `record`
+    where it actually ran (not cached, not under cProfile)."""
+    if not Path(history).exists():
+        return {}
+    found = {}
+    for line in Path(history).read_text().splitlines():
+        try:
+            past = json.loads(line)
+        except ValueError:
+            continue
+        if not _comparable(past, record):
+            continue
+        for st in past["stages"]:
+            if st.get("ok") and not st.get("cached") and "cprofile" not in st:
+                found[st["name"]] = dict(st, run=past["run"]["started"])
+    return found
+
+
+def save(record: dict, path: Path = INTERIM / PROFILE, history: Path = INTERIM / HISTORY) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(record, indent=2))
+    tmp.replace(path)
+    with open(history, "a") as f:
+        f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def _mib(n) -> str:
+    return "-" if n is None else f"{n / 2**20:.1f}"
+
+
+def _rows(n) -> str:
+    return "-" if n is None else f"{n:,}"
+
+
+def summary(
+    record: dict, past: dict[str, dict] | None = None, path: Path = INTERIM / PROFILE
+) -> str:
+    """Stages sorted by wall time (cached ones listed after), with Δ wall against the
+    `baseline` entries `past`; `path` is where the record was saved."""
+    past = past or {}
+    ran = sorted(
+        (s for s in record["stages"] if not s.get("cached")),
+        key=lambda s: s.get("wall_s", 0.0),
+        reverse=True,
+    )
+    cached = [s for s in record["stages"] if s.get("cached")]
+    header = (
+        f"{'stage':<30} {'wall s':>7} {'cpu s':>7} {'peak MiB':>8} {'rows in':>11} "
+        f"{'rows out':>9} {'MiB in':>7} {'MiB out':>7} {'read MiB':>8} {'Δ wall':>8}"
+    )
+    lines = [
+        f"Stage profile (slowest first; {relative(path)}; Δ wall vs the stage's last "
+        f"comparable run{'' if past else ': none yet'})",
+        header,
+    ]
+    for s in ran:
+        delta = ""
+        prev = past.get(s["name"])
+        if prev and prev["wall_s"] > 0:
+            change = s["wall_s"] / prev["wall_s"] - 1
+            flag = " ⚠️" if change > REGRESSION and s["wall_s"] - prev["wall_s"] >= 0.1 else ""
+            delta = f"{change:+.0%}{flag}"
+        lines.append(
+            f"{s['name']:<30} {s['wall_s']:7.2f} {s['cpu_s']:7.2f} {s['peak_rss_mb']:8.0f} "
+            f"{_rows(s.get('rows_in')):>11} {_rows(s.get('rows_out')):>9} "
+            f"{_mib(s.get('bytes_in')):>7} {_mib(s.get('bytes_out')):>7} "
+            f"{_mib(s.get('read_bytes')):>8} {delta:>8}"
+        )
+    if cached:
+        lines.append(f"cached: {', '.join(s['name'] for s in cached)}")
+    profiled = [s["cprofile"] for s in ran if s.get("cprofile")]
+    if profiled:
+        lines.append(f"cProfile: {', '.join(profiled)} (+ .txt summaries)")
+    return "\n".join(lines)
@@ -0,0 +1,95 @@
+"""
+Cohort retention engine.
+
+Cohorts are users grouped by signup_date (UTC calendar day). A user is retained on
+day n if they have a session_start on signup_date + n days, the same definition as
+sql/cohort_retention.sql. Instead of joining users to every session and testing one
+offset per pass, `day_offsets` looks up each session's user signup day by user code
+(`userdict.user_codes`) and keeps the distinct (user, day_offset) pairs once;
+`retention_counts` turns those into a cohort x offset matrix of distinct users for
+any set of offsets (D0..D90, or weekly buckets with `bucket_days=7`).
+"""
+
+from collections.abc import Iterable
+
+import numpy as np
+import pandas as pd
+
+from beamcart_metrics.buckets import epoch_days
+from beamcart_metrics.userdict import lookup, user_codes
+
+DAYS = range(0, 91)  # offsets kept in the full matrix (D0..D90)
+NO_USER = np.iinfo(np.int64).max  # signup day of sessions whose user is not in users
+
+
+def cohort_sizes(users: pd.DataFrame) -> pd.Series:
+    """Distinct users per signup_date, sorted by signup_date."""
+    signup_date = users["signup_ts"].dt.normalize().rename("signup_date")
+    return users["user_id"].groupby(signup_date).nunique().rename("cohort_size")
+
+
+def day_offsets(users: pd.DataFrame, sessions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Distinct (user, signup_date, day_offset) rows, day_offset = event day - signup day.
+
+    `user` is the user's code (`userdict.user_codes`); sessions of user_ids missing
+    from `users` are dropped (the SQL's users LEFT JOIN events).
+    """
+    u, s = user_codes(users, sessions)
+    signup = lookup(u, epoch_days(users["signup_ts"]), s, fill=NO_USER)
+    known = signup != NO_USER
+    user, signup = s[known], signup[known]
+    offset = epoch_days(sessions["event_ts"])[known] - signup
+
+    pairs = pd.DataFrame({"user": user, "day_offset": offset, "signup": signup})
+    pairs = pairs.drop_duplicates(["user", "day_offset"])
+    signup_date = pairs.pop("signup").to_numpy().astype("datetime64[D]")
+    signup_date = signup_date.astype(users["signup_ts"].dtype)  # same unit as cohort_sizes
+    return pairs.assign(signup_date=signup_date)[["user", "signup_date", "day_offset"]]
+
+
+def retention_counts(
+    users: pd.DataFrame,
+    sessions: pd.DataFrame,
+    offsets: Iterable[int] = DAYS,
+    bucket_days: int = 1,
+) -> pd.DataFrame:
+    """
+    Distinct retained users per cohort (rows: signup_date, every cohort) and offset
+    (columns). With `bucket_days=7`, offset k counts users active on any of days
+    7k..7k+6 after signup.
+    """
+    offsets = list(offsets)
+    pairs = day_offsets(users, sessions)
+    if bucket_days != 1:
+        pairs = pairs.assign(day_offset=pairs["day_offset"] // bucket_days)
+        pairs = pairs.drop_duplicates(["user", "day_offset"])
+    pairs = pairs[pairs["day_offset"].isin(offsets)]
+    counts = pairs.groupby(["signup_date", "day_offset"]).size().unstack(fill_value=0)
+    cohorts = cohort_sizes(users).index
+    return counts.reindex(index=cohorts, columns=offsets, fill_value=0)
+
+
+def dn_retention(cohort: pd.Series, counts: pd.DataFrame, n: int) -> pd.DataFrame:
+    """The retention_d{n}.csv table: signup_date, cohort_size, d{n}_users, d{n}_retention."""
+    out = cohort.reset_index()
+    out[f"d{n}_users"] = counts[n].to_numpy(dtype=float)
+    out[f"d{n}_retention"] = (out[f"d{n}_users"] / out["cohort_size"]).round(4)
+    return out
+
+
+def retention_summary(
+    cohort: pd.Series, counts: pd.DataFrame, days: Iterable[int] = (1, 7, 30)
+) -> pd.DataFrame:
+    """The retention_summary.csv table: signup_date, cohort_size, d{n}_retention per n."""
+    out = cohort.reset_index()
+    for n in days:
+        out[f"d{n}_retention"] = dn_retention(cohort, counts, n)[f"d{n}_retention"]
+    return out
+
+
+def retention_matrix(cohort: pd.Series, counts: pd.DataFrame, prefix: str = "d") -> pd.DataFrame:
+    """Wide cohort x offset table of retention rates (4 dp), one `{prefix}{n}` column each."""
+    rates = counts.div(cohort, axis=0).round(4)
+    rates.columns = [f"{prefix}{n}" for n in counts.columns]
+    return pd.concat([cohort, rates], axis=1).reset_index()
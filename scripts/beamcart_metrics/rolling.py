@@ -0,0 +1,128 @@
+"""
+Rolling-window active users: DAU, L7, L28, DAU/L28 stickiness and the L28 histogram.
+
+Every window is computed in one sweep over the distinct active (user, day) pairs,
+sorted by user then day, instead of rescanning N days for each reported day. A pair
+(u, d) counts user u in the N-day windows ending on days d .. d + N - 1, but only up
+to the user's next active day d' (from then on d' counts them). So each pair adds +1
+at d and -1 at min(d + N, d') to a difference array, and a cumulative sum gives the
+N-day actives of every day: O(pairs + days) per window, whatever N is.
+
+The L28 histogram (users active on exactly k of the last 28 days, k = 1..28) uses the
+same events per user: +1 at d and -1 at d + 28. A user's running sum is their k, which
+holds until their next event, so each (user, event day) adds +1 at (day, k) and -1 at
+(next event day, k) to a days x k difference array.
+
+Days reported run from the first to the last day with a session. Windows ending in the
+first 27 days only see the days since the data starts. Stickiness is dau / l28 (NaN if
+nobody was active in the last 28 days).
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from beamcart_metrics.buckets import DAY, epoch_days
+from beamcart_metrics.userdict import sorted_unique, user_codes
+
+WINDOWS = (7, 28)  # trailing windows reported next to DAU, as l7, l28
+HISTOGRAM_DAYS = 28
+
+
+@dataclass(frozen=True)
+class ActiveDays:
+    user: np.ndarray  # user code of each distinct active (user, day) pair, sorted
+    day: np.ndarray  # calendar day (days since 1970), ascending within each user
+    first: int  # first and last day with a session: the days reported
+    last: int
+
+    @property
+    def n_days(self) -> int:
+        return self.last - self.first + 1
+
+
+def active_days(sessions: pd.DataFrame) -> ActiveDays:
+    """Distinct (user, day) pairs of the sessions (rows without user_id are skipped)."""
+    ok = sessions["event_ts"].notna().to_numpy()
+    day = epoch_days(sessions["event_ts"])[ok]
+    if not len(day):
+        empty = np.zeros(0, dtype=np.int64)
+        return ActiveDays(empty, empty, 0, -1)
+    (user,) = user_codes(sessions)
+    user = user[ok].astype(np.int64)
+    first, last = int(day.min()), int(day.max())
+    n = last - first + 1
+    key = sorted_unique(user[user >= 0] * n + (day[user >= 0] - first))
+    return ActiveDays(key // n, key % n + first, first, last)
+
+
+def _next_day(act: ActiveDays) -> np.ndarray:
+    """Each pair's user's next active day (the day after the last reported one for a
+    user's last pair)."""
+    nxt = np.full(len(act.user), act.last + 1, np.int64)
+    same = act.user[1:] == act.user[:-1]
+    nxt[:-1][same] = act.day[1:][same]
+    return nxt
+
+
+def window_actives(act: ActiveDays, window: int) -> np.ndarray:
+    """Distinct users active in the `window` days ending on each reported day."""
+    n = act.n_days
+    start = act.day - act.first
+    end = np.minimum(np.minimum(act.day + window, _next_day(act)) - act.first, n)
+    delta = np.bincount(start, minlength=n + 1) - np.bincount(end, minlength=n + 1)
+    return np.cumsum(delta)[:n]
+
+
+def _days(act: ActiveDays) -> pd.Series:
+    days = np.arange(act.first, act.last + 1)
+    return pd.Series((days * DAY).astype("datetime64[s]"), name="day")
+
+
+def daily_actives(act: ActiveDays, windows: tuple[int, ...] = WINDOWS) -> pd.DataFrame:
+    """day, dau, l{N} for each N in `windows`, stickiness (dau / l28)."""
+    out = pd.DataFrame({"day": _days(act), "dau": window_actives(act, 1)})
+    for w in windows:
+        out[f"l{w}"] = window_actives(act, w)
+    return with_stickiness(out)
+
+
+def with_stickiness(daily: pd.DataFrame) -> pd.DataFrame:
+    return daily.assign(stickiness=daily["dau"] / daily["l28"].where(daily["l28"] > 0))
+
+
+def active_days_histogram(act: ActiveDays, window: int = HISTOGRAM_DAYS) -> pd.DataFrame:
+    """day, days_active, users: users active on exactly `days_active` of the `window`
+    days ending on each reported day (rows with users only)."""
+    n = act.n_days
+    # +1 when a day enters the window, -1 when it leaves, per user in time order
+    user = np.concatenate([act.user, act.user])
+    at = np.concatenate([act.day, act.day + window]) - act.first
+    step = np.concatenate([np.ones(len(act.day), np.int64), -np.ones(len(act.day), np.int64)])
+    # both halves are sorted by (user, day): a stable sort of the key merges two runs
+    order = np.argsort(user * (n + window) + at, kind="stable")
+    user, at, step = user[order], at[order], step[order]
+    k = np.cumsum(step)  # each user's steps sum to 0, so this is the running count per user
+    # one row per (user, event day): the count after its last step
+    last = np.ones(len(at), dtype=bool)
+    last[:-1] = (user[1:] != user[:-1]) | (at[1:] != at[:-1])
+    user, at, k = user[last], at[last], k[last]
+    until = np.empty_like(at)  # the user's next event day (every user ends at k = 0)
+    until[:-1] = at[1:]
+    counted = k > 0
+    start, end, k = at[counted], np.minimum(until[counted], n), k[counted]
+    keep = start < n
+    start, end, k = start[keep], end[keep], k[keep]
+    size = (n + 1) * (window + 1)
+    delta = np.bincount(start * (window + 1) + k, minlength=size)
+    delta -= np.bincount(end * (window + 1) + k, minlength=size)
+    grid = np.cumsum(delta.reshape(n + 1, window + 1), axis=0)[:n]
+    day, days_active = np.nonzero(grid)
+    return pd.DataFrame(
+        {
+            "day": _days(act).to_numpy()[day],
+            "days_active": days_active,
+            "users": grid[day, days_active],
+        }
+    )
@@ -0,0 +1,316 @@
+"""
+Approximate distinct counts: HyperLogLog sketches of the active users.
+
+`run_pipeline.py --approx` swaps the exact WAU / MAU / channel WAU (`nunique`,
+`COUNT(DISTINCT)`, memory proportional to the active users of a bucket) for HLL
+estimates. `build_sketches.py` streams the sessions once (`store.iter_batches`) into one
+sketch per (grain, period, acquisition_channel, country), grain "week" (ISO week) or
+"month", and persists them to _sketches/active_users.parquet in the dataset's interim
+dir, with the `store.source_stats` of the raw data they sketch. A sketch is
+a fixed array of `M` one-byte registers (16 KiB) however many users it has seen, and
+sketches merge by element-wise max. Any roll-up (all users per week, a country, a
+4-week window) is a merge of stored sketches (`Sketches.rollup`): no rescan of the
+raw data.
+
+Users are hashed with `pd.util.hash_array` (SipHash, fixed key, so the same user
+always lands in the same register). Estimates use Ertl's improved raw estimator
+("New cardinality estimation algorithms for HyperLogLog sketches", 2017), which is
+unbiased from a handful of users to billions without empirical bias tables. The
+relative standard error is `STD_ERROR` (~0.8% at precision 14). Sessions of users
+missing from the users table only count towards roll-ups that do not split by
+channel or country (as in the exact metrics).
+
+Outputs built from sketches carry an `approximate` column naming their approximate
+columns (e.g. "wau,opac"); parity and the decomposition check compare those columns
+with `APPROX_RTOL` instead of exactly.
+"""
+
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from beamcart_metrics import metrics
+from beamcart_metrics.buckets import DAY
+from beamcart_metrics.churn import period_labels
+from beamcart_metrics.loaders import SESSION_FILTER
+from beamcart_metrics.paths import INTERIM, RAW, STORE
+from beamcart_metrics.store import iter_batches, read_table, same_sources, source_stats
+from beamcart_metrics.streaming import batch_rows_for
+
+P = 14  # precision: 2**P registers per sketch
+M = 1 << P
+Q = 64 - P  # hash bits left for the rank
+STD_ERROR = 1.04 / math.sqrt(M)
+APPROX_RTOL = 4 * STD_ERROR  # tolerance when checking an estimate against the exact count
+
+GRAINS = ("week", "month")
+DIMENSIONS = ("acquisition_channel", "country")
+FLAG = "approximate"  # column naming the approximate columns of an output
+SKETCHES = Path("_sketches", "active_users.parquet")  # in the dataset's interim dir
+
+
+def hash_ids(values) -> np.ndarray:
+    """64-bit hash of each user id (stable across runs and processes)."""
+    return pd.util.hash_array(np.asarray(values, dtype=object), categorize=False)
+
+
+def registers_of(hashes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Register index (top P bits) and rank (1 + leading zeros of the other Q bits)."""
+    index = (hashes >> np.uint64(Q)).astype(np.int64)
+    rest = (hashes & np.uint64((1 << Q) - 1)).astype(np.float64)  # < 2**53: exact
+    _, bits = np.frexp(rest)  # bit length; 0 for 0
+    return index, (Q + 1 - bits).astype(np.uint8)
+
+
+def _sigma(x: float) -> float:
+    if x == 1.0:
+        return math.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        z_old, z = z, z + x * y
+        y += y
+        if z == z_old:
+            return z
+
+
+def _tau(x: float) -> float:
+    if x in (0.0, 1.0):
+        return 0.0
+    y, z = 1.0, 1.0 - x
+    while True:
+        x = math.sqrt(x)
+        z_old = z
+        y *= 0.5
+        z -= (1.0 - x) ** 2 * y
+        if z == z_old:
+            return z / 3
+
+
+def estimate(registers: np.ndarray) -> np.ndarray:
+    """Distinct-count estimate of each sketch (rows of `registers`)."""
+    out = []
+    for row in np.atleast_2d(registers):
+        c = np.bincount(row, minlength=Q + 2)
+        z = M * _tau(1.0 - c[Q + 1] / M)
+        for k in range(Q, 0, -1):
+            z = 0.5 * (z + c[k])
+        z += M * _sigma(c[0] / M)
+        out.append(M * M / (2 * math.log(2)) / z)
+    return np.array(out)
+
+
+def _period_start(grain: str, period: np.ndarray) -> np.ndarray:
+    if grain == "week":
+        return ((period * 7 - 3) * DAY).astype("datetime64[s]")
+    return period.astype("datetime64[M]").astype("datetime64[s]")
+
+
+def _period(grain: str, start: np.ndarray) -> np.ndarray:
+    if grain == "week":
+        return (start.astype("datetime64[D]").astype(np.int64) + 3) // 7
+    return start.astype("datetime64[M]").astype(np.int64)
+
+
+class Sketches:
+    """One HLL sketch per row of `keys` (grain, period, acquisition_channel, country;
+    period is the ISO week number or months since 1970, a missing dimension is None)."""
+
+    def __init__(self, keys: pd.DataFrame, registers: np.ndarray, source: dict | None = None):
+        self.keys = keys.reset_index(drop=True)
+        self.registers = registers
+        self.source = source or {}  # store.source_stats of the raw data sketched
+
+    def rollup(self, grain: str, by: tuple[str, ...] = (), window: int = 1) -> pd.DataFrame:
+        """period, *by, users: estimated distinct users per `grain` period (and per `by`
+        dimensions), merging the last `window` periods (e.g. 4-week active users)."""
+        if grain not in GRAINS:
+            raise ValueError(f"unknown grain {grain!r} (expected one of {GRAINS})")
+        by = list(by)
+        keys = self.keys[self.keys["grain"] == grain].dropna(subset=by)
+        rows = []
+        for group, part in keys.groupby(by, sort=True) if by else [((), keys)]:
+            group = group if isinstance(group, tuple) else (group,)
+            merged = {
+                p: self.registers[part.index[i]].max(axis=0)
+                for p, i in part.groupby("period").indices.items()
+            }
+            periods = sorted(merged)
+            for p in periods:
+                window_regs = [merged[q] for q in periods if p - window < q <= p]
+                rows.append((p, *group, np.maximum.reduce(window_regs)))
+        period = np.array([r[0] for r in rows], dtype=np.int64)
+        out = pd.DataFrame({"period": period})
+        for i, col in enumerate(by, start=1):
+            out[col] = [r[i] for r in rows]
+        regs = np.stack([r[-1] for r in rows]) if rows else np.zeros((0, M), np.uint8)
+        out["users"] = np.rint(estimate(regs)).astype(np.int64)
+        return out.sort_values(["period", *by], ignore_index=True)
+
+    def save(self, path: Path = INTERIM / SKETCHES) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        starts = np.empty(len(self.keys), dtype="datetime64[s]")
+        for grain in GRAINS:
+            sel = (self.keys["grain"] == grain).to_numpy()
+            starts[sel] = _period_start(grain, self.keys["period"].to_numpy()[sel])
+        table = pa.table(
+            {
+                "grain": pa.array(self.keys["grain"], pa.string()),
+                "period_start": pa.array(starts),
+                **{d: pa.array(self.keys[d], pa.string()) for d in DIMENSIONS},
+                "registers": pa.FixedSizeBinaryArray.from_buffers(
+                    pa.binary(M), len(self.keys), [None, pa.py_buffer(self.registers.tobytes())]
+                ),
+            }
+        ).replace_schema_metadata({"hll_precision": str(P), "source": json.dumps(self.source)})
+        tmp = path.with_suffix(".tmp")
+        pq.write_table(table, tmp)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path = INTERIM / SKETCHES) -> "Sketches":
+        table = pq.read_table(path)
+        meta = table.schema.metadata or {}
+        precision = meta.get(b"hll_precision", b"?").decode()
+        if precision != str(P):
+            raise ValueError(f"{path}: sketches have precision {precision}, expected {P}")
+        keys = table.drop_columns(["registers"]).to_pandas()
+        starts = keys.pop("period_start").to_numpy(dtype="datetime64[s]")
+        period = np.zeros(len(keys), dtype=np.int64)
+        for grain in GRAINS:
+            sel = (keys["grain"] == grain).to_numpy()
+            period[sel] = _period(grain, starts[sel])
+        keys.insert(1, "period", period)
+        buf = table.column("registers").combine_chunks().buffers()[1]
+        registers = np.frombuffer(buf, dtype=np.uint8).reshape(len(keys), M).copy()
+        return cls(keys, registers, json.loads(meta.get(b"source", b"{}")))
+
+
+class _Builder:
+    """Registers of the (grain, period, channel code, country code) groups seen so far."""
+
+    def __init__(self):
+        self.rows: dict[tuple, int] = {}
+        self.flat = np.zeros(0, dtype=np.uint8)
+
+    def add(self, grain: str, period, channel, country, index, rank) -> None:
+        """Fold the rows' (register index, rank) into their group's sketch; channel and
+        country are category codes, -1 when unknown."""
+        key = period << 32 | (channel + 1) << 16 | (country + 1)
+        codes, groups = pd.factorize(key)
+        row = np.array(
+            [self._row((grain, g >> 32, (g >> 16 & 0xFFFF) - 1, (g & 0xFFFF) - 1)) for g in groups],
+            dtype=np.int64,
+        )
+        np.maximum.at(self.flat, row[codes] * M + index, rank)
+
+    def _row(self, group: tuple) -> int:
+        if group not in self.rows:
+            self.rows[group] = len(self.rows)
+            if len(self.rows) * M > len(self.flat):  # grow by doubling
+                grown = np.zeros(max(len(self.flat) * 2, 64 * M), dtype=np.uint8)
+                grown[: len(self.flat)] = self.flat
+                self.flat = grown
+        return self.rows[group]
+
+
+def build(raw_dir: Path = RAW, store_dir: Path = STORE, memory_mb: float | None = None) -> Sketches:
+    """Sketch the distinct session users per week and per month, by acquisition channel
+    and country, in one streamed pass over the events."""
+    users = read_table("users", raw_dir=raw_dir, store_dir=store_dir)
+    ids = pd.Index(users["user_id"].cat.categories)
+    code = users["user_id"].cat.codes.to_numpy()
+    ok = code >= 0
+    dims = {}
+    for d in DIMENSIONS:  # per user id code: the dimension's category code (-1: unknown)
+        dims[d] = np.full(len(ids) + 1, -1, dtype=np.int64)
+        dims[d][code[ok]] = users[d].cat.codes.to_numpy()[ok]
+    names = {d: list(users[d].cat.categories) for d in DIMENSIONS}
+
+    builder = _Builder()
+    columns, rows = ["user_id", "event_ts"], batch_rows_for(memory_mb)
+    for batch in iter_batches("events", columns, SESSION_FILTER, raw_dir, store_dir, rows):
+        valid = pc.and_(pc.is_valid(batch.column("user_id")), pc.is_valid(batch.column("event_ts")))
+        batch = batch.filter(valid)
+        if batch.num_rows == 0:
+            continue
+        col = batch.column("user_id")
+        used, inverse = np.unique(col.indices.to_numpy(), return_inverse=True)
+        values = col.dictionary.take(pa.array(used)).to_pandas()
+        index, rank = registers_of(hash_ids(values)[inverse])
+        user = ids.get_indexer(values)[inverse]  # -1 (unknown) picks the -1 sentinel
+        secs = batch.column("event_ts").cast(pa.int64()).to_numpy()
+        channel, country = (dims[d][user] for d in DIMENSIONS)
+        week = (secs // DAY + 3) // 7
+        builder.add("week", week, channel, country, index, rank)
+        month = secs.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+        builder.add("month", month, channel, country, index, rank)
+
+    groups = list(builder.rows)
+    keys = pd.DataFrame(groups, columns=["grain", "period", *DIMENSIONS])
+    for d in DIMENSIONS:
+        keys[d] = [names[d][c] if c >= 0 else None for c in keys[d]]
+    registers = builder.flat[: len(groups) * M].reshape(len(groups), M)
+    return Sketches(keys, registers.copy(), source_stats(raw_dir, store_dir))
+
+
+def load_or_build(
+    path: Path = INTERIM / SKETCHES,
+    raw_dir: Path = RAW,
+    store_dir: Path = STORE,
+    memory_mb: float | None = None,
+) -> Sketches:
+    """The persisted sketches (written by build_sketches.py), built and saved if missing
+    or sketched from other raw data than raw_dir's."""
+    if Path(path).exists():
+        sk = Sketches.load(path)
+        if same_sources(sk.source, raw_dir):
+            return sk
+    sk = build(raw_dir, store_dir, memory_mb)
+    sk.save(path)
+    return sk
+
+
+# --- approximate metrics (same frames as metrics.py, plus the `approximate` flag) -----
+
+
+def flagged(df: pd.DataFrame, *columns: str) -> pd.DataFrame:
+    """`df` with the `approximate` column naming its approximate `columns`."""
+    return df.assign(**{FLAG: ",".join(columns)})
+
+
+def active_users(
+    sk: Sketches, grain: str = "week", by: tuple[str, ...] = (), window: int = 1
+) -> pd.DataFrame:
+    """`Sketches.rollup` with the period as week_start or month: week_start | month,
+    *by, users."""
+    est = sk.rollup(grain, by, window)
+    label = period_labels(est.pop("period").to_numpy(), grain)
+    est.insert(0, label.name, label.to_numpy())
+    return est
+
+
+def wau_by_week(sk: Sketches) -> pd.DataFrame:
+    """week_start, wau (estimated), approximate."""
+    return flagged(active_users(sk, "week").rename(columns={"users": "wau"}), "wau")
+
+
+def mau_by_month(sk: Sketches) -> pd.DataFrame:
+    """month, mau (estimated), approximate."""
+    return flagged(active_users(sk, "month").rename(columns={"users": "mau"}), "mau")
+
+
+def opac_by_channel_week(sk: Sketches, net: pd.DataFrame) -> pd.DataFrame:
+    """`metrics.opac_by_channel` with the channel WAU estimated from the sketches and
+    the exact net orders `net` (week_start, acquisition_channel, orders_net, revenue_net)."""
+    wau = active_users(sk, "week", ("acquisition_channel",)).rename(columns={"users": "wau"})
+    net = net.astype({"acquisition_channel": str})
+    out = metrics.opac_by_channel(wau, net).reset_index(drop=True)
+    return flagged(out, "wau", "opac")
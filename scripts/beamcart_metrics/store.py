@@ -0,0 +1,518 @@
+"""
+Columnar raw-data store.
+
+`ingest()` converts data/raw/{users,events,orders}.csv once into typed Parquet under
+data/store/ (a raw table may also be a `.parquet` file in any schema-compatible types,
+e.g. from `seed_synthetic_data_big.py --format parquet`; the CSV wins if both exist):
+
+- events and orders are hive-partitioned by ISO week (`week=YYYY-MM-DD`, Monday start);
+  rows keep their CSV order inside a partition, so per-week float sums are bit-identical
+  to the CSV path; users is a single file
+- user_id, event_type, country and acquisition_channel are dictionary-encoded
+  (int32 indices; each partition holds only its own values, so new rows leave the
+  other weeks' files byte-identical), timestamps are timestamp[s], is_refund is int8
+- every table also has `user_code`, the user's int32 code in the store's persistent
+  user dictionary (`user_dict.parquet`, see userdict.py). Ingest keeps the previous
+  dictionary and only appends new ids, so codes (and unchanged partitions) stay stable
+  across runs. The CSV fallback has no `user_code`
+
+Ingest also writes `events.arrow` / `orders.arrow`: the same rows in the same order plus
+`week`, as one uncompressed Arrow IPC file each, every week in its own record batches.
+The manifest's `week_index` maps each week to its first row, rows and batches, so
+`read_weeks(name, weeks=, since=)` (or `read_table(..., weeks=, since=)`) memory-maps the
+file and reads only the selected weeks' pages, without decompressing or decoding
+anything (dictionary columns stay encoded); the cost is a second, uncompressed copy of
+events and orders on disk.
+
+Readers get column and partition pruning through `read_table(name, columns=, filters=)`
+(pandas), `iter_batches(...)` (the same, as bounded Arrow record batches) and
+`scan_sql(name)` (DuckDB). `_manifest.json` records the size/mtime of the
+CSVs an ingest was built from (plus content hashes), the rows of each table and the
+time span and ISO weeks it covers (the dataset registry's metadata, see datasets.py);
+once the CSVs change the store counts as stale and readers fall back to parsing the
+CSVs with the same schema.
+"""
+
+import json
+import os
+import shutil
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pcsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from beamcart_metrics.cache import file_digest
+from beamcart_metrics.paths import RAW, STORE
+from beamcart_metrics.userdict import USER_CODE, UserDict
+
+MANIFEST = "_manifest.json"
+
+DICT = pa.dictionary(pa.int32(), pa.string())
+TS = pa.timestamp("s")
+
+SCHEMAS = {
+    "users": pa.schema(
+        [
+            ("user_id", DICT),
+            ("signup_ts", TS),
+            ("country", DICT),
+            ("acquisition_channel", DICT),
+        ]
+    ),
+    "events": pa.schema([("user_id", DICT), ("event_ts", TS), ("event_type", DICT)]),
+    "orders": pa.schema(
+        [
+            ("order_id", pa.string()),
+            ("user_id", DICT),
+            ("order_ts", TS),
+            ("revenue", pa.float64()),
+            ("items", pa.int16()),
+            ("is_refund", pa.int8()),
+        ]
+    ),
+}
+TS_COL = {"users": "signup_ts", "events": "event_ts", "orders": "order_ts"}
+PARTITIONED = ("events", "orders")
+WEEK = pa.field("week", DICT)
+CODE = pa.field(USER_CODE, pa.int32())
+_PANDAS_TYPES = {pa.string(): pd.StringDtype("pyarrow")}
+CSV_ROW_BYTES = 48  # rough raw CSV row width, sizes iter_batches' CSV blocks
+WEEK_BATCH_ROWS = 1 << 20  # record batch size of the week files
+NULL_WEEK = "None"  # partition of the rows without a timestamp, which are in no ISO week
+
+
+def _csv_convert_options(name: str) -> pcsv.ConvertOptions:
+    schema = SCHEMAS[name]
+    types = {f.name: f.type for f in schema}
+    if name == "orders":
+        # be robust to 0/1, "0"/"1" or blanks: parse as float, blanks -> 0
+        types["is_refund"] = pa.float64()
+    return pcsv.ConvertOptions(column_types=types, include_columns=schema.names)
+
+
+def _fix_refund_flag(name: str, table: pa.Table) -> pa.Table:
+    if name != "orders":
+        return table
+    flag = pc.fill_null(table["is_refund"], 0)
+    return table.set_column(table.schema.get_field_index("is_refund"), "is_refund", flag)
+
+
+def source_path(name: str, raw_dir: Path = RAW) -> Path:
+    """The raw file of a table: <name>.csv, else <name>.parquet if only that exists."""
+    csv = Path(raw_dir) / f"{name}.csv"
+    parquet = csv.with_suffix(".parquet")
+    return parquet if not csv.exists() and parquet.exists() else csv
+
+
+def read_csv_arrow(name: str, raw_dir: Path = RAW) -> pa.Table:
+    """Parse one raw table straight into the store schema (no pandas round trip); a
+    Parquet source is read and cast the same way."""
+    path = source_path(name, raw_dir)
+    if path.suffix == ".parquet":
+        table = pq.read_table(path, columns=SCHEMAS[name].names)
+    else:
+        table = pcsv.read_csv(path, convert_options=_csv_convert_options(name))
+    return _fix_refund_flag(name, table).cast(SCHEMAS[name])
+
+
+def store_schema(name: str) -> pa.Schema:
+    """Schema of a store table: the raw columns, `user_code` and (partitioned) `week`."""
+    schema = SCHEMAS[name].append(CODE)
+    return schema.append(WEEK) if name in PARTITIONED else schema
+
+
+def week_key(ts: pa.ChunkedArray) -> pa.ChunkedArray:
+    """ISO week start (Monday, UTC) of each timestamp as a `YYYY-MM-DD` string."""
+    monday = pc.floor_temporal(ts, unit="week", week_starts_monday=True)
+    return pc.strftime(monday, format="%Y-%m-%d")
+
+
+def _local_dictionaries(table: pa.Table) -> pa.Table:
+    """Re-encode dictionary columns with only the values present in `table`."""
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            col = pc.dictionary_encode(table.column(i).cast(pa.string()))
+            table = table.set_column(i, field, col.cast(field.type))
+    return table
+
+
+def time_span(ts: pa.ChunkedArray) -> dict:
+    """min_ts / max_ts of a timestamp column as ISO strings (None when all null)."""
+    lo, hi = pc.min_max(ts).as_py().values()
+    return {"min_ts": lo and lo.isoformat(), "max_ts": hi and hi.isoformat()}
+
+
+def sort_by_week(
+    table: pa.Table, weeks: pa.ChunkedArray
+) -> tuple[pa.Table, pa.ChunkedArray, list[tuple[str | None, int, int]]]:
+    """`table` and `weeks` stably sorted by week (rows keep their CSV order inside a
+    week, null weeks last), plus the (week, start, end) row range of every week."""
+    order = pc.sort_indices(weeks)
+    table, weeks = table.take(order), weeks.take(order)
+    ends = pc.run_end_encode(weeks).combine_chunks()
+    runs, start = [], 0
+    for week, end in zip(ends.values.to_pylist(), ends.run_ends.to_pylist(), strict=True):
+        runs.append((week, start, end))
+        start = end
+    return table, weeks, runs
+
+
+def write_partitions(table: pa.Table, weeks: pa.ChunkedArray, out_dir: Path) -> None:
+    """
+    Write `table` as `out_dir/week=YYYY-MM-DD/part-0.parquet`, rows in their original
+    order within each week. Each file carries only its own dictionary values, so a
+    partition's bytes change only when its rows do (incremental stages rely on that).
+    """
+    table, _, runs = sort_by_week(table, weeks)
+    for week, start, end in runs:
+        part = Path(out_dir) / f"week={week or NULL_WEEK}"
+        part.mkdir(parents=True)
+        pq.write_table(
+            _local_dictionaries(table.slice(start, end - start)), part / "part-0.parquet"
+        )
+
+
+def write_week_file(
+    table: pa.Table, weeks: pa.ChunkedArray, path: Path, batch_rows: int = WEEK_BATCH_ROWS
+) -> dict:
+    """
+    Write `table` plus its `week` column as an uncompressed Arrow IPC file, sorted as
+    `write_partitions` sorts it, every week's rows in their own record batches of at
+    most `batch_rows`. Rows without a timestamp are in no week and are left out.
+    Returns the sparse index, `{week: [first row, rows, first batch, batches]}`.
+    """
+    table, weeks, runs = sort_by_week(table, weeks)
+    if runs and runs[-1][0] is None:  # null weeks sort last
+        dated = runs.pop()[1]
+        table, weeks = table.slice(0, dated), weeks.slice(0, dated)
+    table = table.append_column(WEEK, pc.dictionary_encode(weeks).cast(WEEK.type))
+    table = table.unify_dictionaries().combine_chunks()  # one dictionary per column
+    index, batch = {}, 0
+    with pa.ipc.new_file(path, table.schema) as writer:
+        for week, start, end in runs:
+            first = batch
+            for b in table.slice(start, end - start).to_batches(max_chunksize=batch_rows):
+                writer.write_batch(b)
+                batch += 1
+            index[week] = [start, end - start, first, batch - first]
+    return {"file": Path(path).name, "weeks": index}
+
+
+def _source_stats(raw_dir: Path, with_digest: bool = False) -> dict:
+    out = {}
+    for name in SCHEMAS:
+        p = source_path(name, raw_dir)
+        st = p.stat()
+        out[name] = {"path": str(p.resolve()), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        if with_digest:
+            out[name]["sha256"] = file_digest(p)
+    return out
+
+
+def is_fresh(raw_dir: Path = RAW, store_dir: Path = STORE) -> bool:
+    """True if the store exists and was built from the CSVs currently in raw_dir.
+
+    Size+mtime decide in the common case; a CSV rewritten with identical content (new
+    mtime, e.g. the seed stage re-running) is still fresh via its content hash."""
+    manifest = Path(store_dir) / MANIFEST
+    if not manifest.exists():
+        return False
+    try:
+        return same_sources(json.loads(manifest.read_text())["source"], raw_dir)
+    except (OSError, KeyError, ValueError):
+        return False
+
+
+def same_sources(built: dict, raw_dir: Path = RAW) -> bool:
+    """True if `built` (`source_stats` of some earlier build) describes the raw files
+    currently in raw_dir: same paths and sizes, and same mtimes or content hashes."""
+    try:
+        for name, cur in _source_stats(raw_dir).items():
+            old = built[name]
+            if (old["path"], old["size"]) != (cur["path"], cur["size"]):
+                return False
+            if old["mtime_ns"] != cur["mtime_ns"] and old["sha256"] != file_digest(cur["path"]):
+                return False
+        return True
+    except (OSError, KeyError, TypeError):
+        return False
+
+
+def source_stats(raw_dir: Path = RAW, store_dir: Path = STORE) -> dict:
+    """Path, size, mtime and content hash of each raw file, identifying the data an
+    artifact derived from them was built from (see `same_sources`); from the store
+    manifest while the store is fresh, so the files are only hashed without one."""
+    if is_fresh(raw_dir, store_dir):
+        return json.loads((Path(store_dir) / MANIFEST).read_text())["source"]
+    return _source_stats(raw_dir, with_digest=True)
+
+
+def ingest(raw_dir: Path = RAW, store_dir: Path = STORE) -> dict:
+    """Rebuild the Parquet store (and the week files) from the raw CSVs, extending the
+    user dictionary; returns row counts per table."""
+    store_dir = Path(store_dir)
+    tmp = store_dir.with_name(store_dir.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    source = _source_stats(raw_dir, with_digest=True)
+    users = UserDict.load(store_dir)
+    rows, coverage, week_index = {}, {}, {}
+    for name in SCHEMAS:
+        table = read_csv_arrow(name, raw_dir)
+        table = table.append_column(CODE, users.encode(table["user_id"]))
+        rows[name] = table.num_rows
+        coverage[name] = time_span(table[TS_COL[name]])
+        if name in PARTITIONED:
+            weeks = week_key(table[TS_COL[name]])
+            coverage[name]["weeks"] = sorted(w for w in pc.unique(weeks).to_pylist() if w)
+            write_partitions(table, weeks, tmp / name)
+            week_index[name] = write_week_file(table, weeks, tmp / f"{name}.arrow")
+        else:
+            pq.write_table(table, tmp / f"{name}.parquet")
+
+    users.save(tmp)
+    manifest = {
+        "source": source,
+        "rows": rows,
+        "coverage": coverage,
+        "user_dict": len(users),
+        "week_index": week_index,
+    }
+    (tmp / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp, store_dir)
+    return rows
+
+
+def _path(name: str, store_dir: Path) -> Path:
+    return Path(store_dir) / (name if name in PARTITIONED else f"{name}.parquet")
+
+
+def read_arrow(
+    name: str,
+    columns: list[str] | None = None,
+    filters=None,
+    raw_dir: Path = RAW,
+    store_dir: Path = STORE,
+) -> pa.Table:
+    """
+    Read a raw table as Arrow with the store schema.
+
+    `columns` prunes columns (`week` is available for partitioned tables) and `filters`
+    uses pyarrow's DNF filter syntax, e.g. `[("week", ">=", "2025-11-03")]`; partition
+    filters skip whole directories, others skip row groups by their statistics.
+    Falls back to the CSV when the store is missing or stale (without `user_code`).
+    """
+    schema = store_schema(name)
+    if is_fresh(raw_dir, store_dir):
+        table = pq.read_table(
+            _path(name, store_dir), columns=columns, filters=filters, partitioning="hive"
+        )
+    else:
+        table = read_csv_arrow(name, raw_dir)
+        if name in PARTITIONED:
+            table = table.append_column("week", week_key(table[TS_COL[name]]))
+        if filters is not None:
+            table = table.filter(pq.filters_to_expression(filters))
+        if columns is not None:
+            table = table.select(columns)
+    return table.cast(pa.schema([schema.field(c) for c in table.column_names]))
+
+
+def week_partitions(name: str, store_dir: Path = STORE) -> dict[str, Path]:
+    """`YYYY-MM-DD` week -> its partition directory in the store (the NULL_WEEK
+    partition, rows in no week, is left out)."""
+    parts = sorted((Path(store_dir) / name).glob("week=*"))
+    return {p.name.split("=", 1)[1]: p for p in parts if p.name != f"week={NULL_WEEK}"}
+
+
+def week_start(day) -> str:
+    """`YYYY-MM-DD` Monday of the ISO week containing `day` (date, timestamp or string)."""
+    ts = pd.Timestamp(day)
+    return (ts - pd.Timedelta(days=ts.weekday())).strftime("%Y-%m-%d")
+
+
+def _present_values(col: pa.ChunkedArray) -> pa.DictionaryArray:
+    """`col` with only the dictionary values its rows use, remapped on the int32
+    indices (the values themselves are only gathered, not decoded)."""
+    col = col.combine_chunks()
+    null = col.is_null().to_numpy(zero_copy_only=False)
+    codes = pc.fill_null(col.indices, 0).to_numpy()
+    used = np.unique(codes[~null])
+    remap = np.zeros(len(col.dictionary), dtype=np.int32)
+    remap[used] = np.arange(len(used), dtype=np.int32)
+    indices = pa.array(remap[codes], mask=null if null.any() else None)
+    return pa.DictionaryArray.from_arrays(indices, col.dictionary.take(used))
+
+
+def _dated(day) -> bool:
+    return day is not None and day != NULL_WEEK and not pd.isna(day)
+
+
+def read_weeks(
+    name: str,
+    weeks=None,
+    since=None,
+    columns: list[str] | None = None,
+    filters=None,
+    raw_dir: Path = RAW,
+    store_dir: Path = STORE,
+) -> pa.Table:
+    """
+    `read_arrow` restricted to some ISO weeks of events or orders: the weeks containing
+    the dates in `weeks`, and / or every week from the one containing `since` on. Rows
+    without a timestamp are in no week, so they are never read (None or NULL_WEEK in
+    `weeks` selects nothing).
+
+    With a fresh store the rows come from the memory-mapped week file: the sparse index
+    in the manifest gives each week's record batches, so only those weeks' pages are
+    read. Nothing is decoded: the other dictionary columns keep their indices, remapped
+    to a dictionary of the values present (as the Parquet partitions hold them), so the
+    frame `to_pandas` makes equals `read_arrow`'s with a week filter (which is what a
+    store built before the week files, or the CSV fallback, is read with).
+    """
+    if name not in PARTITIONED:
+        raise ValueError(f"{name} is not partitioned by week")
+    wanted = None if weeks is None else {week_start(w) for w in weeks if _dated(w)}
+    first = None if since is None else week_start(since)
+    index = None
+    if is_fresh(raw_dir, store_dir):
+        manifest = json.loads((Path(store_dir) / MANIFEST).read_text())
+        index = manifest.get("week_index", {}).get(name)
+    if index is None:
+        flt = list(filters or []) + [("week", "!=", NULL_WEEK)]
+        if wanted is not None:
+            flt.append(("week", "in", sorted(wanted)))
+        if first is not None:
+            flt.append(("week", ">=", first))
+        return read_arrow(name, columns, flt, raw_dir, store_dir)
+
+    picked = [
+        entry
+        for week, entry in sorted(index["weeks"].items())
+        if (wanted is None or week in wanted) and (first is None or week >= first)
+    ]
+    reader = pa.ipc.open_file(pa.memory_map(str(Path(store_dir) / index["file"])))
+    batches = [reader.get_batch(i) for _, _, batch, n in picked for i in range(batch, batch + n)]
+    table = pa.Table.from_batches(batches, schema=reader.schema)
+    # week keeps the file's dictionary, every ingested week, as partition discovery has it
+    for c in columns if columns is not None else table.column_names:
+        if c != "week" and pa.types.is_dictionary(table.schema.field(c).type):
+            i = table.schema.get_field_index(c)
+            table = table.set_column(i, c, _present_values(table.column(i)))
+    if filters is not None:
+        table = table.filter(pq.filters_to_expression(filters))
+    if columns is not None:
+        table = table.select(columns)
+    schema = store_schema(name)
+    return table.cast(pa.schema([schema.field(c) for c in table.column_names]))
+
+
+def iter_batches(
+    name: str,
+    columns: list[str] | None = None,
+    filters=None,
+    raw_dir: Path = RAW,
+    store_dir: Path = STORE,
+    batch_rows: int = 1 << 20,
+) -> Iterator[pa.RecordBatch]:
+    """
+    `read_arrow` as a stream of record batches of about `batch_rows` rows at most, so a
+    table larger than memory can be aggregated batch by batch. Dictionary columns carry
+    per-batch dictionaries. The CSV fallback reads blocks of ~`CSV_ROW_BYTES` per row.
+    """
+    schema = store_schema(name)
+    expr = None if filters is None else pq.filters_to_expression(filters)
+    if is_fresh(raw_dir, store_dir):
+        dataset = ds.dataset(_path(name, store_dir), format="parquet", partitioning="hive")
+        batches = dataset.to_batches(
+            columns=columns,
+            filter=expr,
+            batch_size=batch_rows,
+            batch_readahead=1,  # bounded memory: at most ~2 batches in flight
+            fragment_readahead=1,
+        )
+    else:
+        path = source_path(name, raw_dir)
+        if path.suffix == ".parquet":
+            reader = pq.ParquetFile(path).iter_batches(batch_rows, columns=SCHEMAS[name].names)
+        else:
+            reader = pcsv.open_csv(
+                path,
+                read_options=pcsv.ReadOptions(block_size=batch_rows * CSV_ROW_BYTES),
+                convert_options=_csv_convert_options(name),
+            )
+        wanted = set(columns or schema.names) | _filter_columns(filters)
+        with_week = name in PARTITIONED and "week" in wanted
+        tables = (_csv_block(name, b, with_week, expr, columns) for b in reader)
+        batches = (b for t in tables for b in t.combine_chunks().to_batches())
+    for batch in batches:
+        yield batch.cast(pa.schema([schema.field(c) for c in batch.schema.names]))
+
+
+def _csv_block(name: str, batch: pa.RecordBatch, with_week: bool, expr, columns) -> pa.Table:
+    """One parsed CSV block (or raw Parquet batch), shaped like a store batch."""
+    table = _fix_refund_flag(name, pa.Table.from_batches([batch])).cast(SCHEMAS[name])
+    if with_week:
+        table = table.append_column("week", week_key(table[TS_COL[name]]))
+    if expr is not None:
+        table = table.filter(expr)
+    return table if columns is None else table.select(columns)
+
+
+def _filter_columns(filters) -> set[str]:
+    """Columns a DNF filter (list of tuples, or list of lists of tuples) refers to."""
+    if not filters:
+        return set()
+    groups = filters if isinstance(filters[0], list) else [filters]
+    return {column for group in groups for column, _, _ in group}
+
+
+def read_table(
+    name: str,
+    columns: list[str] | None = None,
+    filters=None,
+    raw_dir: Path = RAW,
+    store_dir: Path = STORE,
+    weeks=None,
+    since=None,
+) -> pd.DataFrame:
+    """`read_arrow` (`read_weeks` with `weeks` / `since`) converted to pandas with
+    `to_pandas`."""
+    if weeks is not None or since is not None:
+        return to_pandas(read_weeks(name, weeks, since, columns, filters, raw_dir, store_dir))
+    return to_pandas(read_arrow(name, columns, filters, raw_dir, store_dir))
+
+
+def to_pandas(table: pa.Table) -> pd.DataFrame:
+    """Arrow table in the store schema -> pandas: dictionary columns become categoricals
+    (with lexically sorted categories, so sorting matches plain strings), plain strings
+    stay Arrow-backed (`string[pyarrow]`: offsets + bytes, no Python object per value),
+    timestamps stay datetime64[s]."""
+    df = table.to_pandas(types_mapper=_PANDAS_TYPES.get)
+    for c in df.columns:
+        if isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].cat.set_categories(sorted(df[c].cat.categories))
+    return df
+
+
+def scan_sql(name: str, raw_dir: Path = RAW, store_dir: Path = STORE) -> str:
+    """DuckDB table expression for a raw table: the Parquet store when fresh (DuckDB
+    pushes projections and `week` predicates into the scan), else the raw file."""
+    if is_fresh(raw_dir, store_dir):
+        p = _path(name, store_dir)
+        glob = str(p / "*" / "*.parquet") if name in PARTITIONED else str(p)
+        glob = glob.replace("'", "''")
+        return f"read_parquet('{glob}', hive_partitioning = true)"
+    path = source_path(name, raw_dir)
+    quoted = str(path).replace("'", "''")
+    if path.suffix == ".parquet":
+        return f"read_parquet('{quoted}')"
+    return f"read_csv_auto('{quoted}', header=True)"
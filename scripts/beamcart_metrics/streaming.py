@@ -0,0 +1,411 @@
+"""
+Streaming metric engine: `--engine streaming`, for event logs larger than memory.
+
+`Stream` reads events and orders as bounded Arrow record batches (`store.iter_batches`:
+the Parquet store, or the CSVs when it is stale) and folds each batch into mergeable
+state, one pass per table:
+
+- sessions: the distinct (user, ISO week), (user, month) and (user, days since signup)
+  pairs, as sorted int64 keys deduplicated batch by batch. WAU / MAU are counts per
+  period, churn is `lifecycle` over the week / month pairs, retention a count per
+  (cohort, offset) for offsets D0..D90.
+- orders: per-week, per-(week, channel) and per-(week, channel x country cell) order
+  counts and net revenue sums.
+
+User ids become dense codes: the users table's ids first (the dimension, loaded whole
+for signup days and channels), then unknown ids as they show up. The functions below
+mirror `metrics.py` / `retention.py` / `churn.py` by name and return the same frames.
+Counts are equal to the in-memory path; revenue sums can differ in the last bits,
+because they are added batch by batch.
+
+Memory is bounded by the batch size plus the state, which grows with the distinct
+pairs, not with the events. `memory_mb` (the peak RSS budget of the process) sizes
+the batches from the headroom left when a pass starts. Each pass prints its rows,
+batches and the peak RSS against the budget (`Stream.stats`).
+"""
+
+import os
+import resource
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from beamcart_metrics import cube, metrics, retention, rolling
+from beamcart_metrics.buckets import DAY, epoch_days
+from beamcart_metrics.churn import Activity, period_labels
+from beamcart_metrics.loaders import SESSION_FILTER
+from beamcart_metrics.paths import RAW, STORE
+from beamcart_metrics.store import iter_batches, read_table
+from beamcart_metrics.userdict import sorted_unique
+
+PERIOD_BITS = 20  # key = user << PERIOD_BITS | period (weeks, months, offsets < 2**20)
+MASK = (1 << PERIOD_BITS) - 1
+MAX_OFFSET = max(retention.DAYS)  # retention offsets kept: D0..D90
+
+ROW_BYTES = 256  # working memory per streamed row (Arrow batch, NumPy temporaries)
+DEFAULT_BATCH_ROWS = 1 << 20
+MIN_BATCH_ROWS, MAX_BATCH_ROWS = 10_000, 4_000_000
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process, MiB."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:  # not Linux
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10  # bytes vs KiB
+
+
+def batch_rows_for(memory_mb: float | None) -> int:
+    """Rows per batch that keep a pass within `memory_mb`: half the headroom left above
+    the current RSS goes to the batch, half is left for the state."""
+    if memory_mb is None:
+        return DEFAULT_BATCH_ROWS
+    headroom = (memory_mb - rss_mb()) * 2**20 / 2
+    return int(np.clip(headroom / ROW_BYTES, MIN_BATCH_ROWS, MAX_BATCH_ROWS))
+
+
+@dataclass
+class PassStats:
+    table: str
+    batch_rows: int
+    rows: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    peak_rss_mb: float = 0.0
+
+    def describe(self, memory_mb: float | None) -> str:
+        budget = f" (budget {memory_mb:,.0f} MiB)" if memory_mb else ""
+        over = " ⚠️ over budget" if memory_mb and self.peak_rss_mb > memory_mb else ""
+        return (
+            f"  ⇢ streamed {self.table}: {self.rows:,} rows in {self.batches} batches of "
+            f"≤{self.batch_rows:,} in {self.seconds:.2f} s, peak RSS "
+            f"{self.peak_rss_mb:,.0f} MiB{budget}{over}"
+        )
+
+
+class _Distinct:
+    """Distinct int64 keys, deduplicated per batch and merged into one sorted array
+    whenever the pending batches outgrow it."""
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.int64)
+        self._pending: list[np.ndarray] = []
+        self._n = 0
+
+    def add(self, keys: np.ndarray) -> None:
+        keys = sorted_unique(keys)
+        self._pending.append(keys)
+        self._n += len(keys)
+        if self._n > max(len(self.keys), DEFAULT_BATCH_ROWS):
+            self.compact()
+
+    def compact(self) -> np.ndarray:
+        if self._pending:
+            # sorted runs: the stable (merge) sort only merges them
+            merged = np.concatenate([self.keys, *self._pending])
+            self._pending, self._n = [], 0
+            self.keys = sorted_unique(merged, kind="stable")
+        return self.keys
+
+
+def _fold(state: pd.DataFrame | None, part: pd.DataFrame) -> pd.DataFrame:
+    """Add per-group sums of one batch into the running ones."""
+    if state is None:
+        return part
+    return pd.concat([state, part]).groupby(level=list(range(part.index.nlevels))).sum()
+
+
+def _seconds(col: pa.Array) -> tuple[np.ndarray, np.ndarray]:
+    """Epoch seconds of a timestamp[s] column and its validity mask."""
+    valid = col.is_valid().to_numpy(zero_copy_only=False)
+    return col.cast(pa.int64()).fill_null(0).to_numpy(), valid
+
+
+class Stream:
+    """Lazily computed streaming state over the raw tables; each table is read once."""
+
+    def __init__(
+        self,
+        raw_dir: Path = RAW,
+        store_dir: Path = STORE,
+        memory_mb: float | None = None,
+        batch_rows: int | None = None,
+    ):
+        self.raw_dir = Path(raw_dir)
+        self.store_dir = Path(store_dir)
+        self.memory_mb = memory_mb
+        self.batch_rows = batch_rows  # None: sized from memory_mb
+        self.stats: dict[str, PassStats] = {}
+        self._users: pd.DataFrame | None = None
+        self._sessions: dict[str, np.ndarray] | None = None
+        self._orders: dict[str, pd.DataFrame] | None = None
+
+    # --- users: the dimension, and the user id -> code dictionary -------------------
+
+    @property
+    def users(self) -> pd.DataFrame:
+        if self._users is None:
+            users = read_table("users", raw_dir=self.raw_dir, store_dir=self.store_dir)
+            self._ids = pd.Index(users["user_id"].cat.categories)
+            code = users["user_id"].cat.codes.to_numpy()
+            ok = code >= 0
+            self._signup_day = np.zeros(len(self._ids), dtype=np.int64)
+            self._signup_day[code[ok]] = epoch_days(users["signup_ts"])[ok]
+            self._channel = np.full(len(self._ids), -1, dtype=np.int64)
+            self._channel[code[ok]] = users["acquisition_channel"].cat.codes.to_numpy()[ok]
+            self._channels = users["acquisition_channel"].cat.categories
+            self._segments = cube.Segments.of(users[ok], code[ok])
+            self._users = users
+        return self._users
+
+    def _user_codes(self, col: pa.DictionaryArray) -> tuple[np.ndarray, np.ndarray]:
+        """Dense user code of every row of a user_id column and its validity mask."""
+        valid = col.is_valid().to_numpy(zero_copy_only=False)
+        index = col.indices.fill_null(0).to_numpy()
+        if len(col.dictionary) == 0:  # every user_id is null
+            return np.zeros(len(col), dtype=np.int64), valid
+        if len(col.dictionary) > len(col):  # store partitions: look up only the ids used
+            used, index = np.unique(index, return_inverse=True)  # small ints: cheap
+            values = col.dictionary.take(pa.array(used)).to_pandas()
+        else:
+            values = col.dictionary.to_pandas()
+        lookup = self._ids.get_indexer(values)
+        new = lookup < 0
+        if new.any():  # ids missing from users: codes after the known ones
+            self._ids = self._ids.append(pd.Index(values[new].unique()))
+            lookup[new] = self._ids.get_indexer(values[new])
+        return lookup[index], valid
+
+    def _channel_of(self, user: np.ndarray) -> np.ndarray:
+        """Acquisition channel code per user code (-1: not in users)."""
+        known = user < len(self._channel)
+        return np.where(known, self._channel[np.where(known, user, 0)], -1)
+
+    # --- the two passes ----------------------------------------------------------------
+
+    def _batches(self, table: str, columns: list[str], filters=None):
+        st = PassStats(table, self.batch_rows or batch_rows_for(self.memory_mb))
+        t0 = time.perf_counter()
+        for batch in iter_batches(
+            table, columns, filters, self.raw_dir, self.store_dir, st.batch_rows
+        ):
+            st.rows += batch.num_rows
+            st.batches += 1
+            yield batch
+        st.seconds, st.peak_rss_mb = time.perf_counter() - t0, peak_rss_mb()
+        self.stats[table] = st
+        print(st.describe(self.memory_mb))
+
+    @property
+    def sessions(self) -> dict[str, np.ndarray]:
+        """Sorted distinct `user << PERIOD_BITS | period` keys for "week", "month", "day"
+        and "offset" (days since signup, users in the users table, D0..MAX_OFFSET)."""
+        if self._sessions is None:
+            self.users
+            weeks, months, days, offsets = _Distinct(), _Distinct(), _Distinct(), _Distinct()
+            for batch in self._batches("events", ["user_id", "event_ts"], SESSION_FILTER):
+                user, ok = self._user_codes(batch.column("user_id"))
+                secs, ts_ok = _seconds(batch.column("event_ts"))
+                user, secs = user[ok & ts_ok], secs[ok & ts_ok]
+                day = secs // DAY
+                weeks.add(user << PERIOD_BITS | (day + 3) // 7)
+                days.add(user << PERIOD_BITS | day)
+                month = secs.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+                months.add(user << PERIOD_BITS | month)
+                known = user < len(self._signup_day)
+                user, day = user[known], day[known]
+                offset = day - self._signup_day[user]
+                keep = (offset >= 0) & (offset <= MAX_OFFSET)
+                offsets.add(user[keep] << PERIOD_BITS | offset[keep])
+            self._sessions = {
+                "week": weeks.compact(),
+                "month": months.compact(),
+                "day": days.compact(),
+                "offset": offsets.compact(),
+            }
+        return self._sessions
+
+    @property
+    def orders(self) -> dict[str, pd.DataFrame]:
+        """Order sums per ISO week ("week"), per (week, channel code) ("channel") and per
+        (week, `cube.Segments` cell) ("segment")."""
+        if self._orders is None:
+            self.users
+            by_week = by_channel = by_segment = None
+            columns = ["order_id", "user_id", "order_ts", "revenue", "is_refund"]
+            for batch in self._batches("orders", columns):
+                secs, ok = _seconds(batch.column("order_ts"))
+                user, user_ok = self._user_codes(batch.column("user_id"))
+                is_refund = batch.column("is_refund").to_numpy(zero_copy_only=False)
+                revenue = batch.column("revenue").to_numpy(zero_copy_only=False)
+                rows = pd.DataFrame(
+                    {
+                        "week": (secs // DAY + 3) // 7,
+                        "channel": np.where(user_ok, self._channel_of(user), -1),
+                        "segment": self._segments.lookup(np.where(user_ok, user, -1)),
+                        "all_orders": batch.column("order_id")
+                        .is_valid()
+                        .to_numpy(zero_copy_only=False),
+                        "refund_orders": is_refund == 1,
+                        "orders_net": is_refund == 0,
+                        "revenue_net": np.where(is_refund == 0, revenue, 0.0),
+                    }
+                )[ok]
+                sums = ["all_orders", "refund_orders", "orders_net", "revenue_net"]
+                by_week = _fold(by_week, rows.groupby("week")[sums].sum())
+                by_segment = _fold(by_segment, rows.groupby(["week", "segment"])[sums].sum())
+                rows = rows[rows["channel"] >= 0]
+                part = rows.groupby(["week", "channel"])[["orders_net", "revenue_net"]].sum()
+                by_channel = _fold(by_channel, part)
+            empty = pd.DataFrame(columns=sums, dtype=np.int64)
+            self._orders = {
+                "week": by_week if by_week is not None else empty,
+                "channel": by_channel if by_channel is not None else empty,
+                "segment": by_segment if by_segment is not None else empty,
+            }
+        return self._orders
+
+    def report(self) -> dict:
+        """Per-pass rows, batches, seconds and peak RSS, plus the budget."""
+        return {
+            "memory_mb": self.memory_mb,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "passes": {
+                t: dict(s.__dict__, seconds=round(s.seconds, 4)) for t, s in self.stats.items()
+            },
+        }
+
+
+# --- metric functions (same names and frames as the in-memory path) -------------------
+
+
+def _week_start(week: np.ndarray) -> np.ndarray:
+    return ((week * 7 - 3) * DAY).astype("datetime64[s]")
+
+
+def wau_by_week(stream: Stream) -> pd.DataFrame:
+    weeks, wau = np.unique(stream.sessions["week"] & MASK, return_counts=True)
+    return pd.DataFrame({"week_start": _week_start(weeks), "wau": wau})
+
+
+def _week_sums(stream: Stream, columns: list[str]) -> pd.DataFrame:
+    sums = stream.orders["week"][columns].sort_index()
+    out = sums.reset_index(drop=True)
+    out.insert(0, "week_start", _week_start(sums.index.to_numpy(dtype=np.int64)))
+    return out.astype({c: np.int64 for c in columns if c != "revenue_net"})
+
+
+def net_orders_by_week(stream: Stream) -> pd.DataFrame:
+    return _week_sums(stream, ["orders_net", "revenue_net"])
+
+
+def refunds_by_week(stream: Stream) -> pd.DataFrame:
+    return _week_sums(stream, ["all_orders", "refund_orders"])
+
+
+def mau_by_month(stream: Stream) -> pd.DataFrame:
+    months, mau = np.unique(stream.sessions["month"] & MASK, return_counts=True)
+    return pd.DataFrame({"month": period_labels(months, "month"), "mau": mau})
+
+
+def opac_by_channel_week(stream: Stream) -> pd.DataFrame:
+    keys = stream.sessions["week"]
+    channel = stream._channel_of(keys >> PERIOD_BITS)
+    pairs = pd.DataFrame({"week": keys & MASK, "channel": channel})
+    wau = pairs[channel >= 0].groupby(["week", "channel"]).size().rename("wau")
+    net = stream.orders["channel"]
+
+    def frame(sums: pd.DataFrame) -> pd.DataFrame:
+        week = sums.index.get_level_values("week").to_numpy(dtype=np.int64)
+        code = sums.index.get_level_values("channel").to_numpy(dtype=np.int64)
+        out = sums.reset_index(drop=True)
+        out.insert(0, "week_start", _week_start(week))
+        out.insert(1, "acquisition_channel", pd.Categorical.from_codes(code, stream._channels))
+        return out
+
+    net = frame(net).astype({"orders_net": np.int64})
+    return metrics.opac_by_channel(frame(wau.to_frame()), net)
+
+
+def segment_cube(stream: Stream) -> pd.DataFrame:
+    """`cube.segment_cube` from the streamed (user, week) pairs and segment order sums."""
+    stream.users
+    keys = stream.sessions["week"]
+    weeks, period = np.unique(keys & MASK, return_inverse=True)
+    seg = stream._segments
+    week, cell, values = cube.activity_facts(seg, keys >> PERIOD_BITS, period, weeks)
+    sums = stream.orders["segment"]
+    order_week = sums.index.get_level_values("week").to_numpy(dtype=np.int64)
+    order_cell = sums.index.get_level_values("segment").to_numpy(dtype=np.int64)
+    order_values = {c: sums[c].to_numpy(dtype=float) for c in sums.columns}
+    return cube.cube_frame(
+        seg,
+        np.concatenate([week, order_week]),
+        np.concatenate([cell, order_cell]),
+        cube.stack_facts(values, order_values, len(week), len(order_week)),
+    )
+
+
+def cohort_sizes(stream: Stream) -> pd.Series:
+    return retention.cohort_sizes(stream.users)
+
+
+def retention_counts(stream: Stream, offsets=retention.DAYS) -> pd.DataFrame:
+    """`retention.retention_counts` for daily offsets within D0..MAX_OFFSET."""
+    offsets = list(offsets)
+    if offsets and (min(offsets) < 0 or max(offsets) > MAX_OFFSET):
+        raise ValueError(f"streaming retention keeps offsets 0..{MAX_OFFSET}, got {offsets}")
+    keys = stream.sessions["offset"]
+    cohorts = cohort_sizes(stream).index
+    user, offset = keys >> PERIOD_BITS, keys & MASK
+    column = np.full(MAX_OFFSET + 1, -1)
+    column[offsets] = np.arange(len(offsets))
+    sel = column[offset] >= 0
+    cohort_day = cohorts.to_numpy().astype("datetime64[D]").astype(np.int64)
+    row = np.searchsorted(cohort_day, stream._signup_day[user[sel]])
+    cells = np.bincount(
+        row * len(offsets) + column[offset[sel]], minlength=len(cohorts) * len(offsets)
+    )
+    return pd.DataFrame(
+        cells.reshape(len(cohorts), len(offsets)),
+        index=cohorts,
+        columns=pd.Index(offsets, name="day_offset"),
+    )
+
+
+def active_days(stream: Stream) -> rolling.ActiveDays:
+    """`rolling.active_days` from the streamed (user, day) pairs."""
+    keys = stream.sessions["day"]
+    user, day = keys >> PERIOD_BITS, keys & MASK
+    if not len(day):
+        return rolling.active_days(pd.DataFrame({"user_id": [], "event_ts": []}))
+    return rolling.ActiveDays(user, day, int(day.min()), int(day.max()))
+
+
+def daily_actives(stream: Stream) -> pd.DataFrame:
+    return rolling.daily_actives(active_days(stream))
+
+
+def active_days_histogram(stream: Stream) -> pd.DataFrame:
+    return rolling.active_days_histogram(active_days(stream))
+
+
+def activity(stream: Stream, by: str = "week") -> Activity:
+    """`churn.activity` from the streamed (user, week / month) pairs."""
+    if by not in ("week", "month"):
+        raise ValueError(f"unknown period {by!r}")
+    keys = stream.sessions[by]
+    observed, period = np.unique(keys & MASK, return_inverse=True)
+    return Activity(keys >> PERIOD_BITS, period, period_labels(observed, by))
@@ -0,0 +1,223 @@
+"""
+Vectorised synthetic data generator for scale tests.
+
+Users are generated in chunks of `Params.chunk_users`. Each chunk draws everything as
+NumPy arrays: signups, a (user, week) matrix of Poisson session counts, one timestamp
+per session (weekday weighted by the weekend bump, hour, minute), purchase and refund
+flags. The knobs are the ones seed_synthetic_data_big.py always had: LAMBDA_SESS, promo
+weeks, refund spike week, weekend bump.
+
+Chunks run on a process pool. Every worker writes its chunk's tables as part files
+(CSV without a header, or Parquet in the store schema). The parent appends the parts in
+chunk order to one file per table, so memory stays bounded by a chunk per process.
+
+Every chunk has its own RNG, seeded from `(seed, chunk)`. The output depends only on
+the seed and the chunk size, never on the number of workers or on scheduling. Order
+ids are `o<user number>-<n>` (the user's n-th order), so they need no global counter.
+"""
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pcsv
+import pyarrow.parquet as pq
+
+from beamcart_metrics.buckets import DAY
+from beamcart_metrics.store import SCHEMAS
+
+FORMATS = ("csv", "parquet")
+
+COUNTRIES, COUNTRY_P = ["US", "IN", "CA", "UK"], [0.5, 0.2, 0.2, 0.1]
+CHANNELS, CHANNEL_P = ["paid", "organic", "email", "referral"], [0.35, 0.35, 0.15, 0.15]
+ITEMS, ITEMS_P = [1, 2, 3], [0.7, 0.25, 0.05]
+
+
+@dataclass(frozen=True)
+class Params:
+    users: int = 10_000
+    weeks: int = 10
+    seed: int = 42
+    base_monday: str = "2025-10-27"  # first ISO week (a Monday)
+    promo_weeks: tuple[int, ...] = (2, 6)  # 0-based week indices
+    refund_spike_week: int = 3
+    lambda_sess: float = 1.2  # avg sessions per user-week (Poisson)
+    purchase_p: float = 0.25  # per-session purchase probability
+    weekend_bump: float = 1.4  # relative weight of Sat/Sun for session timing
+    promo_sess_mult: float = 1.5
+    promo_purchase_mult: float = 1.2
+    refund_base: float = 0.06
+    refund_spike: float = 0.20
+    chunk_users: int = 100_000  # users per chunk (changing it changes the draws)
+
+    @property
+    def n_chunks(self) -> int:
+        return -(-self.users // self.chunk_users)
+
+
+def _dictionary(codes: np.ndarray, values) -> pa.DictionaryArray:
+    return pa.DictionaryArray.from_arrays(pa.array(codes, pa.int32()), pa.array(values))
+
+
+def _label(prefix: str, *parts: np.ndarray) -> pa.Array:
+    """`prefix` + the numbers in `parts` joined with "-" (e.g. u17, o17-2)."""
+    strings = [pc.cast(pa.array(x), pa.string()) for x in parts]
+    joined = pc.binary_join_element_wise(*strings, "-") if len(strings) > 1 else strings[0]
+    return pc.binary_join_element_wise(prefix, joined, "")
+
+
+def generate_chunk(p: Params, chunk: int) -> dict[str, pa.Table]:
+    """Users `chunk * chunk_users` onwards with their events and orders, in the store
+    schema; events and orders are sorted by user, then time."""
+    rng = np.random.default_rng(np.random.SeedSequence(p.seed, spawn_key=(chunk,)))
+    lo = chunk * p.chunk_users
+    n = min(p.users, lo + p.chunk_users) - lo
+    base = np.datetime64(p.base_monday, "s").astype(np.int64)
+    weeks = np.arange(p.weeks)
+    promo = np.isin(weeks, p.promo_weeks)
+
+    def clock(m: int) -> np.ndarray:  # random hour and minute, in seconds
+        return rng.integers(0, 24, m) * 3600 + rng.integers(0, 60, m) * 60
+
+    # users: signup uniform over the weeks
+    signup_day = rng.integers(0, 7 * p.weeks, n)
+    signup_ts = base + signup_day * DAY + clock(n)
+    user_ids = _label("u", np.arange(lo + 1, lo + n + 1))
+    users = pa.table(
+        [
+            user_ids.dictionary_encode(),
+            pa.array(signup_ts.astype("datetime64[s]")),
+            _dictionary(rng.choice(len(COUNTRIES), n, p=COUNTRY_P), COUNTRIES),
+            _dictionary(rng.choice(len(CHANNELS), n, p=CHANNEL_P), CHANNELS),
+        ],
+        schema=SCHEMAS["users"],
+    )
+
+    # sessions: Poisson count per (user, week) from the signup week on
+    lam = p.lambda_sess * np.where(promo, p.promo_sess_mult, 1.0)
+    counts = rng.poisson(lam, size=(n, p.weeks))
+    counts[weeks[None, :] < (signup_day // 7)[:, None]] = 0
+    cell = np.repeat(np.arange(n * p.weeks), counts.ravel())
+    m = len(cell)
+    dow_w = np.array([1, 1, 1, 1, 1, p.weekend_bump, p.weekend_bump])
+    offset = rng.choice(7, m, p=dow_w / dow_w.sum()) * DAY + clock(m)  # into the week
+    # cells are already in (user, week) order: sorting the combined key only reorders
+    # sessions inside a cell, which the stable (run-aware) sort does in about one pass
+    key = np.sort(cell * (7 * DAY) + offset, kind="stable")
+    cell, offset = np.divmod(key, 7 * DAY)
+    user, week = np.divmod(cell, p.weeks)
+    ts = base + week * (7 * DAY) + offset
+    events = pa.table(
+        [
+            _dictionary(user, user_ids),
+            pa.array(ts.astype("datetime64[s]")),
+            _dictionary(np.zeros(m, np.int32), ["session_start"]),
+        ],
+        schema=SCHEMAS["events"],
+    )
+
+    # orders: a purchase on some sessions, refunds more likely in the spike week
+    p_buy = p.purchase_p * np.where(promo, p.promo_purchase_mult, 1.0)
+    buy = rng.random(m) < p_buy[week]
+    o_user, o_week, o_ts = user[buy], week[buy], ts[buy]
+    k = len(o_user)
+    refund_p = np.where(o_week == p.refund_spike_week, p.refund_spike, p.refund_base)
+    nth = np.arange(k) - np.searchsorted(o_user, o_user) + 1  # o_user is sorted
+    orders = pa.table(
+        [
+            _label("o", lo + o_user + 1, nth),
+            _dictionary(o_user, user_ids),
+            pa.array(o_ts.astype("datetime64[s]")),
+            pa.array(np.round(rng.lognormal(np.log(35), 0.35, k), 2)),
+            pa.array(rng.choice(ITEMS, k, p=ITEMS_P), pa.int16()),
+            pa.array(rng.random(k) < refund_p).cast(pa.int8()),
+        ],
+        schema=SCHEMAS["orders"],
+    )
+    return {"users": users, "events": events, "orders": orders}
+
+
+def _part(tmp: Path, name: str, chunk: int, fmt: str) -> Path:
+    return tmp / f"{name}-{chunk:06d}.{fmt}"
+
+
+def _write_chunk(p: Params, chunk: int, fmt: str, tmp: Path) -> dict[str, int]:
+    """Generate one chunk into part files; returns its row counts."""
+    rows = {}
+    for name, table in generate_chunk(p, chunk).items():
+        path = _part(tmp, name, chunk, fmt)
+        if fmt == "csv":
+            opts = pcsv.WriteOptions(include_header=False, quoting_style="none")
+            pcsv.write_csv(table, path, opts)
+        else:
+            pq.write_table(table, path)
+        rows[name] = table.num_rows
+    return rows
+
+
+def generate(
+    p: Params,
+    out_dir: Path,
+    fmt: str = "csv",
+    workers: int | None = None,
+    suffix: str = "",
+) -> dict[str, int]:
+    """Write <out_dir>/{users,events,orders}<suffix>.<fmt>; returns total rows per table.
+    Files are replaced only once every chunk was written."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r} (expected one of {FORMATS})")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    workers = max(1, min(workers or os.cpu_count() or 1, p.n_chunks))
+    final = {name: out_dir / f"{name}{suffix}.{fmt}" for name in SCHEMAS}
+    tmp = Path(tempfile.mkdtemp(prefix=".synthetic-", dir=out_dir))
+    try:
+        sinks = {}
+        for name, path in final.items():
+            if fmt == "csv":
+                sinks[name] = open(tmp / path.name, "wb")
+                sinks[name].write((",".join(SCHEMAS[name].names) + "\n").encode())
+            else:
+                sinks[name] = pq.ParquetWriter(tmp / path.name, SCHEMAS[name])
+
+        chunks = range(p.n_chunks)
+        args = (repeat(p), chunks, repeat(fmt), repeat(tmp))
+        totals = dict.fromkeys(SCHEMAS, 0)
+        with ProcessPoolExecutor(workers) if workers > 1 else _InProcess() as pool:
+            for chunk, rows in zip(chunks, pool.map(_write_chunk, *args)):
+                for name, sink in sinks.items():  # append in chunk order, then drop
+                    part = _part(tmp, name, chunk, fmt)
+                    if fmt == "csv":
+                        with open(part, "rb") as f:
+                            shutil.copyfileobj(f, sink)
+                    else:
+                        sink.write_table(pq.read_table(part, schema=SCHEMAS[name]))
+                    part.unlink()
+                    totals[name] += rows[name]
+
+        for name, sink in sinks.items():
+            sink.close()
+            os.replace(tmp / final[name].name, final[name])
+        return totals
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+class _InProcess:
+    """`map` in this process, for workers=1 (same output as the pool)."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, fn, *iterables):
+        return map(fn, *iterables)
@@ -0,0 +1,360 @@
+"""
+User x day activity index: one bitmap of active users per calendar day.
+
+WAU, MAU, rolling N-day actives, churn and Dn retention all derive from the same fact,
+"user U had a session on day D". `UserDays` materialises it once as a bit matrix, one
+row per day with sessions and one bit per user code (`userdict`: codes are dense and
+stable across ingests, so a row stays valid as users are added). The index is persisted
+to _activity/user_days.parquet in the dataset's interim dir (one zstd-compressed row
+bitmap per day, with the `store.source_stats` of the raw data it indexes)
+by `build_user_days.py`, and `run_pipeline.py --index` answers those metrics from it:
+
+- active users of a week / month: OR of its day rows (`np.bitwise_or.reduceat`), then
+  popcount (`np.bitwise_count`)
+- DAU / L7 / L28: a sliding OR over the days, three passes for any window
+  (`window_or`, van Herk / Gil-Werman block prefix and suffix ORs); the L28 histogram
+  counts per user, from the index's (user, day) pairs (`rolling`)
+- churn: retained = W[t] & W[t-1], churned = W[t-1] & ~W[t], new = W[t] & ~(W[0] | ...
+  | W[t-1]) per calendar period, the same table as `churn.lifecycle`
+- Dn retention: each cohort user's bit on signup day + n
+
+`build()` is incremental: it records the digest of every events partition
+(`week=YYYY-MM-DD`) it folded in and, on the next run, re-folds only the ISO weeks whose
+partition changed, so appending a day of events re-reads one week (from the
+memory-mapped week file, `store.read_weeks`). The index is rebuilt
+from scratch when this module or the prefix of the user dictionary it was built with
+changes. It needs a fresh store (`user_code` columns).
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from beamcart_metrics import rolling
+from beamcart_metrics.buckets import DAY, epoch_days
+from beamcart_metrics.cache import file_digest, path_digest
+from beamcart_metrics.churn import lifecycle_frame, period_labels
+from beamcart_metrics.loaders import SESSION_FILTER
+from beamcart_metrics.paths import INTERIM, RAW, STORE
+from beamcart_metrics.retention import DAYS, cohort_sizes
+from beamcart_metrics.store import (
+    is_fresh,
+    read_weeks,
+    same_sources,
+    source_stats,
+    week_partitions,
+)
+from beamcart_metrics.userdict import USER_CODE, UserDict
+
+USER_DAYS = Path("_activity", "user_days.parquet")  # in the dataset's interim dir
+META = b"user_days"  # Parquet schema metadata key of the build state
+
+
+class UserDays:
+    """Row i: the users active on calendar day `days[i]` (days since 1970, ascending),
+    user code u at bit u & 7 of byte u >> 3.
+
+    `days` and `bits` are views of the first rows / columns of larger buffers that grow
+    geometrically (everything outside the views is zero), so folding in weeks one by one
+    reallocates O(log weeks) times rather than once per week."""
+
+    def __init__(self, days: np.ndarray | None = None, bits: np.ndarray | None = None):
+        self._days = np.zeros(0, np.int64) if days is None else days
+        self._bits = np.zeros((0, 0), np.uint8) if bits is None else bits
+        self._rows, self._width = self._bits.shape
+
+    @property
+    def days(self) -> np.ndarray:
+        return self._days[: self._rows]
+
+    @property
+    def bits(self) -> np.ndarray:
+        return self._bits[: self._rows, : self._width]
+
+    @property
+    def n_users(self) -> int:
+        """Number of user codes a row can hold (a multiple of 8)."""
+        return self._width * 8
+
+    def _reserve(self, rows: int, width: int) -> None:
+        """Make room for `rows` rows of `width` bytes, at least doubling a dimension that
+        has to grow."""
+        cap_rows, cap_width = self._bits.shape
+        if rows <= cap_rows and width <= cap_width:
+            return
+        if rows > cap_rows:
+            cap_rows = max(rows, 2 * cap_rows)
+        if width > cap_width:
+            cap_width = max(width, 2 * cap_width)
+        days = np.zeros(cap_rows, np.int64)
+        bits = np.zeros((cap_rows, cap_width), np.uint8)
+        days[: self._rows] = self.days
+        bits[: self._rows, : self._width] = self.bits
+        self._days, self._bits = days, bits
+
+    def append(self, day: np.ndarray, user: np.ndarray) -> None:
+        """OR sessions (calendar day, user code; -1: no user) into their days' rows,
+        adding rows for new days and widening the rows for new user codes."""
+        if not len(day):
+            return
+        lo = day.min()
+        touched = np.flatnonzero(np.bincount(day - lo)) + lo
+        width = max(self._width, (int(user.max(initial=-1)) >> 3) + 1)
+        new = np.setdiff1d(touched, self.days, assume_unique=True)
+        self._reserve(self._rows + len(new), width)
+        if len(new):
+            n = self._rows
+            days = np.union1d(self.days, new)
+            # rows before the first new day stay put: appending days in order moves none
+            first = int(np.searchsorted(self.days, new[0]))
+            moved = self._bits[first:n].copy()
+            self._bits[np.searchsorted(days, self.days[first:])] = moved
+            self._bits[np.searchsorted(days, new)] = 0
+            self._days[: len(days)] = days
+            self._rows = len(days)
+        self._width = width
+        ok = user >= 0
+        local = np.zeros((len(touched), width * 8), dtype=bool)
+        local[np.searchsorted(touched, day[ok]), user[ok]] = True
+        rows = np.searchsorted(self.days, touched)
+        self._bits[rows, :width] |= np.packbits(local, axis=1, bitorder="little")
+
+    def drop(self, lo: int, hi: int) -> None:
+        """Remove the rows of days lo <= day < hi."""
+        n = self._rows
+        i, j = np.searchsorted(self.days, [lo, hi])
+        self._days[i : n - (j - i)] = self._days[j:n]
+        self._bits[i : n - (j - i)] = self._bits[j:n]
+        self._days[n - (j - i) : n] = 0
+        self._bits[n - (j - i) : n] = 0
+        self._rows = n - (j - i)
+
+    def save(self, path: Path = INTERIM / USER_DAYS, state: dict | None = None) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        rows = [r.tobytes() for r in self.bits]
+        table = pa.table(
+            {
+                "day": pa.array(self.days.astype("datetime64[D]")),
+                "users": pa.array(rows, pa.binary()),
+            }
+        ).replace_schema_metadata({META: json.dumps(state or {})})
+        tmp = path.with_suffix(".tmp")
+        pq.write_table(table, tmp, compression="zstd")
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path = INTERIM / USER_DAYS) -> tuple["UserDays", dict]:
+        """The index at `path` and the build state saved with it."""
+        table = pq.read_table(path)
+        state = json.loads((table.schema.metadata or {}).get(META, b"{}"))
+        days = table.column("day").to_numpy().astype(np.int64)
+        rows = table.column("users").to_pylist()
+        width = max((len(r) for r in rows), default=0)
+        bits = np.zeros((len(rows), width), np.uint8)
+        for i, r in enumerate(rows):  # rows written before new users were added are shorter
+            bits[i, : len(r)] = np.frombuffer(r, np.uint8)
+        return cls(days, bits), state
+
+
+def build(raw_dir: Path = RAW, store_dir: Path = STORE, path: Path = INTERIM / USER_DAYS) -> tuple:
+    """
+    Bring the index at `path` up to date with the store's session events, re-folding
+    only the weeks whose partition changed; returns the index and the re-folded weeks
+    (`YYYY-MM-DD` week starts, all of them on a full rebuild).
+    """
+    if not is_fresh(raw_dir, store_dir):
+        raise ValueError(f"{store_dir} is missing or stale: run ingest_raw.py first")
+    users = UserDict.load(store_dir)
+    version = file_digest(Path(__file__))
+    parts = {w: path_digest(p) for w, p in week_partitions("events", store_dir).items()}
+    ud, state = UserDays(), {}
+    if Path(path).exists():
+        ud, state = UserDays.load(path)
+        n = state.get("user_dict", 0)
+        if state.get("version") != version or n > len(users) or state["digest"] != users.digest(n):
+            ud, state = UserDays(), {}
+    old = state.get("partitions", {})
+    changed = sorted(w for w in parts if old.get(w) != parts[w])
+    for w in set(old) - set(parts) | set(changed):  # removed or re-folded weeks
+        monday = int(np.datetime64(w, "D").astype(np.int64))
+        ud.drop(monday, monday + 7)
+    for w in changed:  # one week of sessions in memory at a time
+        cols = [USER_CODE, "event_ts"]
+        sessions = read_weeks("events", [w], None, cols, SESSION_FILTER, raw_dir, store_dir)
+        sessions = sessions.filter(sessions.column("event_ts").is_valid())
+        ts = pd.Series(sessions.column("event_ts").to_numpy())
+        ud.append(epoch_days(ts), sessions.column(USER_CODE).to_numpy())
+    state = {
+        "version": version,
+        "user_dict": len(users),
+        "digest": users.digest(),
+        "partitions": parts,
+        "source": source_stats(raw_dir, store_dir),
+    }
+    ud.save(path, state)
+    return ud, changed
+
+
+def load_or_build(path: Path = INTERIM / USER_DAYS, raw_dir: Path = RAW, store_dir: Path = STORE):
+    """The persisted index (written by build_user_days.py), built and saved if missing,
+    brought up to date (`build`) if it was built from other raw data than raw_dir's."""
+    if Path(path).exists():
+        ud, state = UserDays.load(path)
+        if same_sources(state.get("source"), raw_dir):
+            return ud
+    return build(raw_dir, store_dir, path)[0]
+
+
+# --- bit matrix operations ---------------------------------------------------------
+
+
+def popcount(bits: np.ndarray) -> np.ndarray:
+    """Number of users in each row."""
+    return np.bitwise_count(bits).sum(axis=1, dtype=np.int64)
+
+
+def window_or(bits: np.ndarray, window: int) -> np.ndarray:
+    """Row i: OR of rows max(0, i - window + 1)..i. ORs within blocks of `window` rows
+    forwards (prefix) and backwards (suffix); a window spans at most two blocks, so it is
+    suffix[i - window + 1] | prefix[i], three passes whatever `window` is."""
+    prefix, suffix = bits.copy(), bits.copy()
+    n = len(bits)
+    for i in range(1, n):
+        if i % window:
+            prefix[i] |= prefix[i - 1]
+    for i in range(n - 2, -1, -1):
+        if (i + 1) % window:
+            suffix[i] |= suffix[i + 1]
+    out = prefix
+    if window < n:
+        out[window:] |= suffix[1 : n - window + 1]
+    return out
+
+
+def _dense(ud: UserDays) -> tuple[np.ndarray, np.ndarray]:
+    """Every calendar day from the first to the last indexed one, and their rows
+    (days without sessions are empty)."""
+    if not len(ud.days):
+        return ud.days, ud.bits
+    days = np.arange(ud.days[0], ud.days[-1] + 1)
+    bits = np.zeros((len(days), ud.bits.shape[1]), np.uint8)
+    bits[ud.days - ud.days[0]] = ud.bits
+    return days, bits
+
+
+def by_period(ud: UserDays, by: str = "week") -> tuple[np.ndarray, np.ndarray]:
+    """Observed periods (ISO week numbers, or months since 1970 with by="month") and the
+    OR of their day rows."""
+    if by == "week":
+        period = (ud.days + 3) // 7
+    elif by == "month":
+        period = ud.days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    else:
+        raise ValueError(f"unknown period {by!r}")
+    if not len(period):
+        return period, ud.bits
+    starts = np.flatnonzero(np.r_[True, period[1:] != period[:-1]])
+    return period[starts], np.bitwise_or.reduceat(ud.bits, starts, axis=0)
+
+
+# --- metrics (same frames as metrics.py / churn.py / retention.py) ----------------
+
+
+def wau_by_week(ud: UserDays) -> pd.DataFrame:
+    """week_start, wau."""
+    week, bits = by_period(ud, "week")
+    return pd.DataFrame({"week_start": period_labels(week, "week"), "wau": popcount(bits)})
+
+
+def mau_by_month(ud: UserDays) -> pd.DataFrame:
+    """month (`YYYY-MM`, categorical), mau."""
+    month, bits = by_period(ud, "month")
+    labels = pd.Categorical(period_labels(month, "month"))
+    return pd.DataFrame({"month": labels, "mau": popcount(bits)})
+
+
+def daily_actives(ud: UserDays, windows: tuple[int, ...] = rolling.WINDOWS) -> pd.DataFrame:
+    """`rolling.daily_actives` from the index: a sliding OR per window."""
+    days, bits = _dense(ud)
+    day = pd.Series((days * DAY).astype("datetime64[s]"), name="day")
+    out = pd.DataFrame({"day": day, "dau": popcount(bits)})
+    for w in windows:
+        out[f"l{w}"] = popcount(window_or(bits, w))
+    return rolling.with_stickiness(out)
+
+
+def active_days(ud: UserDays) -> rolling.ActiveDays:
+    """The index's (user, day) pairs, sorted by user then day, for `rolling`."""
+    if not len(ud.days):
+        return rolling.ActiveDays(ud.days, ud.days, 0, -1)
+    first, last = int(ud.days[0]), int(ud.days[-1])
+    n = last - first + 1
+    keys = [
+        np.flatnonzero(np.unpackbits(row, bitorder="little")) * n + (d - first)
+        for d, row in zip(ud.days, ud.bits, strict=True)
+    ]
+    key = np.sort(np.concatenate(keys))
+    return rolling.ActiveDays(key // n, key % n + first, first, last)
+
+
+def lifecycle(ud: UserDays, by: str = "week", gaps: tuple[int, ...] = (2,)) -> pd.DataFrame:
+    """`churn.lifecycle(churn.activity(sessions, by), gaps)` from the index."""
+    period, observed = by_period(ud, by)
+    offsets = period - period[0] if len(period) else period
+    n = int(offsets[-1]) + 1 if len(offsets) else 0  # calendar periods spanned
+    w = np.zeros((n, observed.shape[1]), np.uint8)  # periods without sessions are empty
+    w[offsets] = observed
+    ever = np.bitwise_or.accumulate(w, axis=0) if n else w  # active in any period <= t
+    before = np.zeros_like(w)
+    before[1:] = ever[:-1]
+    active = popcount(w)
+    new = popcount(w & ~before)
+    retained, churned = np.zeros(n, np.int64), np.zeros(n, np.int64)
+    retained[1:] = popcount(w[1:] & w[:-1])
+    churned[1:] = popcount(w[:-1] & ~w[1:])
+    inactive = {}
+    for k in gaps:
+        # active at or before t - k, and in none of t - k + 1..t
+        inactive[k] = np.zeros(n, np.int64)
+        if n > k:
+            inactive[k][k:] = popcount(ever[: n - k] & ~window_or(w, k)[k:])
+    labels = period_labels(period, by)
+    return lifecycle_frame(labels, offsets, active, retained, new, churned, inactive)
+
+
+def retention_counts(ud: UserDays, users: pd.DataFrame, offsets=DAYS) -> pd.DataFrame:
+    """`retention.retention_counts(users, sessions, offsets)` from the index: `users`
+    must carry the store's user_code."""
+    if USER_CODE not in users:
+        raise ValueError("users has no user_code column: read it from a fresh store")
+    offsets = list(offsets)
+    cohorts = cohort_sizes(users).index
+    code = users[USER_CODE].to_numpy().astype(np.int64)
+    signup = epoch_days(users["signup_ts"])
+    cohort = cohorts.get_indexer(signup.astype("datetime64[D]").astype(cohorts.dtype))
+    known = (code >= 0) & (code < ud.n_users) & (cohort >= 0)
+    code, signup, cohort = code[known], signup[known], cohort[known]
+
+    days, bits = _dense(ud)
+    byte, mask = code >> 3, (1 << (code & 7)).astype(np.uint8)
+    counts = np.zeros((len(cohorts), len(offsets)), np.int64)
+    for j, n in enumerate(offsets):
+        row = signup + n - (days[0] if len(days) else 0)
+        ok = (row >= 0) & (row < len(days))
+        hit = (bits[row[ok], byte[ok]] & mask[ok]) != 0
+        counts[:, j] = np.bincount(cohort[ok][hit], minlength=len(cohorts))
+    return pd.DataFrame(
+        counts,
+        index=cohorts,
+        columns=pd.Index(offsets, name="day_offset"),
+    )
+
+
+def active_days_histogram(ud: UserDays) -> pd.DataFrame:
+    """`rolling.active_days_histogram` from the index."""
+    return rolling.active_days_histogram(active_days(ud))
@@ -0,0 +1,129 @@
+"""
+Dense user codes shared by every table.
+
+`UserDict` is the persistent user_id -> int32 code dictionary of the store
+(data/store/user_dict.parquet). Codes are positions in the dictionary. `ingest()`
+appends ids it has not seen before (users first, then events and orders, in order of
+first appearance) and never renumbers old ones, so a code means the same user across
+tables and across runs. Every store table carries a `user_code` column (-1 where
+user_id is missing).
+
+With codes, user attributes are array lookups (`lookup`: `channel[user_code]`) instead
+of merges on user_id strings, and distinct users per group are a bitmap or a sorted
+dedup plus `bincount` (`distinct_count`) instead of a hash-based `nunique`. Frames
+without `user_code` (the CSV fallback, hand-built frames) still work: `user_codes`
+then numbers the union of their user_id values, consistently across the frames given.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+USER_CODE = "user_code"
+USER_DICT = "user_dict.parquet"  # in the store directory
+BITMAP_CELLS = 1 << 28  # distinct_count uses a groups x users bitmap up to 256 MiB
+
+
+class UserDict:
+    """Append-only user_id -> dense int32 code dictionary."""
+
+    def __init__(self, ids: pa.Array | None = None):
+        self.ids = ids if ids is not None else pa.array([], pa.string())
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, store_dir: Path) -> "UserDict":
+        """The store's dictionary (empty if it has none yet)."""
+        path = Path(store_dir) / USER_DICT
+        if not path.exists():
+            return cls()
+        return cls(pq.read_table(path).column("user_id").combine_chunks())
+
+    def save(self, store_dir: Path) -> None:
+        path = Path(store_dir) / USER_DICT
+        tmp = path.with_suffix(".tmp")
+        pq.write_table(pa.table({"user_id": self.ids}), tmp)
+        os.replace(tmp, path)
+
+    def digest(self, n: int | None = None) -> str:
+        """Digest of the first `n` ids (all by default): artifacts keyed by user code stay
+        valid while the dictionary still starts with the ids they were built with."""
+        ids = self.ids if n is None else self.ids.slice(0, n)
+        return hashlib.sha256("\n".join(ids.to_pylist()).encode()).hexdigest()
+
+    def _codes(self, values: pa.Array) -> pa.Array:
+        """Code of each (string) value, appending unseen ones; null stays null."""
+        codes = pc.index_in(values, value_set=self.ids)
+        new = values.filter(pc.and_(pc.is_null(codes), pc.is_valid(values)))
+        if len(new):
+            self.ids = pa.concat_arrays([self.ids, pc.unique(new)])
+            codes = pc.index_in(values, value_set=self.ids)
+        return codes
+
+    def encode(self, user_id: pa.ChunkedArray) -> pa.ChunkedArray:
+        """int32 code per row of a user_id column (-1 for null), appending new ids.
+        Dictionary-encoded columns only look up their dictionary values."""
+        chunks = []
+        for chunk in user_id.chunks:
+            if pa.types.is_dictionary(chunk.type):
+                codes = self._codes(chunk.dictionary.cast(pa.string())).take(chunk.indices)
+            else:
+                codes = self._codes(chunk.cast(pa.string()))
+            chunks.append(pc.fill_null(codes, -1).cast(pa.int32()))
+        return pa.chunked_array(chunks, pa.int32())
+
+
+def user_codes(*frames: pd.DataFrame) -> tuple[np.ndarray, ...]:
+    """Dense user codes of each frame's rows, consistent across `frames` (-1: no user):
+    their `user_code` column if they all have one, else positions in the union of their
+    user_id values."""
+    if all(USER_CODE in f for f in frames):
+        return tuple(f[USER_CODE].to_numpy() for f in frames)
+    cats = [pd.Categorical(f["user_id"]) for f in frames]
+    ids = pd.Index(cats[0].categories)
+    for c in cats[1:]:
+        ids = ids.append(c.categories[~c.categories.isin(ids)])
+    # code -1 (missing user_id) picks the appended -1
+    return tuple(np.append(ids.get_indexer(c.categories), -1)[c.codes] for c in cats)
+
+
+def lookup(keys: np.ndarray, values: np.ndarray, codes: np.ndarray, fill=-1) -> np.ndarray:
+    """Value of each user in `codes`, given `values[i]` of user `keys[i]` (e.g. the
+    users table's channel codes); `fill` for users without one and for code -1."""
+    size = int(max(keys.max(initial=-1), codes.max(initial=-1))) + 2  # slot -1 is fill
+    table = np.full(size, fill, dtype=np.result_type(values, np.asarray(fill)))
+    ok = keys >= 0
+    table[keys[ok]] = values[ok]
+    return table[codes]
+
+
+def sorted_unique(keys: np.ndarray, kind: str | None = None) -> np.ndarray:
+    """Distinct values, sorted: sorts `keys` in place and drops repeats (much cheaper
+    than np.unique's hashing for large int64 arrays)."""
+    keys.sort(kind=kind)
+    first = np.ones(len(keys), dtype=bool)
+    np.not_equal(keys[1:], keys[:-1], out=first[1:])
+    return keys[first]
+
+
+def distinct_count(group: np.ndarray, user: np.ndarray, n_groups: int) -> np.ndarray:
+    """Distinct users per group 0..n_groups-1 (rows with group or user -1 are skipped):
+    a groups x users bitmap when it is small enough, else a sorted dedup of the
+    (group, user) pairs; then one count per group."""
+    ok = (group >= 0) & (user >= 0)
+    group, user = group[ok].astype(np.int64), user[ok].astype(np.int64)
+    n_users = int(user.max()) + 1 if len(user) else 1
+    key = group * n_users + user
+    if n_groups * n_users <= BITMAP_CELLS:
+        seen = np.zeros(n_groups * n_users, dtype=bool)
+        seen[key] = True
+        return seen.reshape(n_groups, n_users).sum(axis=1)
+    return np.bincount(sorted_unique(key) // n_users, minlength=n_groups)
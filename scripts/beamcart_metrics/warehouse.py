@@ -0,0 +1,368 @@
+"""
+Persistent DuckDB warehouse: the `--engine duckdb` backend.
+
+`build()` loads the raw tables once into data/beamcart.duckdb (from the Parquet store
+when fresh, else the CSVs) with plain DuckDB types:
+
+- users:  user_id, signup_ts, country, acquisition_channel, signup_date (DATE)
+- events: user_id, event_ts, event_type, week (DATE, ISO Monday)
+- orders: order_id, user_id, order_ts, revenue, items, is_refund (0/1), week
+
+events and orders are written `ORDER BY week`, so each row group covers a narrow week
+range and week predicates skip the rest via zone maps. Two intermediates every activity
+metric starts from are materialised as tables (or, with `materialise=False`, defined
+as views of the same name):
+
+- user_week: distinct (week, user_id) with a session_start
+- user_day:  distinct (day, user_id) with a session_start
+
+`connect()` rebuilds the file only when the source CSVs (by content hash) or this
+module changed, then opens it read-only, so any number of pipeline workers can query
+it at once. The tables keep the names and columns the sql/*.sql files expect.
+
+The metric functions below mirror `metrics.py` / `retention.py` / `churn.py` /
+`rolling.py` / `cube.py` by name and return the same frames, computed by DuckDB's
+vectorised, multithreaded engine. Results come back as Arrow and are wrapped, not
+copied, into pandas (`arrowio.py`). The pandas path stays the reference; parity stages
+compare the two.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from beamcart_metrics import arrowio, cube, rolling
+from beamcart_metrics.cache import file_digest
+from beamcart_metrics.churn import Activity
+from beamcart_metrics.paths import DUCKDB, RAW, STORE
+from beamcart_metrics.retention import DAYS
+from beamcart_metrics.store import MANIFEST, SCHEMAS, is_fresh, scan_sql, source_path
+
+TABLES = {
+    "users": """
+        SELECT CAST(user_id AS VARCHAR) AS user_id,
+               CAST(signup_ts AS TIMESTAMP) AS signup_ts,
+               CAST(country AS VARCHAR) AS country,
+               CAST(acquisition_channel AS VARCHAR) AS acquisition_channel,
+               CAST(signup_ts AS DATE) AS signup_date
+        FROM {src}
+        ORDER BY user_id
+    """,
+    "events": """
+        SELECT CAST(user_id AS VARCHAR) AS user_id,
+               CAST(event_ts AS TIMESTAMP) AS event_ts,
+               CAST(event_type AS VARCHAR) AS event_type,
+               CAST(DATE_TRUNC('week', CAST(event_ts AS TIMESTAMP)) AS DATE) AS week
+        FROM {src}
+        ORDER BY week, event_ts
+    """,
+    "orders": """
+        SELECT CAST(order_id AS VARCHAR) AS order_id,
+               CAST(user_id AS VARCHAR) AS user_id,
+               CAST(order_ts AS TIMESTAMP) AS order_ts,
+               CAST(revenue AS DOUBLE) AS revenue,
+               CAST(items AS SMALLINT) AS items,
+               CAST(COALESCE(CAST(is_refund AS DOUBLE), 0) AS TINYINT) AS is_refund,
+               CAST(DATE_TRUNC('week', CAST(order_ts AS TIMESTAMP)) AS DATE) AS week
+        FROM {src}
+        ORDER BY week, order_ts
+    """,
+}
+
+INTERMEDIATES = {
+    "user_week": """
+        SELECT DISTINCT week, user_id FROM events
+        WHERE event_type = 'session_start'
+        ORDER BY week, user_id
+    """,
+    "user_day": """
+        SELECT DISTINCT CAST(event_ts AS DATE) AS day, user_id FROM events
+        WHERE event_type = 'session_start'
+        ORDER BY day, user_id
+    """,
+}
+
+
+def source_signature(raw_dir: Path = RAW, store_dir: Path = STORE) -> str:
+    """Content hashes of the raw CSVs (taken from the store manifest when it is fresh)
+    plus the digest of this module, i.e. everything the database content depends on."""
+    if is_fresh(raw_dir, store_dir):
+        source = json.loads((Path(store_dir) / MANIFEST).read_text())["source"]
+        digests = {name: source[name]["sha256"] for name in SCHEMAS}
+    else:
+        digests = {name: file_digest(source_path(name, raw_dir)) for name in SCHEMAS}
+    digests["warehouse"] = file_digest(Path(__file__))
+    return json.dumps(digests, sort_keys=True)
+
+
+def build(
+    db_path: Path = DUCKDB,
+    raw_dir: Path = RAW,
+    store_dir: Path = STORE,
+    materialise: bool = True,
+) -> dict:
+    """(Re)create the database file; returns row counts per table.
+
+    The file is written under a temporary name and swapped in, so readers holding the
+    previous file open are never blocked or see a half-built database."""
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = db_path.with_name(f"{db_path.name}.tmp{os.getpid()}")
+    tmp.unlink(missing_ok=True)
+
+    signature = source_signature(raw_dir, store_dir)
+    rows = {}
+    with duckdb.connect(str(tmp)) as con:
+        for name, query in TABLES.items():
+            src = scan_sql(name, raw_dir, store_dir)
+            con.execute(f"CREATE TABLE {name} AS {query.format(src=src)}")
+            rows[name] = con.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+        kind = "TABLE" if materialise else "VIEW"
+        for name, query in INTERMEDIATES.items():
+            con.execute(f"CREATE {kind} {name} AS {query}")
+        con.execute("CREATE TABLE _meta (signature VARCHAR, materialised BOOLEAN)")
+        con.execute("INSERT INTO _meta VALUES (?, ?)", [signature, materialise])
+        con.execute("CHECKPOINT")
+    os.replace(tmp, db_path)
+    return rows
+
+
+def is_current(db_path: Path = DUCKDB, raw_dir: Path = RAW, store_dir: Path = STORE) -> bool:
+    """True if the database exists and was built from the current raw data and code."""
+    if not Path(db_path).exists():
+        return False
+    try:
+        with duckdb.connect(str(db_path), read_only=True) as con:
+            (built,) = con.execute("SELECT signature FROM _meta").fetchone()
+    except (duckdb.Error, TypeError):
+        return False
+    return built == source_signature(raw_dir, store_dir)
+
+
+def connect(
+    db_path: Path = DUCKDB, raw_dir: Path = RAW, store_dir: Path = STORE
+) -> duckdb.DuckDBPyConnection:
+    """Read-only connection to an up-to-date database (built first if needed)."""
+    if not is_current(db_path, raw_dir, store_dir):
+        build(db_path, raw_dir, store_dir)
+    return duckdb.connect(str(db_path), read_only=True)
+
+
+# --- metrics (same names and output frames as the pandas functions) ------------------
+
+
+def wau_by_week(con: duckdb.DuckDBPyConnection) -> pd.DataFrame:
+    """week_start, wau (distinct active users)."""
+    q = "SELECT week AS week_start, COUNT(*) AS wau FROM user_week GROUP BY week ORDER BY week"
+    return arrowio.frame(con, q)
+
+
+def net_orders_by_week(con: duckdb.DuckDBPyConnection) -> pd.DataFrame:
+    """week_start, orders_net, revenue_net; weeks with only refunds are kept (0, 0.0)."""
+    q = """
+        SELECT week AS week_start,
+               COUNT(*) FILTER (WHERE is_refund = 0) AS orders_net,
+               COALESCE(SUM(revenue) FILTER (WHERE is_refund = 0), 0.0) AS revenue_net
+        FROM orders GROUP BY week ORDER BY week
+    """
+    return arrowio.frame(con, q)
+
+
+def refunds_by_week(con: duckdb.DuckDBPyConnection) -> pd.DataFrame:
+    """week_start, all_orders, refund_orders."""
+    q = """
+        SELECT week AS week_start,
+               COUNT(order_id) AS all_orders,
+               COUNT(*) FILTER (WHERE is_refund = 1) AS refund_orders
+        FROM orders GROUP BY week ORDER BY week
+    """
+    return arrowio.frame(con, q)
+
+
+def mau_by_month(con: duckdb.DuckDBPyConnection) -> pd.DataFrame:
+    """month (`YYYY-MM`), mau."""
+    q = """
+        SELECT strftime(day, '%Y-%m') AS month, COUNT(DISTINCT user_id) AS mau
+        FROM user_day GROUP BY month ORDER BY month
+    """
+    return arrowio.frame(con, q)
+
+
+def opac_by_channel_week(con: duckdb.DuckDBPyConnection) -> pd.DataFrame:
+    """week_start, acquisition_channel, wau, orders_net, revenue_net, opac (0 if no WAU)."""
+    q = """
+        WITH wau AS (
+          SELECT w.week, u.acquisition_channel, COUNT(*) AS wau
+          FROM user_week w JOIN users u USING (user_id)
+          GROUP BY ALL
+        ),
+        ord AS (
+          SELECT o.week, u.acquisition_channel,
+                 COUNT(*) FILTER (WHERE o.is_refund = 0) AS orders_net,
+                 COALESCE(SUM(o.revenue) FILTER (WHERE o.is_refund = 0), 0.0) AS revenue_net
+          FROM orders o JOIN users u USING (user_id)
+          GROUP BY ALL
+        )
+        SELECT week AS week_start,
+               acquisition_channel,
+               COALESCE(wau, 0) AS wau,
+               COALESCE(orders_net, 0) AS orders_net,
+               COALESCE(revenue_net, 0.0) AS revenue_net,
+               CASE WHEN wau > 0 THEN COALESCE(orders_net, 0) / wau ELSE 0.0 END AS opac
+        FROM wau FULL JOIN ord USING (week, acquisition_channel)
+        ORDER BY week_start, acquisition_channel
+    """
+    return arrowio.frame(con, q)
+
+
+def segment_cube(con: duckdb.DuckDBPyConnection) -> pd.DataFrame:
+    """`cube.segment_cube`: one GROUPING SETS pass over the user_week pairs, the previous
+    calendar week's pairs and the orders, each with its user's channel and country."""
+    q = """
+        WITH active AS (SELECT user_id, week FROM user_week WHERE user_id IS NOT NULL),
+        weeks AS (
+          SELECT w.week, n.week AS next_week
+          FROM (SELECT DISTINCT week FROM active) w
+          LEFT JOIN (SELECT DISTINCT week FROM active) n ON n.week = w.week + INTERVAL 7 DAY
+        ),
+        facts AS (
+          SELECT user_id, week, 1 AS wau, 0 AS active_t_minus_1, 0 AS churned_users,
+                 0 AS all_orders, 0 AS refund_orders, 0 AS orders_net, 0.0 AS revenue_net
+          FROM active
+          UNION ALL
+          SELECT a.user_id, w.next_week, 0, 1, (n.user_id IS NULL)::INT, 0, 0, 0, 0.0
+          FROM active a
+          JOIN weeks w ON w.week = a.week AND w.next_week IS NOT NULL
+          LEFT JOIN active n ON n.user_id = a.user_id AND n.week = w.next_week
+          UNION ALL
+          SELECT user_id, week, 0, 0, 0, (order_id IS NOT NULL)::INT, (is_refund = 1)::INT,
+                 (is_refund = 0)::INT, CASE WHEN is_refund = 0 THEN COALESCE(revenue, 0.0) END
+          FROM orders WHERE week IS NOT NULL
+        )
+        SELECT f.week AS week_start, u.acquisition_channel, u.country,
+               GROUPING(u.acquisition_channel, u.country) AS grouping_id,
+               SUM(wau)::BIGINT AS wau,
+               SUM(active_t_minus_1)::BIGINT AS active_t_minus_1,
+               SUM(churned_users)::BIGINT AS churned_users,
+               SUM(all_orders)::BIGINT AS all_orders,
+               SUM(refund_orders)::BIGINT AS refund_orders,
+               SUM(orders_net)::BIGINT AS orders_net,
+               COALESCE(SUM(revenue_net), 0.0) AS revenue_net
+        FROM facts f LEFT JOIN users u USING (user_id)
+        GROUP BY GROUPING SETS (
+          (f.week, u.acquisition_channel, u.country),
+          (f.week, u.acquisition_channel),
+          (f.week, u.country),
+          (f.week)
+        )
+        ORDER BY week_start, grouping_id, acquisition_channel NULLS LAST, country NULLS LAST
+    """
+    df = arrowio.frame(con, q)
+    for d in cube.DIMENSIONS:
+        df[d] = df[d].astype("category")
+    return cube.with_ratios(df.astype({"grouping_id": np.int64}))
+
+
+def cohort_sizes(con: duckdb.DuckDBPyConnection) -> pd.Series:
+    """Distinct users per signup_date, sorted by signup_date."""
+    q = """
+        SELECT signup_date, COUNT(DISTINCT user_id) AS cohort_size
+        FROM users GROUP BY signup_date ORDER BY signup_date
+    """
+    df = arrowio.frame(con, q)
+    return df.set_index("signup_date")["cohort_size"]
+
+
+def retention_counts(
+    con: duckdb.DuckDBPyConnection, offsets=DAYS, bucket_days: int = 1
+) -> pd.DataFrame:
+    """Distinct retained users per cohort (rows) and day offset (columns), as
+    `retention.retention_counts`."""
+    offsets = list(offsets)
+    # floor division (DuckDB's // truncates): days before signup stay negative
+    q = """
+        SELECT u.signup_date,
+               CAST(FLOOR((d.day - u.signup_date) / $bucket) AS BIGINT) AS day_offset,
+               COUNT(DISTINCT d.user_id) AS users
+        FROM user_day d JOIN users u USING (user_id)
+        WHERE list_contains($offsets, CAST(FLOOR((d.day - u.signup_date) / $bucket) AS BIGINT))
+        GROUP BY ALL
+    """
+    pairs = arrowio.frame(con, q, {"bucket": bucket_days, "offsets": offsets})
+    counts = pairs.set_index(["signup_date", "day_offset"])["users"].unstack(fill_value=0)
+    cohorts = cohort_sizes(con).index
+    return counts.reindex(index=cohorts, columns=offsets, fill_value=0)
+
+
+_DAYS = """
+    SELECT CAST(d AS DATE) AS day
+    FROM range(
+      (SELECT CAST(MIN(day) AS TIMESTAMP) FROM user_day),
+      (SELECT CAST(MAX(day) AS TIMESTAMP) FROM user_day) + INTERVAL 1 DAY,
+      INTERVAL 1 DAY
+    ) AS t(d)
+"""
+
+
+def daily_actives(con: duckdb.DuckDBPyConnection) -> pd.DataFrame:
+    """day, dau, l7, l28, stickiness, as `rolling.daily_actives`."""
+    q = f"""
+        WITH days AS ({_DAYS})
+        SELECT d.day,
+               COUNT(DISTINCT u.user_id) FILTER (WHERE u.day = d.day) AS dau,
+               COUNT(DISTINCT u.user_id) FILTER (WHERE u.day > d.day - 7) AS l7,
+               COUNT(DISTINCT u.user_id) AS l28
+        FROM days d LEFT JOIN user_day u ON u.day BETWEEN d.day - 27 AND d.day
+        GROUP BY d.day ORDER BY d.day
+    """
+    df = arrowio.frame(con, q)
+    return rolling.with_stickiness(df)
+
+
+def active_days_histogram(con: duckdb.DuckDBPyConnection) -> pd.DataFrame:
+    """day, days_active, users, as `rolling.active_days_histogram`."""
+    q = f"""
+        WITH days AS ({_DAYS}),
+        per_user AS (
+          SELECT d.day, u.user_id, COUNT(*) AS days_active
+          FROM days d JOIN user_day u ON u.day BETWEEN d.day - 27 AND d.day
+          WHERE u.user_id IS NOT NULL
+          GROUP BY ALL
+        )
+        SELECT day, days_active, COUNT(*) AS users
+        FROM per_user GROUP BY ALL ORDER BY day, days_active
+    """
+    return arrowio.frame(con, q)
+
+
+def activity(con: duckdb.DuckDBPyConnection, by: str = "week") -> Activity:
+    """Distinct active (user, period) pairs as `churn.activity`, from user_week / user_day."""
+    if by == "week":
+        pairs = "SELECT user_id, week AS period FROM user_week"
+    elif by == "month":
+        pairs = "SELECT DISTINCT user_id, DATE_TRUNC('month', day) AS period FROM user_day"
+    else:
+        raise ValueError(f"unknown period {by!r}")
+    # the pair codes come over as Arrow int64 buffers, used by NumPy in place
+    arrays = arrowio.fetch(
+        con,
+        f"""
+        SELECT DENSE_RANK() OVER (ORDER BY user_id) - 1 AS user,
+               DENSE_RANK() OVER (ORDER BY period) - 1 AS period
+        FROM ({pairs})
+        ORDER BY user, period
+        """,
+    ).combine_chunks()
+    periods = arrowio.fetch(con, f"SELECT DISTINCT period FROM ({pairs}) ORDER BY period")
+    observed = np.asarray(periods["period"].to_numpy(), dtype="datetime64[s]")
+    if by == "week":
+        labels = pd.Series(observed, name="week_start")
+    else:
+        labels = pd.Series(observed.astype("datetime64[M]").astype(str), name="month")
+    user = arrays["user"].to_numpy()
+    period = arrays["period"].to_numpy()
+    return Activity(user, period, labels)
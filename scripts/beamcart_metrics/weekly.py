@@ -0,0 +1,104 @@
+"""
+Incremental, week-partitioned weekly aggregates.
+
+Every weekly metric here is a per-week function of that week's rows, so a stage can
+keep its per-week partial aggregates (distinct-user counts, net order / revenue sums)
+in `_partials/` under the dataset's interim dir and, on the next run, recompute only
+the ISO weeks whose store partition (`data/store/<table>/week=...`) changed. The other
+weeks are read back from the partials. A recomputed week sees exactly the rows, in the
+same order, that a full rebuild would group together, so the merged result is
+bit-identical to it.
+
+Partials are rebuilt from scratch when the code that produces them changes (the
+calling script or this package), when the store is stale, or when the context asks
+for a full refresh (`run_pipeline.py --full-refresh`).
+
+With the DuckDB and streaming engines there are no partials: `warehouse` and
+`streaming` have a function of the same name as each `agg`, and one query over the
+week-clustered table (or the shared streaming pass) replaces the scan.
+"""
+
+import inspect
+import json
+from collections.abc import Callable
+from pathlib import Path
+
+import pandas as pd
+
+from beamcart_metrics import streaming, warehouse
+from beamcart_metrics.cache import file_digest, package_digest, path_digest
+from beamcart_metrics.context import FrameContext
+from beamcart_metrics.loaders import LOADERS
+from beamcart_metrics.store import is_fresh, week_partitions
+
+PARTIALS = "_partials"  # in the dataset's interim dir
+
+# frame name on FrameContext / in LOADERS -> raw table whose partitions it reads
+SOURCES = {"sessions": "events", "events": "events", "orders": "orders"}
+
+
+def partition_digests(table: str, ctx: FrameContext) -> dict[str, str] | None:
+    """`YYYY-MM-DD` week -> content digest of its store partition (None: store stale).
+    Rows without a timestamp are in no week's aggregate, so their partition is left out."""
+    if not is_fresh(ctx.raw_dir, ctx.store_dir):
+        return None
+    return {w: path_digest(p) for w, p in week_partitions(table, ctx.store_dir).items()}
+
+
+def _version(agg: Callable) -> str:
+    """Digest of the code behind a partial: the module defining `agg` + this package."""
+    return file_digest(Path(inspect.getsourcefile(agg))) + package_digest()
+
+
+def _week_keys(df: pd.DataFrame) -> pd.Series:
+    return df["week_start"].dt.strftime("%Y-%m-%d")
+
+
+def weekly(
+    key: str,
+    source: str,
+    agg: Callable[[pd.DataFrame], pd.DataFrame],
+    ctx: FrameContext,
+    partials_dir: Path | None = None,
+) -> pd.DataFrame:
+    """
+    `agg(frame)` over every week of `source` ("sessions", "events" or "orders"),
+    recomputing only the weeks whose store partition changed since the last call
+    with the same `key`.
+
+    `agg` must return one row per week with a `week_start` column and depend on
+    nothing but that week's rows; the result is sorted by `week_start`.
+    """
+    if ctx.engine == "duckdb":
+        return getattr(warehouse, agg.__name__)(ctx.db)
+    if ctx.engine == "streaming":
+        return getattr(streaming, agg.__name__)(ctx.stream)
+
+    table = SOURCES[source]
+    partials_dir = Path(partials_dir or ctx.interim_dir / PARTIALS)
+    data_path, meta_path = partials_dir / f"{key}.parquet", partials_dir / f"{key}.json"
+
+    digests = partition_digests(table, ctx)
+    version = _version(agg)
+    meta = {}
+    if not ctx.full_refresh and digests is not None and data_path.exists() and meta_path.exists():
+        meta = json.loads(meta_path.read_text())
+    done = meta.get("weeks", {}) if meta.get("version") == version else {}
+    touched = sorted(w for w, d in (digests or {}).items() if done.get(w) != d)
+
+    if digests is None or not done or len(touched) == len(digests):
+        out = agg(getattr(ctx, source))  # full rebuild from the shared frame
+    else:
+        kept = pd.read_parquet(data_path)
+        kept = kept[_week_keys(kept).isin(set(digests) - set(touched))]
+        if touched:
+            fresh = agg(LOADERS[source](ctx.raw_dir, ctx.store_dir, weeks=touched))
+            kept = pd.concat([kept, fresh], ignore_index=True) if len(kept) else fresh
+        out = kept.sort_values("week_start", ignore_index=True)
+        print(f"  ↻ {key}: recomputed {len(touched)} of {len(digests)} weeks")
+
+    if digests is not None:
+        partials_dir.mkdir(parents=True, exist_ok=True)
+        out.to_parquet(data_path, index=False)
+        meta_path.write_text(json.dumps({"version": version, "weeks": digests}, indent=2))
+    return out
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+# HLL sketches of the active users per (ISO week | month, acquisition_channel, country),
+# for the approximate WAU / MAU / channel WAU of `run_pipeline.py --approx` (sketch.py)
+
+from beamcart_metrics import FrameContext
+from beamcart_metrics.sketch import SKETCHES, STD_ERROR, build
+
+
+def main(ctx: FrameContext | None = None) -> None:
+    ctx = ctx or FrameContext()
+    sk = build(ctx.raw_dir, ctx.store_dir, ctx.memory_mb)
+    path = ctx.interim_dir / SKETCHES
+    sk.save(path)
+
+    per_grain = sk.keys["grain"].value_counts().to_dict()
+    print(f"✅ saved {path}")
+    print(
+        f"  {len(sk.keys)} sketches ({per_grain.get('week', 0)} week, "
+        f"{per_grain.get('month', 0)} month), {sk.registers.nbytes / 2**20:.1f} MiB of "
+        f"registers, ±{STD_ERROR:.2%} standard error"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+# User x day activity index (one bitmap of active user codes per day) for the WAU / MAU /
+# churn / retention stages of `run_pipeline.py --index`; re-folds only changed weeks (userdays.py)
+
+from beamcart_metrics import FrameContext
+from beamcart_metrics.userdays import USER_DAYS, build
+
+
+def main(ctx: FrameContext | None = None) -> None:
+    ctx = ctx or FrameContext()
+    path = ctx.interim_dir / USER_DAYS
+    ud, changed = build(ctx.raw_dir, ctx.store_dir, path)
+
+    print(f"✅ saved {path}")
+    print(
+        f"  {len(ud.days)} days x {ud.n_users:,} user bits ({ud.bits.nbytes / 2**20:.1f} MiB), "
+        f"{len(changed)} week(s) re-folded"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,41 @@
 #!/usr/bin/env python3
 # Weekly churn: users active in week t-1 but NOT in week t
-
-import pandas as pd
-from pathlib import Path
-
-ROOT = Path(__file__).resolve().parents[1]
-RAW = ROOT / "data" / "raw"
-INTERIM = ROOT / "data" / "interim"
-INTERIM.mkdir(parents=True, exist_ok=True)
-
-
-def week_start_utc(ts: pd.Series) -> pd.Series:
-    return (ts - pd.to_timedelta(ts.dt.weekday, unit="D")).dt.normalize()
-
-
-# Load events and create weekly active sets
-events = pd.read_csv(RAW / "events.csv", parse_dates=["event_ts"])
-events = events[events["event_type"] == "session_start"].copy()
-events["week_start"] = week_start_utc(events["event_ts"])
-
-# one row per (week, user)
-wk_user = events[["user_id", "week_start"]].drop_duplicates()
-
-# Build dict: week_start -> set(user_id)
-weeks = sorted(wk_user["week_start"].unique())
-active_sets = {w: set(wk_user.loc[wk_user["week_start"] == w, "user_id"]) for w in weeks}
-
-rows = []
-for i in range(1, len(weeks)):
-    t = weeks[i]
-    tm1 = weeks[i - 1]
-    prev_set = active_sets.get(tm1, set())
-    cur_set = active_sets.get(t, set())
-    churned = prev_set - cur_set
-    rows.append(
-        {
-            "week_start": t,
-            "active_t_minus_1": len(prev_set),
-            "churned_users": len(churned),
-            "churn_rate": (len(churned) / len(prev_set)) if len(prev_set) > 0 else float("nan"),
-        }
-    )
-
-out = pd.DataFrame(rows).sort_values("week_start")
-path = INTERIM / "churn_weekly.csv"
-out.to_csv(path, index=False)
-
-print(f"✅ saved {path}")
-print(out.to_string(index=False, formatters={"churn_rate": "{:.4f}".format}))
+# (+ retained / resurrected / new users, 2+ week gaps, and the same by calendar month)
+
+from beamcart_metrics import FrameContext, streaming, userdays, warehouse
+from beamcart_metrics.churn import activity, lifecycle
+
+
+def main(ctx: FrameContext | None = None) -> None:
+    ctx = ctx or FrameContext()
+    ctx.interim_dir.mkdir(parents=True, exist_ok=True)
+
+    if ctx.index:  # bitmap AND / OR / popcount over the user x day index
+        out = userdays.lifecycle(ctx.user_days, "week", gaps=(2, 4))
+        monthly = userdays.lifecycle(ctx.user_days, "month", gaps=(2,))
+    else:
+        if ctx.engine == "duckdb":  # pairs from the user_week / user_day tables
+            weeks = warehouse.activity(ctx.db, "week")
+            months = warehouse.activity(ctx.db, "month")
+        elif ctx.engine == "streaming":  # pairs kept by the streaming pass over the events
+            weeks = streaming.activity(ctx.stream, "week")
+            months = streaming.activity(ctx.stream, "month")
+        else:
+            weeks, months = activity(ctx.sessions, by="week"), activity(ctx.sessions, by="month")
+        # one sorted (user_code, week) pair per active user-week
+        out = lifecycle(weeks, gaps=(2, 4))
+        monthly = lifecycle(months, gaps=(2,))
+
+    path = ctx.interim_dir / "churn_weekly.csv"
+    out.to_csv(path, index=False)
+    monthly_path = ctx.interim_dir / "churn_monthly.csv"
+    monthly.to_csv(monthly_path, index=False)
+
+    print(f"✅ saved {path}")
+    print(out.to_string(index=False, formatters={"churn_rate": "{:.4f}".format}))
+    print(f"\n✅ saved {monthly_path}")
+    print(monthly.to_string(index=False, formatters={"churn_rate": "{:.4f}".format}))
+
+
+if __name__ == "__main__":
+    main()
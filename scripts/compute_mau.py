@@ -1,29 +1,31 @@
 #!/usr/bin/env python3
 # Compute MAU from events.csv (UTC, calendar month)
 
-import pandas as pd
-from pathlib import Path
+from beamcart_metrics import FrameContext, sketch, streaming, userdays, warehouse
+from beamcart_metrics.metrics import mau_by_month
 
-ROOT = Path(__file__).resolve().parents[1]
-RAW = ROOT / "data" / "raw"
-INTERIM = ROOT / "data" / "interim"
-INTERIM.mkdir(parents=True, exist_ok=True)
 
-events = pd.read_csv(RAW / "events.csv", parse_dates=["event_ts"])
-events = events[events["event_type"] == "session_start"].copy()
+def main(ctx: FrameContext | None = None) -> None:
+    ctx = ctx or FrameContext()
+    ctx.interim_dir.mkdir(parents=True, exist_ok=True)
 
-# calendar month label like "2025-10"
-events["month"] = events["event_ts"].dt.strftime("%Y-%m")
+    if ctx.approx:
+        mau = sketch.mau_by_month(ctx.sketches)
+    elif ctx.index:
+        mau = userdays.mau_by_month(ctx.user_days)
+    elif ctx.engine == "duckdb":
+        mau = warehouse.mau_by_month(ctx.db)
+    elif ctx.engine == "streaming":
+        mau = streaming.mau_by_month(ctx.stream)
+    else:
+        mau = mau_by_month(ctx.sessions)
 
-mau = (
-    events.groupby("month", as_index=False)["user_id"]
-    .nunique()
-    .rename(columns={"user_id": "mau"})
-    .sort_values("month")
-)
+    out = ctx.interim_dir / "mau_by_month.csv"
+    mau.to_csv(out, index=False)
 
-out = INTERIM / "mau_by_month.csv"
-mau.to_csv(out, index=False)
+    print(f"✅ saved: {out}")
+    print(mau.to_string(index=False))
 
-print(f"✅ saved: {out}")
-print(mau.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Dataset profiles: list them, switch the active one, register your own.
+
+Profiles (beamcart_metrics/datasets.py): small (data/raw), big (data/raw/big), xl
+(data/raw/xl, Parquet) and any directory registered with `add`. Each keeps its own
+store and DuckDB file. `use` only records the active name, so switching is instant and
+reads nothing; row counts come from the profile's metadata sidecar, which `describe`
+(or the ingest stage) keeps up to date.
+
+Usage:
+  python scripts/dataset.py list
+  python scripts/dataset.py use small|big|xl|NAME
+  python scripts/dataset.py describe [NAME] [--refresh]
+  python scripts/dataset.py add NAME PATH       # users/events/orders .csv or .parquet
+  python scripts/dataset.py remove NAME
+"""
+import argparse
+import json
+import sys
+
+from beamcart_metrics import datasets
+
+
+def _rows(meta: dict | None) -> str:
+    if meta is None:
+        return "not described yet"
+    rows = ", ".join(f"{n} {t['rows']:,}" for n, t in meta["tables"].items())
+    weeks = meta["weeks"]
+    span = f"{weeks['count']} weeks from {weeks['first']}" if weeks["count"] else "no weeks"
+    return f"{rows}; {span}"
+
+
+def cmd_list(args) -> None:
+    active = datasets.active_name()
+    for name, p in datasets.profiles().items():
+        mark = "*" if name == active else " "
+        missing = p.missing()
+        state = f"missing {', '.join(missing)}" if missing else _rows(datasets.cached(p))
+        print(f"{mark} {name:<8} {p.format:<8} {p.raw_dir}  ({state})")
+
+
+def cmd_use(args) -> None:
+    p = datasets.use(args.name)
+    print(f"✅ active dataset: {p.name} ({p.raw_dir}, {p.format})")
+    print(f"  {_rows(datasets.cached(p))}")
+
+
+def cmd_describe(args) -> None:
+    p = datasets.get(args.name)
+    if p.missing():
+        sys.exit(f"❌ {p.name}: no {', '.join(p.missing())} in {p.raw_dir}")
+    print(json.dumps(datasets.describe(p, refresh=args.refresh), indent=2))
+
+
+def cmd_add(args) -> None:
+    p = datasets.add(args.name, args.path)
+    print(f"✅ registered {p.name}: {p.raw_dir} ({p.format}); work dir {p.work_dir}")
+
+
+def cmd_remove(args) -> None:
+    datasets.remove(args.name)
+    print(f"✅ removed {args.name} (its files are left in place)")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Manage the dataset profiles.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="profiles, the active one starred").set_defaults(fn=cmd_list)
+    u = sub.add_parser("use", help="make a profile the active one")
+    u.add_argument("name")
+    u.set_defaults(fn=cmd_use)
+    d = sub.add_parser("describe", help="print (and refresh if stale) the metadata sidecar")
+    d.add_argument("name", nargs="?", help="profile (default: the active one)")
+    d.add_argument("--refresh", action="store_true", help="recompute even if up to date")
+    d.set_defaults(fn=cmd_describe)
+    a = sub.add_parser("add", help="register a directory of raw tables")
+    a.add_argument("name")
+    a.add_argument("path")
+    a.set_defaults(fn=cmd_add)
+    r = sub.add_parser("remove", help="unregister a custom profile")
+    r.add_argument("name")
+    r.set_defaults(fn=cmd_remove)
+    args = ap.parse_args(argv)
+    try:
+        args.fn(args)
+    except (ValueError, FileNotFoundError) as e:
+        sys.exit(f"❌ {e}")
+
+
+if __name__ == "__main__":
+    main()
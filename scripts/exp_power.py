@@ -15,7 +15,7 @@ CUPED (optional):
   effective n reduces by (1 - ρ^2).
 
 CLI:
-  --baseline BASE_OPAC      (default: take last row from data/interim/opac_by_week.csv)
+  --baseline BASE_OPAC      (default: take last row from the active dataset's opac_by_week.csv)
   --lift 0.05               target proportional lift (e.g., 0.05 = +5%)
   --alpha 0.05
   --power 0.80
@@ -26,17 +26,15 @@ CLI:
 import argparse
 import math
 import pandas as pd
-from pathlib import Path
 from scipy.stats import norm
 
-ROOT = Path(__file__).resolve().parents[1]
-INTERIM = ROOT / "data" / "interim"
+from beamcart_metrics import datasets, profiling
 
 
 def read_baseline_opac():
-    p = INTERIM / "opac_by_week.csv"
+    p = datasets.get().interim_dir / "opac_by_week.csv"  # the active dataset's
     if not p.exists():
-        raise SystemExit("Missing data/interim/opac_by_week.csv. Run the pipeline first.")
+        raise SystemExit(f"Missing {profiling.relative(p)}. Run the pipeline first.")
     df = pd.read_csv(p, parse_dates=["week_start"]).sort_values("week_start")
     last = df.iloc[-1]
     return float(last["opac"]), pd.to_datetime(last["week_start"]).date(), int(last.get("wau", 0))
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Convert the active dataset's raw tables (data/raw/{users,events,orders}.csv for the
+default `small` profile) into its typed, week-partitioned Parquet store (data/store/;
+see beamcart_metrics/store.py), and refresh the dataset's metadata sidecar from the
+ingest (see beamcart_metrics/datasets.py).
+
+Run once after the raw CSVs change; readers fall back to the CSVs while the store is
+stale. Usage:
+  python scripts/ingest_raw.py
+"""
+from beamcart_metrics import FrameContext, datasets
+from beamcart_metrics.store import ingest
+
+
+def dir_size(p):
+    return sum(f.stat().st_size for f in p.rglob("*") if f.is_file())
+
+
+def main(ctx: FrameContext | None = None) -> None:
+    ctx = ctx or FrameContext()
+    rows = ingest(ctx.raw_dir, ctx.store_dir)
+    size = dir_size(ctx.store_dir) / 1024
+    print(f"✅ ingested {ctx.raw_dir} -> {ctx.store_dir} ({size:.1f} KiB)")
+    for name, n in rows.items():
+        print(f"  {name:<7}: {n:,} rows")
+    if ctx.profile is not None:  # the sidecar comes from the fresh manifest, no re-read
+        datasets.describe(ctx.profile)
+
+    # frames loaded before the ingest came from the CSVs; reload from the store
+    ctx.reset()
+
+
+if __name__ == "__main__":
+    main()
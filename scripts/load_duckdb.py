@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Load the raw tables into the active dataset's persistent DuckDB database
+(data/beamcart.duckdb for the default `small` profile; see beamcart_metrics/warehouse.py
+and datasets.py): users / events / orders clustered by week, plus the user_week and
+user_day activity tables.
+
+Does nothing while the database matches the raw data. The DuckDB engine
+(`run_pipeline.py --engine duckdb`) and the sql_*_parity checks query this file.
+Usage:
+  python scripts/load_duckdb.py [--force] [--no-materialise]
+"""
+import argparse
+
+from beamcart_metrics import FrameContext, warehouse
+
+
+def main(ctx: FrameContext | None = None, force: bool = False, materialise: bool = True) -> None:
+    ctx = ctx or FrameContext()
+    if not force and warehouse.is_current(ctx.db_path, ctx.raw_dir, ctx.store_dir):
+        print(f"✅ {ctx.db_path} is up to date")
+        return
+    rows = warehouse.build(ctx.db_path, ctx.raw_dir, ctx.store_dir, materialise=materialise)
+    size = ctx.db_path.stat().st_size / 1024
+    print(f"✅ loaded raw tables -> {ctx.db_path} ({size:.1f} KiB)")
+    for name, n in rows.items():
+        print(f"  {name:<7}: {n:,} rows")
+    # a connection opened earlier still reads the replaced file
+    ctx.reset()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Load the raw tables into data/beamcart.duckdb.")
+    ap.add_argument("--force", action="store_true", help="rebuild even if up to date")
+    ap.add_argument(
+        "--no-materialise",
+        dest="materialise",
+        action="store_false",
+        help="define user_week / user_day as views instead of tables",
+    )
+    args = ap.parse_args()
+    main(force=args.force, materialise=args.materialise)
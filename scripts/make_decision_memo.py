@@ -2,9 +2,12 @@
 import pandas as pd
 from pathlib import Path
 
+from beamcart_metrics import cube, datasets, profiling
+
 ROOT = Path(__file__).resolve().parents[1]
-interim = ROOT / "data" / "interim"
-charts = ROOT / "docs" / "charts"
+profile = datasets.get()  # the active dataset's outputs
+interim = profile.interim_dir
+charts = profiling.relative(profile.charts_dir)
 memo = ROOT / "docs" / "decision_memo.md"
 
 wk = pd.read_csv(interim / "weekly_kpis.csv", parse_dates=["week_start"]).sort_values("week_start")
@@ -18,6 +21,26 @@ def fmt(v, f):
         return str(v)
 
 
+def segment_table(seg: pd.DataFrame, dim: str) -> str:
+    """Markdown table of one cut of the segment cube for the latest week."""
+    rows = [f"| {dim} | WAU | OPAC | Refund rate | Churn rate |", "|---|---:|---:|---:|---:|"]
+    for _, r in seg.sort_values("wau", ascending=False).iterrows():
+        name = r[dim] if pd.notna(r[dim]) else "(none)"
+        rows.append(
+            f"| {name} | {int(r['wau'])} | {fmt(r['opac'], '{:.4f}')} "
+            f"| {fmt(r['refund_rate'], '{:.4f}')} | {fmt(r['churn_rate'], '{:.4f}')} |"
+        )
+    return "\n".join(rows)
+
+
+# segment cuts of the latest week, sliced from the cube (segment_cube.py) when it exists
+segments = "Run `scripts/segment_cube.py` for the channel and country cuts."
+if (interim / cube.CUBE).exists():
+    cb = cube.read(interim / cube.CUBE)
+    cb = cb[cb["week_start"] == cb["week_start"].max()]
+    segments = "\n\n".join(segment_table(cube.level(cb, dim), dim) for dim in cube.DIMENSIONS)
+
+
 md = f"""# BeamCart — Churn & North-Star Metrics Playbook (v0)
 
 ## Problem & context
@@ -46,12 +69,15 @@ OPAC
 **Guardrails:** Refund rate ≤ 6% (weekly).  
 **Segments:** acquisition_channel, country (compute and watch deltas).
 
+## Segments (latest week)
+{segments}
+
 ## Charts
-- WAU trend: `docs/charts/wau_trend.png`
-- Cohort retention: `docs/charts/cohort_heatmap.png`
-- OPAC trend: `docs/charts/opac_trend.png`
-- Rev/WAU trend: `docs/charts/rev_per_wau_trend.png`
-- OPAC by channel (latest): `docs/charts/opac_by_channel_latest.png`
+- WAU trend: `{charts}/wau_trend.png`
+- Cohort retention: `{charts}/cohort_heatmap.png`
+- OPAC trend: `{charts}/opac_trend.png`
+- Rev/WAU trend: `{charts}/rev_per_wau_trend.png`
+- OPAC by channel (latest): `{charts}/opac_by_channel_latest.png`
 
 ## First experiment (v0)
 - Lever: “Continue your cart” sticky card + 2-item bundle on Home.  
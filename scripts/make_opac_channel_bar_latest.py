@@ -1,34 +1,49 @@
 #!/usr/bin/env python3
 # Bar chart: OPAC by acquisition_channel for the most recent ISO week
+# (the channel totals of the segment cube, see segment_cube.py)
 
-import pandas as pd
 import matplotlib.pyplot as plt
-from pathlib import Path
-
-ROOT = Path(__file__).resolve().parents[1]
-interim = ROOT / "data" / "interim"
-charts = ROOT / "docs" / "charts"
-charts.mkdir(parents=True, exist_ok=True)
-
-df = pd.read_csv(interim / "opac_by_channel_week.csv", parse_dates=["week_start"])
-latest = df["week_start"].max()
-week = df[df["week_start"] == latest].copy().sort_values("opac", ascending=False)
-
-plt.figure(figsize=(7, 4))
-plt.bar(week["acquisition_channel"], week["opac"])
-for i, (ch, opac, wau) in enumerate(zip(week["acquisition_channel"], week["opac"], week["wau"])):
-    plt.text(i, opac, f"{opac:.2f}\nWAU={int(wau)}", ha="center", va="bottom", fontsize=9)
-
-plt.title(f"OPAC by Channel — Week starting {latest.date()}")
-plt.xlabel("Acquisition Channel")
-plt.ylabel("OPAC")
-plt.tight_layout()
-
-out = charts / "opac_by_channel_latest.png"
-plt.savefig(out, dpi=160)
-print(f"✅ saved chart: {out}")
-print(
-    week[["week_start", "acquisition_channel", "wau", "orders_net", "opac"]].to_string(
-        index=False, formatters={"opac": "{:.4f}".format}
+
+from beamcart_metrics import FrameContext, cube
+
+
+def main(ctx: FrameContext | None = None) -> None:
+    ctx = ctx or FrameContext()
+    charts = ctx.charts_dir
+    charts.mkdir(parents=True, exist_ok=True)
+
+    df = cube.level(cube.read(ctx.interim_dir / cube.CUBE), "acquisition_channel").dropna(
+        subset=["acquisition_channel"]
+    )
+    # no WAU: OPAC shown as 0
+    df = df.assign(
+        acquisition_channel=df["acquisition_channel"].astype(str), opac=df["opac"].fillna(0.0)
     )
-)
+    latest = df["week_start"].max()
+    week = df[df["week_start"] == latest].copy().sort_values("opac", ascending=False)
+
+    plt.figure(figsize=(7, 4))
+    plt.bar(week["acquisition_channel"], week["opac"])
+    for i, (ch, opac, wau) in enumerate(
+        zip(week["acquisition_channel"], week["opac"], week["wau"])
+    ):
+        plt.text(i, opac, f"{opac:.2f}\nWAU={int(wau)}", ha="center", va="bottom", fontsize=9)
+
+    plt.title(f"OPAC by Channel — Week starting {latest.date()}")
+    plt.xlabel("Acquisition Channel")
+    plt.ylabel("OPAC")
+    plt.tight_layout()
+
+    out = charts / "opac_by_channel_latest.png"
+    plt.savefig(out, dpi=160)
+    plt.close()
+    print(f"✅ saved chart: {out}")
+    print(
+        week[["week_start", "acquisition_channel", "wau", "orders_net", "opac"]].to_string(
+            index=False, formatters={"opac": "{:.4f}".format}
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 import pandas as pd
 import matplotlib.pyplot as plt
-from pathlib import Path
+
+from beamcart_metrics import datasets
 
 THRESHOLD = 0.06  # 6%
-ROOT = Path(__file__).resolve().parents[1]
-interim, charts = ROOT / "data" / "interim", ROOT / "docs" / "charts"
+profile = datasets.get()  # the active dataset's outputs
+interim, charts = profile.interim_dir, profile.charts_dir
 charts.mkdir(parents=True, exist_ok=True)
 
 df = pd.read_csv(interim / "refund_rate_by_week.csv", parse_dates=["week_start"]).sort_values(
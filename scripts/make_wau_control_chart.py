@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 import pandas as pd
 import matplotlib.pyplot as plt
-from pathlib import Path
 
-ROOT = Path(__file__).resolve().parents[1]
-interim, charts = ROOT / "data" / "interim", ROOT / "docs" / "charts"
+from beamcart_metrics import datasets
+
+profile = datasets.get()  # the active dataset's outputs
+interim, charts = profile.interim_dir, profile.charts_dir
 charts.mkdir(parents=True, exist_ok=True)
 
 df = pd.read_csv(interim / "wau_by_week.csv", parse_dates=["week_start"]).sort_values("week_start")
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Memory of the loaded raw tables, column by column: bytes as `pd.read_csv` would type
+them (object strings, int64, datetime64[ns]) against the compact frames the loaders
+return, checked against the per-column budget (beamcart_metrics/loaders.py).
+
+Usage:
+  python scripts/memory_report.py [--dataset NAME] [--tables users events orders]
+"""
+import argparse
+
+from beamcart_metrics import FrameContext
+from beamcart_metrics.loaders import LOADERS, memory_report
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Bytes per column of the loaded raw tables.")
+    ap.add_argument("--dataset", help="dataset profile (default: the active one)")
+    ap.add_argument("--tables", nargs="+", choices=LOADERS, default=["users", "events", "orders"])
+    args = ap.parse_args(argv)
+    ctx = FrameContext(dataset=args.dataset)
+    print(f"dataset: {ctx.dataset.name} ({ctx.raw_dir})")
+    memory_report({t: getattr(ctx, t) for t in args.tables})
+
+
+if __name__ == "__main__":
+    main()
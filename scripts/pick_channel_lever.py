@@ -2,10 +2,10 @@
 # Pick the top channel by OPAC in the most recent ISO week
 
 import pandas as pd
-from pathlib import Path
 
-ROOT = Path(__file__).resolve().parents[1]
-INTERIM = ROOT / "data" / "interim"
+from beamcart_metrics import datasets
+
+INTERIM = datasets.get().interim_dir  # the active dataset's outputs
 
 df = pd.read_csv(INTERIM / "opac_by_channel_week.csv", parse_dates=["week_start"])
 df = df[df["wau"] > 0].copy()
@@ -1,33 +1,22 @@
 #!/usr/bin/env python3
-import pandas as pd
-from pathlib import Path
+from beamcart_metrics import FrameContext
+from beamcart_metrics.metrics import aov_by_week, net_orders_by_week
+from beamcart_metrics.weekly import weekly
 
-ROOT = Path(__file__).resolve().parents[1]
-RAW = ROOT / "data" / "raw"
-INTERIM = ROOT / "data" / "interim"
-INTERIM.mkdir(parents=True, exist_ok=True)
 
-orders = pd.read_csv(RAW / "orders.csv", parse_dates=["order_ts"])
-orders["is_refund"] = pd.to_numeric(orders["is_refund"], errors="coerce").fillna(0).astype(int)
+def main(ctx: FrameContext | None = None) -> None:
+    ctx = ctx or FrameContext()
+    ctx.interim_dir.mkdir(parents=True, exist_ok=True)
 
-# include ALL orders to keep weeks that have only refunds
-orders["week_start"] = (
-    orders["order_ts"] - pd.to_timedelta(orders["order_ts"].dt.weekday, unit="D")
-).dt.normalize()
+    # include ALL orders to keep weeks that have only refunds (AOV NaN, same as SQL)
+    aov = aov_by_week(weekly("recompute_aov_pandas", "orders", net_orders_by_week, ctx))
 
-# conditional aggregation to mirror SQL
-grp = orders.groupby("week_start", as_index=False)
-aov_by_week = grp.agg(
-    orders_net=("is_refund", lambda s: (s == 0).sum()),
-    revenue_net=("revenue", lambda s: s.where(orders.loc[s.index, "is_refund"] == 0, 0).sum()),
-)
+    out = ctx.interim_dir / "aov_by_week.csv"
+    aov.to_csv(out, index=False)
 
-# compute AOV; keep NaN when orders_net == 0 (same as SQL)
-aov_by_week["aov"] = aov_by_week["revenue_net"] / aov_by_week["orders_net"]
+    print(f"✅ recomputed pandas AOV -> {out}")
+    print(aov.to_string(index=False, formatters={"aov": "{:.6f}".format}))
 
-aov_by_week = aov_by_week.sort_values("week_start")
-out = INTERIM / "aov_by_week.csv"
-aov_by_week.to_csv(out, index=False)
 
-print(f"✅ recomputed pandas AOV -> {out}")
-print(aov_by_week.to_string(index=False, formatters={"aov": "{:.6f}".format}))
+if __name__ == "__main__":
+    main()
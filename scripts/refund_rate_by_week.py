@@ -2,35 +2,29 @@
 # Weekly refund rate = refund_orders / all_orders (ISO week = Monday start)
 
 import pandas as pd
-from pathlib import Path
 
-ROOT = Path(__file__).resolve().parents[1]
-RAW = ROOT / "data" / "raw"
-INTERIM = ROOT / "data" / "interim"
-INTERIM.mkdir(parents=True, exist_ok=True)
+from beamcart_metrics import FrameContext
+from beamcart_metrics.metrics import refund_rate_by_week, refunds_by_week
+from beamcart_metrics.weekly import weekly
 
 
-def week_start_utc(ts: pd.Series) -> pd.Series:
-    return (ts - pd.to_timedelta(ts.dt.weekday, unit="D")).dt.normalize()
+def main(ctx: FrameContext | None = None) -> None:
+    ctx = ctx or FrameContext()
+    ctx.interim_dir.mkdir(parents=True, exist_ok=True)
 
+    agg = refund_rate_by_week(weekly("refund_rate_by_week", "orders", refunds_by_week, ctx))
 
-orders = pd.read_csv(RAW / "orders.csv", parse_dates=["order_ts"])
-orders["is_refund"] = pd.to_numeric(orders["is_refund"], errors="coerce").fillna(0).astype(int)
-orders["week_start"] = week_start_utc(orders["order_ts"])
+    out = ctx.interim_dir / "refund_rate_by_week.csv"
+    agg.to_csv(out, index=False)
 
-agg = orders.groupby("week_start", as_index=False).agg(
-    all_orders=("order_id", "count"), refund_orders=("is_refund", lambda s: (s == 1).sum())
-)
-
-agg["refund_rate"] = agg["refund_orders"] / agg["all_orders"]
-agg = agg.sort_values("week_start")
+    print(f"✅ saved {out}")
+    print(
+        agg.to_string(
+            index=False,
+            formatters={"refund_rate": (lambda v: "NaN" if pd.isna(v) else f"{v:.4f}")},
+        )
+    )
 
-out = INTERIM / "refund_rate_by_week.csv"
-agg.to_csv(out, index=False)
 
-print(f"✅ saved {out}")
-print(
-    agg.to_string(
-        index=False, formatters={"refund_rate": (lambda v: "NaN" if pd.isna(v) else f"{v:.4f}")}
-    )
-)
+if __name__ == "__main__":
+    main()
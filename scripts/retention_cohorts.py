@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# Cohort retention by signup_date (UTC calendar days) for every offset D0..D90 in one pass;
+# writes the D1/D7/D30 tables, their summary and the full cohort x day matrix
+
+from beamcart_metrics import FrameContext, streaming, userdays, warehouse
+from beamcart_metrics.retention import (
+    DAYS,
+    cohort_sizes,
+    dn_retention,
+    retention_counts,
+    retention_matrix,
+    retention_summary,
+)
+
+SUMMARY_DAYS = (1, 7, 30)
+
+
+def main(ctx: FrameContext | None = None) -> None:
+    ctx = ctx or FrameContext()
+    ctx.interim_dir.mkdir(parents=True, exist_ok=True)
+
+    if ctx.index:  # each cohort user's bit on signup day + n
+        cohort = cohort_sizes(ctx.users)
+        counts = userdays.retention_counts(ctx.user_days, ctx.users, DAYS)
+    elif ctx.engine == "duckdb":
+        cohort = warehouse.cohort_sizes(ctx.db)
+        counts = warehouse.retention_counts(ctx.db, DAYS)
+    elif ctx.engine == "streaming":
+        cohort = streaming.cohort_sizes(ctx.stream)
+        counts = streaming.retention_counts(ctx.stream, DAYS)
+    else:
+        cohort = cohort_sizes(ctx.users)
+        counts = retention_counts(ctx.users, ctx.sessions, DAYS)
+
+    for n in SUMMARY_DAYS:
+        dn_retention(cohort, counts, n).to_csv(ctx.interim_dir / f"retention_d{n}.csv", index=False)
+    summary = retention_summary(cohort, counts, SUMMARY_DAYS)
+
+    path = ctx.interim_dir / "retention_summary.csv"
+    summary.to_csv(path, index=False)
+    matrix_path = ctx.interim_dir / "retention_matrix.csv"
+    retention_matrix(cohort, counts).to_csv(matrix_path, index=False)
+
+    print(f"✅ saved {path} (+ retention_d1/d7/d30.csv, {matrix_path.name})")
+    print(
+        summary.to_string(
+            index=False, formatters={f"d{n}_retention": "{:.4f}".format for n in SUMMARY_DAYS}
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,24 @@
 #!/usr/bin/env python3
 # Compute D1 retention by signup_date (UTC calendar days)
+# (the pipeline writes this table from retention_cohorts.py; kept for one-off runs)
 
-import pandas as pd
-from pathlib import Path
+from beamcart_metrics import FrameContext
+from beamcart_metrics.retention import cohort_sizes, dn_retention, retention_counts
 
-ROOT = Path(__file__).resolve().parents[1]
-RAW = ROOT / "data" / "raw"
-INTERIM = ROOT / "data" / "interim"
-INTERIM.mkdir(parents=True, exist_ok=True)
 
-# Load
-users = pd.read_csv(RAW / "users.csv", parse_dates=["signup_ts"])
-events = pd.read_csv(RAW / "events.csv", parse_dates=["event_ts"])
+def main(ctx: FrameContext | None = None) -> None:
+    ctx = ctx or FrameContext()
+    ctx.interim_dir.mkdir(parents=True, exist_ok=True)
 
-# Prep
-users["signup_date"] = users["signup_ts"].dt.normalize()  # floor to day (UTC)
-sess = events[events["event_type"] == "session_start"].copy()
-sess["event_day"] = sess["event_ts"].dt.normalize()
+    counts = retention_counts(ctx.users, ctx.sessions, [1])
+    out = dn_retention(cohort_sizes(ctx.users), counts, 1)
 
-# Cohort size per signup_date
-cohort = (
-    users.groupby("signup_date", as_index=False)["user_id"]
-    .nunique()
-    .rename(columns={"user_id": "cohort_size"})
-)
+    # Save + print
+    path = ctx.interim_dir / "retention_d1.csv"
+    out.to_csv(path, index=False)
+    print(f"✅ saved {path}")
+    print(out.to_string(index=False))
 
-# For each user, did they return on D+1 (exact calendar day)?
-ue = users[["user_id", "signup_date"]].merge(
-    sess[["user_id", "event_day"]], on="user_id", how="left"
-)
-ue["is_d1"] = ue["event_day"] == (ue["signup_date"] + pd.to_timedelta(1, "D"))
 
-d1 = (
-    ue.loc[ue["is_d1"]]
-    .groupby("signup_date", as_index=False)["user_id"]
-    .nunique()
-    .rename(columns={"user_id": "d1_users"})
-)
-
-# Combine and compute rate
-out = cohort.merge(d1, on="signup_date", how="left").fillna({"d1_users": 0})
-out["d1_retention"] = (out["d1_users"] / out["cohort_size"]).round(4)
-out = out.sort_values("signup_date")
-
-# Save + print
-path = INTERIM / "retention_d1.csv"
-out.to_csv(path, index=False)
-print(f"✅ saved {path}")
-print(out.to_string(index=False))
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# Daily rolling actives (UTC calendar days): DAU, L7, L28, DAU/L28 stickiness, and the
+# L28 histogram (users active on exactly k of the last 28 days), every window in one sweep
+
+from beamcart_metrics import FrameContext, rolling, streaming, userdays, warehouse
+
+
+def main(ctx: FrameContext | None = None) -> None:
+    ctx = ctx or FrameContext()
+    ctx.interim_dir.mkdir(parents=True, exist_ok=True)
+
+    if ctx.index:  # sliding ORs over the user x day index
+        daily = userdays.daily_actives(ctx.user_days)
+        hist = userdays.active_days_histogram(ctx.user_days)
+    elif ctx.engine == "duckdb":
+        daily = warehouse.daily_actives(ctx.db)
+        hist = warehouse.active_days_histogram(ctx.db)
+    elif ctx.engine == "streaming":
+        daily = streaming.daily_actives(ctx.stream)
+        hist = streaming.active_days_histogram(ctx.stream)
+    else:
+        act = rolling.active_days(ctx.sessions)
+        daily, hist = rolling.daily_actives(act), rolling.active_days_histogram(act)
+
+    path = ctx.interim_dir / "rolling_active_daily.csv"
+    daily.to_csv(path, index=False)
+    hist_path = ctx.interim_dir / "l28_histogram.csv"
+    hist.to_csv(hist_path, index=False)
+
+    print(f"✅ saved {path} (+ {hist_path.name})")
+    print(daily.tail(14).to_string(index=False, formatters={"stickiness": "{:.4f}".format}))
+    if len(hist):
+        last = hist[hist["day"] == hist["day"].max()]
+        print(f"\nL28 histogram on {last['day'].iloc[0]:%Y-%m-%d}:")
+        print(last[["days_active", "users"]].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
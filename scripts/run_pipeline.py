@@ -1,52 +1,220 @@
 #!/usr/bin/env python3
+"""
+Run the end-to-end pipeline.
+
+Stages and the artifacts they read/write are declared in beamcart_metrics/pipeline.py.
+Independent stages run concurrently on a process pool (`--jobs`, default: CPU count);
+`--jobs 1` runs everything in this process with one shared FrameContext. `--isolated`
+keeps the old behaviour (one interpreter per script, in registry order). A critical-
+path report at the end shows which chain of stages bounds the wall-clock time.
+
+Stages whose script, library code and inputs are unchanged since their last
+successful run are skipped (content-hash build cache, manifest
+_cache_manifest.json in the interim dir); `--force` reruns everything. Weekly KPI stages
+keep per-week partial aggregates and only recompute weeks whose raw rows changed;
+`--full-refresh` rebuilds them from scratch (and implies `--force`).
+
+`--engine duckdb` computes the metrics in the persistent DuckDB database
+data/beamcart.duckdb (raw tables loaded once by load_duckdb) instead of pandas; the
+pandas engine (default) is the reference the parity stages check against.
+
+`--engine streaming` reads events and orders in bounded record batches and folds them
+into per-week / per-user state, for event logs larger than memory; `--memory-mb` is its
+peak RSS budget (sizes the batches; each pass reports its peak RSS).
+
+`--approx` estimates WAU, MAU and channel WAU from HyperLogLog sketches (build_sketches
+stage, _sketches in the interim dir) instead of exact distinct counts; those outputs
+carry an `approximate` column.
+
+`--index` answers WAU, MAU, churn and retention from the user x day activity index
+(build_user_days stage, _activity in the interim dir; refreshed one changed week at a
+time) with bitmap OR / AND / popcount instead of groupbys.
+
+`--parity-shards N/K` / `--parity-weeks N` make the parity stage verify a sample (the
+first N of K user shards, the last N ISO weeks) instead of the whole history.
+
+`--dataset NAME` runs on a dataset profile other than the active one (`small`, `big`,
+`xl` or a registered path; see scripts/dataset.py). Each profile has its own store,
+database, interim dir (metric CSVs, partials, sketches, activity index, build cache,
+run profiles) and charts dir, so the profiles' runs neither share nor invalidate each
+other's state. The default profile's interim and charts dirs are data/interim/ and
+docs/charts/; another profile's are interim/ and charts/ under its work dir.
+
+Every run records per-stage wall time, CPU time, peak RSS, bytes read / written and the
+rows and bytes of each stage's inputs and outputs in _run_profile.json in the interim
+dir (history in _run_profiles.jsonl), and prints them slowest first with the change since
+the last comparable run. `--profile STAGE` (repeatable) also runs that stage under
+cProfile (_profiles/STAGE.prof + .txt in the interim dir).
+
+Usage:
+  python scripts/run_pipeline.py [--jobs N] [--force] [--full-refresh] [--isolated]
+                                 [--engine pandas|duckdb|streaming] [--memory-mb N]
+                                 [--approx] [--index] [--dataset NAME]
+                                 [--parity-shards N/K] [--parity-weeks N]
+                                 [--profile STAGE ...]
+"""
+import argparse
+import os
+import shutil
 import subprocess
 import sys
-import os
+import time
 
-ROOT = os.path.dirname(os.path.dirname(__file__))
-S = [
-    "scripts/seed_synthetic_data.py",
-    # core metrics
-    "scripts/first_metrics.py",
-    "scripts/compute_mau.py",
-    "scripts/recompute_aov_pandas.py",
-    # parity checks
-    "scripts/sql_wau_parity.py",
-    "scripts/sql_aov_parity.py",
-    # retention & churn
-    "scripts/retention_d1.py",
-    "scripts/retention_d7.py",
-    "scripts/retention_d30.py",
-    "scripts/retention_summary.py",
-    "scripts/churn_weekly.py",
-    "scripts/sql_churn_parity.py",
-    # north-star + drivers
-    "scripts/opac_by_week.py",
-    "scripts/rev_per_wau.py",
-    "scripts/decomposition_check.py",
-    "scripts/refund_rate_by_week.py",
-    "scripts/opac_by_channel_week.py",
-    # charts
-    "scripts/make_wau_chart.py",
-    "scripts/make_cohort_heatmap.py",
-    "scripts/make_opac_chart.py",
-    "scripts/make_rev_per_wau_chart.py",
-    "scripts/make_opac_channel_bar_latest.py",
-    # snapshot
-    "scripts/weekly_kpis.py",
-    "scripts/summary_day1.py",
-]
-
-
-def run(py):
+from beamcart_metrics import ENGINES, FrameContext, datasets, profiling
+from beamcart_metrics.cache import MANIFEST, BuildCache
+from beamcart_metrics.pipeline import (
+    STAGES,
+    critical_path_report,
+    for_dataset,
+    for_engine,
+    run_parallel,
+    run_serial,
+    with_approx,
+    with_index,
+    with_parity_sample,
+)
+from beamcart_metrics.parity import Sample
+from beamcart_metrics.weekly import PARTIALS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_isolated(py):
     print(f"→ {py}")
     subprocess.run([sys.executable, os.path.join(ROOT, py)], check=True)
 
 
-def main():
-    for script in S:
-        run(script)
-    print("\n✅ Pipeline complete. Artifacts in data/interim/ and docs/charts/.")
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Run the BeamCart metrics pipeline.")
+    ap.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="worker processes for independent stages (default: CPU count; 1 = in-process)",
+    )
+    ap.add_argument(
+        "--force",
+        action="store_true",
+        help="ignore the build cache and rerun every stage",
+    )
+    ap.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="recompute incremental weekly aggregates for every week (implies --force)",
+    )
+    ap.add_argument(
+        "--isolated",
+        action="store_true",
+        help="run each stage in its own interpreter, one after another",
+    )
+    ap.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="pandas",
+        help="compute metrics with pandas (reference) or in the persistent DuckDB database",
+    )
+    ap.add_argument(
+        "--memory-mb",
+        type=float,
+        help="peak RSS budget of the streaming engine in MiB (sizes its batches)",
+    )
+    ap.add_argument(
+        "--approx",
+        action="store_true",
+        help="estimate WAU / MAU / channel WAU from HLL sketches (~1%% error, flagged)",
+    )
+    ap.add_argument(
+        "--index",
+        action="store_true",
+        help="answer WAU / MAU / churn / retention from the user x day activity index",
+    )
+    ap.add_argument(
+        "--dataset",
+        metavar="NAME",
+        help="dataset profile to run on (default: the active one, see scripts/dataset.py)",
+    )
+    ap.add_argument(
+        "--parity-shards",
+        metavar="N/K",
+        help="check SQL <-> pandas parity on the first N of K hash(user_id) shards only",
+    )
+    ap.add_argument(
+        "--parity-weeks",
+        type=int,
+        metavar="N",
+        help="check SQL <-> pandas parity on the last N ISO weeks only",
+    )
+    ap.add_argument(
+        "--profile",
+        action="append",
+        default=[],
+        metavar="STAGE",
+        help="also run STAGE (e.g. churn_weekly) under cProfile; repeatable",
+    )
+    args = ap.parse_args(argv)
+    if args.isolated and (args.engine != "pandas" or args.approx or args.index):
+        ap.error("--isolated runs the standalone scripts: pandas engine, exact counts, no index")
+    try:
+        sample = Sample.parse(args.parity_shards, args.parity_weeks)
+    except ValueError as e:
+        ap.error(str(e))
+    if args.isolated and sample is not None:
+        ap.error("--isolated runs sql_parity.py on the full data; use its --shards/--last-weeks")
+    try:
+        dataset = datasets.get(args.dataset)
+    except ValueError as e:
+        ap.error(str(e))
+    if args.isolated and dataset.name != datasets.active_name():
+        ap.error("--isolated runs the standalone scripts on the active dataset")
+    missing = dataset.missing()
+    if missing and dataset.name != datasets.DEFAULT:  # the default one is seeded by a stage
+        hint = f" (generate it: {dataset.seed})" if dataset.seed else ""
+        ap.error(f"dataset {dataset.name}: no {', '.join(missing)} in {dataset.raw_dir}{hint}")
+    stages = with_index(for_engine(STAGES, args.engine), args.index)
+    stages = with_parity_sample(with_approx(stages, args.approx), sample)
+    stages = for_dataset(stages, dataset)
+    unknown = set(args.profile) - {st.name for st in stages}
+    if unknown:
+        ap.error(f"--profile: unknown stage(s) {', '.join(sorted(unknown))}")
+    if args.isolated and args.profile:
+        ap.error("--isolated runs each script in its own interpreter; it is not profiled")
+
+    if args.isolated:
+        if args.full_refresh:  # standalone scripts have no flag; drop their partials
+            shutil.rmtree(dataset.interim_dir / PARTIALS, ignore_errors=True)
+        for st in stages:
+            run_isolated(st.script)
+    else:
+        interim = dataset.interim_dir
+        cache = BuildCache(interim / MANIFEST, force=args.force or args.full_refresh)
+        options = dict(
+            full_refresh=args.full_refresh,
+            engine=args.engine,
+            parity_sample=sample,
+            memory_mb=args.memory_mb,
+            approx=args.approx,
+            index=args.index,
+            dataset=dataset.name,
+        )
+        profile = tuple(args.profile)
+        print(f"dataset: {dataset.name} ({profiling.relative(dataset.raw_dir)})")
+        started, t0 = time.time(), time.perf_counter()
+        if args.jobs > 1:
+            results = run_parallel(stages, args.jobs, cache, profile, **options)
+        else:
+            results = run_serial(stages, FrameContext(**options), cache, profile)
+        seconds = time.perf_counter() - t0
+        record = profiling.run_record(
+            results, options, args.jobs, started, seconds, dataset.store_dir
+        )
+        history = interim / profiling.HISTORY
+        past = profiling.baseline(record, history)
+        profiling.save(record, interim / profiling.PROFILE, history)
+        print("\n" + critical_path_report(stages, results))
+        print("\n" + profiling.summary(record, past, interim / profiling.PROFILE))
+    interim, charts = (profiling.relative(d) for d in (dataset.interim_dir, dataset.charts_dir))
+    print(f"\n✅ Pipeline complete. Artifacts in {interim}/ and {charts}/.")
 
 
 if __name__ == "__main__":
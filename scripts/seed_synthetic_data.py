@@ -8,9 +8,10 @@ import csv
 import os
 from datetime import datetime, timedelta
 
+from beamcart_metrics import FrameContext
+
 ROOT = os.path.dirname(os.path.dirname(__file__))
 RAW = os.path.join(ROOT, "data", "raw")
-os.makedirs(RAW, exist_ok=True)
 
 
 # Helper to write rows
@@ -102,22 +103,34 @@ orders = [
     ),
 ]
 
-write_csv(
-    os.path.join(RAW, "users.csv"),
-    ["user_id", "signup_ts", "country", "acquisition_channel"],
-    users,
-)
-
-write_csv(os.path.join(RAW, "events.csv"), ["user_id", "event_ts", "event_type"], events)
-
-write_csv(
-    os.path.join(RAW, "orders.csv"),
-    ["order_id", "user_id", "order_ts", "revenue", "items", "is_refund"],
-    orders,
-)
-
-print("✅ Wrote:")
-print(f"  users.csv   : {len(users)} rows")
-print(f"  events.csv  : {len(events)} rows")
-print(f"  orders.csv  : {len(orders)} rows")
-print("Dates are UTC-like strings (YYYY-MM-DD HH:MM:SS). ISO weeks start Monday.")
+
+def main(ctx: FrameContext | None = None) -> None:
+    os.makedirs(RAW, exist_ok=True)
+
+    write_csv(
+        os.path.join(RAW, "users.csv"),
+        ["user_id", "signup_ts", "country", "acquisition_channel"],
+        users,
+    )
+
+    write_csv(os.path.join(RAW, "events.csv"), ["user_id", "event_ts", "event_type"], events)
+
+    write_csv(
+        os.path.join(RAW, "orders.csv"),
+        ["order_id", "user_id", "order_ts", "revenue", "items", "is_refund"],
+        orders,
+    )
+
+    print("✅ Wrote:")
+    print(f"  users.csv   : {len(users)} rows")
+    print(f"  events.csv  : {len(events)} rows")
+    print(f"  orders.csv  : {len(orders)} rows")
+    print("Dates are UTC-like strings (YYYY-MM-DD HH:MM:SS). ISO weeks start Monday.")
+
+    # tables on disk changed: drop anything the shared context already loaded
+    if ctx is not None:
+        ctx.reset()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# Segment cube: WAU, orders, revenue, AOV, OPAC, refund rate and churn per ISO week for
+# every acquisition_channel x country cell plus the channel / country / week totals,
+# in one grouped pass -> segment_cube.parquet in the dataset's interim dir
+
+from beamcart_metrics import FrameContext, cube, streaming, warehouse
+
+
+def main(ctx: FrameContext | None = None) -> None:
+    ctx = ctx or FrameContext()
+
+    if ctx.engine == "duckdb":  # GROUPING SETS over user_week + orders
+        out = warehouse.segment_cube(ctx.db)
+    elif ctx.engine == "streaming":
+        out = streaming.segment_cube(ctx.stream)
+    else:
+        out = cube.segment_cube(ctx.users, ctx.sessions, ctx.orders)
+
+    path = ctx.interim_dir / cube.CUBE
+    cube.write(out, path)
+
+    latest = out[out["week_start"] == out["week_start"].max()]
+    fmt = {c: "{:.4f}".format for c in ("opac", "refund_rate", "churn_rate")}
+    cols = ["acquisition_channel", "country", "wau", "orders_net", "opac", "refund_rate"]
+    print(f"✅ saved {path} ({len(out)} rows)")
+    print(f"Latest week {latest['week_start'].iloc[0].date()}, by channel x country:")
+    print(cube.level(latest, *cube.DIMENSIONS)[cols].to_string(index=False, formatters=fmt))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Run every SQL <-> pandas parity check (registry in beamcart_metrics/parity.py) over
+one connection to data/beamcart.duckdb, queries in parallel on DuckDB's thread pool.
+
+A full run writes parity_report.json and parity_report.md to the interim dir (per-check
+timings, max differences and the first mismatching rows); `--only` just prints it.
+`--shards N/K` and/or `--last-weeks N` verify a sample instead (the first N of K
+hash(user_id) shards, the last N ISO weeks): both sides are recomputed on the slice
+and the report records its coverage.
+Exits non-zero on any mismatch.
+Usage:
+  python scripts/sql_parity.py [--only wau aov ...] [--threads N]
+                               [--shards N/K] [--last-weeks N]
+"""
+import argparse
+import json
+import time
+
+from beamcart_metrics import FrameContext
+from beamcart_metrics.parity import (
+    BY_NAME,
+    CHECKS,
+    Sample,
+    coverage,
+    report_json,
+    report_markdown,
+    run_checks,
+    sample_connection,
+    sample_frames,
+)
+
+REPORT = "parity_report"
+
+
+def main(ctx: FrameContext | None = None, only=None, threads=4, sample=None) -> None:
+    """All checks (and the report files), or just the `only` ones (printed only), on
+    the full data or on `sample` (default: `ctx.parity_sample`)."""
+    ctx = ctx or FrameContext()
+    sample = sample or ctx.parity_sample
+    ctx.interim_dir.mkdir(parents=True, exist_ok=True)
+    checks = [BY_NAME[n] for n in only] if only else CHECKS
+
+    t0 = time.perf_counter()
+    if sample is None:
+        results = run_checks(ctx.db, checks, ctx.interim_dir, threads)
+        extra = {"mode": "full"}
+    else:
+        ctx.db  # build the database if it is stale
+        with sample_connection(ctx.db_path, sample) as con:
+            results = run_checks(con, checks, ctx.interim_dir, threads, frames=sample_frames(con))
+            extra = {"mode": "sampled", "sample": sample.describe(), "coverage": coverage(con)}
+    out = report_json(results, time.perf_counter() - t0, engine=ctx.engine, **extra)
+    md = report_markdown(out)
+    if not only:
+        (ctx.interim_dir / f"{REPORT}.json").write_text(json.dumps(out, indent=2) + "\n")
+        (ctx.interim_dir / f"{REPORT}.md").write_text(md)
+    print(md)
+
+    if not out["ok"]:
+        failed = ", ".join(r.name for r in results if not r.ok)
+        raise SystemExit(f"❌ Parity failed: {failed}. See the report above.")
+    print("✅ Parity OK")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Run the SQL <-> pandas parity checks.")
+    ap.add_argument("--only", nargs="+", choices=sorted(BY_NAME), help="run only these checks")
+    ap.add_argument("--threads", type=int, default=4, help="queries in flight at once")
+    ap.add_argument("--shards", metavar="N/K", help="verify the first N of K user shards")
+    ap.add_argument("--last-weeks", type=int, metavar="N", help="verify the last N ISO weeks")
+    args = ap.parse_args()
+    try:
+        sample = Sample.parse(args.shards, args.last_weeks)
+    except ValueError as e:
+        ap.error(str(e))
+    main(only=args.only, threads=args.threads, sample=sample)
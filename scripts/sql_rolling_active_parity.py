@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+# SQL <-> pandas parity for sql/rolling_active.sql and sql/l28_histogram.sql only
+# (see sql_parity.py)
+
+from beamcart_metrics import FrameContext
+
+import sql_parity
+
+
+def main(ctx: FrameContext | None = None) -> None:
+    sql_parity.main(ctx, only=["rolling_active", "l28_histogram"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+# SQL <-> pandas parity for sql/segment_cube.sql only (see sql_parity.py)
+
+from beamcart_metrics import FrameContext
+
+import sql_parity
+
+
+def main(ctx: FrameContext | None = None) -> None:
+    sql_parity.main(ctx, only=["segment_cube"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+-- L28 histogram: users active on exactly k of the 28 days ending on each calendar day
+-- (k = 1..28; only non-empty buckets)
+-- expects `events(user_id, event_ts, event_type)`
+WITH user_day AS (
+  SELECT DISTINCT
+    user_id,
+    CAST(event_ts AS DATE) AS day
+  FROM events
+  WHERE event_type = 'session_start'
+    AND event_ts IS NOT NULL
+    AND user_id IS NOT NULL
+),
+days AS (
+  SELECT CAST(d AS DATE) AS day
+  FROM range(
+    (SELECT CAST(MIN(day) AS TIMESTAMP) FROM user_day),
+    (SELECT CAST(MAX(day) AS TIMESTAMP) FROM user_day) + INTERVAL 1 DAY,
+    INTERVAL 1 DAY
+  ) AS t(d)
+),
+per_user AS (
+  SELECT
+    d.day,
+    u.user_id,
+    COUNT(*) AS days_active
+  FROM days d
+  JOIN user_day u
+    ON u.day BETWEEN d.day - 27 AND d.day
+  GROUP BY 1, 2
+)
+SELECT
+  day,
+  days_active,
+  COUNT(*) AS users
+FROM per_user
+GROUP BY 1, 2
+ORDER BY 1, 2;
@@ -0,0 +1,38 @@
+-- Daily active users, trailing 7 / 28-day actives (L7, L28) and DAU/L28 stickiness,
+-- for every calendar day from the first to the last session (UTC)
+-- expects `events(user_id, event_ts, event_type)`
+WITH user_day AS (
+  SELECT DISTINCT
+    user_id,
+    CAST(event_ts AS DATE) AS day
+  FROM events
+  WHERE event_type = 'session_start'
+    AND event_ts IS NOT NULL
+),
+days AS (
+  SELECT CAST(d AS DATE) AS day
+  FROM range(
+    (SELECT CAST(MIN(day) AS TIMESTAMP) FROM user_day),
+    (SELECT CAST(MAX(day) AS TIMESTAMP) FROM user_day) + INTERVAL 1 DAY,
+    INTERVAL 1 DAY
+  ) AS t(d)
+),
+windows AS (
+  SELECT
+    d.day,
+    COUNT(DISTINCT u.user_id) FILTER (WHERE u.day = d.day)     AS dau,
+    COUNT(DISTINCT u.user_id) FILTER (WHERE u.day > d.day - 7) AS l7,
+    COUNT(DISTINCT u.user_id)                                  AS l28
+  FROM days d
+  LEFT JOIN user_day u
+         ON u.day BETWEEN d.day - 27 AND d.day
+  GROUP BY 1
+)
+SELECT
+  day,
+  dau,
+  l7,
+  l28,
+  1.0 * dau / NULLIF(l28, 0) AS stickiness
+FROM windows
+ORDER BY 1;
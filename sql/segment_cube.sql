@@ -0,0 +1,77 @@
+-- Segment cube: weekly KPIs per acquisition_channel x country, plus the channel,
+-- country and week totals, in one grouped pass.
+-- Every fact carries its user's channel and country (a user has one of each), so
+-- distinct users add up across cells and the GROUPING SETS are plain sums.
+-- grouping_id = GROUPING(acquisition_channel, country): 0 cell, 1 channel total,
+-- 2 country total, 3 week total. Ratios are NULL when the denominator is 0.
+-- expects `users`, `events(user_id, event_ts, event_type)`, `orders`
+
+WITH active AS (
+  SELECT DISTINCT
+    user_id,
+    CAST(DATE_TRUNC('week', CAST(event_ts AS TIMESTAMP)) AS DATE) AS week
+  FROM events
+  WHERE event_type = 'session_start' AND user_id IS NOT NULL AND event_ts IS NOT NULL
+),
+-- churn compares each week with the previous calendar week (as churn_rate.sql)
+weeks AS (
+  SELECT w.week, n.week AS next_week
+  FROM (SELECT DISTINCT week FROM active) w
+  LEFT JOIN (SELECT DISTINCT week FROM active) n ON n.week = w.week + INTERVAL 7 DAY
+),
+facts AS (
+  SELECT user_id, week, 1 AS wau, 0 AS active_t_minus_1, 0 AS churned_users,
+         0 AS all_orders, 0 AS refund_orders, 0 AS orders_net, 0.0 AS revenue_net
+  FROM active
+  UNION ALL
+  SELECT a.user_id, w.next_week, 0, 1, CASE WHEN n.user_id IS NULL THEN 1 ELSE 0 END,
+         0, 0, 0, 0.0
+  FROM active a
+  JOIN weeks w ON w.week = a.week AND w.next_week IS NOT NULL
+  LEFT JOIN active n ON n.user_id = a.user_id AND n.week = w.next_week
+  UNION ALL
+  SELECT user_id,
+         CAST(DATE_TRUNC('week', CAST(order_ts AS TIMESTAMP)) AS DATE),
+         0, 0, 0,
+         CASE WHEN order_id IS NOT NULL THEN 1 ELSE 0 END,
+         CASE WHEN CAST(is_refund AS INTEGER) = 1 THEN 1 ELSE 0 END,
+         CASE WHEN CAST(is_refund AS INTEGER) = 0 THEN 1 ELSE 0 END,
+         CASE WHEN CAST(is_refund AS INTEGER) = 0
+              THEN COALESCE(CAST(revenue AS DOUBLE), 0.0) ELSE 0.0 END
+  FROM orders
+  WHERE order_ts IS NOT NULL
+),
+cube AS (
+  SELECT
+    f.week AS week_start,
+    u.acquisition_channel,
+    u.country,
+    GROUPING(u.acquisition_channel, u.country) AS grouping_id,
+    CAST(SUM(f.wau) AS BIGINT) AS wau,
+    CAST(SUM(f.orders_net) AS BIGINT) AS orders_net,
+    SUM(f.revenue_net) AS revenue_net,
+    CAST(SUM(f.all_orders) AS BIGINT) AS all_orders,
+    CAST(SUM(f.refund_orders) AS BIGINT) AS refund_orders,
+    CAST(SUM(f.active_t_minus_1) AS BIGINT) AS active_t_minus_1,
+    CAST(SUM(f.churned_users) AS BIGINT) AS churned_users
+  FROM facts f
+  LEFT JOIN users u USING (user_id)
+  GROUP BY GROUPING SETS (
+    (f.week, u.acquisition_channel, u.country),
+    (f.week, u.acquisition_channel),
+    (f.week, u.country),
+    (f.week)
+  )
+)
+SELECT
+  week_start, acquisition_channel, country, grouping_id,
+  wau, orders_net, revenue_net,
+  revenue_net / NULLIF(orders_net, 0) AS aov,
+  1.0 * orders_net / NULLIF(wau, 0) AS opac,
+  revenue_net / NULLIF(wau, 0) AS rev_per_wau,
+  all_orders, refund_orders,
+  1.0 * refund_orders / NULLIF(all_orders, 0) AS refund_rate,
+  active_t_minus_1, churned_users,
+  1.0 * churned_users / NULLIF(active_t_minus_1, 0) AS churn_rate
+FROM cube
+ORDER BY week_start, grouping_id, acquisition_channel NULLS LAST, country NULLS LAST;
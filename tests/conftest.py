@@ -0,0 +1,88 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# scripts/ is not installed; put it on sys.path so tests can import beamcart_metrics, and
+# benchmarks/ for the benchmark harness (kept out of the package and its cache digest)
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "benchmarks"))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+
+def _write_raw(raw):
+    raw.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(
+        {
+            "user_id": ["u1", "u2"],
+            "signup_ts": ["2025-10-27 09:00:00", "2025-10-28 10:00:00"],
+            "country": ["US", "IN"],
+            "acquisition_channel": ["paid", "organic"],
+        }
+    ).to_csv(raw / "users.csv", index=False)
+    pd.DataFrame(
+        {
+            "user_id": ["u1", "u1", "u2"],
+            "event_ts": ["2025-10-27 10:00:00", "2025-10-27 10:05:00", "2025-10-29 08:00:00"],
+            "event_type": ["session_start", "page_view", "session_start"],
+        }
+    ).to_csv(raw / "events.csv", index=False)
+    pd.DataFrame(
+        {
+            "order_id": ["o1", "o2"],
+            "user_id": ["u1", "u2"],
+            "order_ts": ["2025-10-27 11:00:00", "2025-10-29 09:00:00"],
+            "revenue": [10.0, 20.0],
+            "items": [1, 2],
+            "is_refund": ["0", "1"],
+        }
+    ).to_csv(raw / "orders.csv", index=False)
+
+
+def _write_random_raw(raw, n_users=300, seed=3):
+    rng = np.random.default_rng(seed)
+    raw.mkdir(parents=True, exist_ok=True)
+    start = np.datetime64("2025-09-01T00:00:00", "s")
+    users = pd.DataFrame(
+        {
+            "user_id": [f"u{i:04d}" for i in range(n_users)],
+            "signup_ts": start + rng.integers(0, 30 * 86_400, n_users).astype("timedelta64[s]"),
+            "country": rng.choice(["US", "IN", "DE"], n_users),
+            "acquisition_channel": rng.choice(["paid", "organic", "referral"], n_users),
+        }
+    )
+    users.to_csv(raw / "users.csv", index=False)
+    n = 5_000
+    pd.DataFrame(
+        {
+            "user_id": rng.choice(users["user_id"], n),
+            "event_ts": start + rng.integers(0, 90 * 86_400, n).astype("timedelta64[s]"),
+            "event_type": rng.choice(["session_start", "page_view"], n),
+        }
+    ).to_csv(raw / "events.csv", index=False)
+    m = 800
+    pd.DataFrame(
+        {
+            "order_id": [f"o{i}" for i in range(m)],
+            "user_id": rng.choice(users["user_id"], m),
+            "order_ts": start + rng.integers(0, 90 * 86_400, m).astype("timedelta64[s]"),
+            "revenue": rng.gamma(2.0, 20.0, m).round(2),
+            "items": rng.integers(1, 5, m),
+            "is_refund": (rng.random(m) < 0.1).astype(int),
+        }
+    ).to_csv(raw / "orders.csv", index=False)
+
+
+@pytest.fixture
+def write_raw():
+    """Writes the tiny hand-checked raw CSVs (two users, three events, two orders) into
+    a directory."""
+    return _write_raw
+
+
+@pytest.fixture
+def write_random_raw():
+    """Writes seeded random raw CSVs (`n_users` users over 90 days) into a directory."""
+    return _write_random_raw
@@ -0,0 +1,64 @@
+import bench
+
+
+def test_benchmark_run_times_every_stage_on_both_engines(tmp_path):
+    record = bench.run(
+        ["10k"],
+        stages=("wau", "churn", "refund_rate"),
+        repeat=1,
+        root=tmp_path,
+        workers=1,
+        events={"10k": 3_000},
+    )
+
+    got = [(r["engine"], r["stage"]) for r in record["results"]]
+    assert got == [(e, s) for e in bench.ENGINES for s in ("load", "wau", "churn", "refund_rate")]
+    for r in record["results"]:
+        assert r["rows"] > 0 and r["wall_s"] > 0 and r["rows_per_s"] > 0
+        assert r["peak_rss_mb"] >= r["peak_delta_mb"] >= 0
+    # the dataset is reused while its parameters are unchanged
+    params = (tmp_path / "10k" / "_params.json").stat().st_mtime_ns
+    bench.dataset("10k", 3_000, tmp_path)
+    assert (tmp_path / "10k" / "_params.json").stat().st_mtime_ns == params
+
+    bench.save(record, tmp_path / "h.jsonl")
+    bench.save(record, tmp_path / "h.jsonl")
+    assert bench.load_history(tmp_path / "h.jsonl") == [record, record]
+
+
+def test_compare_flags_slower_and_hungrier_stages_only():
+    def result(stage, wall, mb, rows=100):
+        return {
+            "scale": "1m",
+            "engine": "pandas",
+            "stage": stage,
+            "rows": rows,
+            "wall_s": wall,
+            "peak_delta_mb": mb,
+        }
+
+    base = {
+        "results": [
+            result("wau", 1.0, 100),
+            result("mau", 1.0, 100),
+            result("aov", 0.01, 1),
+            result("opac", 1.0, 100),
+        ]
+    }
+    now = {
+        "results": [
+            result("wau", 1.1, 110),
+            result("mau", 1.5, 200),
+            result("aov", 0.03, 10),
+            result("opac", 9.0, 900, rows=200),
+            result("churn", 1.0, 100),
+        ]
+    }
+
+    rows = {r["stage"]: r for r in bench.compare(now, base, threshold=0.2)}
+
+    assert set(rows) == {"wau", "mau", "aov"}  # opac: other data size; churn: new
+    assert rows["wau"]["regression"] == []
+    assert rows["mau"]["regression"] == ["wall", "memory"]
+    assert rows["aov"]["regression"] == []  # 3x, but by less than 0.05 s and 16 MiB
+    assert rows["mau"]["wall_ratio"] == 1.5
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from beamcart_metrics.buckets import day_start, month_label, week_index, week_start
+
+
+def _ts():
+    rng = np.random.default_rng(1)
+    secs = rng.integers(0, 3 * 365 * 86_400, 5_000)
+    ts = pd.Series(np.datetime64("2024-01-01T00:00:00", "s") + secs.astype("timedelta64[s]"))
+    return pd.concat(
+        [ts, pd.Series([pd.NaT, pd.Timestamp("2025-11-02 23:59:59")])], ignore_index=True
+    )
+
+
+def test_week_and_day_match_the_datetime_accessor_version():
+    ts = _ts()
+    legacy_week = (ts - pd.to_timedelta(ts.dt.weekday, unit="D")).dt.normalize()
+    pd.testing.assert_series_equal(week_start(ts), legacy_week.astype("datetime64[s]"))
+    pd.testing.assert_series_equal(day_start(ts), ts.dt.normalize().astype("datetime64[s]"))
+    assert week_start(ts).dtype == "datetime64[s]"
+    assert week_start(ts).iloc[-1] == pd.Timestamp("2025-10-27")  # Sunday -> previous Monday
+
+
+def test_week_index_counts_monday_weeks():
+    mon, sun = pd.Series(pd.to_datetime(["2025-10-27 00:00:00", "2025-11-02 23:59:59"]))
+    assert week_index(pd.Series([mon, sun])).tolist() == [week_index(pd.Series([mon]))[0]] * 2
+
+
+def test_month_label_matches_strftime():
+    ts = _ts()
+    labels = month_label(ts)
+    assert isinstance(labels.dtype, pd.CategoricalDtype)
+    assert labels.isna().tolist() == ts.isna().tolist()
+    pd.testing.assert_series_equal(
+        labels.astype(str).where(ts.notna()), ts.dt.strftime("%Y-%m"), check_names=False
+    )
@@ -0,0 +1,99 @@
+import os
+from dataclasses import replace
+
+from beamcart_metrics.cache import BuildCache
+from beamcart_metrics.pipeline import (
+    STAGES,
+    Stage,
+    for_engine,
+    rewritten_outputs,
+    with_approx,
+    with_index,
+)
+
+
+def _setup(tmp_path):
+    (tmp_path / "stage.py").write_text("def main(ctx=None):\n    pass\n")
+    (tmp_path / "in.csv").write_text("a\n1\n")
+    (tmp_path / "out.csv").write_text("b\n2\n")
+    return Stage("stage.py", ("in.csv",), ("out.csv",))
+
+
+def _cache(tmp_path, **kw):
+    return BuildCache(tmp_path / "_cache_manifest.json", tmp_path, **kw)
+
+
+def test_recorded_stage_is_a_hit_in_a_new_process(tmp_path):
+    st = _setup(tmp_path)
+    cache = _cache(tmp_path)
+    fp = cache.fingerprint(st)
+    assert not cache.is_hit(st, fp)
+    cache.record(st, fp, "miss", 1.5)
+
+    again = _cache(tmp_path)
+    assert again.fingerprint(st) == fp
+    assert again.is_hit(st, fp)
+    assert again.data["stages"]["stage"]["status"] == "miss"
+    assert not _cache(tmp_path, force=True).is_hit(st, fp)
+
+
+def test_input_or_script_content_change_is_a_miss(tmp_path):
+    st = _setup(tmp_path)
+    cache = _cache(tmp_path)
+    cache.record(st, cache.fingerprint(st), "miss")
+
+    (tmp_path / "in.csv").write_text("a\n2\n")
+    assert not _cache(tmp_path).is_hit(st, _cache(tmp_path).fingerprint(st))
+
+    (tmp_path / "in.csv").write_text("a\n1\n")
+    (tmp_path / "stage.py").write_text("def main(ctx=None):\n    return 1\n")
+    assert not _cache(tmp_path).is_hit(st, _cache(tmp_path).fingerprint(st))
+
+
+def test_touching_an_input_without_changing_it_is_a_hit(tmp_path):
+    st = _setup(tmp_path)
+    cache = _cache(tmp_path)
+    cache.record(st, cache.fingerprint(st), "miss")
+
+    os.utime(tmp_path / "in.csv", ns=(0, 0))
+    fresh = _cache(tmp_path)
+    assert fresh.is_hit(st, fresh.fingerprint(st))
+
+
+def test_modified_or_missing_output_is_a_miss(tmp_path):
+    st = _setup(tmp_path)
+    cache = _cache(tmp_path)
+    fp = cache.fingerprint(st)
+    cache.record(st, fp, "miss")
+
+    (tmp_path / "out.csv").write_text("b\n3\n")
+    assert not cache.is_hit(st, fp)
+    # unless a later stage owns the final version of that file
+    assert cache.is_hit(st, fp, frozenset({"out.csv"}))
+    (tmp_path / "out.csv").unlink()
+    assert not cache.is_hit(st, fp, frozenset({"out.csv"}))
+
+
+def test_rewritten_outputs_marks_earlier_writers_only():
+    stages = [
+        Stage("a.py", (), ("x", "y")),
+        Stage("b.py", ("y",), ("x",)),
+    ]
+    assert rewritten_outputs(stages) == {"a": frozenset({"x"}), "b": frozenset()}
+
+
+def test_switching_engines_is_a_miss(tmp_path):
+    (tmp_path / "data" / "store").mkdir(parents=True)
+    (tmp_path / "data" / "store" / "events.parquet").write_text("e")
+    st = replace(_setup(tmp_path), inputs=("data/store/events.parquet",))
+    cache = _cache(tmp_path)
+    cache.record(st, cache.fingerprint(st), "miss")  # a pandas run
+
+    assert cache.is_hit(*for_engine([st], "pandas"), cache.fingerprint(st))
+    for engine in ("streaming", "duckdb"):
+        (other,) = for_engine([st], engine)
+        assert not cache.is_hit(other, cache.fingerprint(other))
+    # run options add up rather than replace each other
+    stages = {s.name: s for s in with_approx(with_index(for_engine(STAGES, "streaming")))}
+    assert stages["first_metrics"].params == "streaming,index,approx"
+    assert stages["opac_by_week"].params == "streaming"
@@ -0,0 +1,121 @@
+import duckdb
+import numpy as np
+import pandas as pd
+
+from beamcart_metrics import ROOT, cube
+from beamcart_metrics.churn import activity, lifecycle
+
+
+def _sessions(seed=0, n=400):
+    rng = np.random.default_rng(seed)
+    ts = pd.Timestamp("2025-10-27") + pd.to_timedelta(rng.integers(0, 70 * 24, n), unit="h")
+    users = rng.choice([f"u{i}" for i in range(40)], n)
+    return pd.DataFrame({"user_id": pd.Categorical(users), "event_ts": ts})
+
+
+def _expected(sessions):
+    """Per-week Python sets, the way churn_weekly.py used to do it."""
+    wk = sessions["event_ts"].dt.to_period("W-SUN").dt.start_time
+    sets = {w: set(sessions.loc[wk == w, "user_id"]) for w in sorted(wk.unique())}
+    weeks = list(sets)
+    rows, seen = [], set()
+    for i, w in enumerate(weeks):
+        cur = sets[w]
+        if i:
+            prev = sets[weeks[i - 1]]
+            last = {u: max(j for j in range(i) if u in sets[weeks[j]]) for u in seen - cur}
+            rows.append(
+                {
+                    "week_start": w,
+                    "active_t_minus_1": len(prev),
+                    "churned_users": len(prev - cur),
+                    "retained_users": len(prev & cur),
+                    "new_users": len(cur - seen),
+                    "resurrected_users": len((cur & seen) - prev),
+                    "inactive_2plus": sum(i - j >= 2 for j in last.values()),
+                }
+            )
+        seen |= cur
+    return pd.DataFrame(rows)
+
+
+def test_lifecycle_matches_per_week_sets():
+    sessions = _sessions()
+    got = lifecycle(activity(sessions), gaps=(2,))
+    exp = _expected(sessions)
+
+    assert got.columns[:4].tolist() == [
+        "week_start",
+        "active_t_minus_1",
+        "churned_users",
+        "churn_rate",
+    ]
+    for c in exp.columns:
+        assert got[c].tolist() == exp[c].tolist(), c
+    assert got["churn_rate"].tolist() == (exp["churned_users"] / exp["active_t_minus_1"]).tolist()
+    assert (got["retained_users"] + got["churned_users"] == got["active_t_minus_1"]).all()
+
+
+def test_monthly_periods():
+    sessions = pd.DataFrame(
+        {
+            "user_id": ["a", "b", "a", "c", "b"],
+            "event_ts": pd.to_datetime(
+                ["2025-10-30", "2025-10-31", "2025-11-02", "2025-11-20", "2025-12-01"]
+            ),
+        }
+    )
+    out = lifecycle(activity(sessions, by="month"))
+    assert out["month"].tolist() == ["2025-11", "2025-12"]
+    assert out["churned_users"].tolist() == [1, 2]
+    assert out["resurrected_users"].tolist() == [0, 1]
+    assert out["inactive_2plus"].tolist() == [0, 0]
+
+
+def test_sessions_without_a_timestamp_are_not_a_period():
+    sessions = _sessions(n=100)
+    with_null = pd.concat(
+        [sessions, pd.DataFrame({"user_id": ["u1"], "event_ts": [pd.NaT]})], ignore_index=True
+    )
+    with_null["user_id"] = with_null["user_id"].astype("category")
+
+    for by in ("week", "month"):
+        got = lifecycle(activity(with_null, by=by))
+        pd.testing.assert_frame_equal(got, lifecycle(activity(sessions, by=by)))
+
+
+def test_a_week_without_activity_breaks_the_chain():
+    weeks = {"a": [0, 1, 3], "b": [0, 3, 4], "c": [0]}  # nobody active in week 2
+    sessions = pd.DataFrame(
+        [
+            (u, pd.Timestamp("2025-10-27") + pd.Timedelta(weeks=w, hours=9))
+            for u, ws in weeks.items()
+            for w in ws
+        ],
+        columns=["user_id", "event_ts"],
+    ).assign(event_type="session_start")
+    got = lifecycle(activity(sessions), gaps=(2,))
+
+    # week 3 follows an empty week: no row (a is not "retained" from week 1)
+    assert got["week_start"].dt.strftime("%m-%d").tolist() == ["11-03", "11-24"]
+    assert got["active_t_minus_1"].tolist() == [3, 2]
+    assert got["churned_users"].tolist() == [2, 1]
+    assert got["retained_users"].tolist() == [1, 1]
+    assert got["inactive_2plus"].tolist() == [0, 1]  # c, gone since week 0
+
+    sql = (ROOT / "sql" / "churn_rate.sql").read_text()
+    con = duckdb.connect()
+    con.register("events", sessions)
+    expected = con.sql(sql).df()
+    cols = ["active_t_minus_1", "churned_users", "churn_rate"]
+    assert got["week_start"].tolist() == expected["week_start"].tolist()
+    assert got[cols].to_numpy().tolist() == expected[cols].to_numpy().tolist()
+
+    users = pd.DataFrame({"user_id": list(weeks), "acquisition_channel": "ads", "country": "US"})
+    orders = pd.DataFrame(columns=["order_id", "user_id", "order_ts", "revenue", "is_refund"])
+    orders = orders.astype({"order_ts": "datetime64[ns]", "revenue": float, "is_refund": int})
+    totals = cube.level(cube.segment_cube(users, sessions, orders))
+    pd.testing.assert_frame_equal(
+        totals.merge(got[["week_start"]])[["week_start", *cols]],
+        got[["week_start", *cols]],
+    )
@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+from beamcart_metrics import FrameContext, cube, metrics
+from beamcart_metrics.churn import activity, lifecycle
+from beamcart_metrics.parity import BY_NAME, report_json, report_markdown, run_checks
+
+
+@pytest.fixture
+def ctx(tmp_path, write_random_raw):
+    write_random_raw(tmp_path / "raw")
+    ctx = FrameContext(tmp_path / "raw", tmp_path / "store", db_path=tmp_path / "b.duckdb")
+    yield ctx
+    ctx.reset()
+
+
+def test_week_totals_are_the_weekly_kpis(ctx):
+    totals = cube.level(cube.segment_cube(ctx.users, ctx.sessions, ctx.orders))
+    opac = metrics.opac_by_week(
+        metrics.wau_by_week(ctx.sessions), metrics.net_orders_by_week(ctx.orders)
+    )
+    refunds = metrics.refund_rate_by_week(metrics.refunds_by_week(ctx.orders))
+    churn = lifecycle(activity(ctx.sessions))
+
+    def same(cols, expected):
+        got = totals.merge(expected[["week_start"]], on="week_start")[["week_start", *cols]]
+        pd.testing.assert_frame_equal(got, expected[["week_start", *cols]].reset_index(drop=True))
+
+    same(["wau", "orders_net", "revenue_net", "opac"], opac)
+    same(["all_orders", "refund_orders", "refund_rate"], refunds)
+    same(["active_t_minus_1", "churned_users", "churn_rate"], churn)
+
+
+def test_cells_add_up_to_every_rollup(ctx):
+    out = cube.segment_cube(ctx.users, ctx.sessions, ctx.orders)
+    cells = cube.level(out, *cube.DIMENSIONS)
+    counts = [*cube.COUNTS, "revenue_net"]
+    for dims in [("acquisition_channel",), ("country",), ()]:
+        rolled = cells.groupby(["week_start", *dims], observed=True)[counts].sum()
+        got = cube.level(out, *dims).set_index(["week_start", *dims])[counts]
+        pd.testing.assert_frame_equal(got, rolled, check_index_type=False)
+    # the channel cut is the per-channel OPAC table
+    by_channel = cube.level(out, "acquisition_channel")
+    py = metrics.opac_by_channel_week(ctx.users, ctx.sessions, ctx.orders)
+    assert by_channel[["wau", "orders_net"]].to_numpy().tolist() == (
+        py[["wau", "orders_net"]].to_numpy().tolist()
+    )
+    with pytest.raises(ValueError, match="unknown dimensions"):
+        cube.level(out, "city")
+
+
+def test_sql_cube_matches_the_parquet_cube(ctx, tmp_path):
+    out = cube.segment_cube(ctx.users, ctx.sessions, ctx.orders)
+    cube.write(out, tmp_path / "segment_cube.parquet")
+    pd.testing.assert_frame_equal(cube.read(tmp_path / "segment_cube.parquet"), out)
+
+    results = run_checks(ctx.db, [BY_NAME["segment_cube"]], tmp_path)
+    report = report_json(results, 0.0)
+    assert report["ok"], report_markdown(report)
+    assert results[0].rows == len(out)
+
+
+def test_a_session_without_timestamp_is_left_out(tmp_path, write_random_raw):
+    raw = tmp_path / "raw"
+    write_random_raw(raw)
+    with (raw / "events.csv").open("a") as f:
+        f.write("u0001,,session_start\n")
+    ctx = FrameContext(raw, tmp_path / "store", db_path=tmp_path / "b.duckdb")
+    assert ctx.sessions["event_ts"].isna().sum() == 1
+
+    out = cube.segment_cube(ctx.users, ctx.sessions, ctx.orders)
+    timed = ctx.sessions[ctx.sessions["event_ts"].notna()]
+    pd.testing.assert_frame_equal(out, cube.segment_cube(ctx.users, timed, ctx.orders))
+    cube.write(out, tmp_path / "segment_cube.parquet")
+    results = run_checks(ctx.db, [BY_NAME["segment_cube"]], tmp_path)
+    assert report_json(results, 0.0)["ok"]
+    ctx.reset()
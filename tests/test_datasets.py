@@ -0,0 +1,99 @@
+import pandas as pd
+import pytest
+
+from beamcart_metrics import datasets, store
+from beamcart_metrics.context import FrameContext
+from beamcart_metrics.pipeline import STAGES, for_dataset
+
+
+def test_use_add_remove_keep_the_active_name_in_the_registry(tmp_path, write_raw):
+    reg = tmp_path / "datasets" / "registry.json"
+    assert datasets.get(registry=reg).name == datasets.DEFAULT
+    write_raw(tmp_path / "mine")
+
+    p = datasets.add("mine", tmp_path / "mine", registry=reg)
+    assert (p.format, p.work_dir) == ("csv", tmp_path / "datasets" / "mine")
+    assert datasets.use("mine", registry=reg) == p
+    assert datasets.get(registry=reg) == p
+    with pytest.raises(ValueError):
+        datasets.add("big", tmp_path / "mine", registry=reg)
+    with pytest.raises(ValueError):
+        datasets.use("nope", registry=reg)
+    with pytest.raises(FileNotFoundError, match="no users.csv"):
+        datasets.add("empty", tmp_path, registry=reg)
+
+    datasets.remove("mine", registry=reg)
+    assert datasets.active_name(registry=reg) == datasets.DEFAULT
+    assert "mine" not in datasets.profiles(registry=reg)
+
+
+def test_describe_from_the_store_manifest_matches_a_scan(tmp_path, write_raw):
+    raw = tmp_path / "raw"
+    write_raw(raw)
+    scanned = datasets.Profile("a", raw, tmp_path / "a")
+    from_manifest = datasets.Profile("b", raw, tmp_path / "b")
+    store.ingest(raw, from_manifest.store_dir)
+
+    meta = datasets.describe(scanned)
+    assert datasets.describe(from_manifest)["tables"] == meta["tables"]
+    assert {n: t["rows"] for n, t in meta["tables"].items()} == store.ingest(raw, tmp_path / "s")
+    assert meta["tables"]["events"]["min_ts"] == "2025-10-27T10:00:00"
+    assert meta["tables"]["orders"]["max_ts"] == "2025-10-29T09:00:00"
+    assert meta["weeks"] == {"first": "2025-10-27", "last": "2025-10-27", "count": 1, "missing": []}
+    assert datasets.cached(scanned) == meta
+
+    # an identical rewrite keeps the sidecar; a changed file invalidates it
+    (raw / "users.csv").write_bytes((raw / "users.csv").read_bytes())
+    assert datasets.describe(scanned)["described"] == meta["described"]
+    events = pd.read_csv(raw / "events.csv")
+    events.loc[2, "event_ts"] = "2025-11-12 08:00:00"
+    events.to_csv(raw / "events.csv", index=False)
+    assert datasets.cached(scanned) is None
+    assert datasets.describe(scanned)["weeks"]["missing"] == ["2025-11-03"]
+
+
+def test_parquet_profile_reads_like_its_csv_twin(tmp_path, write_raw):
+    raw, pq_raw = tmp_path / "raw", tmp_path / "pq"
+    write_raw(raw)
+    pq_raw.mkdir()
+    for name in store.SCHEMAS:
+        store.read_csv_arrow(name, raw).to_pandas().to_parquet(pq_raw / f"{name}.parquet")
+
+    p = datasets.add("pq", pq_raw, registry=tmp_path / "datasets" / "registry.json")
+    assert p.format == "parquet"
+    assert datasets.describe(p)["tables"]["orders"]["rows"] == 2
+    want = FrameContext(raw, tmp_path / "s1").orders
+    got = FrameContext(p.raw_dir, p.store_dir).orders
+    pd.testing.assert_frame_equal(got, want)
+    store.ingest(raw, tmp_path / "s1")
+    store.ingest(p.raw_dir, p.store_dir)
+    want = FrameContext(raw, tmp_path / "s1").orders
+    pd.testing.assert_frame_equal(FrameContext(p.raw_dir, p.store_dir).orders, want)
+
+
+def test_for_dataset_points_the_stages_at_the_profile_files(tmp_path):
+    assert for_dataset(STAGES, datasets.BUILTIN["small"]) is STAGES
+
+    stages = {st.name: st for st in for_dataset(STAGES, datasets.BUILTIN["xl"])}
+
+    assert "seed_synthetic_data" not in stages
+    assert stages["ingest_raw"].inputs == (
+        "data/raw/xl/users.parquet",
+        "data/raw/xl/events.parquet",
+        "data/raw/xl/orders.parquet",
+    )
+    assert all(a.startswith("data/datasets/xl/store/") for a in stages["ingest_raw"].outputs)
+    assert "data/datasets/xl/beamcart.duckdb" in stages["load_duckdb"].outputs
+    # derived state is the profile's own, never the default profile's
+    assert stages["first_metrics"].outputs[0] == "data/datasets/xl/interim/wau_by_week.csv"
+    assert all(
+        a.startswith("data/datasets/xl/")
+        for st in stages.values()
+        for a in st.outputs
+        if not a.startswith("data/raw/")
+    )
+    assert stages["make_wau_chart"].outputs == ("data/datasets/xl/charts/wau_trend.png",)
+    ctx = FrameContext(dataset="xl")
+    assert ctx.interim_dir == datasets.BUILTIN["xl"].work_dir / "interim"
+    assert ctx.charts_dir == datasets.BUILTIN["xl"].work_dir / "charts"
+    assert FrameContext(dataset="small").charts_dir == datasets.CHARTS
@@ -0,0 +1,53 @@
+import pandas as pd
+
+from beamcart_metrics import FrameContext
+from beamcart_metrics.loaders import load_sessions
+from beamcart_metrics.metrics import (
+    aov_by_week,
+    mau_by_month,
+    net_orders_by_week,
+    opac_by_channel_week,
+    opac_by_week,
+    refund_rate_by_week,
+    refunds_by_week,
+    rev_per_wau,
+    wau_by_week,
+)
+
+
+def test_weekly_metrics_on_the_tiny_dataset(tmp_path, write_raw):
+    write_raw(tmp_path)
+    ctx = FrameContext(tmp_path)
+
+    wau = wau_by_week(ctx.sessions)
+    net = net_orders_by_week(ctx.orders)
+    assert wau.to_dict("list") == {"week_start": [pd.Timestamp("2025-10-27")], "wau": [2]}
+    # o2 is a refund: one net order, revenue 10
+    assert net[["orders_net", "revenue_net"]].values.tolist() == [[1, 10.0]]
+
+    assert aov_by_week(net)["aov"].tolist() == [10.0]
+    assert opac_by_week(wau, net)["opac"].tolist() == [0.5]
+    assert rev_per_wau(wau, net)["rev_per_wau"].tolist() == [5.0]
+    assert refund_rate_by_week(refunds_by_week(ctx.orders))["refund_rate"].tolist() == [0.5]
+    assert mau_by_month(ctx.sessions).astype({"month": str}).values.tolist() == [["2025-10", 2]]
+
+
+def test_opac_by_channel_week(tmp_path, write_raw):
+    write_raw(tmp_path)
+    ctx = FrameContext(tmp_path)
+
+    out = opac_by_channel_week(ctx.users, ctx.sessions, ctx.orders)
+
+    assert out["acquisition_channel"].astype(str).tolist() == ["organic", "paid"]
+    assert out["wau"].tolist() == [1, 1]
+    assert out["orders_net"].tolist() == [0, 1]
+    assert out["opac"].tolist() == [0.0, 1.0]
+
+
+def test_load_sessions_combines_filters(tmp_path, write_raw):
+    write_raw(tmp_path)
+    late = [("event_ts", ">=", pd.Timestamp("2025-10-28"))]
+
+    sessions = load_sessions(tmp_path, tmp_path / "store", filters=late)
+
+    assert sessions["user_id"].astype(str).tolist() == ["u2"]
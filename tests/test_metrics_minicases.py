@@ -1,6 +1,8 @@
 import numpy as np
 import pandas as pd
 
+from beamcart_metrics.orders import order_totals
+
 
 # --- Test 1: Refund exclusion & empty-AOV weeks are retained ---
 def test_refund_exclusion_keeps_week_and_sets_aov_nan():
@@ -24,11 +26,7 @@ def test_refund_exclusion_keeps_week_and_sets_aov_nan():
         orders["order_ts"] - pd.to_timedelta(orders["order_ts"].dt.weekday, unit="D")
     ).dt.normalize()
 
-    grp = orders.groupby("week_start", as_index=False)
-    aov_by_week = grp.agg(
-        orders_net=("is_refund", lambda s: (s == 0).sum()),
-        revenue_net=("revenue", lambda s: s.where(orders.loc[s.index, "is_refund"] == 0, 0).sum()),
-    )
+    aov_by_week = order_totals(orders, "week_start")
     aov_by_week["aov"] = aov_by_week["revenue_net"] / aov_by_week["orders_net"]
     aov = aov_by_week.set_index("week_start")
 
@@ -41,6 +39,9 @@ def test_refund_exclusion_keeps_week_and_sets_aov_nan():
     assert aov.loc[w2, "orders_net"] == 2
     assert aov.loc[w2, "revenue_net"] == 100.0
     assert aov.loc[w2, "aov"] == 50.0
+    # refund counts come from the same pass
+    assert aov["all_orders"].tolist() == [2, 2]
+    assert aov["refund_orders"].tolist() == [2, 0]
 
 
 # --- Test 2: Churn is counted at t only for users active in t-1 and missing in t (no double count) ---
@@ -0,0 +1,118 @@
+import json
+
+import pandas as pd
+import pytest
+
+from beamcart_metrics import FrameContext, metrics
+from beamcart_metrics.parity import (
+    BY_NAME,
+    CHECKS,
+    Check,
+    Sample,
+    compare,
+    coverage,
+    report_json,
+    report_markdown,
+    run_checks,
+    sample_connection,
+    sample_frames,
+)
+
+WEEKS = ["2025-10-27", "2025-11-03", "2025-11-10"]
+
+
+def _sql_side(**cols):
+    return pd.DataFrame({"week_start": pd.to_datetime(WEEKS), **cols})
+
+
+def test_compare_matches_within_tolerance_and_nan_equals_nan():
+    check = Check("t", "x", "x", ("week_start",), ("n",), ("rate",), rtol=1e-9)
+    py = pd.DataFrame({"week_start": WEEKS, "n": [1, 2, 3], "rate": [0.5, float("nan"), 0.1]})
+    sql = _sql_side(n=[1, 2, 3], rate=[0.5 + 1e-12, float("nan"), 0.1])
+
+    res = compare(check, py, sql)
+
+    assert res.ok and res.rows == 3 and res.max_abs_diff["rate"] < 1e-11
+
+
+def test_compare_reports_value_and_missing_row_mismatches():
+    check = Check("t", "x", "x", ("week_start",), ("n",), ("rate",))
+    py = pd.DataFrame({"week_start": WEEKS[:2], "n": [1, 2], "rate": [0.5, 0.25]})
+    sql = _sql_side(n=[1, 5, 3], rate=[0.5, 0.25, 0.1])
+
+    res = compare(check, py, sql)
+
+    assert not res.ok
+    assert res.mismatched_rows == 2
+    assert res.mismatched_columns == ["missing", "n", "rate"]
+    assert [r["side"] for r in res.diff] == ["both", "right_only"]
+    assert "❌" in report_markdown(report_json([res], 0.1))
+
+
+def test_compare_rounds_the_sql_side_for_stored_rates():
+    check = BY_NAME["retention"]
+    py = pd.DataFrame(
+        {
+            "signup_date": ["2025-10-01"],
+            "cohort_size": [3],
+            "d1_retention": [0.3333],
+            "d7_retention": [0.0],
+            "d30_retention": [0.6667],
+        }
+    )
+    sql = py.assign(signup_date=pd.to_datetime(py["signup_date"]), d1_retention=[1 / 3])
+    sql["d30_retention"] = 2 / 3
+    assert compare(check, py, sql).ok
+
+
+def test_run_checks_over_one_connection(tmp_path, write_random_raw):
+    write_random_raw(tmp_path / "raw")
+    ctx = FrameContext(tmp_path / "raw", tmp_path / "store", db_path=tmp_path / "b.duckdb")
+    interim = tmp_path / "interim"
+    interim.mkdir()
+    wau = metrics.wau_by_week(ctx.sessions)
+    metrics.opac_by_week(wau, metrics.net_orders_by_week(ctx.orders)).to_csv(
+        interim / "opac_by_week.csv", index=False
+    )
+    wau.to_csv(interim / "wau_by_week.csv", index=False)
+
+    results = run_checks(ctx.db, [BY_NAME["wau"], BY_NAME["opac"]], interim, threads=2)
+    report = report_json(results, 0.0, engine="pandas")
+
+    assert [r.name for r in results] == ["wau", "opac"]
+    assert report["ok"], report_markdown(report)
+    assert (interim / "wau_by_week_sql.csv").exists()  # save_sql
+    assert json.loads(json.dumps(report))["checks"][0]["rows"] == len(wau)
+    ctx.reset()
+
+
+def test_sample_parse():
+    assert Sample.parse() is None
+    assert Sample.parse("2/8") == Sample(shards=8, verify=(0, 1))
+    assert Sample.parse(weeks=4) == Sample(weeks=4)
+    for bad in ("0/4", "5/4", "1-4"):
+        with pytest.raises(ValueError):
+            Sample.parse(bad)
+    with pytest.raises(ValueError):
+        Sample.parse(weeks=0)
+
+
+def test_sampled_checks_recompute_both_sides_on_the_slice(tmp_path, write_random_raw):
+    write_random_raw(tmp_path / "raw")
+    ctx = FrameContext(tmp_path / "raw", tmp_path / "store", db_path=tmp_path / "b.duckdb")
+    ctx.db
+    interim = tmp_path / "interim"
+    interim.mkdir()
+
+    with sample_connection(ctx.db_path, Sample.parse("1/3", weeks=4)) as con:
+        frames = sample_frames(con)
+        results = run_checks(con, CHECKS, interim, threads=2, frames=frames)
+        cov = coverage(con)
+
+    report = report_json(results, 0.0, mode="sampled", sample={}, coverage=cov)
+    assert report["ok"], report_markdown(report)
+    assert not list(interim.iterdir())  # sampled runs save no SQL results
+    assert 0 < cov["users"]["fraction"] < 0.6 and cov["events"]["fraction"] < 0.5
+    assert cov["weeks"]["count"] == 4
+    assert frames.users["user_id"].nunique() == cov["users"]["rows"]
+    ctx.reset()
@@ -0,0 +1,45 @@
+import io
+
+import pandas as pd
+
+from beamcart_metrics import FrameContext, store
+from beamcart_metrics.loaders import memory_report
+
+
+def test_context_loads_each_table_once_and_types_columns(tmp_path, write_raw):
+    write_raw(tmp_path)
+    ctx = FrameContext(tmp_path)
+
+    assert ctx.events is ctx.events  # cached, not re-read
+    assert pd.api.types.is_datetime64_any_dtype(ctx.events["event_ts"])
+    assert pd.api.types.is_integer_dtype(ctx.orders["is_refund"])
+    assert list(ctx.sessions["event_type"].unique()) == ["session_start"]
+    assert len(ctx.sessions) == 2
+
+
+def test_context_reset_rereads_raw(tmp_path, write_raw):
+    write_raw(tmp_path)
+    ctx = FrameContext(tmp_path)
+    assert len(ctx.users) == 2
+
+    pd.read_csv(tmp_path / "users.csv").head(1).to_csv(tmp_path / "users.csv", index=False)
+    assert len(ctx.users) == 2
+    ctx.reset()
+    assert len(ctx.users) == 1
+
+
+def test_loaded_frames_are_compact_and_within_the_memory_budget(tmp_path, write_raw):
+    write_raw(tmp_path / "raw")
+    store.ingest(tmp_path / "raw", tmp_path / "store")
+    ctx = FrameContext(tmp_path / "raw", tmp_path / "store")
+    out = io.StringIO()
+
+    report = memory_report({"events": ctx.events, "orders": ctx.orders}, file=out)
+
+    assert ctx.orders["order_id"].dtype == "string[pyarrow]"
+    assert ctx.events["user_id"].cat.codes.dtype == "int8"
+    before = report.set_index(["table", "column"])["before_bytes"]
+    naive = pd.read_csv(tmp_path / "raw" / "orders.csv")["order_id"]
+    assert before["orders", "order_id"] == naive.memory_usage(deep=True, index=False)
+    assert (report["after_bytes"] <= report["budget_bytes"]).all()
+    assert "over budget" not in out.getvalue()
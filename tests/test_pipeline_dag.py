@@ -0,0 +1,98 @@
+from pathlib import Path
+
+from beamcart_metrics.pipeline import (
+    APPROX_STAGES,
+    INDEX_STAGES,
+    STAGES,
+    Stage,
+    critical_path,
+    database,
+    dependencies,
+    for_engine,
+    store,
+    with_approx,
+    with_index,
+)
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_registry_scripts_exist_and_sources_are_on_disk():
+    produced = {a for st in STAGES for a in st.outputs}
+    for st in STAGES:
+        assert (ROOT / st.script).exists(), st.script
+        assert "def main(ctx" in (ROOT / st.script).read_text(), st.script
+        for a in st.inputs:
+            assert a in produced or (ROOT / a).exists(), f"{st.name}: {a}"
+
+
+def test_independent_stages_have_no_edges_between_them():
+    deps = dependencies(STAGES)
+    assert (
+        deps["retention_cohorts"] == deps["churn_weekly"] == deps["compute_mau"] == {"ingest_raw"}
+    )
+    assert deps["make_cohort_heatmap"] == {"retention_cohorts"}
+    assert deps["make_wau_chart"] == {"first_metrics"}
+    assert {"load_duckdb", "churn_weekly", "retention_cohorts"} <= deps["sql_parity"]
+    assert "load_duckdb" not in deps["first_metrics"]
+
+
+def test_duckdb_engine_reads_the_database_and_keeps_no_partials():
+    stages = {st.name: st for st in for_engine(STAGES, "duckdb")}
+    deps = dependencies(list(stages.values()))
+
+    assert stages["load_duckdb"].inputs == store("users", "events", "orders")
+    assert stages["opac_by_week"].inputs == database()
+    assert not any("_partials" in a for st in stages.values() for a in st.outputs)
+    assert deps["first_metrics"] == {"load_duckdb"}
+    assert for_engine(STAGES, "pandas") is STAGES
+
+
+def test_overwritten_artifact_keeps_serial_order():
+    deps = dependencies(STAGES)
+    # both write aov_by_week.csv: the later writer waits, readers see the later one
+    assert "first_metrics" in deps["recompute_aov_pandas"]
+    assert "recompute_aov_pandas" in deps["sql_parity"]
+    assert "recompute_aov_pandas" in deps["decomposition_check"]
+
+
+def test_writer_waits_for_earlier_readers():
+    stages = [
+        Stage("a.py", (), ("x",)),
+        Stage("b.py", ("x",), ("y",)),
+        Stage("c.py", (), ("x",)),
+    ]
+    assert dependencies(stages)["c"] == {"a", "b"}
+
+
+def test_critical_path_follows_longest_chain():
+    stages = [
+        Stage("load.py", (), ("raw",)),
+        Stage("fast.py", ("raw",), ("f",)),
+        Stage("slow.py", ("raw",), ("s",)),
+        Stage("report.py", ("f", "s"), ("r",)),
+    ]
+    secs = {"load": 1.0, "fast": 0.5, "slow": 3.0, "report": 0.2}
+    assert critical_path(stages, dependencies(stages), secs) == ["load", "slow", "report"]
+
+
+def test_approx_mode_builds_sketches_before_the_distinct_count_stages():
+    stages = {st.name: st for st in with_approx(STAGES)}
+    deps = dependencies(list(stages.values()))
+
+    assert deps["build_sketches"] == {"ingest_raw"}
+    for name in APPROX_STAGES:
+        assert "build_sketches" in deps[name] and stages[name].params == "approx"
+    assert not any("first_metrics_wau" in a for a in stages["first_metrics"].outputs)
+    assert with_approx(STAGES, approx=False) is STAGES
+
+
+def test_index_mode_builds_the_activity_index_before_its_readers():
+    stages = {st.name: st for st in with_index(STAGES)}
+    deps = dependencies(list(stages.values()))
+
+    assert deps["build_user_days"] == {"ingest_raw"}
+    for name in INDEX_STAGES:
+        assert "build_user_days" in deps[name] and "index" in stages[name].params
+    assert not any("first_metrics_wau" in a for a in stages["first_metrics"].outputs)
+    assert with_index(STAGES, index=False) is STAGES
@@ -0,0 +1,69 @@
+import json
+import pstats
+
+import numpy as np
+import pandas as pd
+
+from beamcart_metrics import profiling, store
+from beamcart_metrics.pipeline import Stage, StageResult
+
+
+def test_probe_measures_the_block_and_dumps_cprofile(tmp_path):
+    with profiling.Probe(tmp_path / "p" / "stage.prof") as probe:
+        block = np.ones(64 * 2**20 // 8)  # 64 MiB
+        (tmp_path / "out.bin").write_bytes(block.tobytes()[: 1 << 20])
+        del block
+
+    stats = probe.stats
+    assert stats["wall_s"] > 0 and stats["cpu_s"] > 0
+    assert stats["peak_rss_mb"] >= 64
+    if stats["written_bytes"] is not None:  # Linux
+        assert stats["written_bytes"] >= 1 << 20
+    assert pstats.Stats(str(tmp_path / "p" / "stage.prof")).total_calls > 0
+    assert "cumulative" in (tmp_path / "p" / "stage.txt").read_text()
+
+
+def test_artifact_rows_and_bytes(tmp_path, write_random_raw):
+    write_random_raw(tmp_path / "data" / "raw")
+    store.ingest(tmp_path / "data" / "raw", tmp_path / "data" / "store")
+    pd.DataFrame({"a": range(7)}).to_csv(tmp_path / "x.csv", index=False)
+    stage = Stage(
+        "scripts/x.py",
+        ("data/raw/orders.csv", "data/store/events", "x.csv"),
+        ("missing.csv", "chart.png"),
+    )
+    (tmp_path / "chart.png").write_bytes(b"\0" * 10)
+
+    out = profiling.artifacts(stage, root=tmp_path)
+
+    assert out["rows_in"] == 800 + 5_000 + 7  # manifest, Parquet footers, CSV lines
+    assert out["bytes_in"] > (tmp_path / "data" / "raw" / "orders.csv").stat().st_size
+    assert out["rows_out"] is None and out["bytes_out"] == 10
+
+
+def _record(jobs, **walls):
+    results = [
+        StageResult(n, ok=True, cached=w is None, profile={} if w is None else _stats(w))
+        for n, w in walls.items()
+    ]
+    return profiling.run_record(results, {"engine": "pandas"}, jobs, 0.0, 1.0)
+
+
+def _stats(wall):
+    return {"wall_s": wall, "cpu_s": wall, "peak_rss_mb": 100.0, "read_bytes": 0}
+
+
+def test_summary_compares_each_stage_with_its_last_comparable_run(tmp_path):
+    history = tmp_path / "h.jsonl"
+    profiling.save(_record(1, a=1.0, b=2.0), tmp_path / "p.json", history)
+    profiling.save(_record(1, a=None, b=2.1), tmp_path / "p.json", history)  # a cached
+    profiling.save(_record(4, a=9.0, b=9.0), tmp_path / "p.json", history)  # other jobs
+    assert json.loads((tmp_path / "p.json").read_text())["run"]["jobs"] == 4
+
+    now = _record(1, a=3.0, b=2.1)
+    past = profiling.baseline(now, history)
+    assert {k: v["wall_s"] for k, v in past.items()} == {"a": 1.0, "b": 2.1}
+
+    lines = profiling.summary(now, past).splitlines()
+    assert lines[2].startswith("a ") and lines[2].endswith("+200% ⚠️")
+    assert lines[3].startswith("b ") and lines[3].endswith("+0%")
@@ -0,0 +1,69 @@
+import pandas as pd
+
+from beamcart_metrics.retention import (
+    cohort_sizes,
+    day_offsets,
+    dn_retention,
+    retention_counts,
+    retention_matrix,
+)
+
+
+def _frames():
+    users = pd.DataFrame(
+        {
+            "user_id": pd.Categorical(["a", "b", "c"]),
+            "signup_ts": pd.to_datetime(
+                ["2025-10-27 23:00", "2025-10-27 08:00", "2025-10-28 12:00"]
+            ),
+        }
+    )
+    sessions = pd.DataFrame(
+        {
+            "user_id": pd.Categorical(["a", "a", "a", "b", "c", "zz"]),
+            "event_ts": pd.to_datetime(
+                [
+                    "2025-10-28 00:30",  # a: D1 (calendar day, not 24h)
+                    "2025-10-28 09:00",  # a: D1 again -> counted once
+                    "2025-11-03 10:00",  # a: D7
+                    "2025-11-03 07:00",  # b: D7
+                    "2025-10-29 01:00",  # c: D1
+                    "2025-10-28 00:00",  # unknown user -> dropped
+                ]
+            ),
+        }
+    )
+    return users, sessions
+
+
+def test_day_offsets_are_distinct_per_user():
+    users, sessions = _frames()
+    pairs = day_offsets(users, sessions)
+    assert sorted(zip(pairs["user"], pairs["day_offset"])) == [(0, 1), (0, 7), (1, 7), (2, 1)]
+
+
+def test_counts_match_the_per_offset_join():
+    users, sessions = _frames()
+    counts = retention_counts(users, sessions, [1, 7, 30])
+
+    ue = users.assign(signup_date=users["signup_ts"].dt.normalize()).merge(
+        sessions.assign(event_day=sessions["event_ts"].dt.normalize()), on="user_id", how="left"
+    )
+    for n in (1, 7, 30):
+        hit = ue[ue["event_day"] == ue["signup_date"] + pd.Timedelta(days=n)]
+        expected = hit.groupby("signup_date")["user_id"].nunique()
+        assert counts[n].to_dict() == expected.reindex(counts.index, fill_value=0).to_dict()
+
+    d7 = dn_retention(cohort_sizes(users), counts, 7)
+    assert d7.columns.tolist() == ["signup_date", "cohort_size", "d7_users", "d7_retention"]
+    assert d7["d7_retention"].tolist() == [1.0, 0.0]
+
+
+def test_weekly_buckets_and_matrix():
+    users, sessions = _frames()
+    weeks = retention_counts(users, sessions, [0, 1], bucket_days=7)
+    assert weeks.to_dict("list") == {0: [1, 1], 1: [2, 0]}
+
+    matrix = retention_matrix(cohort_sizes(users), weeks, prefix="w")
+    assert matrix.columns.tolist() == ["signup_date", "cohort_size", "w0", "w1"]
+    assert matrix["w0"].tolist() == [0.5, 1.0]
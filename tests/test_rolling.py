@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from beamcart_metrics import rolling
+
+
+def _sessions(rows):
+    return pd.DataFrame(
+        {
+            "user_id": [u for u, _ in rows],
+            "event_ts": pd.to_datetime([ts for _, ts in rows]).astype("datetime64[s]"),
+        }
+    )
+
+
+def test_windows_and_histogram_equal_a_rescan_of_every_day():
+    rng = np.random.default_rng(5)
+    n = 3_000
+    start = np.datetime64("2025-09-01T00:00:00", "s")
+    sessions = pd.DataFrame(
+        {
+            "user_id": rng.choice([f"u{i}" for i in range(150)], n),
+            "event_ts": start + rng.integers(0, 80 * 86_400, n).astype("timedelta64[s]"),
+        }
+    )
+    act = rolling.active_days(sessions)
+    daily = rolling.daily_actives(act).set_index("day")
+    hist = rolling.active_days_histogram(act).set_index(["day", "days_active"])["users"]
+
+    day = sessions["event_ts"].dt.normalize()
+    assert len(daily) == (day.max() - day.min()).days + 1
+    for d in daily.index:
+        for col, w in (("dau", 1), ("l7", 7), ("l28", 28)):
+            in_window = sessions[(day > d - pd.Timedelta(days=w)) & (day <= d)]
+            assert daily.loc[d, col] == in_window["user_id"].nunique()
+        in_28 = (day > d - pd.Timedelta(days=28)) & (day <= d)
+        k = day[in_28].groupby(sessions.loc[in_28, "user_id"]).nunique().value_counts()
+        assert hist.loc[d].sort_index().to_dict() == k.sort_index().to_dict()
+        assert hist.loc[d].sum() == daily.loc[d, "l28"]
+
+
+def test_gaps_repeats_and_missing_users():
+    sessions = _sessions(
+        [
+            ("a", "2025-01-01 08:00"),
+            ("a", "2025-01-01 20:00"),  # same day twice
+            ("b", "2025-01-03 09:00"),
+            (None, "2025-01-05 09:00"),  # no user: not counted
+            ("a", "2025-03-01 09:00"),  # after a 28+ day gap
+        ]
+    )
+    daily = rolling.daily_actives(rolling.active_days(sessions)).set_index("day")
+
+    assert daily.loc["2025-01-01", ["dau", "l7", "l28"]].tolist() == [1, 1, 1]
+    assert daily.loc["2025-01-05", ["dau", "l7", "l28"]].tolist() == [0, 2, 2]
+    assert daily.loc["2025-01-30", "l28"] == 1  # b still in the window, a dropped out
+    assert np.isnan(daily.loc["2025-02-15", "stickiness"])  # nobody in the last 28 days
+    assert daily.loc["2025-03-01", "stickiness"] == 1.0
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from beamcart_metrics import FrameContext, metrics, sketch
+from beamcart_metrics.buckets import week_start
+from beamcart_metrics.parity import BY_NAME, compare
+
+
+def _registers(ids) -> np.ndarray:
+    reg = np.zeros(sketch.M, dtype=np.uint8)
+    index, rank = sketch.registers_of(sketch.hash_ids(ids))
+    np.maximum.at(reg, index, rank)
+    return reg
+
+
+@pytest.mark.parametrize("n", [0, 1, 50, 5_000, 200_000])
+def test_estimates_are_within_the_standard_error(n):
+    ids = [f"u{i}" for i in range(n)]
+    (est,) = sketch.estimate(_registers(ids + ids[: n // 2]))  # repeats do not count
+    assert abs(est - n) <= max(4 * sketch.STD_ERROR * n, 0.5)
+
+
+def test_merged_sketches_estimate_the_union():
+    a, b = [f"u{i}" for i in range(30_000)], [f"u{i}" for i in range(20_000, 60_000)]
+    merged = np.maximum(_registers(a), _registers(b))
+    assert (merged == _registers(a + b)).all()
+
+
+@pytest.fixture
+def built(tmp_path, write_random_raw):
+    write_random_raw(tmp_path / "raw")
+    ctx = FrameContext(tmp_path / "raw", tmp_path / "store")
+    sketch.build(ctx.raw_dir, ctx.store_dir).save(tmp_path / "sk.parquet")
+    return ctx, sketch.Sketches.load(tmp_path / "sk.parquet")
+
+
+def test_rollups_of_the_persisted_sketches_match_the_exact_counts(built):
+    ctx, sk = built
+    sessions = ctx.sessions
+    assert set(sk.keys["grain"]) == {"week", "month"}
+
+    wau, exact = sketch.wau_by_week(sk), metrics.wau_by_week(sessions)
+    assert (wau["approximate"] == "wau").all()
+    assert (wau["week_start"] == exact["week_start"]).all()
+    np.testing.assert_allclose(wau["wau"], exact["wau"], rtol=sketch.APPROX_RTOL)
+
+    mau, exact = sketch.mau_by_month(sk), metrics.mau_by_month(sessions)
+    assert list(mau["month"]) == list(exact["month"].astype(str))
+    np.testing.assert_allclose(mau["mau"], exact["mau"], rtol=sketch.APPROX_RTOL)
+
+    # country x 2-week windows, merged from the stored sketches only
+    s = sessions.merge(ctx.users[["user_id", "country"]], on="user_id")
+    week = week_start(s["event_ts"])
+    rolled = sketch.active_users(sk, "week", ("country",), window=2)
+    for _, row in rolled.sample(5, random_state=0).iterrows():
+        in_window = (week > row["week_start"] - pd.Timedelta(days=14)) & (week <= row["week_start"])
+        n = s.loc[in_window & (s["country"] == row["country"]), "user_id"].nunique()
+        assert abs(row["users"] - n) <= sketch.APPROX_RTOL * n
+
+
+def test_channel_opac_estimates_wau_and_keeps_exact_orders(built):
+    ctx, sk = built
+    exact = metrics.opac_by_channel_week(ctx.users, ctx.sessions, ctx.orders)
+    net = metrics.net_orders_by_channel_week(ctx.users, ctx.orders)
+    approx = sketch.opac_by_channel_week(sk, net)
+
+    assert (approx["approximate"] == "wau,opac").all()
+    assert approx["orders_net"].tolist() == exact["orders_net"].tolist()
+    np.testing.assert_allclose(approx["wau"], exact["wau"], rtol=sketch.APPROX_RTOL)
+
+
+def test_parity_compares_flagged_columns_within_the_sketch_tolerance():
+    weeks = pd.to_datetime(["2025-10-27", "2025-11-03"])
+    sql = pd.DataFrame({"week_start": weeks, "wau": [10_000, 20_000]})
+    near = sketch.flagged(sql.assign(wau=[10_100, 19_900]), "wau")
+    far = sketch.flagged(sql.assign(wau=[10_100, 25_000]), "wau")
+
+    assert not compare(BY_NAME["wau"], near.drop(columns="approximate"), sql).ok
+    res = compare(BY_NAME["wau"], near, sql)
+    assert res.ok and res.approximate == ["wau"]
+    assert not compare(BY_NAME["wau"], far, sql).ok
+
+
+def test_sketches_of_other_raw_data_are_rebuilt(built, tmp_path, write_random_raw):
+    ctx, sk = built
+    assert sketch.load_or_build(tmp_path / "sk.parquet", ctx.raw_dir, ctx.store_dir).source
+    write_random_raw(tmp_path / "other", n_users=200, seed=5)  # another profile's raw data
+    other = FrameContext(tmp_path / "other", tmp_path / "other_store")
+
+    got = sketch.load_or_build(tmp_path / "sk.parquet", other.raw_dir, other.store_dir)
+    exact = metrics.wau_by_week(other.sessions)
+    np.testing.assert_allclose(
+        sketch.wau_by_week(got)["wau"], exact["wau"], rtol=sketch.APPROX_RTOL
+    )
+    assert sketch.Sketches.load(tmp_path / "sk.parquet").source == got.source != sk.source
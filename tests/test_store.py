@@ -0,0 +1,163 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from beamcart_metrics import store
+
+
+def test_ingest_partitions_by_iso_week_and_types_columns(tmp_path, write_raw):
+    raw, st = tmp_path / "raw", tmp_path / "store"
+    write_raw(raw)
+    rows = store.ingest(raw, st)
+
+    assert rows == {"users": 2, "events": 3, "orders": 2}
+    assert sorted(os.listdir(st / "events")) == ["week=2025-10-27"]
+    assert store.is_fresh(raw, st)
+
+    events = store.read_table("events", raw_dir=raw, store_dir=st)
+    assert isinstance(events["event_type"].dtype, pd.CategoricalDtype)
+    assert isinstance(events["user_id"].dtype, pd.CategoricalDtype)
+    assert events["event_ts"].dtype == "datetime64[s]"
+    orders = store.read_table("orders", raw_dir=raw, store_dir=st)
+    assert orders["is_refund"].dtype == "int8"
+    assert orders["is_refund"].tolist() == [0, 1]
+
+
+def test_store_and_csv_fallback_read_the_same_frame(tmp_path, write_raw):
+    raw, st = tmp_path / "raw", tmp_path / "store"
+    write_raw(raw)
+    cols = ["user_id", "event_ts"]
+    flt = [("event_type", "=", "session_start")]
+
+    from_csv = store.read_table("events", cols, flt, raw_dir=raw, store_dir=st)
+    store.ingest(raw, st)
+    from_store = store.read_table("events", cols, flt, raw_dir=raw, store_dir=st)
+
+    assert "read_parquet" in store.scan_sql("events", raw, st)
+    pd.testing.assert_frame_equal(from_csv, from_store)
+    assert len(from_store) == 2
+
+
+def test_store_goes_stale_when_csv_changes(tmp_path, write_raw):
+    raw, st = tmp_path / "raw", tmp_path / "store"
+    write_raw(raw)
+    store.ingest(raw, st)
+
+    users = pd.read_csv(raw / "users.csv")
+    pd.concat([users, users.assign(user_id="u9")]).to_csv(raw / "users.csv", index=False)
+
+    assert not store.is_fresh(raw, st)
+    assert "read_csv_auto" in store.scan_sql("users", raw, st)
+    assert len(store.read_table("users", raw_dir=raw, store_dir=st)) == 4
+
+
+def test_rewriting_identical_csv_keeps_store_fresh(tmp_path, write_raw):
+    raw, st = tmp_path / "raw", tmp_path / "store"
+    write_raw(raw)
+    store.ingest(raw, st)
+
+    path = raw / "orders.csv"
+    path.write_bytes(path.read_bytes())
+    os.utime(path, ns=(0, 0))  # new mtime, same content
+
+    assert store.is_fresh(raw, st)
+
+
+@pytest.fixture
+def write_weeks(write_raw):
+    """write_raw with events over three ISO weeks, out of week order in the CSV."""
+
+    def write(raw):
+        write_raw(raw)
+        pd.DataFrame(
+            {
+                "user_id": ["u2", "u1", "u1", "u2", "u1"],
+                "event_ts": [
+                    "2025-11-12 08:00:00",
+                    "2025-10-27 10:00:00",
+                    "2025-11-04 09:00:00",
+                    "2025-10-29 08:00:00",
+                    "2025-11-10 07:00:00",
+                ],
+                "event_type": ["session_start", "session_start", "page_view", "session_start", "x"],
+            }
+        ).to_csv(raw / "events.csv", index=False)
+
+    return write
+
+
+def test_week_reads_match_the_partition_filter(tmp_path, write_weeks):
+    raw, st = tmp_path / "raw", tmp_path / "store"
+    write_weeks(raw)
+    store.ingest(raw, st)
+    index = json.loads((st / store.MANIFEST).read_text())["week_index"]["events"]
+    assert index["weeks"] == {
+        "2025-10-27": [0, 2, 0, 1],
+        "2025-11-03": [2, 1, 1, 1],
+        "2025-11-10": [3, 2, 2, 1],
+    }
+
+    def both(flt, **kw):
+        got = store.read_table("events", raw_dir=raw, store_dir=st, **kw)
+        want = store.read_table("events", filters=flt, raw_dir=raw, store_dir=st)
+        pd.testing.assert_frame_equal(got, want)
+        return got
+
+    picked = both(
+        [("week", "in", ["2025-10-27", "2025-11-10"])], weeks=["2025-11-14", "2025-10-27"]
+    )
+    assert picked["event_ts"].dt.day.tolist() == [27, 29, 12, 10]  # CSV order within a week
+    assert len(both([("week", ">=", "2025-11-03")], since="2025-11-05")) == 3
+    both_flt = [("week", "=", "2025-11-10")]
+    assert len(both(both_flt, weeks=["2025-11-03", "2025-11-10"], since="2025-11-11")) == 2
+    sessions = store.read_table(
+        "events",
+        ["user_id"],
+        [("event_type", "=", "session_start")],
+        raw_dir=raw,
+        store_dir=st,
+        since="2025-11-10",
+    )
+    assert sessions["user_id"].tolist() == ["u2"]
+    with pytest.raises(ValueError, match="not partitioned"):
+        store.read_table("users", raw_dir=raw, store_dir=st, since="2025-11-10")
+
+
+def test_week_reads_fall_back_without_a_fresh_week_index(tmp_path, write_weeks):
+    raw, st = tmp_path / "raw", tmp_path / "store"
+    write_weeks(raw)
+    from_csv = store.read_table("events", raw_dir=raw, store_dir=st, since="2025-11-03")
+    store.ingest(raw, st)
+    manifest = json.loads((st / store.MANIFEST).read_text())
+    del manifest["week_index"]  # a store ingested before the week files
+    (st / store.MANIFEST).write_text(json.dumps(manifest))
+    from_parquet = store.read_table("events", raw_dir=raw, store_dir=st, since="2025-11-03")
+
+    assert len(from_csv) == 3
+
+    def rows(df):  # the CSV keeps file order and only the weeks read in `week`
+        return df.astype({"week": str}).sort_values("event_ts", ignore_index=True)
+
+    pd.testing.assert_frame_equal(rows(from_csv), rows(from_parquet.drop(columns="user_code")))
+
+
+def test_rows_without_a_timestamp_are_in_no_week(tmp_path, write_weeks):
+    raw, st = tmp_path / "raw", tmp_path / "store"
+    write_weeks(raw)
+    with (raw / "events.csv").open("a") as f:
+        f.write("u1,,session_start\n")
+    from_csv = store.read_table("events", raw_dir=raw, store_dir=st, since="2025-11-10")
+    store.ingest(raw, st)
+
+    assert (st / "events" / f"week={store.NULL_WEEK}").is_dir()  # full reads keep the row
+    assert list(store.week_partitions("events", st)) == ["2025-10-27", "2025-11-03", "2025-11-10"]
+    index = json.loads((st / store.MANIFEST).read_text())["week_index"]["events"]
+    assert sum(rows for _, rows, _, _ in index["weeks"].values()) == 5
+    since = store.read_table("events", raw_dir=raw, store_dir=st, since="2025-11-10")
+    assert since["event_ts"].notna().all() and len(since) == len(from_csv) == 2
+    weeks = [None, store.NULL_WEEK, "2025-11-10"]
+    pd.testing.assert_frame_equal(
+        store.read_table("events", raw_dir=raw, store_dir=st, weeks=weeks), since
+    )
@@ -0,0 +1,79 @@
+import pandas as pd
+import pytest
+
+from beamcart_metrics import FrameContext, cube, metrics, rolling, store, streaming
+from beamcart_metrics.churn import activity, lifecycle
+from beamcart_metrics.retention import cohort_sizes, retention_counts
+
+
+@pytest.fixture(params=["store", "csv"])
+def raw(request, tmp_path, write_random_raw):
+    """Random raw tables, read through the Parquet store or (stale store) the CSVs."""
+    write_random_raw(tmp_path / "raw")
+    if request.param == "store":
+        store.ingest(tmp_path / "raw", tmp_path / "store")
+    return tmp_path
+
+
+def _both(raw, batch_rows=700):
+    ctx = FrameContext(raw / "raw", raw / "store")
+    return ctx, streaming.Stream(raw / "raw", raw / "store", batch_rows=batch_rows)
+
+
+def test_streamed_metrics_equal_the_in_memory_ones(raw):
+    ctx, stream = _both(raw)
+    eq = pd.testing.assert_frame_equal
+
+    eq(streaming.wau_by_week(stream), metrics.wau_by_week(ctx.sessions))
+    eq(streaming.net_orders_by_week(stream), metrics.net_orders_by_week(ctx.orders))
+    eq(streaming.refunds_by_week(stream), metrics.refunds_by_week(ctx.orders))
+    eq(
+        streaming.mau_by_month(stream),
+        metrics.mau_by_month(ctx.sessions).astype({"month": str}).reset_index(drop=True),
+    )
+    eq(
+        streaming.opac_by_channel_week(stream).reset_index(drop=True),
+        metrics.opac_by_channel_week(ctx.users, ctx.sessions, ctx.orders).reset_index(drop=True),
+    )
+    for by in ("week", "month"):
+        eq(lifecycle(streaming.activity(stream, by)), lifecycle(activity(ctx.sessions, by)))
+    act = rolling.active_days(ctx.sessions)
+    eq(streaming.daily_actives(stream), rolling.daily_actives(act))
+    eq(streaming.active_days_histogram(stream), rolling.active_days_histogram(act))
+    eq(
+        streaming.segment_cube(stream),
+        cube.segment_cube(ctx.users, ctx.sessions, ctx.orders),
+        check_categorical=False,
+    )
+    pd.testing.assert_series_equal(streaming.cohort_sizes(stream), cohort_sizes(ctx.users))
+    eq(
+        streaming.retention_counts(stream),
+        retention_counts(ctx.users, ctx.sessions),
+        check_names=False,
+    )
+
+    # one pass per table, in bounded batches
+    assert set(stream.stats) == {"events", "orders"}
+    assert stream.stats["events"].rows == len(
+        ctx.events[ctx.events["event_type"] == "session_start"]
+    )
+    assert stream.stats["events"].batches > 1
+
+
+def test_memory_budget_sizes_the_batches_and_is_reported(raw, capsys):
+    small = streaming.batch_rows_for(streaming.rss_mb() + 10)
+    large = streaming.batch_rows_for(streaming.rss_mb() + 1_000)
+    assert streaming.MIN_BATCH_ROWS <= small < large <= streaming.MAX_BATCH_ROWS
+
+    stream = streaming.Stream(raw / "raw", raw / "store", memory_mb=4_096)
+    streaming.wau_by_week(stream)
+    report = stream.report()
+    assert report["memory_mb"] == 4_096 and report["peak_rss_mb"] > 0
+    assert report["passes"]["events"]["peak_rss_mb"] > 0
+    assert "streamed events" in capsys.readouterr().out
+
+
+def test_retention_offsets_outside_the_streamed_range_are_rejected(raw):
+    _, stream = _both(raw)
+    with pytest.raises(ValueError):
+        streaming.retention_counts(stream, [120])
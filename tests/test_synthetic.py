@@ -0,0 +1,61 @@
+import pandas as pd
+import pyarrow.parquet as pq
+
+from beamcart_metrics import load_events, load_orders, load_users
+from beamcart_metrics.buckets import week_index
+from beamcart_metrics.synthetic import Params, generate, generate_chunk
+
+P = Params(users=2_000, weeks=8, chunk_users=500)
+W0 = week_index(pd.Series([pd.Timestamp(P.base_monday)]))[0]
+
+
+def test_output_does_not_depend_on_worker_count(tmp_path):
+    one, two = tmp_path / "one", tmp_path / "two"
+    rows = generate(P, one, "csv", workers=1)
+    assert generate(P, two, "csv", workers=2) == rows
+    for name in ("users", "events", "orders"):
+        assert (one / f"{name}.csv").read_bytes() == (two / f"{name}.csv").read_bytes()
+    assert rows["users"] == 2_000 and rows["events"] > rows["orders"] > 0
+    assert not [p for p in one.iterdir() if p.name.startswith(".")]  # parts cleaned up
+
+
+def test_csv_and_parquet_hold_the_same_rows(tmp_path):
+    generate(P, tmp_path, "csv", workers=1)
+    generate(P, tmp_path, "parquet", workers=1)
+
+    orders = load_orders(tmp_path, tmp_path / "no-store")
+    from_parquet = pq.read_table(tmp_path / "orders.parquet").to_pandas()
+    pd.testing.assert_frame_equal(
+        orders.astype({"user_id": str}),
+        from_parquet.astype(
+            {"order_id": "string[pyarrow]", "user_id": str, "order_ts": "datetime64[s]"}
+        ),
+    )
+    assert orders["order_id"].is_unique
+
+
+def test_knobs_shape_the_data(tmp_path):
+    generate(P, tmp_path, "csv", workers=1)
+    users, events = load_users(tmp_path, tmp_path / "s"), load_events(tmp_path, tmp_path / "s")
+    orders = load_orders(tmp_path, tmp_path / "s")
+    week = week_index(events["event_ts"]) - W0
+
+    # nobody is active before their signup week
+    signup = events[["user_id"]].merge(users, on="user_id", how="left")["signup_ts"]
+    assert (week >= week_index(signup) - W0).all()
+    assert set(week) <= set(range(P.weeks))
+
+    # promo weeks (2, 6) have more sessions per user than their neighbours
+    per_week = pd.Series(week).value_counts().sort_index()
+    assert per_week[2] > per_week[1] and per_week[6] > per_week[5] and per_week[6] > per_week[7]
+
+    # the spike week has the most refunds
+    o_week = week_index(orders["order_ts"]) - W0
+    assert orders.groupby(o_week)["is_refund"].mean().idxmax() == P.refund_spike_week
+
+
+def test_chunks_are_sorted_by_user_then_time():
+    events = generate_chunk(P, 1)["events"].to_pandas()
+    assert events["user_id"].iloc[0] == "u501"
+    ordered = events.assign(user=events["user_id"].cat.codes)
+    assert ordered.equals(ordered.sort_values(["user", "event_ts"], kind="stable"))
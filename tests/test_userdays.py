@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from beamcart_metrics import FrameContext, metrics, rolling, store, userdays
+from beamcart_metrics.churn import activity, lifecycle
+from beamcart_metrics.retention import retention_counts
+
+
+@pytest.fixture
+def indexed(tmp_path, write_random_raw):
+    write_random_raw(tmp_path / "raw")
+    store.ingest(tmp_path / "raw", tmp_path / "store")
+    ud, changed = userdays.build(tmp_path / "raw", tmp_path / "store", tmp_path / "ud.parquet")
+    return tmp_path, FrameContext(tmp_path / "raw", tmp_path / "store"), ud, changed
+
+
+def test_index_metrics_equal_the_groupby_ones(indexed):
+    _, ctx, ud, _ = indexed
+    eq = pd.testing.assert_frame_equal
+
+    eq(userdays.wau_by_week(ud), metrics.wau_by_week(ctx.sessions))
+    eq(userdays.mau_by_month(ud), metrics.mau_by_month(ctx.sessions))
+    for by, gaps in (("week", (2, 4)), ("month", (2,))):
+        eq(userdays.lifecycle(ud, by, gaps), lifecycle(activity(ctx.sessions, by), gaps))
+    eq(userdays.retention_counts(ud, ctx.users), retention_counts(ctx.users, ctx.sessions))
+
+    act = rolling.active_days(ctx.sessions)
+    eq(userdays.daily_actives(ud), rolling.daily_actives(act))
+    eq(userdays.active_days_histogram(ud), rolling.active_days_histogram(act))
+
+
+def test_window_or_matches_a_rescan_of_every_window():
+    bits = np.random.default_rng(0).integers(0, 256, (23, 5), dtype=np.uint8)
+    for window in (1, 3, 7, 30):
+        expected = [np.bitwise_or.reduce(bits[max(0, i - window + 1) : i + 1]) for i in range(23)]
+        assert (userdays.window_or(bits, window) == np.array(expected)).all()
+
+
+def test_a_new_day_re_folds_only_its_week(indexed):
+    tmp, _, _, changed = indexed
+    assert len(changed) == 13  # first build: every week
+
+    events = pd.read_csv(tmp / "raw" / "events.csv")
+    last = pd.to_datetime(events["event_ts"]).max().normalize() + pd.Timedelta(days=1)
+    day = pd.DataFrame(
+        {
+            "user_id": ["u0001", "new-user"],
+            "event_ts": [last + pd.Timedelta(hours=9), last + pd.Timedelta(hours=10)],
+            "event_type": "session_start",
+        }
+    )
+    pd.concat([events, day]).to_csv(tmp / "raw" / "events.csv", index=False)
+    store.ingest(tmp / "raw", tmp / "store")
+
+    ud, changed = userdays.build(tmp / "raw", tmp / "store", tmp / "ud.parquet")
+    assert len(changed) == 1
+    full, _ = userdays.build(tmp / "raw", tmp / "store", tmp / "full.parquet")
+    assert (ud.days == full.days).all() and (ud.bits == full.bits).all()
+    ctx = FrameContext(tmp / "raw", tmp / "store")
+    pd.testing.assert_frame_equal(userdays.wau_by_week(ud), metrics.wau_by_week(ctx.sessions))
+
+
+def test_a_stale_store_is_rejected(indexed):
+    tmp, *_ = indexed
+    (tmp / "raw" / "events.csv").write_text("user_id,event_ts,event_type\n")
+    with pytest.raises(ValueError, match="stale"):
+        userdays.build(tmp / "raw", tmp / "store", tmp / "ud.parquet")
+
+
+def test_an_index_of_other_raw_data_is_rebuilt(indexed, write_random_raw):
+    tmp, ctx, ud, _ = indexed
+    assert userdays.load_or_build(tmp / "ud.parquet", ctx.raw_dir, ctx.store_dir).n_users
+    write_random_raw(tmp / "other", n_users=200, seed=5)  # another profile's raw data
+    store.ingest(tmp / "other", tmp / "other_store")
+    other = FrameContext(tmp / "other", tmp / "other_store")
+
+    got = userdays.load_or_build(tmp / "ud.parquet", other.raw_dir, other.store_dir)
+    pd.testing.assert_frame_equal(userdays.wau_by_week(got), metrics.wau_by_week(other.sessions))
+
+
+def test_folding_weeks_one_by_one_equals_one_append():
+    rng = np.random.default_rng(1)
+    day = rng.integers(20_000, 20_000 + 7 * 52, 5_000)
+    user = np.where(day < 20_100, rng.integers(-1, 40, 5_000), rng.integers(-1, 900, 5_000))
+    whole = userdays.UserDays()
+    whole.append(day, user)
+
+    ud = userdays.UserDays()
+    weeks = (day - 20_000) // 7
+    for w in range(52):
+        ud.append(day[weeks == w], user[weeks == w])
+    assert len(ud._days) < 2 * len(ud.days)  # capacity grew geometrically, not per week
+    for w in (30, 3, 51):  # re-fold weeks out of order, as an incremental build does
+        ud.drop(20_000 + 7 * w, 20_007 + 7 * w)
+        ud.append(day[weeks == w], user[weeks == w])
+    assert (ud.days == whole.days).all() and (ud.bits == whole.bits).all()
+
+
+def test_lifecycle_counts_calendar_periods_across_an_empty_one():
+    weeks = {0: [0, 1, 3], 1: [0, 3, 4], 2: [0]}  # user code -> weeks; week 2 is empty
+    ts = pd.Series(
+        [pd.Timestamp("2025-10-27") + pd.Timedelta(weeks=w) for ws in weeks.values() for w in ws]
+    )
+    code = np.array([u for u, ws in weeks.items() for _ in ws])
+    ud = userdays.UserDays()
+    ud.append((ts.to_numpy().astype("datetime64[D]").astype(np.int64)), code)
+
+    sessions = pd.DataFrame({"user_id": code.astype(str), "event_ts": ts})
+    for by in ("week", "month"):
+        expected = lifecycle(activity(sessions, by, user=code), gaps=(2,))
+        pd.testing.assert_frame_equal(userdays.lifecycle(ud, by, gaps=(2,)), expected)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from beamcart_metrics import FrameContext, metrics, store, userdict
+from beamcart_metrics.userdict import USER_CODE, UserDict
+
+
+def test_codes_are_shared_across_tables_and_stable_across_ingests(tmp_path, write_random_raw):
+    raw, st = tmp_path / "raw", tmp_path / "store"
+    write_random_raw(raw)
+    store.ingest(raw, st)
+    ids = UserDict.load(st).ids.to_pylist()
+    assert pq.read_metadata(st / "users.parquet").schema.to_arrow_schema().field(USER_CODE)
+
+    ctx = FrameContext(raw, st)
+    for frame in (ctx.users, ctx.sessions, ctx.orders):
+        assert frame[USER_CODE].dtype == "int32"
+        assert (
+            np.asarray(ids, dtype=object)[frame[USER_CODE]] == frame["user_id"].astype(str)
+        ).all()
+
+    # a new user is appended; existing users keep their codes
+    users = pd.read_csv(raw / "users.csv")
+    new = users.head(1).assign(user_id="new-user")
+    pd.concat([new, users]).to_csv(raw / "users.csv", index=False)
+    store.ingest(raw, st)
+    assert UserDict.load(st).ids.to_pylist() == ids + ["new-user"]
+
+
+def test_frames_without_codes_number_the_union_of_their_ids():
+    users = pd.DataFrame({"user_id": ["b", "a"]})
+    events = pd.DataFrame({"user_id": pd.Categorical(["c", None, "a", "b"])})
+    u, e = userdict.user_codes(users, events)
+    assert u.tolist() == [1, 0]
+    assert e.tolist() == [2, -1, 0, 1]
+
+
+def test_lookup_fills_unknown_and_missing_users():
+    keys, values = np.array([2, 0]), np.array([20, 0])
+    assert userdict.lookup(keys, values, np.array([0, 1, 2, 5, -1])).tolist() == [0, -1, 20, -1, -1]
+
+
+def test_distinct_count_paths_agree(monkeypatch):
+    rng = np.random.default_rng(0)
+    group, user = rng.integers(-1, 6, 10_000), rng.integers(-1, 500, 10_000)
+    ok = (group >= 0) & (user >= 0)
+    expected = pd.Series(user[ok]).groupby(group[ok]).nunique().reindex(range(7), fill_value=0)
+
+    bitmap = userdict.distinct_count(group, user, 7)
+    monkeypatch.setattr(userdict, "BITMAP_CELLS", 0)
+    assert bitmap.tolist() == userdict.distinct_count(group, user, 7).tolist() == expected.tolist()
+
+
+def test_metrics_match_on_codes_and_on_user_ids(tmp_path, write_random_raw):
+    write_random_raw(tmp_path / "raw")
+    store.ingest(tmp_path / "raw", tmp_path / "store")
+    ctx = FrameContext(tmp_path / "raw", tmp_path / "store")
+    users, sessions, orders = (
+        f.drop(columns=USER_CODE) for f in (ctx.users, ctx.sessions, ctx.orders)
+    )
+
+    pd.testing.assert_frame_equal(
+        metrics.opac_by_channel_week(ctx.users, ctx.sessions, ctx.orders),
+        metrics.opac_by_channel_week(users, sessions, orders),
+    )
+    pd.testing.assert_frame_equal(
+        metrics.mau_by_month(ctx.sessions), metrics.mau_by_month(sessions)
+    )
@@ -0,0 +1,115 @@
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from beamcart_metrics import FrameContext, arrowio, cube, metrics, rolling, warehouse
+from beamcart_metrics.churn import activity, lifecycle
+from beamcart_metrics.retention import cohort_sizes, retention_counts
+
+
+@pytest.fixture
+def ctx(tmp_path, write_random_raw):
+    write_random_raw(tmp_path / "raw")
+    ctx = FrameContext(tmp_path / "raw", tmp_path / "store", db_path=tmp_path / "b.duckdb")
+    yield ctx
+    ctx.reset()
+
+
+def _same(a: pd.DataFrame, b: pd.DataFrame):
+    pd.testing.assert_frame_equal(
+        a.reset_index(drop=True), b.reset_index(drop=True), check_dtype=False, rtol=1e-12
+    )
+
+
+def test_weekly_metrics_match_pandas(ctx):
+    _same(warehouse.wau_by_week(ctx.db), metrics.wau_by_week(ctx.sessions))
+    _same(warehouse.net_orders_by_week(ctx.db), metrics.net_orders_by_week(ctx.orders))
+    _same(warehouse.refunds_by_week(ctx.db), metrics.refunds_by_week(ctx.orders))
+    _same(
+        warehouse.mau_by_month(ctx.db),
+        metrics.mau_by_month(ctx.sessions).astype({"month": str}),
+    )
+    py = metrics.opac_by_channel_week(ctx.users, ctx.sessions, ctx.orders)
+    _same(warehouse.opac_by_channel_week(ctx.db), py.astype({"acquisition_channel": str}))
+
+
+def test_retention_and_churn_match_pandas(ctx):
+    pd.testing.assert_series_equal(
+        warehouse.cohort_sizes(ctx.db), cohort_sizes(ctx.users), check_dtype=False
+    )
+    for bucket in (1, 7):
+        pd.testing.assert_frame_equal(
+            warehouse.retention_counts(ctx.db, range(0, 20), bucket),
+            retention_counts(ctx.users, ctx.sessions, range(0, 20), bucket),
+            check_dtype=False,
+            check_names=False,
+        )
+    for by in ("week", "month"):
+        _same(
+            lifecycle(warehouse.activity(ctx.db, by), gaps=(2, 4)),
+            lifecycle(activity(ctx.sessions, by), gaps=(2, 4)),
+        )
+
+
+def test_rolling_actives_match_pandas(ctx):
+    act = rolling.active_days(ctx.sessions)
+    _same(warehouse.daily_actives(ctx.db), rolling.daily_actives(act))
+    _same(warehouse.active_days_histogram(ctx.db), rolling.active_days_histogram(act))
+
+
+def test_segment_cube_matches_pandas(ctx):
+    _same(warehouse.segment_cube(ctx.db), cube.segment_cube(ctx.users, ctx.sessions, ctx.orders))
+
+
+def test_database_is_reused_until_the_raw_data_changes(ctx):
+    ctx.db.close()
+    ctx.reset()
+    mtime = ctx.db_path.stat().st_mtime_ns
+    assert warehouse.is_current(ctx.db_path, ctx.raw_dir, ctx.store_dir)
+    warehouse.connect(ctx.db_path, ctx.raw_dir, ctx.store_dir).close()
+    assert ctx.db_path.stat().st_mtime_ns == mtime
+
+    with open(ctx.raw_dir / "orders.csv", "a") as f:
+        f.write("o_new,u0001,2025-12-01 10:00:00,99.5,1,0\n")
+    assert not warehouse.is_current(ctx.db_path, ctx.raw_dir, ctx.store_dir)
+    con = warehouse.connect(ctx.db_path, ctx.raw_dir, ctx.store_dir)
+    assert con.execute("SELECT COUNT(*) FROM orders").fetchone() == (801,)
+    with pytest.raises(duckdb.Error):  # read-only: safe to share between workers
+        con.execute("DELETE FROM orders")
+    con.close()
+
+
+def test_views_instead_of_materialised_tables(tmp_path, write_random_raw):
+    write_random_raw(tmp_path / "raw")
+    db = tmp_path / "v.duckdb"
+    warehouse.build(db, tmp_path / "raw", tmp_path / "store", materialise=False)
+    with duckdb.connect(str(db), read_only=True) as con:
+        kinds = dict(
+            con.execute("SELECT table_name, table_type FROM information_schema.tables").fetchall()
+        )
+        assert kinds["user_week"] == "VIEW" and kinds["events"] == "BASE TABLE"
+        assert warehouse.wau_by_week(con)["wau"].sum() > 0
+
+
+def test_arrow_hand_off_wraps_duckdb_results_and_scans_frames_in_place(ctx):
+    q = "SELECT week, user_id FROM user_week ORDER BY week, user_id"
+    df = arrowio.frame(ctx.db, q)
+
+    pd.testing.assert_frame_equal(df, ctx.db.execute(q).df().astype({"week": "datetime64[s]"}))
+    counts = arrowio.fetch(ctx.db, "SELECT COUNT(*) AS n FROM user_week GROUP BY week")
+    wrapped = arrowio.to_frame(counts)["n"].to_numpy()
+    assert np.shares_memory(wrapped, np.asarray(counts["n"].chunk(0)))  # no copy
+    assert isinstance(arrowio.frame(ctx.db, q, arrow_dtypes=True)["user_id"].dtype, pd.ArrowDtype)
+    assert sum(b.num_rows for b in arrowio.batches(ctx.db, q, rows=100)) == len(df)
+
+    # the pandas sessions, queried by name on the read-only connection
+    with arrowio.scan(ctx.db, s=ctx.sessions) as con:
+        got = arrowio.frame(
+            con,
+            "SELECT DISTINCT CAST(DATE_TRUNC('week', event_ts) AS DATE) AS week, user_id "
+            "FROM s ORDER BY week, user_id",
+        )
+    pd.testing.assert_frame_equal(got.astype({"user_id": object}), df)
+    with pytest.raises(duckdb.CatalogException):
+        ctx.db.execute("SELECT * FROM s")
@@ -0,0 +1,69 @@
+import pandas as pd
+
+from beamcart_metrics import FrameContext, store
+from beamcart_metrics.buckets import week_start
+from beamcart_metrics.weekly import weekly
+
+
+def _wau(sessions):
+    return (
+        sessions.assign(week_start=lambda d: week_start(d["event_ts"]))
+        .groupby("week_start", as_index=False)["user_id"]
+        .nunique()
+        .rename(columns={"user_id": "wau"})
+    )
+
+
+def _revenue(orders):
+    net = orders[orders["is_refund"] == 0].assign(week_start=lambda d: week_start(d["order_ts"]))
+    return net.groupby("week_start", as_index=False)["revenue"].sum()
+
+
+def _session(user_id, ts):
+    return {"user_id": user_id, "event_ts": ts, "event_type": "session_start"}
+
+
+def _append(path, rows):
+    df = pd.read_csv(path)
+    pd.concat([df, pd.DataFrame(rows)]).to_csv(path, index=False)
+
+
+def test_only_touched_weeks_are_recomputed_and_match_a_full_rebuild(tmp_path, capsys, write_raw):
+    raw, st, parts = tmp_path / "raw", tmp_path / "store", tmp_path / "partials"
+    write_raw(raw)
+    _append(raw / "events.csv", [_session("u2", "2025-11-04 09:00:00")])
+    store.ingest(raw, st)
+    ctx = FrameContext(raw, st)
+    weekly("wau", "sessions", _wau, ctx, parts)
+    weekly("rev", "orders", _revenue, ctx, parts)
+    assert "recomputed" not in capsys.readouterr().out  # first run: full build
+
+    # new rows land in the second week (or in none); a brand-new user must not touch week 1
+    _append(raw / "events.csv", [_session("u3", "2025-11-05 09:00:00"), _session("u1", None)])
+    order = {"order_id": "o3", "user_id": "u3", "order_ts": "2025-11-05 10:00:00"}
+    _append(raw / "orders.csv", [{**order, "revenue": 0.1, "items": 1, "is_refund": 0}])
+    store.ingest(raw, st)
+    ctx.reset()
+    wau = weekly("wau", "sessions", _wau, ctx, parts)
+    rev = weekly("rev", "orders", _revenue, ctx, parts)
+    out = capsys.readouterr().out
+    assert "wau: recomputed 1 of 2 weeks" in out
+    assert "rev: recomputed 1 of 2 weeks" in out
+    assert wau["wau"].tolist() == [2, 2]
+
+    full = FrameContext(raw, st, full_refresh=True)
+    assert wau.to_csv(index=False) == weekly("wau", "sessions", _wau, full, parts).to_csv(
+        index=False
+    )
+    assert rev.to_csv(index=False) == _revenue(full.orders).to_csv(index=False)
+
+
+def test_stale_store_computes_everything_without_partials(tmp_path, write_raw):
+    raw, parts = tmp_path / "raw", tmp_path / "partials"
+    write_raw(raw)
+    ctx = FrameContext(raw, tmp_path / "store")
+
+    wau = weekly("wau", "sessions", _wau, ctx, parts)
+
+    assert wau["wau"].tolist() == [2]
+    assert not parts.exists()